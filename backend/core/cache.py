@@ -0,0 +1,90 @@
+"""
+In-process TTL cache for MedSync
+Small thread-safe key/value cache used by services to keep hot,
+cheap-to-invalidate results in memory for a bounded time
+"""
+
+from typing import Any, Callable, Dict, Hashable, Optional
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Thread-safe dictionary whose entries expire after ttl_seconds
+
+    When max_entries is reached the entry closest to expiry is evicted.
+    Each API worker has its own cache, so writers invalidate the local copy
+    and the TTL bounds how stale other workers can be.
+    """
+
+    def __init__(self, ttl_seconds: float = 60, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._data: Dict[Hashable, tuple] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        expires_at = time.monotonic() + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.max_entries:
+                self._evict()
+            self._data[key] = (expires_at, value)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the cached value or call loader() and cache its result"""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every key for which predicate(key) is true"""
+        with self._lock:
+            doomed = [key for key in self._data if predicate(key)]
+            for key in doomed:
+                del self._data[key]
+            return len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def _evict(self):
+        now = time.monotonic()
+        expired = [key for key, item in self._data.items() if item[0] <= now]
+        for key in expired:
+            del self._data[key]
+        if len(self._data) >= self.max_entries:
+            del self._data[min(self._data, key=lambda k: self._data[k][0])]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses
+            }
@@ -2,6 +2,7 @@ import mysql.connector
 from mysql.connector import pooling
 import os
 import logging
+import threading
 from typing import Optional, Tuple, Any, List, Dict
 from contextlib import contextmanager
 from dotenv import load_dotenv
@@ -94,13 +95,42 @@ def get_db_cursor(connection):
             cursor.close()
 
 
+def create_pool(pool_name: str, pool_size: int):
+    """Create an additional connection pool with the main pool's settings"""
+    pool = pooling.MySQLConnectionPool(
+        pool_name=pool_name,
+        pool_size=pool_size,
+        pool_reset_session=True,
+        **DB_CONFIG
+    )
+    logger.info(f"✅ Connection pool {pool_name} ({pool_size}) created successfully")
+    return pool
+
+
+# Secondary pool for long report and background reads, created on first use
+# so request handlers holding a main pool connection never compete with
+# them for the same 10 connections
+_read_pool = None
+_read_pool_lock = threading.Lock()
+
+
+def get_read_pool():
+    """Get (creating on first call) the connection pool used for report and background reads"""
+    global _read_pool
+    if _read_pool is None:
+        with _read_pool_lock:
+            if _read_pool is None:
+                _read_pool = create_pool('medsync_read_pool', int(os.getenv('DB_READ_POOL_SIZE', '16')))
+    return _read_pool
+
+
 @contextmanager
-def get_db():
+def get_db(pool=None):
     """Context manager for database connection and cursor (FastAPI compatible)"""
     connection = None
     cursor = None
     try:
-        connection = connection_pool.get_connection()
+        connection = (pool or connection_pool).get_connection()
         cursor = connection.cursor(dictionary=True, buffered=True)
         yield (cursor, connection)
         connection.commit()
@@ -3,13 +3,28 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from core.database import test_database_connection, get_database_info
 from core.db_export import export_database
+from datetime import time
+from services.scheduler import scheduler
+from services.archive import archive_service
+from services.no_show_sweeper import no_show_sweeper
+from services.waitlist import waitlist_service
+from services.doctor_daily_stats import doctor_daily_stats
+from services.patient_statistics import patient_statistics
+from services.branch_statistics import branch_statistics
+from services.revenue_ledger import revenue_ledger
+from services.report_jobs import report_jobs
+from services.report_summaries import report_summaries
+from services.report_pregeneration import report_pregeneration
+from services.analytics_snapshot import analytics_snapshot
+from services.medication_search import medication_search
 
 # Import routers
 from routers import (
     auth, doctor, appointment, branch, patient, conditions, 
     staff, timeslot, insurance, medication, prescription, 
     consultation, treatment_catalogue, treatment, payment, invoice, claims,
-    profile_patient, dashboard_patient, dashboard_doctor, reports
+    profile_patient, dashboard_patient, dashboard_doctor, reports, maintenance,
+    waitlist
 )
 
 @asynccontextmanager
@@ -25,8 +40,39 @@ async def lifespan(app: FastAPI):
     else:
         print("❌ Database connection failed!")
     
+    # Waitlist index lives in memory; rebuild it from the database
+    waitlist_service.load()
+    # Medication typeahead index, also in memory
+    if ok:
+        medication_search.rebuild()
+    
+    # Background maintenance jobs
+    scheduler.register("archive", archive_service.run, daily_at=time(2, 0))
+    scheduler.register("no_show_sweep", no_show_sweeper.run, daily_at=time(23, 30))
+    scheduler.register("waitlist_expire_holds", waitlist_service.expire_holds, interval_seconds=60)
+    scheduler.register("doctor_stats_sync", doctor_daily_stats.sync_changes, interval_seconds=doctor_daily_stats.poll_seconds)
+    scheduler.register("doctor_stats_reconcile", doctor_daily_stats.reconcile, daily_at=time(3, 0))
+    # Age buckets shift as birthdays pass, so rebuild just after midnight
+    scheduler.register("patient_stats_rebuild", patient_statistics.rebuild, daily_at=time(0, 5))
+    scheduler.register("branch_stats_rebuild", branch_statistics.rebuild, daily_at=time(3, 30))
+    scheduler.register("revenue_ledger_rebuild", revenue_ledger.rebuild, daily_at=time(3, 45))
+    scheduler.register("report_cache_purge", report_jobs.purge_expired, interval_seconds=600)
+    scheduler.register("report_summary_refresh", report_summaries.refresh, interval_seconds=report_summaries.refresh_seconds)
+    scheduler.register("report_summary_rebuild", report_summaries.rebuild, daily_at=time(3, 50))
+    # After the nightly rebuilds, which bump the data versions in the cache keys
+    scheduler.register("report_pregenerate", report_pregeneration.run, daily_at=time(4, 15))
+    if analytics_snapshot.enabled:
+        scheduler.register("analytics_snapshot_sync", analytics_snapshot.sync, interval_seconds=analytics_snapshot.sync_seconds)
+        # Full recopy drops rows deleted in MySQL, which the watermarks never see
+        scheduler.register("analytics_snapshot_rebuild", analytics_snapshot.rebuild, daily_at=time(4, 30))
+    # Drops the stale n-gram postings that edits leave behind
+    scheduler.register("medication_search_rebuild", medication_search.rebuild, daily_at=time(4, 45))
+    scheduler.start()
+    
     yield
     
+    scheduler.stop()
+    report_jobs.shutdown()
     print("👋 Shutting down MedSync API...")
 
 # Create FastAPI app
@@ -67,6 +113,8 @@ app.include_router(profile_patient.router, prefix="/profile-patient")
 app.include_router(dashboard_patient.router, prefix="/dashboard-patient")
 app.include_router(dashboard_doctor.router, prefix="/dashboard-doctor")
 app.include_router(reports.router, prefix="/reports")
+app.include_router(maintenance.router, prefix="/maintenance")
+app.include_router(waitlist.router, prefix="/waitlist")
 # app.include_router(dashboard_staff.router, prefix="/dashboard-staff")
 
 @app.get("/")
@@ -1,3 +1,3 @@
-from . import dashboard_patient, patient, doctor, appointment, branch, staff, timeslot, insurance, medication, consultation, treatment_catalogue, prescription, treatment, conditions, payment, invoice, claims, profile_patient , dashboard_doctor
+from . import dashboard_patient, patient, doctor, appointment, branch, staff, timeslot, insurance, medication, consultation, treatment_catalogue, prescription, treatment, conditions, payment, invoice, claims, profile_patient , dashboard_doctor, maintenance, waitlist
 
-__all__ = ["patient", "doctor", "appointment", "branch", "staff", "timeslot", "insurance", "medication", "consultation", "treatment_catalogue", "prescription", "treatment", "conditions", "payment", "invoice", "claims", "profile_patient", "dashboard_patient", "dashboard_doctor"]
\ No newline at end of file
+__all__ = ["patient", "doctor", "appointment", "branch", "staff", "timeslot", "insurance", "medication", "consultation", "treatment_catalogue", "prescription", "treatment", "conditions", "payment", "invoice", "claims", "profile_patient", "dashboard_patient", "dashboard_doctor", "maintenance", "waitlist"]
\ No newline at end of file
@@ -1,9 +1,14 @@
 from fastapi import APIRouter, HTTPException, status, Query
-from typing import Optional
-from datetime import date, time
-from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import date, time, timedelta
+from pydantic import BaseModel, Field, validator
 from core.database import get_db
+from services.archive import archive_service
+from services.waitlist import waitlist_service
+from services.doctor_stats import doctor_stats_service
+from services.doctor_daily_stats import doctor_daily_stats
 import logging
+import uuid
 
 router = APIRouter(tags=["appointments"])
 
@@ -11,6 +16,9 @@ router = APIRouter(tags=["appointments"])
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Upper bound on slots claimed by one batch booking (covers a 52-week series twice a week)
+MAX_BATCH_SLOTS = 104
+
 # ============================================
 # PYDANTIC SCHEMAS
 # ============================================
@@ -43,6 +51,44 @@ class AppointmentBookingResponse(BaseModel):
             }
         }
 
+class RecurrenceRule(BaseModel):
+    doctor_id: str = Field(..., description="Doctor ID (UUID)")
+    branch_id: Optional[str] = Field(None, description="Branch ID (UUID), any branch if omitted")
+    start_date: date = Field(..., description="First date of the series (YYYY-MM-DD)")
+    weekdays: List[int] = Field(..., min_items=1, description="Weekdays to book (0=Monday ... 6=Sunday)")
+    weeks: int = Field(..., ge=1, le=52, description="Number of weeks the series runs")
+    start_time: time = Field(..., description="Slot start time (HH:MM:SS)")
+
+    @validator('weekdays')
+    def validate_weekdays(cls, v):
+        if any(day < 0 or day > 6 for day in v):
+            raise ValueError('weekdays must be between 0 (Monday) and 6 (Sunday)')
+        return sorted(set(v))
+
+class BatchBookingRequest(BaseModel):
+    patient_id: str = Field(..., description="Patient ID (UUID)")
+    time_slot_ids: Optional[List[str]] = Field(None, description="Explicit time slot IDs to book")
+    recurrence: Optional[RecurrenceRule] = Field(None, description="Recurrence rule used to pick slots")
+    mode: str = Field("all_or_nothing", pattern="^(all_or_nothing|best_effort)$")
+    notes: Optional[str] = Field(None, description="Notes applied to every appointment")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "patient_id": "patient-uuid-here",
+                "recurrence": {
+                    "doctor_id": "doctor-uuid-here",
+                    "branch_id": "branch-uuid-here",
+                    "start_date": "2025-11-03",
+                    "weekdays": [0, 3],
+                    "weeks": 6,
+                    "start_time": "10:00:00"
+                },
+                "mode": "all_or_nothing",
+                "notes": "Physiotherapy follow-up series"
+            }
+        }
+
 class AppointmentUpdateRequest(BaseModel):
     status: Optional[str] = Field(None, pattern="^(Scheduled|Completed|Cancelled|No-Show)$")
     notes: Optional[str] = None
@@ -99,6 +145,7 @@ def book_appointment(booking_data: AppointmentBookingRequest):
                         ts.available_date,
                         ts.start_time,
                         ts.end_time,
+                        ts.doctor_id,
                         u.full_name as doctor_name,
                         b.branch_name
                     FROM time_slot ts
@@ -141,6 +188,15 @@ def book_appointment(booking_data: AppointmentBookingRequest):
                         detail=f"Cannot book time slot in the past (Date: {slot['available_date']})"
                     )
                 
+                # Check if held for a waitlisted patient
+                hold = waitlist_service.get_hold(cursor, booking_data.time_slot_id)
+                if hold and hold['patient_id'] != booking_data.patient_id:
+                    logger.warning(f"Time slot held for waitlist entry {hold['waitlist_id']}: {booking_data.time_slot_id}")
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail=f"Time slot is held for a waitlisted patient until {hold['hold_expires_at']}"
+                    )
+                
                 logger.info(f"Pre-validation passed - Slot available on {slot['available_date']} at {slot['start_time']}")
                 
             except HTTPException:
@@ -223,6 +279,8 @@ def book_appointment(booking_data: AppointmentBookingRequest):
             # Process result
             if success == 1 or success is True:
                 logger.info(f"✅ Appointment booked successfully: {appointment_id}")
+                doctor_stats_service.invalidate(slot['doctor_id'])
+                doctor_daily_stats.touch(cursor, slot['doctor_id'], [slot['available_date']])
                 return AppointmentBookingResponse(
                     success=True,
                     message=error_message or "Appointment booked successfully",
@@ -266,6 +324,242 @@ def book_appointment(booking_data: AppointmentBookingRequest):
         )
 
 
+def _expand_recurrence(rule: RecurrenceRule) -> List[date]:
+    """Expand a weekly recurrence rule into the concrete dates of the series"""
+    dates = []
+    for offset in range(rule.weeks * 7):
+        day = rule.start_date + timedelta(days=offset)
+        if day.weekday() in rule.weekdays:
+            dates.append(day)
+    return dates
+
+
+def _merge_archived(hot_rows, archived_rows):
+    """Merge archived appointment rows into a hot result, newest first"""
+    if not archived_rows:
+        return hot_rows
+    for row in archived_rows:
+        row['is_archived'] = True
+    merged = list(hot_rows) + list(archived_rows)
+    merged.sort(key=lambda row: (row['available_date'], row['start_time']), reverse=True)
+    return merged
+
+
+@router.post("/book-batch", status_code=status.HTTP_201_CREATED)
+def book_appointments_batch(batch_data: BatchBookingRequest):
+    """
+    Book a series of appointments for one patient in a single transaction
+
+    - Slots come from an explicit list of IDs or a weekly recurrence rule
+    - All slots are locked with one SELECT ... FOR UPDATE, claimed with one
+      UPDATE and inserted with one multi-row INSERT
+    - all_or_nothing: any unavailable slot rolls back the whole batch (409)
+    - best_effort: available slots are booked, the rest are reported as failed
+    """
+    if bool(batch_data.time_slot_ids) == bool(batch_data.recurrence):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide exactly one of time_slot_ids or recurrence"
+        )
+
+    try:
+        with get_db() as (cursor, connection):
+            cursor.execute(
+                "SELECT patient_id FROM patient WHERE patient_id = %s",
+                (batch_data.patient_id,)
+            )
+            if not cursor.fetchone():
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Patient with ID {batch_data.patient_id} not found"
+                )
+
+            # Resolve the requested slots. Each entry keeps the caller's view of
+            # the slot so that unmatched recurrence dates still get a result row.
+            requested = []
+            if batch_data.recurrence:
+                rule = batch_data.recurrence
+                series_dates = _expand_recurrence(rule)
+                if not series_dates:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="Recurrence rule does not produce any dates"
+                    )
+                if len(series_dates) > MAX_BATCH_SLOTS:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"A batch can book at most {MAX_BATCH_SLOTS} slots"
+                    )
+
+                date_placeholders = ", ".join(["%s"] * len(series_dates))
+                query = f"""
+                    SELECT time_slot_id, available_date
+                    FROM time_slot
+                    WHERE doctor_id = %s
+                    AND start_time = %s
+                    AND available_date IN ({date_placeholders})
+                """
+                params = [rule.doctor_id, rule.start_time] + series_dates
+                if rule.branch_id:
+                    query += " AND branch_id = %s"
+                    params.append(rule.branch_id)
+                query += " ORDER BY available_date, is_booked"
+
+                cursor.execute(query, params)
+                slot_by_date = {}
+                for row in cursor.fetchall():
+                    # Prefer a free slot when several branches share the date
+                    slot_by_date.setdefault(row['available_date'], row['time_slot_id'])
+
+                for day in series_dates:
+                    requested.append({
+                        "time_slot_id": slot_by_date.get(day),
+                        "available_date": day
+                    })
+            else:
+                if len(batch_data.time_slot_ids) > MAX_BATCH_SLOTS:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"A batch can book at most {MAX_BATCH_SLOTS} slots"
+                    )
+                seen = set()
+                for slot_id in batch_data.time_slot_ids:
+                    if slot_id in seen:
+                        continue
+                    seen.add(slot_id)
+                    requested.append({"time_slot_id": slot_id, "available_date": None})
+
+            # Lock every resolved slot in one statement
+            slot_ids = [item['time_slot_id'] for item in requested if item['time_slot_id']]
+            locked = {}
+            if slot_ids:
+                id_placeholders = ", ".join(["%s"] * len(slot_ids))
+                cursor.execute(
+                    f"""SELECT time_slot_id, doctor_id, is_booked, available_date, start_time, end_time
+                    FROM time_slot
+                    WHERE time_slot_id IN ({id_placeholders})
+                    FOR UPDATE""",
+                    slot_ids
+                )
+                locked = {row['time_slot_id']: row for row in cursor.fetchall()}
+            holds = waitlist_service.get_holds(cursor, list(locked))
+
+            # A slot can be unbooked yet still carry a live appointment row
+            # (e.g. flipped by hand); inserting another would break uniqueness
+            occupied = set()
+            if locked:
+                id_placeholders = ", ".join(["%s"] * len(locked))
+                cursor.execute(
+                    f"""SELECT active_time_slot_id FROM appointment
+                    WHERE active_time_slot_id IN ({id_placeholders})""",
+                    list(locked)
+                )
+                occupied = {row['active_time_slot_id'] for row in cursor.fetchall()}
+
+            today = date.today()
+            results = []
+            claimable = []
+            for item in requested:
+                slot = locked.get(item['time_slot_id'])
+                slot_date = slot['available_date'] if slot else item['available_date']
+                result = {
+                    "time_slot_id": item['time_slot_id'],
+                    "available_date": str(slot_date) if slot_date else None,
+                    "start_time": str(slot['start_time']) if slot else None,
+                    "end_time": str(slot['end_time']) if slot else None,
+                    "booked": False,
+                    "appointment_id": None,
+                    "error": None
+                }
+                if not slot:
+                    result["error"] = "Time slot not found"
+                elif slot['is_booked'] == 1 or slot['is_booked'] is True:
+                    result["error"] = "Time slot already booked"
+                elif item['time_slot_id'] in occupied:
+                    result["error"] = "Time slot already has an appointment"
+                elif slot['available_date'] < today:
+                    result["error"] = "Cannot book time slot in the past"
+                elif holds.get(item['time_slot_id'], batch_data.patient_id) != batch_data.patient_id:
+                    result["error"] = "Time slot is held for a waitlisted patient"
+                else:
+                    result["appointment_id"] = str(uuid.uuid4())
+                    claimable.append(result)
+                results.append(result)
+
+            failed = [r for r in results if r["error"]]
+
+            if failed and batch_data.mode == "all_or_nothing":
+                logger.warning(f"Batch booking rejected for patient {batch_data.patient_id}: {len(failed)} unavailable slots")
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail={
+                        "error": f"{len(failed)} of {len(results)} slots are unavailable, nothing was booked",
+                        "results": [{**r, "appointment_id": None} for r in results]
+                    }
+                )
+
+            if claimable:
+                # Claim all slots at once; the FOR UPDATE locks guarantee the count
+                claim_ids = [r['time_slot_id'] for r in claimable]
+                claim_placeholders = ", ".join(["%s"] * len(claim_ids))
+                cursor.execute(
+                    f"""UPDATE time_slot
+                    SET is_booked = TRUE
+                    WHERE time_slot_id IN ({claim_placeholders})
+                    AND is_booked = FALSE""",
+                    claim_ids
+                )
+                if cursor.rowcount != len(claim_ids):
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail="Time slots changed during booking, please retry"
+                    )
+
+                cursor.executemany(
+                    """INSERT INTO appointment (appointment_id, time_slot_id, patient_id, status, notes)
+                    VALUES (%s, %s, %s, 'Scheduled', %s)""",
+                    [
+                        (r['appointment_id'], r['time_slot_id'], batch_data.patient_id, batch_data.notes)
+                        for r in claimable
+                    ]
+                )
+                for r in claimable:
+                    r["booked"] = True
+
+            connection.commit()
+
+            booked_days = {}
+            for r in claimable:
+                slot = locked[r['time_slot_id']]
+                booked_days.setdefault(slot['doctor_id'], set()).add(slot['available_date'])
+            for doctor_id, days in booked_days.items():
+                doctor_stats_service.invalidate(doctor_id)
+                doctor_daily_stats.touch(cursor, doctor_id, days)
+
+            logger.info(f"Batch booking for patient {batch_data.patient_id}: {len(claimable)} booked, {len(failed)} failed")
+
+            return {
+                "success": len(claimable) > 0,
+                "message": f"Booked {len(claimable)} out of {len(results)} appointments",
+                "mode": batch_data.mode,
+                "summary": {
+                    "total_requested": len(results),
+                    "total_booked": len(claimable),
+                    "total_failed": len(failed)
+                },
+                "results": results
+            }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in batch booking for patient {batch_data.patient_id}: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while booking appointments: {str(e)}"
+        )
+
+
 @router.get("/", status_code=status.HTTP_200_OK)
 def get_all_appointments(
     skip: int = Query(0, ge=0),
@@ -372,6 +666,29 @@ def get_appointment_by_id(appointment_id: str):
             )
             appointment = cursor.fetchone()
             
+            if not appointment and archive_service.needs_archive():
+                # Fall back to the archive for old cancelled/no-show appointments
+                cursor.execute(
+                    """SELECT 
+                        a.*,
+                        ts.available_date, ts.start_time, ts.end_time, ts.branch_id, ts.doctor_id,
+                        u_patient.full_name as patient_name, u_patient.email as patient_email,
+                        p.blood_group,
+                        u_doctor.full_name as doctor_name, u_doctor.email as doctor_email,
+                        d.medical_licence_no, d.consultation_fee,
+                        b.branch_name
+                    FROM appointment_archive a
+                    JOIN time_slot_archive ts ON a.time_slot_id = ts.time_slot_id
+                    JOIN patient p ON a.patient_id = p.patient_id
+                    JOIN user u_patient ON p.patient_id = u_patient.user_id
+                    JOIN doctor d ON ts.doctor_id = d.doctor_id
+                    JOIN user u_doctor ON d.doctor_id = u_doctor.user_id
+                    JOIN branch b ON ts.branch_id = b.branch_id
+                    WHERE a.appointment_id = %s""",
+                    (appointment_id,)
+                )
+                appointment = cursor.fetchone()
+            
             if not appointment:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -441,6 +758,24 @@ def get_appointments_by_patient(
             cursor.execute(query, params)
             appointments = cursor.fetchall()
             
+            # Past appointments may have been moved to the archive
+            if include_past and archive_service.needs_archive():
+                cursor.execute(
+                    """SELECT 
+                        a.*,
+                        ts.available_date, ts.start_time, ts.end_time,
+                        u_doctor.full_name as doctor_name,
+                        b.branch_name
+                    FROM appointment_archive a
+                    JOIN time_slot_archive ts ON a.time_slot_id = ts.time_slot_id
+                    JOIN doctor d ON ts.doctor_id = d.doctor_id
+                    JOIN user u_doctor ON d.doctor_id = u_doctor.user_id
+                    JOIN branch b ON ts.branch_id = b.branch_id
+                    WHERE a.patient_id = %s""",
+                    (patient_id,)
+                )
+                appointments = _merge_archived(appointments, cursor.fetchall())
+            
             return {
                 "patient_id": patient_id,
                 "total": len(appointments),
@@ -498,6 +833,24 @@ def get_appointments_by_doctor(
             cursor.execute(query, params)
             appointments = cursor.fetchall()
             
+            # Past appointments may have been moved to the archive
+            if include_past and archive_service.needs_archive():
+                cursor.execute(
+                    """SELECT 
+                        a.*,
+                        ts.available_date, ts.start_time, ts.end_time,
+                        u_patient.full_name as patient_name,
+                        b.branch_name
+                    FROM appointment_archive a
+                    JOIN time_slot_archive ts ON a.time_slot_id = ts.time_slot_id
+                    JOIN patient p ON a.patient_id = p.patient_id
+                    JOIN user u_patient ON p.patient_id = u_patient.user_id
+                    JOIN branch b ON ts.branch_id = b.branch_id
+                    WHERE ts.doctor_id = %s""",
+                    (doctor_id,)
+                )
+                appointments = _merge_archived(appointments, cursor.fetchall())
+            
             return {
                 "doctor_id": doctor_id,
                 "total": len(appointments),
@@ -518,15 +871,31 @@ def get_appointments_by_date(appointment_date: date):
     """Get all appointments for a specific date"""
     try:
         with get_db() as (cursor, connection):
+            # Dates before the archive watermark also need the archive tables
+            if archive_service.needs_archive(appointment_date):
+                appointment_source = """(
+                    SELECT appointment_id, time_slot_id, patient_id, status, notes, created_at, updated_at FROM appointment
+                    UNION ALL
+                    SELECT appointment_id, time_slot_id, patient_id, status, notes, created_at, updated_at FROM appointment_archive
+                ) a
+                JOIN (
+                    SELECT time_slot_id, doctor_id, branch_id, available_date, start_time, end_time FROM time_slot WHERE available_date = %s
+                    UNION ALL
+                    SELECT time_slot_id, doctor_id, branch_id, available_date, start_time, end_time FROM time_slot_archive WHERE available_date = %s
+                ) ts ON a.time_slot_id = ts.time_slot_id"""
+                source_params = (appointment_date, appointment_date)
+            else:
+                appointment_source = "appointment a JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id"
+                source_params = ()
+            
             cursor.execute(
-                """SELECT 
+                f"""SELECT 
                     a.*,
                     ts.available_date, ts.start_time, ts.end_time,
                     u_patient.full_name as patient_name,
                     u_doctor.full_name as doctor_name,
                     b.branch_name
-                FROM appointment a
-                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+                FROM {appointment_source}
                 JOIN patient p ON a.patient_id = p.patient_id
                 JOIN user u_patient ON p.patient_id = u_patient.user_id
                 JOIN doctor d ON ts.doctor_id = d.doctor_id
@@ -534,7 +903,7 @@ def get_appointments_by_date(appointment_date: date):
                 JOIN branch b ON ts.branch_id = b.branch_id
                 WHERE ts.available_date = %s
                 ORDER BY ts.start_time""",
-                (appointment_date,)
+                source_params + (appointment_date,)
             )
             appointments = cursor.fetchall()
             
@@ -605,6 +974,10 @@ def update_appointment(
             cursor.execute(update_query, params)
             connection.commit()
             
+            if update_data.status:
+                doctor_stats_service.invalidate_for_appointment(cursor, appointment_id)
+                doctor_daily_stats.touch_appointment(cursor, appointment_id)
+            
             # Fetch updated record
             cursor.execute(
                 "SELECT * FROM appointment WHERE appointment_id = %s",
@@ -668,12 +1041,23 @@ def cancel_appointment(appointment_id: str):
             
             connection.commit()
             
+            doctor_stats_service.invalidate_for_appointment(cursor, appointment_id)
+            doctor_daily_stats.touch_appointment(cursor, appointment_id)
+            
             logger.info(f"Appointment {appointment_id} cancelled successfully")
             
+            # Offer the freed slot to the best waitlisted patient
+            waitlist_offer = None
+            try:
+                waitlist_offer = waitlist_service.offer_slot(appointment['time_slot_id'])
+            except Exception as e:
+                logger.error(f"Error offering slot {appointment['time_slot_id']} to waitlist: {str(e)}")
+            
             return {
                 "success": True,
                 "message": "Appointment cancelled successfully",
-                "appointment_id": appointment_id
+                "appointment_id": appointment_id,
+                "offered_to_waitlist": waitlist_offer is not None
             }
             
     except HTTPException:
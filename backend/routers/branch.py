@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException, status, Query
 from typing import Optional
+from datetime import date, timedelta
 from core.database import get_db
+from services.branch_statistics import branch_statistics
 import logging
 
 router = APIRouter(tags=["branch"])
@@ -266,12 +268,16 @@ def get_branch_appointments(
     limit: int = Query(100, ge=1, le=500),
     status_filter: Optional[str] = Query(None, pattern="^(Scheduled|Completed|Cancelled|No-Show)$")
 ):
-    """Get all appointments for a branch"""
+    """
+    Get all appointments for a branch
+    
+    The total comes from the branch counters rather than a COUNT over the
+    branch's appointment history.
+    """
     try:
         with get_db() as (cursor, connection):
-            # Check if branch exists
-            cursor.execute("SELECT * FROM branch WHERE branch_id = %s", (branch_id,))
-            branch = cursor.fetchone()
+            # Check if branch exists (and read its counters)
+            branch = branch_statistics.get_counters(cursor, branch_id)
             
             if not branch:
                 raise HTTPException(
@@ -300,14 +306,7 @@ def get_branch_appointments(
                 query += " AND a.status = %s"
                 params.append(status_filter)
             
-            # Get total count
-            count_query = query.replace(
-                "SELECT a.*, ts.available_date, ts.start_time, ts.end_time, u_patient.full_name as patient_name, u_doctor.full_name as doctor_name",
-                "SELECT COUNT(*) as total"
-            )
-            cursor.execute(count_query, params)
-            total_result = cursor.fetchone()
-            total = total_result['total'] if total_result else 0
+            total = branch_statistics.appointment_total(branch, status_filter)
             
             # Add pagination
             query += " ORDER BY ts.available_date DESC, ts.start_time DESC LIMIT %s OFFSET %s"
@@ -413,73 +412,95 @@ def search_branch_by_city(city: str):
 
 @router.get("/{branch_id}/stats", status_code=status.HTTP_200_OK)
 def get_branch_statistics(branch_id: str):
-    """Get branch statistics (employees, doctors, patients, appointments)"""
+    """
+    Get branch statistics (employees, doctors, patients, appointments)
+    
+    Read from the trigger-maintained branch counters: one primary-key
+    lookup plus today's occupancy row.
+    """
     try:
         with get_db() as (cursor, connection):
-            # Check if branch exists
-            cursor.execute("SELECT * FROM branch WHERE branch_id = %s", (branch_id,))
-            branch = cursor.fetchone()
+            counters = branch_statistics.get_counters(cursor, branch_id)
             
-            if not branch:
+            if not counters:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Branch with ID {branch_id} not found"
                 )
             
-            stats = {
+            today = date.today()
+            occupancy = branch_statistics.get_occupancy(cursor, branch_id, today, today)
+            
+            return {
                 "branch_id": branch_id,
-                "branch_name": branch['branch_name']
+                "branch_name": counters['branch_name'],
+                "total_employees": counters['active_employees'],
+                "total_doctors": counters['active_doctors'],
+                "total_patients": counters['patients'],
+                "total_appointments": counters['appointments'],
+                "scheduled_appointments": counters['scheduled'],
+                "completed_appointments": counters['completed'],
+                "cancelled_appointments": counters['cancelled'],
+                "no_show_appointments": counters['no_show'],
+                "today_occupancy": occupancy[0] if occupancy else None,
+                "counters_updated_at": counters['updated_at']
             }
             
-            # Total employees
-            cursor.execute(
-                "SELECT COUNT(*) as total FROM employee WHERE branch_id = %s AND is_active = TRUE",
-                (branch_id,)
-            )
-            stats['total_employees'] = cursor.fetchone()['total']
-            
-            # Total doctors
-            cursor.execute(
-                """SELECT COUNT(*) as total FROM doctor d
-                   JOIN employee e ON d.doctor_id = e.employee_id
-                   WHERE e.branch_id = %s AND e.is_active = TRUE""",
-                (branch_id,)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching stats for branch {branch_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database error: {str(e)}"
+        )
+
+
+@router.get("/{branch_id}/occupancy", status_code=status.HTTP_200_OK)
+def get_branch_occupancy(
+    branch_id: str,
+    date_from: Optional[date] = Query(None, description="Defaults to today"),
+    date_to: Optional[date] = Query(None, description="Defaults to 7 days after date_from")
+):
+    """Get per-day slot occupancy and appointment counts for a branch"""
+    try:
+        date_from = date_from or date.today()
+        date_to = date_to or date_from + timedelta(days=7)
+        if date_to < date_from:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="date_to must not be before date_from"
             )
-            stats['total_doctors'] = cursor.fetchone()['total']
-            
-            # Total patients
-            cursor.execute(
-                "SELECT COUNT(*) as total FROM patient WHERE registered_branch_id = %s",
-                (branch_id,)
+        if (date_to - date_from).days > 366:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Date range cannot exceed 366 days"
             )
-            stats['total_patients'] = cursor.fetchone()['total']
+        
+        with get_db() as (cursor, connection):
+            counters = branch_statistics.get_counters(cursor, branch_id)
             
-            # Total appointments (all time)
-            cursor.execute(
-                """SELECT COUNT(*) as total FROM appointment a
-                   JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                   WHERE ts.branch_id = %s""",
-                (branch_id,)
-            )
-            stats['total_appointments'] = cursor.fetchone()['total']
+            if not counters:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Branch with ID {branch_id} not found"
+                )
             
-            # Scheduled appointments
-            cursor.execute(
-                """SELECT COUNT(*) as total FROM appointment a
-                   JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                   WHERE ts.branch_id = %s AND a.status = 'Scheduled'""",
-                (branch_id,)
-            )
-            stats['scheduled_appointments'] = cursor.fetchone()['total']
+            days = branch_statistics.get_occupancy(cursor, branch_id, date_from, date_to)
             
-            return stats
+            return {
+                "branch_id": branch_id,
+                "branch_name": counters['branch_name'],
+                "date_from": str(date_from),
+                "date_to": str(date_to),
+                "days": days or []
+            }
             
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error fetching stats for branch {branch_id}: {str(e)}")
+        logger.error(f"Error fetching occupancy for branch {branch_id}: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Database error: {str(e)}"
         )
-
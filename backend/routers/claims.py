@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, status, Query
 from typing import Optional
 from pydantic import BaseModel, Field, validator
 from core.database import get_db
+from services.insurance_statistics import insurance_statistics
 from datetime import date
 import logging
 import uuid
@@ -97,6 +98,7 @@ def create_claim(data: ClaimCreate):
                 (claim_id, data.invoice_id, data.insurance_id, data.claim_amount, data.claim_date or date.today(), data.notes)
             )
             connection.commit()
+            insurance_statistics.refresh_insurance(cursor, data.insurance_id)
             
             return {"success": True, "message": f"Claim created. Remaining: {remaining - data.claim_amount:.2f}", "claim_id": claim_id}
     except HTTPException:
@@ -165,43 +167,12 @@ def get_patient_claims(patient_id: str):
 
 @router.get("/insurance/{insurance_id}/summary")
 def get_insurance_summary(insurance_id: str):
-    """Get insurance claim summary with limits and utilization"""
+    """Get insurance claim summary with limits and utilization (served from the insurance statistics snapshot)"""
     try:
-        with get_db() as (cursor, connection):
-            # Get package info
-            cursor.execute("""
-                SELECT ip.annual_limit FROM insurance ins
-                JOIN insurance_package ip ON ins.insurance_package_id = ip.insurance_package_id
-                WHERE ins.insurance_id = %s
-            """, (insurance_id,))
-            result = cursor.fetchone()
-            if not result:
-                raise HTTPException(404, "Insurance not found")
-            annual_limit = float(result['annual_limit'])
-            
-            # Get year total
-            cursor.execute("""
-                SELECT COALESCE(SUM(claim_amount), 0) as year_total, COUNT(*) as count
-                FROM claim WHERE insurance_id = %s AND YEAR(claim_date) = YEAR(CURDATE())
-            """, (insurance_id,))
-            year_data = cursor.fetchone()
-            year_total = float(year_data['year_total'])
-            
-            # All time
-            cursor.execute(
-                "SELECT COALESCE(SUM(claim_amount), 0) as total FROM claim WHERE insurance_id = %s",
-                (insurance_id,)
-            )
-            all_time = float(cursor.fetchone()['total'])
-            
-            return {
-                "annual_limit": annual_limit,
-                "current_year_total": year_total,
-                "remaining_limit": annual_limit - year_total,
-                "utilization_percentage": (year_total / annual_limit * 100) if annual_limit > 0 else 0,
-                "all_time_total": all_time,
-                "claim_count": year_data['count']
-            }
+        summary = insurance_statistics.insurance_summary(insurance_id)
+        if summary is None:
+            raise HTTPException(404, "Insurance not found")
+        return summary
     except HTTPException:
         raise
     except Exception as e:
@@ -213,48 +184,9 @@ def get_claims_statistics(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None
 ):
-    """Get claims statistics with complex aggregations"""
+    """Get claims statistics (served from the insurance statistics snapshot)"""
     try:
-        with get_db() as (cursor, connection):
-            date_filter = ""
-            params = []
-            if start_date and end_date:
-                date_filter = "WHERE claim_date BETWEEN %s AND %s"
-                params = [start_date, end_date]
-            
-            # Overall stats
-            cursor.execute(f"""
-                SELECT COUNT(*) as total, COALESCE(SUM(claim_amount), 0) as sum,
-                       COALESCE(AVG(claim_amount), 0) as avg
-                FROM claim {date_filter}
-            """, params)
-            overall = cursor.fetchone()
-            
-            # By package
-            cursor.execute(f"""
-                SELECT ip.package_name, COUNT(c.claim_id) as count, COALESCE(SUM(c.claim_amount), 0) as total
-                FROM insurance_package ip
-                LEFT JOIN insurance ins ON ip.insurance_package_id = ins.insurance_package_id
-                LEFT JOIN claim c ON ins.insurance_id = c.insurance_id {date_filter.replace('claim_date', 'c.claim_date') if date_filter else ''}
-                GROUP BY ip.package_name
-                ORDER BY total DESC
-            """, params if date_filter else [])
-            by_package = cursor.fetchall()
-            
-            # Monthly trend
-            cursor.execute(f"""
-                SELECT DATE_FORMAT(claim_date, '%Y-%m') as month,
-                       COUNT(*) as count, COALESCE(SUM(claim_amount), 0) as total
-                FROM claim {date_filter}
-                GROUP BY month ORDER BY month DESC LIMIT 12
-            """, params)
-            monthly = cursor.fetchall()
-            
-            return {
-                "overall": overall,
-                "by_package": by_package or [],
-                "monthly_trend": monthly or []
-            }
+        return insurance_statistics.claims_statistics(start_date, end_date)
     except Exception as e:
         raise HTTPException(500, str(e))
 
@@ -267,10 +199,12 @@ def delete_claim(claim_id: str):
     try:
         with get_db() as (cursor, connection):
             cursor.execute("SELECT * FROM claim WHERE claim_id = %s", (claim_id,))
-            if not cursor.fetchone():
+            claim = cursor.fetchone()
+            if not claim:
                 raise HTTPException(404, "Claim not found")
             cursor.execute("DELETE FROM claim WHERE claim_id = %s", (claim_id,))
             connection.commit()
+            insurance_statistics.refresh_insurance(cursor, claim['insurance_id'])
             return {"success": True, "message": "Claim deleted"}
     except HTTPException:
         raise
@@ -401,6 +335,7 @@ def submit_insurance_claim(
             
             if success:
                 logger.info(f"✅ Claim submitted: {claim_id}")
+                insurance_statistics.refresh_insurance(cursor, insurance_id)
                 return {
                     "success": True,
                     "claim_id": claim_id,
@@ -3,6 +3,7 @@ from typing import Optional, List
 from pydantic import BaseModel, Field
 from datetime import date
 from core.database import get_db
+from services.patient_statistics import patient_statistics
 import logging
 import uuid
 
@@ -135,6 +136,7 @@ def add_patient_allergy(allergy_data: AddAllergyRequest):
             
             if success == 1 or success is True:
                 logger.info(f"Allergy added successfully: {allergy_id}")
+                patient_statistics.record_allergy_change(cursor, allergy_data.patient_id, added=True)
                 return AddAllergyResponse(
                     success=True,
                     message=error_message or "Patient allergy added successfully",
@@ -219,6 +221,7 @@ def delete_patient_allergy(allergy_id: str):
             
             connection.commit()
             logger.info(f"Allergy {allergy_id} deleted successfully")
+            patient_statistics.record_allergy_change(cursor, allergy['patient_id'], added=False)
             
             return {
                 "success": True,
@@ -2,6 +2,8 @@ from fastapi import APIRouter, HTTPException, status, Query
 from typing import Optional, List
 from pydantic import BaseModel, Field, validator
 from core.database import get_db
+from services.doctor_stats import doctor_stats_service
+from services.doctor_daily_stats import doctor_daily_stats
 import logging
 import uuid
 import json
@@ -204,6 +206,8 @@ def create_consultation(consultation_data: ConsultationCreate):
             # Process result
             if success == 1 or success is True:
                 logger.info(f"✅ Consultation created successfully: {consultation_id}")
+                doctor_stats_service.invalidate_for_appointment(cursor, consultation_data.appointment_id)
+                doctor_daily_stats.touch_appointment(cursor, consultation_data.appointment_id)
                 return ConsultationResponse(
                     success=True,
                     message=error_message or "Consultation created successfully",
@@ -685,6 +689,9 @@ def delete_consultation(consultation_rec_id: str, force: bool = False):
             )
             connection.commit()
             
+            doctor_stats_service.invalidate_for_appointment(cursor, consultation['appointment_id'])
+            doctor_daily_stats.touch_appointment(cursor, consultation['appointment_id'])
+            
             logger.info(f"✅ Consultation {consultation_rec_id} deleted (force={force})")
             
             return {
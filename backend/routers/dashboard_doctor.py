@@ -1,8 +1,10 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, status
 from typing import Optional
 from datetime import date, datetime, timedelta
 from pydantic import BaseModel
 from core.database import get_db
+from services.doctor_stats import doctor_stats_service
+from services.doctor_dashboard import doctor_dashboard_service
 import logging
 
 router = APIRouter(prefix="/doctors", tags=["doctor-dashboard"])
@@ -41,108 +43,58 @@ class RecentActivity(BaseModel):
 # ENDPOINTS
 # ============================================
 
+@router.get("/{doctor_id}/dashboard/bundle", status_code=status.HTTP_200_OK)
+def get_doctor_dashboard_bundle(doctor_id: str, days: int = Query(7, ge=1, le=90)):
+    """
+    Get every doctor dashboard panel in one request
+
+    Returns the stats, today's appointments and the upcoming appointments
+    for the next N days (same shapes as the /dashboard/stats,
+    /dashboard/today-appointments and /dashboard/upcoming endpoints).
+    The bundle is cached per doctor for a few seconds and dropped whenever
+    the doctor's stats are invalidated.
+    """
+    try:
+        bundle = doctor_dashboard_service.get_bundle(doctor_id, days)
+        if bundle is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Doctor with ID {doctor_id} not found"
+            )
+
+        return {"success": True, **bundle}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching dashboard bundle for doctor {doctor_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database error: {str(e)}"
+        )
+
+
 @router.get("/{doctor_id}/dashboard/stats", status_code=status.HTTP_200_OK, response_model=DashboardStats)
 def get_doctor_dashboard_stats(doctor_id: str):
-    """Get dashboard statistics for doctor"""
+    """
+    Get dashboard statistics for doctor
+
+    Served from the shared doctor stats service: one aggregate query,
+    cached per doctor per day and invalidated by booking, consultation
+    and status changes.
+    """
     try:
-        with get_db() as (cursor, connection):
-            # Verify doctor exists
-            cursor.execute("SELECT * FROM doctor WHERE doctor_id = %s", (doctor_id,))
-            doctor = cursor.fetchone()
-            
-            if not doctor:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Doctor with ID {doctor_id} not found"
-                )
-            
-            # Get today's date
-            today = date.today()
-            
-            # Today's appointments count
-            today_appointments_query = """
-                SELECT COUNT(*) as count
-                FROM appointment a
-                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                WHERE ts.doctor_id = %s
-                AND ts.available_date = %s
-                AND a.status != 'Cancelled'
-            """
-            cursor.execute(today_appointments_query, (doctor_id, today))
-            today_count = cursor.fetchone()
-            
-            # Pending consultations (appointments without completed consultation)
-            pending_consultations_query = """
-                SELECT COUNT(*) as count
-                FROM appointment a
-                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                LEFT JOIN consultation_record cr ON a.appointment_id = cr.appointment_id
-                WHERE ts.doctor_id = %s
-                AND ts.available_date = %s
-                AND a.status = 'Scheduled'
-                AND cr.consultation_rec_id IS NULL
-            """
-            cursor.execute(pending_consultations_query, (doctor_id, today))
-            pending_count = cursor.fetchone()
-            
-            # Completed today
-            completed_today_query = """
-                SELECT COUNT(*) as count
-                FROM appointment a
-                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                WHERE ts.doctor_id = %s
-                AND ts.available_date = %s
-                AND a.status = 'Completed'
-            """
-            cursor.execute(completed_today_query, (doctor_id, today))
-            completed_count = cursor.fetchone()
-            
-            # Unique patients seen today
-            patients_seen_query = """
-                SELECT COUNT(DISTINCT a.patient_id) as count
-                FROM appointment a
-                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                WHERE ts.doctor_id = %s
-                AND ts.available_date = %s
-                AND a.status = 'Completed'
-            """
-            cursor.execute(patients_seen_query, (doctor_id, today))
-            patients_count = cursor.fetchone()
-            
-            # Upcoming appointments (future dates)
-            upcoming_query = """
-                SELECT COUNT(*) as count
-                FROM appointment a
-                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                WHERE ts.doctor_id = %s
-                AND ts.available_date > %s
-                AND a.status = 'Scheduled'
-            """
-            cursor.execute(upcoming_query, (doctor_id, today))
-            upcoming_count = cursor.fetchone()
-            
-            # Total unique patients ever seen
-            total_patients_query = """
-                SELECT COUNT(DISTINCT a.patient_id) as count
-                FROM appointment a
-                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                WHERE ts.doctor_id = %s
-                AND a.status = 'Completed'
-            """
-            cursor.execute(total_patients_query, (doctor_id,))
-            total_patients_count = cursor.fetchone()
-            
-            logger.info(f"Retrieved dashboard stats for doctor {doctor_id}")
-            
-            return DashboardStats(
-                today_appointments=int(today_count['count']) if today_count['count'] else 0,
-                pending_consultations=int(pending_count['count']) if pending_count['count'] else 0,
-                completed_today=int(completed_count['count']) if completed_count['count'] else 0,
-                patients_seen=int(patients_count['count']) if patients_count['count'] else 0,
-                upcoming_appointments=int(upcoming_count['count']) if upcoming_count['count'] else 0,
-                total_patients=int(total_patients_count['count']) if total_patients_count['count'] else 0
+        stats = doctor_stats_service.get_stats(doctor_id)
+        if stats is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Doctor with ID {doctor_id} not found"
             )
-            
+
+        logger.info(f"Retrieved dashboard stats for doctor {doctor_id}")
+
+        return DashboardStats(**stats)
+
     except HTTPException:
         raise
     except Exception as e:
@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException, status, Query
 from typing import Optional, List
 from datetime import date, datetime, timedelta
 from pydantic import BaseModel, Field
-from core.database import get_db
+from services.fanout import fanout, fetch_one, fetch_all
 import logging
 
 router = APIRouter(prefix="/patients", tags=["patient-dashboard"])
@@ -78,6 +78,67 @@ class MedicalSummaryResponse(BaseModel):
     last_visit_date: Optional[date] = None
     next_appointment_date: Optional[date] = None
 
+# ============================================
+# SECTION HELPERS
+# ============================================
+
+def _fetch_active_prescriptions(cursor, patient_id: str, limit: int) -> List[dict]:
+    """Prescriptions from the last 90 days with their medications"""
+    prescriptions_query = """
+        SELECT DISTINCT
+            cr.consultation_rec_id,
+            cr.created_at as prescription_date,
+            u.full_name as doctor_name,
+            DATEDIFF(CURDATE(), cr.created_at) as days_since_prescribed
+        FROM consultation_record cr
+        JOIN prescription_item pi ON cr.consultation_rec_id = pi.consultation_rec_id
+        JOIN appointment a ON cr.appointment_id = a.appointment_id
+        JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+        JOIN doctor d ON ts.doctor_id = d.doctor_id
+        JOIN user u ON d.doctor_id = u.user_id
+        WHERE a.patient_id = %s
+        AND DATEDIFF(CURDATE(), cr.created_at) <= 90
+        ORDER BY cr.created_at DESC
+        LIMIT %s
+    """
+    cursor.execute(prescriptions_query, (patient_id, limit))
+    prescriptions = cursor.fetchall()
+    if not prescriptions:
+        return []
+    
+    # Medications for all prescriptions in one query
+    placeholders = ", ".join(["%s"] * len(prescriptions))
+    cursor.execute(
+        f"""SELECT 
+            pi.consultation_rec_id,
+            m.generic_name,
+            m.manufacturer,
+            m.form,
+            pi.dosage,
+            pi.frequency,
+            pi.duration_days as duration
+        FROM prescription_item pi
+        JOIN medication m ON pi.medication_id = m.medication_id
+        WHERE pi.consultation_rec_id IN ({placeholders})""",
+        [rx['consultation_rec_id'] for rx in prescriptions]
+    )
+    medications_by_rx = {}
+    for row in cursor.fetchall():
+        medications_by_rx.setdefault(row.pop('consultation_rec_id'), []).append(row)
+    
+    return [
+        {
+            'prescription_id': str(rx['consultation_rec_id']),
+            'prescription_date': rx['prescription_date'],
+            'doctor_name': rx['doctor_name'],
+            'medications': medications_by_rx.get(rx['consultation_rec_id'], []),
+            'days_since_prescribed': rx['days_since_prescribed'],
+            'is_active': rx['days_since_prescribed'] <= 30
+        }
+        for rx in prescriptions
+    ]
+
+
 # ============================================
 # ENDPOINTS
 # ============================================
@@ -114,229 +175,188 @@ def get_patient_medical_summary(
     try:
         logger.info(f"Fetching comprehensive medical summary for patient {patient_id}")
         
-        with get_db() as (cursor, connection):
-            # ============================================
-            # 1. GET PATIENT BASIC INFO
-            # ============================================
-            patient_query = """
+        # ============================================
+        # 1. GET PATIENT BASIC INFO
+        # ============================================
+        patient_query = """
+            SELECT 
+                p.patient_id,
+                u.full_name,
+                u.gender,
+                u.DOB,
+                p.blood_group,
+                p.allergies,
+                p.chronic_conditions,
+                NULL as current_medications,
+                b.branch_name as registered_branch
+            FROM patient p
+            JOIN user u ON p.patient_id = u.user_id
+            LEFT JOIN branch b ON p.registered_branch_id = b.branch_id
+            WHERE p.patient_id = %s
+        """
+        sections = {"patient": fetch_one(patient_query, (patient_id,))}
+        
+        # ============================================
+        # 2. GET RECENT CONSULTATIONS
+        # ============================================
+        if include_consultations:
+            consultations_query = """
                 SELECT 
-                    p.patient_id,
-                    u.full_name,
-                    u.gender,
-                    u.DOB,
-                    p.blood_group,
-                    p.allergies,
-                    p.chronic_conditions,
-                    NULL as current_medications,
-                    b.branch_name as registered_branch
-                FROM patient p
-                JOIN user u ON p.patient_id = u.user_id
-                LEFT JOIN branch b ON p.registered_branch_id = b.branch_id
-                WHERE p.patient_id = %s
-            """
-            cursor.execute(patient_query, (patient_id,))
-            patient = cursor.fetchone()
-            
-            if not patient:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Patient with ID {patient_id} not found"
-                )
-            
-            # Calculate age
-            today = date.today()
-            dob = patient['DOB']
-            age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-            
-            # Parse allergies, conditions, and medications
-            allergies = [a.strip() for a in patient['allergies'].split(',') if a.strip()] if patient['allergies'] else []
-            chronic_conditions = [c.strip() for c in patient['chronic_conditions'].split(',') if c.strip()] if patient['chronic_conditions'] else []
-            current_medications = [m.strip() for m in patient['current_medications'].split(',') if m.strip()] if patient['current_medications'] else []
-            
-            # ============================================
-            # 2. GET RECENT CONSULTATIONS
-            # ============================================
-            recent_consultations = []
-            if include_consultations:
-                consultations_query = """
-                    SELECT 
-                        cr.consultation_rec_id as consultation_id,
-                        cr.appointment_id,
-                        cr.created_at as consultation_date,
-                        u.full_name as doctor_name,
-                        GROUP_CONCAT(DISTINCT s.specialization_title SEPARATOR ', ') as specialty,
-                        cr.diagnoses as diagnosis,
-                        cr.symptoms
-                    FROM consultation_record cr
-                    JOIN appointment a ON cr.appointment_id = a.appointment_id
-                    JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                    JOIN doctor d ON ts.doctor_id = d.doctor_id
-                    JOIN user u ON d.doctor_id = u.user_id
-                    LEFT JOIN doctor_specialization ds ON d.doctor_id = ds.doctor_id
-                    LEFT JOIN specialization s ON ds.specialization_id = s.specialization_id
-                    WHERE a.patient_id = %s
-                    GROUP BY cr.consultation_rec_id, cr.appointment_id, cr.created_at, 
-                             u.full_name, cr.diagnoses, cr.symptoms
-                    ORDER BY cr.created_at DESC
-                    LIMIT %s
-                """
-                cursor.execute(consultations_query, (patient_id, consultations_limit))
-                recent_consultations = cursor.fetchall()
-            
-            # ============================================
-            # 3. GET ACTIVE PRESCRIPTIONS
-            # ============================================
-            active_prescriptions = []
-            if include_prescriptions:
-                prescriptions_query = """
-                    SELECT DISTINCT
-                        cr.consultation_rec_id,
-                        cr.created_at as prescription_date,
-                        u.full_name as doctor_name,
-                        DATEDIFF(CURDATE(), cr.created_at) as days_since_prescribed
-                    FROM consultation_record cr
-                    JOIN prescription_item pi ON cr.consultation_rec_id = pi.consultation_rec_id
-                    JOIN appointment a ON cr.appointment_id = a.appointment_id
-                    JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                    JOIN doctor d ON ts.doctor_id = d.doctor_id
-                    JOIN user u ON d.doctor_id = u.user_id
-                    WHERE a.patient_id = %s
-                    AND DATEDIFF(CURDATE(), cr.created_at) <= 90
-                    ORDER BY cr.created_at DESC
-                    LIMIT %s
-                """
-                cursor.execute(prescriptions_query, (patient_id, prescriptions_limit))
-                prescriptions = cursor.fetchall()
-                
-                # Get medications for each prescription
-                for rx in prescriptions:
-                    medications_query = """
-                        SELECT 
-                            m.generic_name,
-                            m.manufacturer,
-                            m.form,
-                            pi.dosage,
-                            pi.frequency,
-                            pi.duration_days as duration
-                        FROM prescription_item pi
-                        JOIN medication m ON pi.medication_id = m.medication_id
-                        WHERE pi.consultation_rec_id = %s
-                    """
-                    cursor.execute(medications_query, (rx['consultation_rec_id'],))
-                    medications = cursor.fetchall()
-                    
-                    active_prescriptions.append({
-                        'prescription_id': str(rx['consultation_rec_id']),
-                        'prescription_date': rx['prescription_date'],
-                        'doctor_name': rx['doctor_name'],
-                        'medications': medications,
-                        'days_since_prescribed': rx['days_since_prescribed'],
-                        'is_active': rx['days_since_prescribed'] <= 30
-                    })
-
-            # ============================================
-            # 4. GET RECENT LAB RESULTS
-            # ============================================
-            # Note: lab_result table doesn't exist in schema
-            recent_lab_results = []
-
-            # ============================================
-            # 5. GET LATEST VITAL SIGNS
-            # ============================================
-            # Note: consultation_record table doesn't have vitals columns
-            # Set to None for now
-            latest_vitals = None
-            
-            # ============================================
-            # 6. GET LAST VISIT AND NEXT APPOINTMENT
-            # ============================================
-            last_visit_query = """
-                SELECT MAX(ts.available_date) as last_visit
-                FROM appointment a
+                    cr.consultation_rec_id as consultation_id,
+                    cr.appointment_id,
+                    cr.created_at as consultation_date,
+                    u.full_name as doctor_name,
+                    GROUP_CONCAT(DISTINCT s.specialization_title SEPARATOR ', ') as specialty,
+                    cr.diagnoses as diagnosis,
+                    cr.symptoms
+                FROM consultation_record cr
+                JOIN appointment a ON cr.appointment_id = a.appointment_id
                 JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+                JOIN doctor d ON ts.doctor_id = d.doctor_id
+                JOIN user u ON d.doctor_id = u.user_id
+                LEFT JOIN doctor_specialization ds ON d.doctor_id = ds.doctor_id
+                LEFT JOIN specialization s ON ds.specialization_id = s.specialization_id
                 WHERE a.patient_id = %s
-                AND a.status = 'Completed'
+                GROUP BY cr.consultation_rec_id, cr.appointment_id, cr.created_at, 
+                         u.full_name, cr.diagnoses, cr.symptoms
+                ORDER BY cr.created_at DESC
+                LIMIT %s
             """
-            cursor.execute(last_visit_query, (patient_id,))
-            last_visit_result = cursor.fetchone()
-            last_visit_date = last_visit_result['last_visit'] if last_visit_result else None
-            
-            next_appointment_query = """
-                SELECT MIN(ts.available_date) as next_appointment
-                FROM appointment a
-                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                WHERE a.patient_id = %s
-                AND a.status = 'Scheduled'
-                AND ts.available_date >= CURDATE()
-            """
-            cursor.execute(next_appointment_query, (patient_id,))
-            next_appointment_result = cursor.fetchone()
-            next_appointment_date = next_appointment_result['next_appointment'] if next_appointment_result else None
-            
-            # ============================================
-            # 7. GENERATE MEDICAL ALERTS
-            # ============================================
-            medical_alerts = []
-            
-            # Alert for critical allergies
-            critical_allergies = ['penicillin', 'aspirin', 'sulfa', 'latex']
-            for allergy in allergies:
-                if any(crit in allergy.lower() for crit in critical_allergies):
-                    medical_alerts.append(f"⚠️ CRITICAL ALLERGY: {allergy}")
-            
-            # Alert for chronic conditions
-            if chronic_conditions:
-                medical_alerts.append(f"📋 {len(chronic_conditions)} chronic condition(s) on record")
-            
-            # Alert for abnormal recent lab results
-            abnormal_labs = [lab for lab in recent_lab_results if lab.get('status') in ['Abnormal', 'Critical']]
-            if abnormal_labs:
-                medical_alerts.append(f"⚕️ {len(abnormal_labs)} abnormal lab result(s) - review recommended")
-            
-            # Alert for no recent visit
-            if last_visit_date:
-                days_since_visit = (today - last_visit_date).days
-                if days_since_visit > 365:
-                    medical_alerts.append(f"📅 Last visit was {days_since_visit} days ago - checkup recommended")
-            
-            # Alert for multiple active prescriptions
-            if len(active_prescriptions) > 3:
-                medical_alerts.append(f"💊 {len(active_prescriptions)} active prescriptions - review for interactions")
-            
-            # ============================================
-            # 8. BUILD RESPONSE
-            # ============================================
-            logger.info(f"Successfully compiled medical summary for patient {patient_id}")
-            
-            return {
-                "patient_id": patient_id,
-                "patient_name": patient['full_name'],
-                "age": age,
-                "gender": patient['gender'],
-                "blood_group": patient['blood_group'],
-                "registered_branch": patient['registered_branch'],
-                "allergies": allergies,
-                "chronic_conditions": chronic_conditions,
-                "current_medications": current_medications,
-                "recent_consultations": recent_consultations,
-                "active_prescriptions": active_prescriptions,
-                "recent_lab_results": recent_lab_results,
-                "latest_vitals": latest_vitals,
-                "medical_alerts": medical_alerts,
-                "last_visit_date": str(last_visit_date) if last_visit_date else None,
-                "next_appointment_date": str(next_appointment_date) if next_appointment_date else None,
-                "summary_generated_at": datetime.now().isoformat(),
-                "data_completeness": {
-                    "has_allergies": len(allergies) > 0,
-                    "has_chronic_conditions": len(chronic_conditions) > 0,
-                    "has_current_medications": len(current_medications) > 0,
-                    "has_recent_consultations": len(recent_consultations) > 0,
-                    "has_active_prescriptions": len(active_prescriptions) > 0,
-                    "has_recent_labs": len(recent_lab_results) > 0,
-                    "has_vitals": latest_vitals is not None
-                }
-            }
-            
+            sections["consultations"] = fetch_all(consultations_query, (patient_id, consultations_limit))
+        
+        # ============================================
+        # 3. GET ACTIVE PRESCRIPTIONS
+        # ============================================
+        if include_prescriptions:
+            sections["prescriptions"] = lambda cursor: _fetch_active_prescriptions(cursor, patient_id, prescriptions_limit)
+        
+        # ============================================
+        # 4. GET LAST VISIT AND NEXT APPOINTMENT
+        # ============================================
+        last_visit_query = """
+            SELECT MAX(ts.available_date) as last_visit
+            FROM appointment a
+            JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+            WHERE a.patient_id = %s
+            AND a.status = 'Completed'
+        """
+        sections["last_visit"] = fetch_one(last_visit_query, (patient_id,))
+        
+        next_appointment_query = """
+            SELECT MIN(ts.available_date) as next_appointment
+            FROM appointment a
+            JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+            WHERE a.patient_id = %s
+            AND a.status = 'Scheduled'
+            AND ts.available_date >= CURDATE()
+        """
+        sections["next_appointment"] = fetch_one(next_appointment_query, (patient_id,))
+        
+        # Independent sections run concurrently; optional ones may come back empty
+        result = fanout.run(sections, defaults={"consultations": [], "prescriptions": []})
+        
+        if "patient" in result.errors:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT if result.errors["patient"] == "timeout" else status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Could not load patient {patient_id}: {result.errors['patient']}"
+            )
+        
+        patient = result.get("patient")
+        if not patient:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Patient with ID {patient_id} not found"
+            )
+        
+        # Calculate age
+        today = date.today()
+        dob = patient['DOB']
+        age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+        
+        # Parse allergies, conditions, and medications
+        allergies = [a.strip() for a in patient['allergies'].split(',') if a.strip()] if patient['allergies'] else []
+        chronic_conditions = [c.strip() for c in patient['chronic_conditions'].split(',') if c.strip()] if patient['chronic_conditions'] else []
+        current_medications = [m.strip() for m in patient['current_medications'].split(',') if m.strip()] if patient['current_medications'] else []
+        
+        recent_consultations = result.get("consultations") or []
+        active_prescriptions = result.get("prescriptions") or []
+        
+        # Note: lab_result table doesn't exist in schema
+        recent_lab_results = []
+        
+        # Note: consultation_record table doesn't have vitals columns
+        latest_vitals = None
+        
+        last_visit_result = result.get("last_visit")
+        last_visit_date = last_visit_result['last_visit'] if last_visit_result else None
+        next_appointment_result = result.get("next_appointment")
+        next_appointment_date = next_appointment_result['next_appointment'] if next_appointment_result else None
+        
+        # ============================================
+        # 5. GENERATE MEDICAL ALERTS
+        # ============================================
+        medical_alerts = []
+        
+        # Alert for critical allergies
+        critical_allergies = ['penicillin', 'aspirin', 'sulfa', 'latex']
+        for allergy in allergies:
+            if any(crit in allergy.lower() for crit in critical_allergies):
+                medical_alerts.append(f"⚠️ CRITICAL ALLERGY: {allergy}")
+        
+        # Alert for chronic conditions
+        if chronic_conditions:
+            medical_alerts.append(f"📋 {len(chronic_conditions)} chronic condition(s) on record")
+        
+        # Alert for abnormal recent lab results
+        abnormal_labs = [lab for lab in recent_lab_results if lab.get('status') in ['Abnormal', 'Critical']]
+        if abnormal_labs:
+            medical_alerts.append(f"⚕️ {len(abnormal_labs)} abnormal lab result(s) - review recommended")
+        
+        # Alert for no recent visit
+        if last_visit_date:
+            days_since_visit = (today - last_visit_date).days
+            if days_since_visit > 365:
+                medical_alerts.append(f"📅 Last visit was {days_since_visit} days ago - checkup recommended")
+        
+        # Alert for multiple active prescriptions
+        if len(active_prescriptions) > 3:
+            medical_alerts.append(f"💊 {len(active_prescriptions)} active prescriptions - review for interactions")
+        
+        # ============================================
+        # 6. BUILD RESPONSE
+        # ============================================
+        logger.info(f"Successfully compiled medical summary for patient {patient_id}")
+        
+        return {
+            "patient_id": patient_id,
+            "patient_name": patient['full_name'],
+            "age": age,
+            "gender": patient['gender'],
+            "blood_group": patient['blood_group'],
+            "registered_branch": patient['registered_branch'],
+            "allergies": allergies,
+            "chronic_conditions": chronic_conditions,
+            "current_medications": current_medications,
+            "recent_consultations": recent_consultations,
+            "active_prescriptions": active_prescriptions,
+            "recent_lab_results": recent_lab_results,
+            "latest_vitals": latest_vitals,
+            "medical_alerts": medical_alerts,
+            "last_visit_date": str(last_visit_date) if last_visit_date else None,
+            "next_appointment_date": str(next_appointment_date) if next_appointment_date else None,
+            "summary_generated_at": datetime.now().isoformat(),
+            "data_completeness": {
+                "has_allergies": len(allergies) > 0,
+                "has_chronic_conditions": len(chronic_conditions) > 0,
+                "has_current_medications": len(current_medications) > 0,
+                "has_recent_consultations": len(recent_consultations) > 0,
+                "has_active_prescriptions": len(active_prescriptions) > 0,
+                "has_recent_labs": len(recent_lab_results) > 0,
+                "has_vitals": latest_vitals is not None
+            },
+            **result.meta()
+        }
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -4,6 +4,11 @@ from pydantic import BaseModel, EmailStr, Field
 from datetime import date, timedelta
 from decimal import Decimal
 from core.database import get_db
+from services.doctor_stats import doctor_stats_service
+from routers import dashboard_doctor
+from services.doctor_daily_stats import doctor_daily_stats
+from services.doctor_performance import doctor_performance
+from services.analytics_snapshot import analytics_snapshot, SnapshotUnavailable
 import hashlib
 import json
 import logging
@@ -456,119 +461,50 @@ def get_all_doctors(skip: int = 0, limit: int = 100):
 
 @router.get("/performance-report", status_code=status.HTTP_200_OK)
 def get_all_doctors_performance_report(
-    period: str = Query("monthly", description="Period: daily, weekly, monthly, yearly"),
+    period: str = Query("monthly", pattern="^(daily|weekly|monthly|yearly|all)$", description="Period: daily, weekly, monthly, yearly (rolling, ending today) or all"),
     top_count: int = Query(10, description="Number of top/bottom performers to return"),
-    sort_by: str = Query("revenue", description="Sort by: revenue, completion_rate, no_show_rate, consultations")
+    sort_by: str = Query("revenue", description="Sort by: revenue, completion_rate, no_show_rate, consultations"),
+    engine: Optional[str] = Query(None, pattern="^(live|snapshot)$", description="Data source: live or snapshot (analytics copy)")
 ):
     """
     Get comprehensive performance report comparing all doctors
     
     Parameters:
-    - period: daily, weekly, monthly, yearly
+    - period: daily, weekly, monthly (30 days), yearly (365 days), ending today; all for all time
     - top_count: Number of top performers to display
     - sort_by: Sort criteria (revenue, completion_rate, no_show_rate, consultations)
+    - engine: "snapshot" reads the local analytics snapshot instead of MySQL
     
     Returns:
-    - List of all doctors with performance metrics
+    - List of all doctors with performance metrics, revenue rank and percentile
     - Top performers
     - Bottom performers
-    - Average metrics across all doctors
-    - Trends
+    - Average metrics and revenue percentiles across all doctors
+    - Trends against the previous period of the same length
     """
     try:
-        with get_db() as (cursor, connection):
-            # Get all active doctors with their metrics
-            cursor.execute(
-                """SELECT 
-                    d.doctor_id,
-                    u.full_name,
-                    d.consultation_fee,
-                    e.branch_id,
-                    b.branch_name,
-                    COUNT(DISTINCT a.appointment_id) as total_consultations,
-                    COUNT(DISTINCT CASE WHEN a.status = 'Completed' THEN a.appointment_id END) as completed,
-                    COUNT(DISTINCT CASE WHEN a.status = 'No-Show' THEN a.appointment_id END) as no_shows,
-                    COUNT(DISTINCT CASE WHEN a.status = 'Cancelled' THEN a.appointment_id END) as cancelled,
-                    COUNT(DISTINCT a.patient_id) as unique_patients,
-                    COALESCE(SUM(i.sub_total + COALESCE(i.tax_amount, 0)), 0) as total_revenue
-                FROM doctor d
-                JOIN user u ON d.doctor_id = u.user_id
-                JOIN employee e ON d.doctor_id = e.employee_id
-                LEFT JOIN branch b ON e.branch_id = b.branch_id
-                LEFT JOIN time_slot ts ON d.doctor_id = ts.doctor_id
-                LEFT JOIN appointment a ON ts.time_slot_id = a.time_slot_id
-                LEFT JOIN consultation_record cr ON a.appointment_id = cr.appointment_id
-                LEFT JOIN invoice i ON cr.consultation_rec_id = i.consultation_rec_id
-                WHERE e.is_active = TRUE
-                GROUP BY d.doctor_id, u.full_name, d.consultation_fee, e.branch_id, b.branch_name
-                ORDER BY total_revenue DESC"""
+        use_snapshot = analytics_snapshot.use(engine)
+        if use_snapshot:
+            report = doctor_performance.report(
+                period=period, sort_by=sort_by, top_count=top_count, use_snapshot=True
             )
-            doctors_data = cursor.fetchall()
-            
-            # Process doctors data to calculate additional metrics
-            doctors_metrics = []
-            for doctor in doctors_data:
-                total_consults = doctor['total_consultations'] or 0
-                completed = doctor['completed'] or 0
-                no_shows = doctor['no_shows'] or 0
-                
-                completion_rate = (completed / total_consults * 100) if total_consults > 0 else 0
-                no_show_rate = (no_shows / total_consults * 100) if total_consults > 0 else 0
-                avg_revenue = (doctor['total_revenue'] / completed) if completed > 0 else 0
-                
-                doctors_metrics.append({
-                    "doctor_id": doctor['doctor_id'],
-                    "doctor_name": doctor['full_name'],
-                    "branch_name": doctor['branch_name'],
-                    "consultation_fee": float(doctor['consultation_fee']) if doctor['consultation_fee'] else 0.0,
-                    "total_consultations": total_consults,
-                    "completed_consultations": completed,
-                    "no_shows": no_shows,
-                    "cancelled": doctor['cancelled'] or 0,
-                    "unique_patients": doctor['unique_patients'] or 0,
-                    "completion_rate": round(completion_rate, 2),
-                    "no_show_rate": round(no_show_rate, 2),
-                    "total_revenue": round(doctor['total_revenue'], 2),
-                    "avg_revenue_per_consultation": round(avg_revenue, 2)
-                })
-            
-            # Sort based on criteria
-            if sort_by == "revenue":
-                doctors_metrics.sort(key=lambda x: x['total_revenue'], reverse=True)
-            elif sort_by == "completion_rate":
-                doctors_metrics.sort(key=lambda x: x['completion_rate'], reverse=True)
-            elif sort_by == "no_show_rate":
-                doctors_metrics.sort(key=lambda x: x['no_show_rate'], reverse=False)
-            else:  # consultations
-                doctors_metrics.sort(key=lambda x: x['total_consultations'], reverse=True)
-            
-            # Calculate averages
-            if doctors_metrics:
-                avg_consultations = sum(d['total_consultations'] for d in doctors_metrics) / len(doctors_metrics)
-                avg_completion_rate = sum(d['completion_rate'] for d in doctors_metrics) / len(doctors_metrics)
-                avg_no_show_rate = sum(d['no_show_rate'] for d in doctors_metrics) / len(doctors_metrics)
-                avg_revenue = sum(d['total_revenue'] for d in doctors_metrics) / len(doctors_metrics)
-            else:
-                avg_consultations = avg_completion_rate = avg_no_show_rate = avg_revenue = 0
-            
-            logger.info(f"Retrieved performance report for {len(doctors_metrics)} doctors")
-            
-            return {
-                "success": True,
-                "total_doctors": len(doctors_metrics),
-                "period": period,
-                "sort_by": sort_by,
-                "summary": {
-                    "average_consultations": round(avg_consultations, 2),
-                    "average_completion_rate": round(avg_completion_rate, 2),
-                    "average_no_show_rate": round(avg_no_show_rate, 2),
-                    "average_revenue": round(avg_revenue, 2)
-                },
-                "top_performers": doctors_metrics[:top_count],
-                "bottom_performers": doctors_metrics[-top_count:] if len(doctors_metrics) > top_count else [],
-                "all_doctors": doctors_metrics
-            }
-            
+        else:
+            with get_db() as (cursor, connection):
+                report = doctor_performance.report(
+                    cursor, period=period, sort_by=sort_by, top_count=top_count
+                )
+        
+        logger.info(f"Retrieved {period} performance report for {report['total_doctors']} doctors")
+        
+        return {
+            "success": True,
+            "sort_by": sort_by,
+            "engine": "snapshot" if use_snapshot else "live",
+            **report
+        }
+        
+    except SnapshotUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching performance report: {str(e)}")
         raise HTTPException(
@@ -578,12 +514,16 @@ def get_all_doctors_performance_report(
 
 
 @router.get("/availability-report", status_code=status.HTTP_200_OK)
-def get_availability_report(branch_id: Optional[str] = None):
+def get_availability_report(
+    branch_id: Optional[str] = None,
+    engine: Optional[str] = Query(None, pattern="^(live|snapshot)$", description="Data source: live or snapshot (analytics copy)")
+):
     """
     Get availability report across all doctors (optionally filtered by branch)
     
     Parameters:
     - branch_id: Optional branch UUID to filter doctors
+    - engine: "snapshot" reads the local analytics snapshot instead of MySQL
     
     Returns:
     - Doctor availability status
@@ -592,67 +532,74 @@ def get_availability_report(branch_id: Optional[str] = None):
     - Branch-wise coverage
     """
     try:
-        with get_db() as (cursor, connection):
-            # Build query
-            query = """SELECT 
-                d.doctor_id,
-                u.full_name,
-                d.is_available,
-                e.branch_id,
-                b.branch_name,
-                COUNT(DISTINCT CASE WHEN ts.available_date >= CURDATE() AND ts.is_booked = FALSE THEN ts.time_slot_id END) as available_slots,
-                COUNT(DISTINCT CASE WHEN ts.available_date >= CURDATE() AND ts.is_booked = TRUE THEN ts.time_slot_id END) as booked_slots,
-                GROUP_CONCAT(DISTINCT s.specialization_title SEPARATOR ', ') as specializations
-            FROM doctor d
-            JOIN user u ON d.doctor_id = u.user_id
-            JOIN employee e ON d.doctor_id = e.employee_id
-            LEFT JOIN branch b ON e.branch_id = b.branch_id
-            LEFT JOIN time_slot ts ON d.doctor_id = ts.doctor_id
-            LEFT JOIN doctor_specialization ds ON d.doctor_id = ds.doctor_id
-            LEFT JOIN specialization s ON ds.specialization_id = s.specialization_id
-            WHERE e.is_active = TRUE"""
-            
-            params = []
-            if branch_id:
-                query += " AND e.branch_id = %s"
-                params.append(branch_id)
-            
-            query += """ GROUP BY d.doctor_id, u.full_name, d.is_available, e.branch_id, b.branch_name
-                        ORDER BY b.branch_name, u.full_name"""
-            
-            cursor.execute(query, params)
-            availability_data = cursor.fetchall()
-            
-            # Group by branch
-            by_branch = {}
-            for doctor in availability_data:
-                branch_key = doctor['branch_name'] or 'Unassigned'
-                if branch_key not in by_branch:
-                    by_branch[branch_key] = []
-                
-                total_slots = (doctor['available_slots'] or 0) + (doctor['booked_slots'] or 0)
-                utilization = ((doctor['booked_slots'] or 0) / total_slots * 100) if total_slots > 0 else 0
-                
-                by_branch[branch_key].append({
-                    "doctor_id": doctor['doctor_id'],
-                    "doctor_name": doctor['full_name'],
-                    "is_available": doctor['is_available'],
-                    "specializations": doctor['specializations'],
-                    "available_slots": doctor['available_slots'] or 0,
-                    "booked_slots": doctor['booked_slots'] or 0,
-                    "total_slots": total_slots,
-                    "utilization_rate": round(utilization, 2)
-                })
+        use_snapshot = analytics_snapshot.use(engine)
+        if use_snapshot:
+            availability_data = analytics_snapshot.doctor_availability(branch_id)
+        else:
+            with get_db() as (cursor, connection):
+                # Build query
+                query = """SELECT 
+                    d.doctor_id,
+                    u.full_name,
+                    d.is_available,
+                    e.branch_id,
+                    b.branch_name,
+                    COUNT(DISTINCT CASE WHEN ts.available_date >= CURDATE() AND ts.is_booked = FALSE THEN ts.time_slot_id END) as available_slots,
+                    COUNT(DISTINCT CASE WHEN ts.available_date >= CURDATE() AND ts.is_booked = TRUE THEN ts.time_slot_id END) as booked_slots,
+                    GROUP_CONCAT(DISTINCT s.specialization_title SEPARATOR ', ') as specializations
+                FROM doctor d
+                JOIN user u ON d.doctor_id = u.user_id
+                JOIN employee e ON d.doctor_id = e.employee_id
+                LEFT JOIN branch b ON e.branch_id = b.branch_id
+                LEFT JOIN time_slot ts ON d.doctor_id = ts.doctor_id
+                LEFT JOIN doctor_specialization ds ON d.doctor_id = ds.doctor_id
+                LEFT JOIN specialization s ON ds.specialization_id = s.specialization_id
+                WHERE e.is_active = TRUE"""
             
-            logger.info(f"Retrieved availability report for {len(availability_data)} doctors")
+                params = []
+                if branch_id:
+                    query += " AND e.branch_id = %s"
+                    params.append(branch_id)
             
-            return {
-                "success": True,
-                "total_doctors": len(availability_data),
-                "branch_filter": branch_id,
-                "availability_by_branch": by_branch
-            }
+                query += """ GROUP BY d.doctor_id, u.full_name, d.is_available, e.branch_id, b.branch_name
+                            ORDER BY b.branch_name, u.full_name"""
             
+                cursor.execute(query, params)
+                availability_data = cursor.fetchall()
+        
+        # Group by branch
+        by_branch = {}
+        for doctor in availability_data:
+            branch_key = doctor['branch_name'] or 'Unassigned'
+            if branch_key not in by_branch:
+                by_branch[branch_key] = []
+            
+            total_slots = (doctor['available_slots'] or 0) + (doctor['booked_slots'] or 0)
+            utilization = ((doctor['booked_slots'] or 0) / total_slots * 100) if total_slots > 0 else 0
+            
+            by_branch[branch_key].append({
+                "doctor_id": doctor['doctor_id'],
+                "doctor_name": doctor['full_name'],
+                "is_available": doctor['is_available'],
+                "specializations": doctor['specializations'],
+                "available_slots": doctor['available_slots'] or 0,
+                "booked_slots": doctor['booked_slots'] or 0,
+                "total_slots": total_slots,
+                "utilization_rate": round(utilization, 2)
+            })
+        
+        logger.info(f"Retrieved availability report for {len(availability_data)} doctors")
+        
+        return {
+            "success": True,
+            "total_doctors": len(availability_data),
+            "branch_filter": branch_id,
+            "engine": "snapshot" if use_snapshot else "live",
+            "availability_by_branch": by_branch
+        }
+        
+    except SnapshotUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching availability report: {str(e)}")
         raise HTTPException(
@@ -1150,105 +1097,37 @@ def search_specializations(search_term: str):
 # DOCTOR DASHBOARD ENDPOINTS
 # ============================================
 
+# Same handler as /dashboard-doctor/{doctor_id}/dashboard/bundle
+router.add_api_route(
+    "/{doctor_id}/dashboard/bundle",
+    dashboard_doctor.get_doctor_dashboard_bundle,
+    methods=["GET"],
+    status_code=status.HTTP_200_OK
+)
+
+
 @router.get("/{doctor_id}/dashboard/stats", status_code=status.HTTP_200_OK)
 def get_doctor_dashboard_stats(doctor_id: str):
     """
     Get doctor dashboard statistics
     
     Returns:
-    - today_appointments: Number of appointments today
-    - pending_consultations: Consultations not yet completed
+    - today_appointments: Non-cancelled appointments today
+    - pending_consultations: Today's scheduled appointments without a consultation
     - completed_today: Completed consultations today
     - patients_seen: Unique patients seen today
-    - upcoming_appointments: Appointments in next 7 days
-    - total_patients: Total unique patients all-time
+    - upcoming_appointments: Scheduled appointments after today
+    - total_patients: Total unique patients seen all-time
     """
     try:
-        with get_db() as (cursor, connection):
-            # Verify doctor exists
-            cursor.execute("SELECT doctor_id FROM doctor WHERE doctor_id = %s", (doctor_id,))
-            if not cursor.fetchone():
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Doctor with ID {doctor_id} not found"
-                )
-            
-            # Today's appointments count
-            cursor.execute(
-                """SELECT COUNT(*) as count FROM appointment a
-                   JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                   WHERE ts.doctor_id = %s 
-                   AND ts.available_date = CURDATE()""",
-                (doctor_id,)
-            )
-            today_result = cursor.fetchone()
-            today_appointments = today_result['count'] if today_result else 0
-            
-            # Pending consultations (appointments with status Scheduled or Checked-in)
-            cursor.execute(
-                """SELECT COUNT(*) as count FROM appointment a
-                   JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                   WHERE ts.doctor_id = %s 
-                   AND a.status IN ('Scheduled', 'Checked-in')""",
-                (doctor_id,)
-            )
-            pending_result = cursor.fetchone()
-            pending_consultations = pending_result['count'] if pending_result else 0
-            
-            # Completed today
-            cursor.execute(
-                """SELECT COUNT(*) as count FROM appointment a
-                   JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                   WHERE ts.doctor_id = %s 
-                   AND ts.available_date = CURDATE()
-                   AND a.status = 'Completed'""",
-                (doctor_id,)
-            )
-            completed_result = cursor.fetchone()
-            completed_today = completed_result['count'] if completed_result else 0
-            
-            # Patients seen today (unique)
-            cursor.execute(
-                """SELECT COUNT(DISTINCT a.patient_id) as count FROM appointment a
-                   JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                   WHERE ts.doctor_id = %s 
-                   AND ts.available_date = CURDATE()""",
-                (doctor_id,)
-            )
-            patients_today_result = cursor.fetchone()
-            patients_seen = patients_today_result['count'] if patients_today_result else 0
-            
-            # Upcoming appointments (next 7 days, excluding today)
-            cursor.execute(
-                """SELECT COUNT(*) as count FROM appointment a
-                   JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                   WHERE ts.doctor_id = %s 
-                   AND ts.available_date > CURDATE()
-                   AND ts.available_date <= DATE_ADD(CURDATE(), INTERVAL 7 DAY)
-                   AND a.status NOT IN ('Cancelled', 'No-Show')""",
-                (doctor_id,)
-            )
-            upcoming_result = cursor.fetchone()
-            upcoming_appointments = upcoming_result['count'] if upcoming_result else 0
-            
-            # Total unique patients all-time
-            cursor.execute(
-                """SELECT COUNT(DISTINCT a.patient_id) as count FROM appointment a
-                   JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                   WHERE ts.doctor_id = %s""",
-                (doctor_id,)
+        stats = doctor_stats_service.get_stats(doctor_id)
+        if stats is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Doctor with ID {doctor_id} not found"
             )
-            total_patients_result = cursor.fetchone()
-            total_patients = total_patients_result['count'] if total_patients_result else 0
-            
-            return {
-                "today_appointments": today_appointments,
-                "pending_consultations": pending_consultations,
-                "completed_today": completed_today,
-                "patients_seen": patients_seen,
-                "upcoming_appointments": upcoming_appointments,
-                "total_patients": total_patients
-            }
+        
+        return stats
             
     except HTTPException:
         raise
@@ -1385,84 +1264,28 @@ def get_doctor_performance_metrics(doctor_id: str):
     - Average revenue per consultation
     - Total revenue generated
     - Performance trend
+    
+    Totals are summed from the doctor_daily_stats rollup, so the cost
+    depends on the number of active days rather than on the number of
+    appointments, consultations and invoices in the doctor's history.
     """
     try:
         with get_db() as (cursor, connection):
-            # Verify doctor exists
-            cursor.execute("SELECT doctor_id, is_available FROM doctor WHERE doctor_id = %s", (doctor_id,))
-            doctor = cursor.fetchone()
+            totals = doctor_daily_stats.get_totals(cursor, doctor_id)
             
-            if not doctor:
+            if not totals:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Doctor with ID {doctor_id} not found"
                 )
             
-            # Total consultations
-            cursor.execute(
-                """SELECT COUNT(*) as total FROM appointment a
-                   JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                   WHERE ts.doctor_id = %s""",
-                (doctor_id,)
-            )
-            total_consultations = cursor.fetchone()['total'] or 0
-            
-            # Completed consultations
-            cursor.execute(
-                """SELECT COUNT(*) as total FROM appointment a
-                   JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                   WHERE ts.doctor_id = %s AND a.status = 'Completed'""",
-                (doctor_id,)
-            )
-            completed_consultations = cursor.fetchone()['total'] or 0
-            
-            # No-show appointments
-            cursor.execute(
-                """SELECT COUNT(*) as total FROM appointment a
-                   JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                   WHERE ts.doctor_id = %s AND a.status = 'No-Show'""",
-                (doctor_id,)
-            )
-            no_shows = cursor.fetchone()['total'] or 0
-            
-            # Cancelled appointments
-            cursor.execute(
-                """SELECT COUNT(*) as total FROM appointment a
-                   JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                   WHERE ts.doctor_id = %s AND a.status = 'Cancelled'""",
-                (doctor_id,)
-            )
-            cancelled = cursor.fetchone()['total'] or 0
-            
-            # Unique patients
-            cursor.execute(
-                """SELECT COUNT(DISTINCT a.patient_id) as total FROM appointment a
-                   JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                   WHERE ts.doctor_id = %s""",
-                (doctor_id,)
-            )
-            unique_patients = cursor.fetchone()['total'] or 0
-            
-            # Total revenue (from invoices linked to consultations)
-            cursor.execute(
-                """SELECT SUM(i.sub_total + COALESCE(i.tax_amount, 0)) as total_revenue
-                   FROM invoice i
-                   JOIN consultation_record cr ON i.consultation_rec_id = cr.consultation_rec_id
-                   JOIN appointment a ON cr.appointment_id = a.appointment_id
-                   JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                   WHERE ts.doctor_id = %s""",
-                (doctor_id,)
-            )
-            revenue_result = cursor.fetchone()
-            total_revenue = float(revenue_result['total_revenue']) if revenue_result['total_revenue'] else 0.0
-            
-            # Average consultation fee
-            cursor.execute(
-                """SELECT d.consultation_fee FROM doctor d WHERE d.doctor_id = %s""",
-                (doctor_id,)
-            )
-            fee_result = cursor.fetchone()
-            avg_fee = float(fee_result['consultation_fee']) if fee_result and fee_result['consultation_fee'] else 0.0
+            total_consultations = int(totals['booked'])
+            completed_consultations = int(totals['completed'])
+            no_shows = int(totals['no_show'])
+            cancelled = int(totals['cancelled'])
+            unique_patients = int(totals['unique_patients'])
+            total_revenue = float(totals['revenue'])
+            avg_fee = float(totals['consultation_fee']) if totals['consultation_fee'] else 0.0
             
             # Calculate metrics
             completion_rate = (completed_consultations / total_consultations * 100) if total_consultations > 0 else 0
@@ -1484,7 +1307,7 @@ def get_doctor_performance_metrics(doctor_id: str):
                 "consultation_fee": avg_fee,
                 "total_revenue": round(total_revenue, 2),
                 "avg_revenue_per_consultation": round(avg_revenue_per_consultation, 2),
-                "is_available": doctor['is_available']
+                "is_available": totals['is_available']
             }
             
     except HTTPException:
@@ -1524,22 +1347,16 @@ def get_doctor_consultation_analytics(
                     detail=f"Doctor with ID {doctor_id} not found"
                 )
             
-            # Consultations per day in the last N days
-            cursor.execute(
-                f"""SELECT 
-                    ts.available_date as consultation_date,
-                    COUNT(*) as total_consultations,
-                    COUNT(CASE WHEN a.status = 'Completed' THEN 1 END) as completed,
-                    COUNT(CASE WHEN a.status = 'No-Show' THEN 1 END) as no_shows
-                FROM appointment a
-                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                WHERE ts.doctor_id = %s 
-                AND ts.available_date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
-                GROUP BY ts.available_date
-                ORDER BY ts.available_date DESC""",
-                (doctor_id, days)
-            )
-            daily_analytics = cursor.fetchall()
+            # Consultations per day in the last N days, from the daily rollup
+            daily_analytics = [
+                {
+                    "consultation_date": row['stat_date'],
+                    "total_consultations": row['booked'],
+                    "completed": row['completed'],
+                    "no_shows": row['no_show']
+                }
+                for row in doctor_daily_stats.get_daily(cursor, doctor_id, date.today() - timedelta(days=days))
+            ]
             
             # Peak hours analysis
             cursor.execute(
@@ -1675,7 +1492,7 @@ def get_doctor_schedule(
                 a.status as appointment_status
             FROM time_slot ts
             LEFT JOIN branch b ON ts.branch_id = b.branch_id
-            LEFT JOIN appointment a ON ts.time_slot_id = a.time_slot_id
+            LEFT JOIN appointment a ON ts.time_slot_id = a.active_time_slot_id
             LEFT JOIN patient p ON a.patient_id = p.patient_id
             LEFT JOIN user u ON p.patient_id = u.user_id
             WHERE ts.doctor_id = %s 
@@ -3,6 +3,7 @@ from typing import Optional
 from datetime import date
 from pydantic import BaseModel, Field
 from core.database import get_db
+from services.insurance_statistics import insurance_statistics
 import logging
 
 router = APIRouter(tags=["insurance"])
@@ -104,6 +105,7 @@ def create_insurance_package(package_data: InsurancePackageCreate):
             )
             
             connection.commit()
+            insurance_statistics.refresh_package(cursor, package_id)
             
             # Fetch created package
             cursor.execute(
@@ -267,6 +269,7 @@ def update_insurance_package(package_id: str, update_data: InsurancePackageUpdat
             
             cursor.execute(update_query, params)
             connection.commit()
+            insurance_statistics.refresh_package(cursor, package_id)
             
             # Fetch updated package
             cursor.execute(
@@ -330,6 +333,7 @@ def delete_insurance_package(package_id: str):
                 (package_id,)
             )
             connection.commit()
+            insurance_statistics.refresh_package(cursor, package_id)
             
             logger.info(f"Insurance package {package_id} deactivated")
             
@@ -394,6 +398,7 @@ def add_patient_insurance(insurance_data: PatientInsuranceCreate):
             logger.info(f"Patient insurance result - Success: {success}, Insurance ID: {insurance_id}")
             
             if success == 1 or success is True:
+                insurance_statistics.refresh_insurance(cursor, insurance_id)
                 return {
                     "success": True,
                     "message": error_message or "Patient insurance added successfully",
@@ -663,6 +668,7 @@ def update_patient_insurance(insurance_id: str, update_data: PatientInsuranceUpd
             
             cursor.execute(update_query, params)
             connection.commit()
+            insurance_statistics.refresh_insurance(cursor, insurance_id)
             
             # Fetch updated record
             cursor.execute(
@@ -719,6 +725,7 @@ def delete_patient_insurance(insurance_id: str):
                 (insurance_id,)
             )
             connection.commit()
+            insurance_statistics.refresh_insurance(cursor, insurance_id)
             
             logger.info(f"Insurance {insurance_id} deactivated")
             
@@ -743,48 +750,9 @@ def delete_patient_insurance(insurance_id: str):
 
 @router.get("/statistics/summary", status_code=status.HTTP_200_OK)
 def get_insurance_statistics():
-    """Get overall insurance statistics"""
+    """Get overall insurance statistics (served from the in-memory snapshot)"""
     try:
-        with get_db() as (cursor, connection):
-            stats = {}
-            
-            # Total packages
-            cursor.execute("SELECT COUNT(*) as total FROM insurance_package WHERE is_active = TRUE")
-            stats['total_active_packages'] = cursor.fetchone()['total']
-            
-            # Total insurances by status
-            cursor.execute("""
-                SELECT status, COUNT(*) as count 
-                FROM insurance 
-                GROUP BY status
-            """)
-            status_counts = cursor.fetchall()
-            stats['insurances_by_status'] = {row['status']: row['count'] for row in status_counts}
-            
-            # Expiring soon (next 30 days)
-            cursor.execute("""
-                SELECT COUNT(*) as count 
-                FROM insurance 
-                WHERE status = 'Active' 
-                AND end_date BETWEEN CURDATE() AND DATE_ADD(CURDATE(), INTERVAL 30 DAY)
-            """)
-            stats['expiring_soon'] = cursor.fetchone()['count']
-            
-            # Most popular package
-            cursor.execute("""
-                SELECT ip.package_name, COUNT(i.insurance_id) as count
-                FROM insurance i
-                JOIN insurance_package ip ON i.insurance_package_id = ip.insurance_package_id
-                WHERE i.status = 'Active'
-                GROUP BY ip.package_name
-                ORDER BY count DESC
-                LIMIT 1
-            """)
-            popular = cursor.fetchone()
-            stats['most_popular_package'] = popular if popular else None
-            
-            return {"statistics": stats}
-            
+        return {"statistics": insurance_statistics.insurance_statistics()}
     except Exception as e:
         logger.error(f"Error fetching insurance statistics: {str(e)}")
         raise HTTPException(
@@ -2,6 +2,8 @@ from fastapi import APIRouter, HTTPException, status, Query
 from typing import Optional
 from pydantic import BaseModel, Field, validator
 from core.database import get_db
+from services.doctor_daily_stats import doctor_daily_stats
+from services.revenue_ledger import revenue_ledger
 from datetime import date, timedelta
 import logging
 import uuid
@@ -148,6 +150,8 @@ def create_invoice(invoice_data: InvoiceCreate):
             )
             connection.commit()
             
+            doctor_daily_stats.touch_consultation(cursor, invoice_data.consultation_rec_id)
+            
             logger.info(f"✅ Invoice created successfully: {invoice_id}")
             
             return InvoiceResponse(
@@ -406,7 +410,8 @@ def update_invoice(invoice_id: str, update_data: InvoiceUpdate):
                 "SELECT * FROM invoice WHERE invoice_id = %s",
                 (invoice_id,)
             )
-            if not cursor.fetchone():
+            invoice = cursor.fetchone()
+            if not invoice:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Invoice with ID {invoice_id} not found"
@@ -441,6 +446,9 @@ def update_invoice(invoice_id: str, update_data: InvoiceUpdate):
             cursor.execute(update_query, params)
             connection.commit()
             
+            if update_data.tax_amount is not None:
+                doctor_daily_stats.touch_consultation(cursor, invoice['consultation_rec_id'])
+            
             # Fetch updated invoice
             cursor.execute(
                 "SELECT *, (sub_total + tax_amount) as total_amount FROM invoice WHERE invoice_id = %s",
@@ -515,6 +523,8 @@ def delete_invoice(invoice_id: str):
             )
             connection.commit()
             
+            doctor_daily_stats.touch_consultation(cursor, invoice['consultation_rec_id'])
+            
             logger.info(f"✅ Invoice {invoice_id} deleted successfully")
             
             return {
@@ -539,46 +549,16 @@ def delete_invoice(invoice_id: str):
 
 @router.get("/statistics/summary", status_code=status.HTTP_200_OK)
 def get_invoice_statistics():
-    """Get invoice summary statistics"""
+    """
+    Get invoice summary statistics
+    
+    Read from the monthly revenue ledger, which the invoice and payment
+    triggers keep current; only the current month's overdue days touch
+    the invoice table (through its due_date index).
+    """
     try:
         with get_db() as (cursor, connection):
-            # Total revenue
-            cursor.execute(
-                "SELECT SUM(sub_total + tax_amount) as total_revenue FROM invoice"
-            )
-            total_revenue = cursor.fetchone()['total_revenue'] or 0
-            
-            # Overdue invoices
-            cursor.execute(
-                """SELECT COUNT(*) as count, SUM(sub_total + tax_amount) as amount
-                FROM invoice
-                WHERE due_date < CURDATE()"""
-            )
-            overdue = cursor.fetchone()
-            
-            # Current month statistics
-            cursor.execute(
-                """SELECT 
-                    COUNT(*) as count,
-                    SUM(sub_total + tax_amount) as amount
-                FROM invoice
-                WHERE MONTH(created_at) = MONTH(CURDATE()) 
-                AND YEAR(created_at) = YEAR(CURDATE())"""
-            )
-            current_month = cursor.fetchone()
-            
-            return {
-                "total_revenue": float(total_revenue),
-                "total_invoices": cursor.execute("SELECT COUNT(*) as c FROM invoice") or cursor.fetchone()['c'],
-                "overdue_invoices": {
-                    "count": overdue['count'],
-                    "amount": float(overdue['amount']) if overdue['amount'] else 0
-                },
-                "current_month": {
-                    "count": current_month['count'],
-                    "amount": float(current_month['amount']) if current_month['amount'] else 0
-                }
-            }
+            return revenue_ledger.invoice_statistics(cursor)
             
     except Exception as e:
         logger.error(f"Error fetching invoice statistics: {str(e)}")
@@ -616,68 +596,20 @@ def get_doctor_financial_statistics(doctor_id: str):
             )
         
         with get_db() as (cursor, connection):
-            # Verify doctor exists
-            cursor.execute(
-                "SELECT * FROM doctor WHERE doctor_id = %s",
-                (doctor_id,)
-            )
-            if not cursor.fetchone():
+            # Totals come from the doctor_daily_stats rollup
+            totals = doctor_daily_stats.get_totals(cursor, doctor_id)
+            if not totals:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Doctor with ID {doctor_id} not found"
                 )
             
-            # Total revenue from consultations (consultation fees)
-            cursor.execute(
-                """SELECT 
-                    COUNT(DISTINCT cr.consultation_rec_id) as total_consultations,
-                    SUM(d.consultation_fee) as total_consultation_revenue,
-                    AVG(d.consultation_fee) as avg_consultation_fee
-                FROM consultation_record cr
-                JOIN appointment a ON cr.appointment_id = a.appointment_id
-                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                JOIN doctor d ON ts.doctor_id = d.doctor_id
-                WHERE d.doctor_id = %s""",
-                (doctor_id,)
-            )
-            consultation_stats = cursor.fetchone()
-            
-            # Treatment revenue
-            cursor.execute(
-                """SELECT 
-                    COUNT(DISTINCT t.treatment_id) as total_treatments,
-                    SUM(tc.base_price) as treatment_revenue
-                FROM treatment t
-                JOIN treatment_catalogue tc ON t.treatment_service_code = tc.treatment_service_code
-                JOIN consultation_record cr ON t.consultation_rec_id = cr.consultation_rec_id
-                JOIN appointment a ON cr.appointment_id = a.appointment_id
-                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                JOIN doctor d ON ts.doctor_id = d.doctor_id
-                WHERE d.doctor_id = %s""",
-                (doctor_id,)
-            )
-            treatment_stats = cursor.fetchone()
-            
-            # Total revenue from invoices
-            cursor.execute(
-                """SELECT 
-                    SUM(i.sub_total + i.tax_amount) as total_invoice_amount,
-                    COUNT(DISTINCT i.invoice_id) as total_invoices
-                FROM invoice i
-                JOIN consultation_record cr ON i.consultation_rec_id = cr.consultation_rec_id
-                JOIN appointment a ON cr.appointment_id = a.appointment_id
-                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                JOIN doctor d ON ts.doctor_id = d.doctor_id
-                WHERE d.doctor_id = %s""",
-                (doctor_id,)
-            )
-            invoice_stats = cursor.fetchone()
-            
-
+            total_consultations = int(totals['consultations'])
+            consultation_fee = float(totals['consultation_fee'] or 0)
             
             # Calculate totals
-            total_consultation_revenue = float(consultation_stats['total_consultation_revenue'] or 0)
-            treatment_revenue = float(treatment_stats['treatment_revenue'] or 0)
+            total_consultation_revenue = total_consultations * consultation_fee
+            treatment_revenue = float(totals['treatment_revenue'])
             total_revenue = total_consultation_revenue + treatment_revenue
             
             logger.info(f"Financial statistics retrieved for doctor {doctor_id}")
@@ -691,16 +623,16 @@ def get_doctor_financial_statistics(doctor_id: str):
                     "currency": "LKR"
                 },
                 "consultation_metrics": {
-                    "total_consultations": consultation_stats['total_consultations'] or 0,
-                    "average_fee": float(consultation_stats['avg_consultation_fee'] or 0)
+                    "total_consultations": total_consultations,
+                    "average_fee": consultation_fee if total_consultations else 0.0
                 },
                 "treatment_metrics": {
-                    "total_treatments": treatment_stats['total_treatments'] or 0,
+                    "total_treatments": int(totals['treatments']),
                     "treatment_revenue": treatment_revenue
                 },
                 "invoice_metrics": {
-                    "total_invoices": invoice_stats['total_invoices'] or 0,
-                    "total_invoice_amount": float(invoice_stats['total_invoice_amount'] or 0)
+                    "total_invoices": int(totals['invoices']),
+                    "total_invoice_amount": float(totals['revenue'])
                 }
             }
             
@@ -0,0 +1,450 @@
+"""
+Maintenance Router - Background Job Administration
+Inspect and manually trigger scheduled maintenance jobs
+"""
+
+from fastapi import APIRouter, HTTPException, status, Query
+from typing import Optional
+from datetime import date
+from services.scheduler import scheduler
+from services.archive import archive_service
+from services.no_show_sweeper import no_show_sweeper
+from services.doctor_daily_stats import doctor_daily_stats
+from services.patient_statistics import patient_statistics
+from services.branch_statistics import branch_statistics
+from services.revenue_ledger import revenue_ledger
+from services.insurance_statistics import insurance_statistics
+from services.report_cache import report_cache
+from services.report_summaries import report_summaries
+from services.report_pregeneration import report_pregeneration
+from services.analytics_snapshot import analytics_snapshot
+from services.medication_search import medication_search
+import logging
+
+router = APIRouter(tags=["maintenance"])
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# SCHEDULED JOBS
+# ============================================
+
+@router.get("/jobs", status_code=status.HTTP_200_OK)
+def get_jobs():
+    """List registered background jobs with their last run status"""
+    return {
+        "success": True,
+        "jobs": scheduler.status()
+    }
+
+
+@router.post("/jobs/{job_name}/run", status_code=status.HTTP_200_OK)
+def run_job(job_name: str):
+    """Run a registered background job immediately"""
+    if job_name not in scheduler.jobs:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job '{job_name}' not found"
+        )
+    try:
+        result = scheduler.run_now(job_name)
+        return {
+            "success": True,
+            "job": job_name,
+            "result": result
+        }
+    except Exception as e:
+        logger.error(f"Error running job {job_name}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Job '{job_name}' failed: {str(e)}"
+        )
+
+
+# ============================================
+# ARCHIVAL
+# ============================================
+
+@router.get("/archive/status", status_code=status.HTTP_200_OK)
+def get_archive_status():
+    """Get archive configuration and watermarks"""
+    try:
+        return {
+            "success": True,
+            **archive_service.status()
+        }
+    except Exception as e:
+        logger.error(f"Error fetching archive status: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database error: {str(e)}"
+        )
+
+
+@router.post("/archive/run", status_code=status.HTTP_200_OK)
+def run_archive(
+    horizon_days: Optional[int] = Query(None, ge=30, description="Archive rows older than this many days"),
+    batch_size: Optional[int] = Query(None, ge=1, le=5000, description="Rows moved per transaction"),
+    max_batches: Optional[int] = Query(None, ge=1, description="Maximum batches per table in this run")
+):
+    """Archive past time slots and appointments with custom bounds"""
+    try:
+        # Same named lock as the nightly job, so a manual run never overlaps it
+        result = scheduler.run_now(
+            "archive",
+            horizon_days=horizon_days,
+            batch_size=batch_size,
+            max_batches=max_batches
+        )
+        if result.get("skipped"):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Archive run skipped: {result['reason']}"
+            )
+        return {
+            "success": True,
+            **result
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error running archive: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Archive run failed: {str(e)}"
+        )
+
+
+# ============================================
+# NO-SHOW SWEEP
+# ============================================
+
+@router.post("/no-show-sweep", status_code=status.HTTP_200_OK)
+def run_no_show_sweep(
+    grace_minutes: Optional[int] = Query(None, ge=0, le=1440, description="Minutes after slot end before marking No-Show"),
+    batch_size: Optional[int] = Query(None, ge=1, le=10000, description="Appointments updated per transaction"),
+    dry_run: bool = Query(False, description="Only count candidates, do not update"),
+    doctor_id: Optional[str] = Query(None, description="Only this doctor's appointments"),
+    date_from: Optional[date] = Query(None, description="Only slots on or after this date"),
+    date_to: Optional[date] = Query(None, description="Only slots on or before this date")
+):
+    """Mark past Scheduled appointments without a consultation record as No-Show"""
+    try:
+        result = no_show_sweeper.run(
+            grace_minutes=grace_minutes,
+            batch_size=batch_size,
+            dry_run=dry_run,
+            doctor_id=doctor_id,
+            date_from=date_from,
+            date_to=date_to
+        )
+        return {
+            "success": True,
+            **result
+        }
+    except Exception as e:
+        logger.error(f"Error running no-show sweep: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"No-show sweep failed: {str(e)}"
+        )
+
+
+# ============================================
+# DOCTOR DAILY STATS ROLLUP
+# ============================================
+
+@router.post("/doctor-stats/reconcile", status_code=status.HTTP_200_OK)
+def reconcile_doctor_stats(
+    doctor_id: Optional[str] = Query(None, description="Rebuild only this doctor (all doctors if omitted)")
+):
+    """Rebuild doctor_daily_stats from the base tables"""
+    try:
+        result = doctor_daily_stats.reconcile(doctor_id)
+        return {
+            "success": True,
+            **result
+        }
+    except Exception as e:
+        logger.error(f"Error reconciling doctor stats: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Doctor stats reconciliation failed: {str(e)}"
+        )
+
+
+# ============================================
+# PATIENT STATISTICS SNAPSHOT
+# ============================================
+
+@router.post("/patient-stats/rebuild", status_code=status.HTTP_200_OK)
+def rebuild_patient_stats():
+    """Rebuild the in-memory patient statistics snapshot of this worker"""
+    try:
+        result = patient_statistics.rebuild()
+        return {
+            "success": True,
+            **result
+        }
+    except Exception as e:
+        logger.error(f"Error rebuilding patient stats: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Patient stats rebuild failed: {str(e)}"
+        )
+
+
+# ============================================
+# BRANCH COUNTERS
+# ============================================
+
+@router.post("/branch-stats/rebuild", status_code=status.HTTP_200_OK)
+def rebuild_branch_stats():
+    """Rebuild branch_counters and branch_daily_occupancy from the base tables"""
+    try:
+        result = branch_statistics.rebuild()
+        return {
+            "success": True,
+            **result
+        }
+    except Exception as e:
+        logger.error(f"Error rebuilding branch stats: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Branch stats rebuild failed: {str(e)}"
+        )
+
+
+# ============================================
+# REVENUE LEDGER
+# ============================================
+
+@router.post("/revenue-ledger/rebuild", status_code=status.HTTP_200_OK)
+def rebuild_revenue_ledger():
+    """Rebuild revenue_ledger and payment_ledger from invoice and payment"""
+    try:
+        result = revenue_ledger.rebuild()
+        return {
+            "success": True,
+            **result
+        }
+    except Exception as e:
+        logger.error(f"Error rebuilding revenue ledger: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Revenue ledger rebuild failed: {str(e)}"
+        )
+
+
+# ============================================
+# INSURANCE STATISTICS SNAPSHOT
+# ============================================
+
+@router.get("/insurance-stats/status", status_code=status.HTTP_200_OK)
+def get_insurance_stats_status():
+    """Age and size of this worker's insurance statistics snapshot"""
+    return insurance_statistics.status()
+
+
+@router.post("/insurance-stats/rebuild", status_code=status.HTTP_200_OK)
+def rebuild_insurance_stats():
+    """Rebuild the in-memory insurance statistics snapshot of this worker"""
+    try:
+        result = insurance_statistics.rebuild()
+        return {
+            "success": True,
+            **result
+        }
+    except Exception as e:
+        logger.error(f"Error rebuilding insurance stats: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Insurance stats rebuild failed: {str(e)}"
+        )
+
+
+# ============================================
+# REPORT CACHE
+# ============================================
+
+@router.get("/report-cache/status", status_code=status.HTTP_200_OK)
+def get_report_cache_status():
+    """Size, hit rate and evictions of the on-disk report cache"""
+    return report_cache.stats()
+
+
+@router.post("/report-cache/clear", status_code=status.HTTP_200_OK)
+def clear_report_cache():
+    """Delete every cached report (data and PDFs)"""
+    try:
+        result = report_cache.clear()
+        return {
+            "success": True,
+            **result
+        }
+    except Exception as e:
+        logger.error(f"Error clearing report cache: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Report cache clear failed: {str(e)}"
+        )
+
+
+# ============================================
+# REPORT SUMMARIES
+# ============================================
+
+@router.get("/report-summaries/status", status_code=status.HTTP_200_OK)
+def get_report_summaries_status():
+    """Pending partitions, staleness and recent refresh runs of the report summaries"""
+    try:
+        return report_summaries.status()
+    except Exception as e:
+        logger.error(f"Error reading report summary status: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Report summary status failed: {str(e)}"
+        )
+
+
+@router.post("/report-summaries/refresh", status_code=status.HTTP_200_OK)
+def refresh_report_summaries():
+    """Recompute the report summary partitions marked since the last refresh"""
+    try:
+        result = report_summaries.refresh()
+        return {
+            "success": True,
+            **result
+        }
+    except Exception as e:
+        logger.error(f"Error refreshing report summaries: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Report summary refresh failed: {str(e)}"
+        )
+
+
+@router.post("/report-summaries/rebuild", status_code=status.HTTP_200_OK)
+def rebuild_report_summaries():
+    """Rebuild every report summary from the base tables"""
+    try:
+        result = report_summaries.rebuild()
+        return {
+            "success": True,
+            **result
+        }
+    except Exception as e:
+        logger.error(f"Error rebuilding report summaries: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Report summary rebuild failed: {str(e)}"
+        )
+
+
+# ============================================
+# REPORT PRE-GENERATION
+# ============================================
+
+@router.post("/report-pregeneration/run", status_code=status.HTTP_200_OK)
+def run_report_pregeneration():
+    """Build the standard report variants into the report cache now"""
+    try:
+        result = report_pregeneration.run()
+        return {
+            "success": True,
+            **result
+        }
+    except Exception as e:
+        logger.error(f"Error pre-generating reports: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Report pre-generation failed: {str(e)}"
+        )
+
+
+# ============================================
+# ANALYTICS SNAPSHOT
+# ============================================
+
+@router.get("/analytics-snapshot/status", status_code=status.HTTP_200_OK)
+def get_analytics_snapshot_status():
+    """Generation, watermarks and table sizes of the local analytics snapshot"""
+    try:
+        return analytics_snapshot.status()
+    except Exception as e:
+        logger.error(f"Error reading analytics snapshot status: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Analytics snapshot status failed: {str(e)}"
+        )
+
+
+@router.post("/analytics-snapshot/sync", status_code=status.HTTP_200_OK)
+def sync_analytics_snapshot():
+    """Copy rows changed since the last sync into the analytics snapshot"""
+    try:
+        result = analytics_snapshot.sync()
+        return {
+            "success": True,
+            **result
+        }
+    except Exception as e:
+        logger.error(f"Error syncing analytics snapshot: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Analytics snapshot sync failed: {str(e)}"
+        )
+
+
+@router.post("/analytics-snapshot/rebuild", status_code=status.HTTP_200_OK)
+def rebuild_analytics_snapshot():
+    """Recopy every table into the analytics snapshot"""
+    try:
+        result = analytics_snapshot.rebuild()
+        return {
+            "success": True,
+            **result
+        }
+    except Exception as e:
+        logger.error(f"Error rebuilding analytics snapshot: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Analytics snapshot rebuild failed: {str(e)}"
+        )
+
+
+# ============================================
+# MEDICATION SEARCH INDEX
+# ============================================
+
+@router.get("/medication-search/status", status_code=status.HTTP_200_OK)
+def get_medication_search_status():
+    """Size, data version and watermark of this process's medication search index"""
+    try:
+        return medication_search.status()
+    except Exception as e:
+        logger.error(f"Error reading medication search status: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Medication search status failed: {str(e)}"
+        )
+
+
+@router.post("/medication-search/rebuild", status_code=status.HTTP_200_OK)
+def rebuild_medication_search():
+    """Reload every medication into this process's search index"""
+    try:
+        result = medication_search.rebuild()
+        return {
+            "success": True,
+            **result
+        }
+    except Exception as e:
+        logger.error(f"Error rebuilding medication search index: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Medication search rebuild failed: {str(e)}"
+        )
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, status, Query
 from typing import Optional, List
 from pydantic import BaseModel, Field, validator
 from core.database import get_db
+from services.medication_search import medication_search
 import logging
 import uuid
 
@@ -130,6 +131,7 @@ def create_medications_bulk(bulk_data: BulkMedicationCreate):
         failed = 0
         
         with get_db() as (cursor, connection):
+            added = []
             for med_data in bulk_data.medications:
                 try:
                     # Set session variables for OUT parameters
@@ -172,6 +174,7 @@ def create_medications_bulk(bulk_data: BulkMedicationCreate):
                             error_message=None
                         ))
                         successful += 1
+                        added.append(result['medication_id'])
                         logger.info(f"✅ Added: {med_data.generic_name} - {med_data.manufacturer}")
                     else:
                         error_msg = result['error_message'] if result else "Unknown error"
@@ -197,6 +200,11 @@ def create_medications_bulk(bulk_data: BulkMedicationCreate):
                     ))
                     failed += 1
                     logger.error(f"❌ Error processing {med_data.generic_name}: {str(e)}")
+
+            # Index only committed rows, as the update endpoint does
+            connection.commit()
+            for medication_id in added:
+                medication_search.upsert(cursor, medication_id)
         
         logger.info(f"Bulk add complete - Success: {successful}, Failed: {failed}")
         
@@ -398,6 +406,7 @@ def update_medication(medication_id: str, update_data: MedicationUpdate):
             
             cursor.execute(update_query, params)
             connection.commit()
+            medication_search.upsert(cursor, medication_id)
             
             # Fetch updated medication
             cursor.execute(
@@ -478,6 +487,7 @@ def delete_medication(medication_id: str, force: bool = False):
                 (medication_id,)
             )
             connection.commit()
+            medication_search.remove(medication_id)
             
             logger.info(f"✅ Medication {medication_id} deleted (force={force})")
             
@@ -564,42 +574,21 @@ def search_medications(
         logger.info(f"Searching medications with query: '{query}', form: {form}")
         
         with get_db() as (cursor, connection):
-            # Build search query
-            search_pattern = f"%{query}%"
-            
-            base_query = """
-                SELECT 
-                    m.*,
-                    CASE 
-                        WHEN LOWER(m.generic_name) = LOWER(%s) THEN 1
-                        WHEN LOWER(m.generic_name) LIKE LOWER(%s) THEN 2
-                        WHEN LOWER(m.manufacturer) = LOWER(%s) THEN 3
-                        WHEN LOWER(m.manufacturer) LIKE LOWER(%s) THEN 4
-                        ELSE 5
-                    END as relevance_score
-                FROM medication m
-                WHERE (
-                    LOWER(m.generic_name) LIKE LOWER(%s) OR 
-                    LOWER(m.manufacturer) LIKE LOWER(%s)
-                )
-            """
+            # Ranking comes from the in-memory index; rows are then read by primary key
+            medication_search.refresh(cursor)
+            ranked = medication_search.search(query, form=form, limit=limit)
+            medication_ids = [medication_id for medication_id, _ in ranked]
             
-            params = [query, f"{query}%", query, f"{query}%", search_pattern, search_pattern]
-            
-            # Add form filter if provided
-            if form:
-                base_query += " AND m.form = %s"
-                params.append(form)
-            
-            # Order by relevance and limit
-            base_query += """
-                ORDER BY relevance_score ASC, m.generic_name ASC
-                LIMIT %s
-            """
-            params.append(limit)
-            
-            cursor.execute(base_query, params)
-            medications = cursor.fetchall()
+            medications = []
+            if medication_ids:
+                placeholders = ','.join(['%s'] * len(medication_ids))
+                cursor.execute(
+                    f"SELECT * FROM medication WHERE medication_id IN ({placeholders})",
+                    medication_ids
+                )
+                rows = {row['medication_id']: row for row in cursor.fetchall()}
+                # Keep the index order; skip rows deleted since the index last refreshed
+                medications = [rows[medication_id] for medication_id in medication_ids if medication_id in rows]
             
             # Add usage statistics if requested
             if include_stats and medications:
@@ -610,7 +599,7 @@ def search_medications(
                     SELECT 
                         medication_id,
                         COUNT(*) as prescription_count,
-                        COUNT(DISTINCT pi.prescription_id) as unique_prescriptions
+                        COUNT(DISTINCT pi.consultation_rec_id) as unique_prescriptions
                     FROM prescription_item pi
                     WHERE medication_id IN ({placeholders})
                     GROUP BY medication_id
@@ -632,15 +621,6 @@ def search_medications(
                             'prescription_count': 0,
                             'unique_prescriptions': 0
                         }
-                    
-                    # Remove relevance_score from response
-                    if 'relevance_score' in med:
-                        del med['relevance_score']
-            else:
-                # Remove relevance_score from response
-                for med in medications:
-                    if 'relevance_score' in med:
-                        del med['relevance_score']
             
             logger.info(f"Found {len(medications)} medications for query '{query}'")
             
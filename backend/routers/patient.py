@@ -1,6 +1,9 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, status
 from typing import List, Optional, Dict, Any
 from core.database import get_db
+from services.fanout import fanout
+from services.profile_assembler import profile_assembler, COMPLETE_PROFILE_SECTIONS
+from services.patient_statistics import patient_statistics
 from schemas import PatientRegistrationRequest, PatientRegistrationResponse
 import hashlib
 import logging
@@ -111,6 +114,12 @@ def register_patient(patient_data: PatientRegistrationRequest):
             # Check if registration was successful
             if success == 1 or success is True:
                 logger.info(f"Patient registered successfully with ID: {user_id}")
+                patient_statistics.record_registration(
+                    patient_data.gender,
+                    patient_data.DOB,
+                    patient_data.blood_group,
+                    patient_data.registered_branch_name
+                )
                 return PatientRegistrationResponse(
                     success=True,
                     message=error_message or "Patient registered successfully",
@@ -313,86 +322,17 @@ def search_patient_by_nic(nic: str):
 
 @router.get("/metrics/statistics", status_code=status.HTTP_200_OK)
 def get_patient_metrics():
-    """Get comprehensive patient statistics and metrics"""
+    """
+    Get comprehensive patient statistics and metrics
+    
+    Served from the in-memory patient statistics snapshot, which is
+    updated by registrations and allergy changes and rebuilt nightly.
+    snapshot_built_at / snapshot_updated_at report its freshness.
+    """
     try:
-        with get_db() as (cursor, connection):
-            metrics = {}
-            
-            # Total patients
-            cursor.execute("SELECT COUNT(*) as total FROM patient")
-            metrics['total_patients'] = cursor.fetchone()['total']
-            
-            # Patients by gender
-            cursor.execute("""
-                SELECT u.gender, COUNT(*) as count 
-                FROM patient p 
-                JOIN user u ON p.patient_id = u.user_id 
-                GROUP BY u.gender
-            """)
-            metrics['by_gender'] = cursor.fetchall()
-            
-            # Patients by blood group
-            cursor.execute("""
-                SELECT blood_group, COUNT(*) as count 
-                FROM patient 
-                GROUP BY blood_group 
-                ORDER BY count DESC
-            """)
-            metrics['by_blood_group'] = cursor.fetchall()
-            
-            # Patients by branch
-            cursor.execute("""
-                SELECT b.branch_name, COUNT(*) as count 
-                FROM patient p 
-                JOIN branch b ON p.registered_branch_id = b.branch_id 
-                GROUP BY b.branch_name
-            """)
-            metrics['by_branch'] = cursor.fetchall()
-            
-            # Age distribution (approximate)
-            cursor.execute("""
-                SELECT 
-                    CASE 
-                        WHEN TIMESTAMPDIFF(YEAR, u.DOB, CURDATE()) < 18 THEN 'Under 18'
-                        WHEN TIMESTAMPDIFF(YEAR, u.DOB, CURDATE()) BETWEEN 18 AND 30 THEN '18-30'
-                        WHEN TIMESTAMPDIFF(YEAR, u.DOB, CURDATE()) BETWEEN 31 AND 50 THEN '31-50'
-                        WHEN TIMESTAMPDIFF(YEAR, u.DOB, CURDATE()) BETWEEN 51 AND 70 THEN '51-70'
-                        ELSE 'Over 70'
-                    END as age_group,
-                    COUNT(*) as count
-                FROM patient p
-                JOIN user u ON p.patient_id = u.user_id
-                GROUP BY age_group
-                ORDER BY age_group
-            """)
-            metrics['by_age_group'] = cursor.fetchall()
-            
-            # Recent registrations (last 30 days)
-            cursor.execute("""
-                SELECT COUNT(*) as count 
-                FROM patient 
-                WHERE created_at >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-            """)
-            metrics['new_patients_last_30_days'] = cursor.fetchone()['count']
-            
-            # Patients with active appointments
-            cursor.execute("""
-                SELECT COUNT(DISTINCT patient_id) as count 
-                FROM appointment 
-                WHERE status IN ('Scheduled', 'Pending')
-            """)
-            metrics['patients_with_active_appointments'] = cursor.fetchone()['count']
-            
-            # Patients with allergies
-            cursor.execute("""
-                SELECT COUNT(DISTINCT patient_id) as count 
-                FROM patient_allergy 
-                WHERE is_active = TRUE
-            """)
-            metrics['patients_with_allergies'] = cursor.fetchone()['count']
-            
-            logger.info("Patient metrics retrieved successfully")
-            return metrics
+        metrics = patient_statistics.get_metrics()
+        logger.info("Patient metrics retrieved successfully")
+        return metrics
             
     except Exception as e:
         logger.error(f"Error fetching patient metrics: {str(e)}")
@@ -463,35 +403,23 @@ def get_all_patients_detailed(skip: int = 0, limit: int = 50):
 
 
 @router.get("/{patient_id}/complete", status_code=status.HTTP_200_OK)
-def get_complete_patient_profile(patient_id: str):
-    """Get complete patient profile with all related information"""
+def get_complete_patient_profile(
+    patient_id: str,
+    strategy: str = Query("aggregate", pattern="^(aggregate|sections)$")
+):
+    """
+    Get complete patient profile with all related information
+    
+    strategy=aggregate (default) builds the whole document in one query,
+    with each section as a JSON array column of the patient row.
+    strategy=sections loads the seven sections concurrently on separate
+    read connections; a section that fails or times out comes back empty
+    and is listed in failed_sections.
+    """
     try:
-        with get_db() as (cursor, connection):
-            # 1. Basic patient and user information
-            cursor.execute("""
-                SELECT 
-                    p.*,
-                    u.full_name,
-                    u.NIC,
-                    u.email,
-                    u.gender,
-                    u.DOB,
-                    TIMESTAMPDIFF(YEAR, u.DOB, CURDATE()) as age,
-                    c.contact_num1,
-                    c.contact_num2,
-                    b.branch_name as registered_branch,
-                    CONCAT(ba.address_line1, ', ', ba.city, ', ', ba.province) as branch_address,
-                    bc.contact_num1 as branch_contact
-                FROM patient p
-                JOIN user u ON p.patient_id = u.user_id
-                JOIN contact c ON u.contact_id = c.contact_id
-                LEFT JOIN branch b ON p.registered_branch_id = b.branch_id
-                LEFT JOIN address ba ON b.address_id = ba.address_id
-                LEFT JOIN contact bc ON b.contact_id = bc.contact_id
-                WHERE p.patient_id = %s
-            """, (patient_id,))
-            
-            patient_info = cursor.fetchone()
+        if strategy == "aggregate":
+            with get_db() as (cursor, connection):
+                patient_info = profile_assembler.assemble(cursor, patient_id)
             
             if not patient_info:
                 raise HTTPException(
@@ -499,133 +427,76 @@ def get_complete_patient_profile(patient_id: str):
                     detail=f"Patient with ID {patient_id} not found"
                 )
             
-            # 2. Get all appointments with details
-            cursor.execute("""
-                SELECT 
-                    a.*,
-                    ts.available_date as appointment_date,
-                    ts.start_time,
-                    ts.end_time,
-                    du.full_name as doctor_name,
-                    GROUP_CONCAT(s.specialization_title SEPARATOR ', ') as specialization,
-                    b.branch_name
-                FROM appointment a
-                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                JOIN doctor d ON ts.doctor_id = d.doctor_id
-                JOIN user du ON d.doctor_id = du.user_id
-                JOIN employee e ON d.doctor_id = e.employee_id
-                JOIN branch b ON e.branch_id = b.branch_id
-                LEFT JOIN doctor_specialization ds ON d.doctor_id = ds.doctor_id
-                LEFT JOIN specialization s ON ds.specialization_id = s.specialization_id
-                WHERE a.patient_id = %s
-                GROUP BY a.appointment_id, ts.available_date, ts.start_time, ts.end_time, du.full_name, b.branch_name
-                ORDER BY ts.available_date DESC, ts.start_time DESC
-            """, (patient_id,))
-            appointments = cursor.fetchall()
-            
-            # 3. Get all allergies
-            cursor.execute("""
-                SELECT * FROM patient_allergy 
-                WHERE patient_id = %s
-                ORDER BY allergy_name
-            """, (patient_id,))
-            allergies = cursor.fetchall()
-            
-            # 4. Get all consultations with treatment details
-            cursor.execute("""
-                SELECT 
-                    cr.*,
-                    du.full_name as doctor_name,
-                    GROUP_CONCAT(s.specialization_title SEPARATOR ', ') as specialization,
-                    a.time_slot_id,
-                    ts.available_date as consultation_date
-                FROM consultation_record cr
-                JOIN appointment a ON cr.appointment_id = a.appointment_id
-                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                JOIN doctor d ON ts.doctor_id = d.doctor_id
-                JOIN user du ON d.doctor_id = du.user_id
-                LEFT JOIN doctor_specialization ds ON d.doctor_id = ds.doctor_id
-                LEFT JOIN specialization s ON ds.specialization_id = s.specialization_id
-                WHERE a.patient_id = %s
-                GROUP BY cr.consultation_rec_id, du.full_name, a.time_slot_id, ts.available_date
-                ORDER BY ts.available_date DESC
-            """, (patient_id,))
-            consultations = cursor.fetchall()
-            
-            # 5. Get prescriptions
-            cursor.execute("""
-                SELECT 
-                    pi.*,
-                    m.generic_name,
-                    m.manufacturer,
-                    m.form,
-                    du.full_name as doctor_name,
-                    cr.diagnoses
-                FROM prescription_item pi
-                JOIN medication m ON pi.medication_id = m.medication_id
-                JOIN consultation_record cr ON pi.consultation_rec_id = cr.consultation_rec_id
-                JOIN appointment a ON cr.appointment_id = a.appointment_id
-                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                JOIN doctor d ON ts.doctor_id = d.doctor_id
-                JOIN user du ON d.doctor_id = du.user_id
-                WHERE a.patient_id = %s
-                ORDER BY pi.created_at DESC
-            """, (patient_id,))
-            prescriptions = cursor.fetchall()
-            
-            # 6. Get invoices and billing
-            cursor.execute("""
-                SELECT 
-                    i.*,
-                    a.patient_id
-                FROM invoice i
-                JOIN consultation_record cr ON i.consultation_rec_id = cr.consultation_rec_id
-                JOIN appointment a ON cr.appointment_id = a.appointment_id
-                WHERE a.patient_id = %s
-                ORDER BY i.created_at DESC
-            """, (patient_id,))
-            invoices = cursor.fetchall()
-            
-            # 7. Get payments
-            cursor.execute("""
-                SELECT * FROM payment
-                WHERE patient_id = %s
-                ORDER BY payment_date DESC
-            """, (patient_id,))
-            payments = cursor.fetchall()
-            
-            # 8. Calculate statistics
-            stats = {
-                "total_appointments": len(appointments),
-                "total_consultations": len(consultations),
-                "total_prescriptions": len(prescriptions),
-                "total_allergies": len(allergies),
-                "total_invoices": len(invoices),
-                "total_payments": len(payments),
-                "pending_appointments": len([a for a in appointments if a.get('status') in ['Scheduled', 'Pending']]),
-                "completed_appointments": len([a for a in appointments if a.get('status') == 'Completed']),
-            }
+            sections = {name: patient_info.pop(name) for name in COMPLETE_PROFILE_SECTIONS}
+            errors = {}
+            meta = {"partial": False, "failed_sections": {}}
+        else:
+            result = fanout.run(
+                profile_assembler.section_readers(patient_id),
+                defaults={name: [] for name in COMPLETE_PROFILE_SECTIONS}
+            )
             
-            # Calculate total amount paid and outstanding
-            total_paid = sum(float(p.get('amount_paid', 0)) for p in payments)
-            total_invoiced = sum(float(i.get('sub_total', 0)) + float(i.get('tax_amount', 0)) for i in invoices)
-            stats['total_amount_paid'] = float(total_paid)
-            stats['total_amount_invoiced'] = float(total_invoiced)
-            stats['outstanding_balance'] = float(total_invoiced - total_paid)
+            if "patient_info" in result.errors:
+                raise HTTPException(
+                    status_code=status.HTTP_504_GATEWAY_TIMEOUT if result.errors["patient_info"] == "timeout" else status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Could not load patient {patient_id}: {result.errors['patient_info']}"
+                )
             
-            logger.info(f"Retrieved complete profile for patient {patient_id}")
+            patient_info = result.get("patient_info")
             
-            return {
-                "patient_info": patient_info,
-                "appointments": appointments or [],
-                "allergies": allergies or [],
-                "consultations": consultations or [],
-                "prescriptions": prescriptions or [],
-                "invoices": invoices or [],
-                "payments": payments or [],
-                "statistics": stats
-            }
+            if not patient_info:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Patient with ID {patient_id} not found"
+                )
             
+            sections = {name: result.get(name) or [] for name in COMPLETE_PROFILE_SECTIONS}
+            errors = result.errors
+            meta = result.meta()
+        
+        appointments = sections["appointments"]
+        allergies = sections["allergies"]
+        consultations = sections["consultations"]
+        prescriptions = sections["prescriptions"]
+        invoices = sections["invoices"]
+        payments = sections["payments"]
+        
+        # Calculate statistics
+        stats = {
+            "total_appointments": len(appointments),
+            "total_consultations": len(consultations),
+            "total_prescriptions": len(prescriptions),
+            "total_allergies": len(allergies),
+            "total_invoices": len(invoices),
+            "total_payments": len(payments),
+            "pending_appointments": len([a for a in appointments if a.get('status') in ['Scheduled', 'Pending']]),
+            "completed_appointments": len([a for a in appointments if a.get('status') == 'Completed']),
+        }
+        
+        # Calculate total amount paid and outstanding
+        total_paid = sum(float(p.get('amount_paid', 0)) for p in payments)
+        total_invoiced = sum(float(i.get('sub_total', 0)) + float(i.get('tax_amount', 0)) for i in invoices)
+        stats['total_amount_paid'] = float(total_paid)
+        stats['total_amount_invoiced'] = float(total_invoiced)
+        stats['outstanding_balance'] = float(total_invoiced - total_paid)
+        if "invoices" in errors or "payments" in errors:
+            # A balance computed from a missing section would be misleading
+            stats['outstanding_balance'] = None
+        
+        logger.info(f"Retrieved complete profile for patient {patient_id}")
+        
+        return {
+            "patient_info": patient_info,
+            "appointments": appointments or [],
+            "allergies": allergies or [],
+            "consultations": consultations or [],
+            "prescriptions": prescriptions or [],
+            "invoices": invoices or [],
+            "payments": payments or [],
+            "statistics": stats,
+            **meta
+        }
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, status, Query
 from typing import Optional, List
 from pydantic import BaseModel, Field, validator
 from core.database import get_db
+from services.revenue_ledger import revenue_ledger
 from datetime import date, datetime
 import logging
 import uuid
@@ -475,74 +476,16 @@ def get_payment_statistics(
     date_from: Optional[date] = None,
     date_to: Optional[date] = None
 ):
-    """Get payment statistics and summary"""
+    """
+    Get payment statistics and summary
+    
+    Status and method totals come from the monthly payment ledger for the
+    whole months in the range; leftover days at either end are read from
+    payment by payment_date range.
+    """
     try:
         with get_db() as (cursor, connection):
-            # Build date filter
-            date_filter = ""
-            params = []
-            
-            if date_from and date_to:
-                date_filter = "WHERE payment_date BETWEEN %s AND %s"
-                params = [date_from, date_to]
-            elif date_from:
-                date_filter = "WHERE payment_date >= %s"
-                params = [date_from]
-            elif date_to:
-                date_filter = "WHERE payment_date <= %s"
-                params = [date_to]
-            
-            # Total revenue by status
-            query = f"""
-                SELECT 
-                    status,
-                    COUNT(*) as count,
-                    SUM(amount_paid) as total_amount
-                FROM payment
-                {date_filter}
-                GROUP BY status
-            """
-            cursor.execute(query, params)
-            by_status = cursor.fetchall()
-            
-            # By payment method
-            query = f"""
-                SELECT 
-                    payment_method,
-                    COUNT(*) as count,
-                    SUM(amount_paid) as total_amount
-                FROM payment
-                {date_filter}
-                GROUP BY payment_method
-                ORDER BY total_amount DESC
-            """
-            cursor.execute(query, params)
-            by_method = cursor.fetchall()
-            
-            # Daily statistics
-            query = f"""
-                SELECT 
-                    payment_date,
-                    COUNT(*) as payment_count,
-                    SUM(amount_paid) as daily_total
-                FROM payment
-                {date_filter}
-                GROUP BY payment_date
-                ORDER BY payment_date DESC
-                LIMIT 30
-            """
-            cursor.execute(query, params)
-            daily_stats = cursor.fetchall()
-            
-            return {
-                "by_status": by_status or [],
-                "by_payment_method": by_method or [],
-                "daily_statistics": daily_stats or [],
-                "date_range": {
-                    "from": str(date_from) if date_from else None,
-                    "to": str(date_to) if date_to else None
-                }
-            }
+            return revenue_ledger.payment_summary(cursor, date_from, date_to)
             
     except Exception as e:
         logger.error(f"Error fetching payment statistics: {str(e)}")
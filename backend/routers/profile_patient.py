@@ -3,6 +3,7 @@ from typing import Optional
 from pydantic import BaseModel, EmailStr, Field
 from datetime import date, datetime
 from core.database import get_db
+from services.fanout import fanout, fetch_one, fetch_all
 import logging
 
 router = APIRouter(prefix="/patients", tags=["patient-profile"])
@@ -87,7 +88,8 @@ def get_patient_profile(patient_id: str):
     """Get complete patient profile information"""
     try:
         with get_db() as (cursor, connection):
-            # FIXED: Changed p.registered_branch to p.registered_branch_id in the JOIN
+            # Allergies, chronic conditions and insurance live in their own
+            # tables; they are folded into the flat profile row by subqueries
             query = """
                 SELECT 
                     p.patient_id,
@@ -108,11 +110,16 @@ def get_patient_profile(patient_id: str):
                     NULL as emergency_contact_name,
                     NULL as emergency_contact_relationship,
                     NULL as emergency_contact_phone,
-                    p.allergies,
-                    p.chronic_conditions,
+                    (SELECT GROUP_CONCAT(pa.allergy_name ORDER BY pa.allergy_name SEPARATOR ', ')
+                        FROM patient_allergy pa
+                        WHERE pa.patient_id = p.patient_id) as allergies,
+                    (SELECT GROUP_CONCAT(cn.condition_name ORDER BY cn.condition_name SEPARATOR ', ')
+                        FROM patient_condition pc
+                        JOIN conditions cn ON pc.condition_id = cn.condition_id
+                        WHERE pc.patient_id = p.patient_id AND pc.is_chronic = TRUE) as chronic_conditions,
                     NULL as current_medications,
-                    NULL as insurance_provider,
-                    NULL as insurance_policy_number,
+                    ins.package_name as insurance_provider,
+                    ins.insurance_id as insurance_policy_number,
                     b.branch_name as registered_branch,
                     p.created_at as registration_date
                 FROM patient p
@@ -120,10 +127,18 @@ def get_patient_profile(patient_id: str):
                 JOIN contact c ON u.contact_id = c.contact_id
                 JOIN address a ON u.address_id = a.address_id
                 JOIN branch b ON p.registered_branch_id = b.branch_id
+                LEFT JOIN (
+                    SELECT i.insurance_id, ip.package_name
+                    FROM insurance i
+                    JOIN insurance_package ip ON i.insurance_package_id = ip.insurance_package_id
+                    WHERE i.patient_id = %s AND i.status = 'Active'
+                    ORDER BY i.start_date DESC
+                    LIMIT 1
+                ) ins ON TRUE
                 WHERE p.patient_id = %s
             """
             
-            cursor.execute(query, (patient_id,))
+            cursor.execute(query, (patient_id, patient_id))
             patient = cursor.fetchone()
             
             if not patient:
@@ -328,93 +343,97 @@ def get_patient_statistics(patient_id: str):
 
 @router.get("/{patient_id}/medical-summary", status_code=status.HTTP_200_OK)
 def get_medical_summary(patient_id: str):
-    """Get patient's medical summary including allergies, conditions, and medications"""
+    """
+    Get patient's medical summary including allergies, conditions, and medications
+    
+    The patient row, diagnoses, allergies and conditions are loaded
+    concurrently; a section that fails or times out comes back empty and
+    is listed in failed_sections.
+    """
     try:
-        with get_db() as (cursor, connection):
-            # Check if patient exists
-            cursor.execute("SELECT * FROM patient WHERE patient_id = %s", (patient_id,))
-            patient = cursor.fetchone()
-            
-            if not patient:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Patient with ID {patient_id} not found"
-                )
-            
-            # Get medical information
-            medical_query = """
-                SELECT 
-                    p.allergies,
-                    p.chronic_conditions,
-                    p.blood_group
-                FROM patient p
-                WHERE p.patient_id = %s
-            """
-            cursor.execute(medical_query, (patient_id,))
-            medical_data = cursor.fetchone()
-            
-            diagnoses_query = """
-                SELECT 
-                    cr.diagnoses as diagnosis,
-                    cr.created_at as diagnosis_date,
-                    u.full_name as doctor_name
-                FROM consultation_record cr
-                JOIN appointment a ON cr.appointment_id = a.appointment_id
-                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
-                JOIN doctor d ON ts.doctor_id = d.doctor_id
-                JOIN user u ON d.doctor_id = u.user_id
-                WHERE a.patient_id = %s
-                ORDER BY cr.created_at DESC
-                LIMIT 5
-            """
-            cursor.execute(diagnoses_query, (patient_id,))
-            recent_diagnoses = cursor.fetchall()
-            
-            # Get patient allergies from patient_allergy table
-            allergies_query = """
-                SELECT 
-                    allergy_name,
-                    severity,
-                    reaction_description,
-                    diagnosed_date
-                FROM patient_allergy
-                WHERE patient_id = %s
-                AND is_active = TRUE
-                ORDER BY diagnosed_date DESC
-            """
-            cursor.execute(allergies_query, (patient_id,))
-            detailed_allergies = cursor.fetchall()
-            
-            # Get patient conditions from patient_condition table
-            conditions_query = """
-                SELECT 
-                    c.condition_name,
-                    pc.diagnosed_date,
-                    pc.is_chronic,
-                    pc.current_status,
-                    pc.notes,
-                    cc.category_name
-                FROM patient_condition pc
-                JOIN conditions c ON pc.condition_id = c.condition_id
-                JOIN conditions_category cc ON c.condition_category_id = cc.condition_category_id
-                WHERE pc.patient_id = %s
-                ORDER BY pc.diagnosed_date DESC
-            """
-            cursor.execute(conditions_query, (patient_id,))
-            detailed_conditions = cursor.fetchall()
-            
-            logger.info(f"Retrieved medical summary for patient {patient_id}")
-            
-            return {
-                "patient_id": patient_id,
-                "blood_group": medical_data['blood_group'] if medical_data else None,
-                "allergies": medical_data['allergies'] if medical_data else None,
-                "chronic_conditions": medical_data['chronic_conditions'] if medical_data else None,
-                "detailed_allergies": detailed_allergies or [],
-                "detailed_conditions": detailed_conditions or [],
-                "current_medications": None,
-                "recent_diagnoses": recent_diagnoses or []
-            }
+        diagnoses_query = """
+            SELECT 
+                cr.diagnoses as diagnosis,
+                cr.created_at as diagnosis_date,
+                u.full_name as doctor_name
+            FROM consultation_record cr
+            JOIN appointment a ON cr.appointment_id = a.appointment_id
+            JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+            JOIN doctor d ON ts.doctor_id = d.doctor_id
+            JOIN user u ON d.doctor_id = u.user_id
+            WHERE a.patient_id = %s
+            ORDER BY cr.created_at DESC
+            LIMIT 5
+        """
+        
+        # Get patient allergies from patient_allergy table
+        allergies_query = """
+            SELECT 
+                allergy_name,
+                severity,
+                reaction_description,
+                diagnosed_date
+            FROM patient_allergy
+            WHERE patient_id = %s
+            AND is_active = TRUE
+            ORDER BY diagnosed_date DESC
+        """
+        
+        # Get patient conditions from patient_condition table
+        conditions_query = """
+            SELECT 
+                c.condition_name,
+                pc.diagnosed_date,
+                pc.is_chronic,
+                pc.current_status,
+                pc.notes,
+                cc.category_name
+            FROM patient_condition pc
+            JOIN conditions c ON pc.condition_id = c.condition_id
+            JOIN conditions_category cc ON c.condition_category_id = cc.condition_category_id
+            WHERE pc.patient_id = %s
+            ORDER BY pc.diagnosed_date DESC
+        """
+        
+        result = fanout.run(
+            {
+                "patient": fetch_one(
+                    "SELECT allergies, chronic_conditions, blood_group FROM patient WHERE patient_id = %s",
+                    (patient_id,)
+                ),
+                "diagnoses": fetch_all(diagnoses_query, (patient_id,)),
+                "allergies": fetch_all(allergies_query, (patient_id,)),
+                "conditions": fetch_all(conditions_query, (patient_id,))
+            },
+            defaults={"diagnoses": [], "allergies": [], "conditions": []}
+        )
+        
+        if "patient" in result.errors:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT if result.errors["patient"] == "timeout" else status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Could not load patient {patient_id}: {result.errors['patient']}"
+            )
+        
+        medical_data = result.get("patient")
+        if not medical_data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Patient with ID {patient_id} not found"
+            )
+        
+        logger.info(f"Retrieved medical summary for patient {patient_id}")
+        
+        return {
+            "patient_id": patient_id,
+            "blood_group": medical_data['blood_group'],
+            "allergies": medical_data['allergies'],
+            "chronic_conditions": medical_data['chronic_conditions'],
+            "detailed_allergies": result.get("allergies") or [],
+            "detailed_conditions": result.get("conditions") or [],
+            "current_medications": None,
+            "recent_diagnoses": result.get("diagnoses") or [],
+            **result.meta()
+        }
             
     except HTTPException:
         raise
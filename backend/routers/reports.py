@@ -3,12 +3,20 @@ Reports Router - PDF Report Generation Endpoints
 Generates formatted PDF reports from database views
 """
 
-from fastapi import APIRouter, HTTPException, status, Query
-from fastapi.responses import StreamingResponse
-from typing import Optional
+from fastapi import APIRouter, HTTPException, status, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Optional, Dict, Any, List, BinaryIO
 from core.database import get_db
-from services.pdf_generator import pdf_generator
+from services.report_data import get_report, REPORTS, encode_payload
+from services.report_cache import report_cache
+from services.report_jobs import report_jobs, ReportQueueFull
+from services.report_export import report_export, ExportBusy, FORMATS
+from services.report_batch import report_batch, DOCUMENTS as BATCH_DOCUMENTS
+from services.analytics_snapshot import analytics_snapshot, SnapshotUnavailable
+from pydantic import BaseModel, Field
 import logging
+import os
 from datetime import datetime
 
 router = APIRouter(tags=["reports"])
@@ -18,12 +26,155 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _etag_matches(request: Request, etag: str) -> bool:
+    """True if the client's If-None-Match already names this version"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [value.strip().removeprefix("W/") for value in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def _cache_headers(etag: str, hit: bool) -> Dict[str, str]:
+    # no-cache: clients keep the body but revalidate with If-None-Match
+    return {"ETag": etag, "Cache-Control": "private, no-cache", "X-Cache": "HIT" if hit else "MISS"}
+
+
+def _snapshot_key(report_name: str, kind: str, filters: Dict[str, Any]) -> str:
+    """Cache key of a report read from the analytics snapshot: its generation replaces the data versions"""
+    return report_cache.key_at(
+        get_report(report_name), kind, filters, {"analytics_snapshot": analytics_snapshot.generation()}
+    )
+
+
+def _cached_json_response(request: Request, report_name: str, filters: Dict[str, Any],
+                          engine: Optional[str] = None) -> Response:
+    """
+    Serve a /data payload from the report cache
+
+    The key covers the filters and the data version of the report's
+    source tables, so an unchanged report is answered with 304 or a cached
+    body without running its queries.
+    """
+    report = get_report(report_name)
+    
+    if analytics_snapshot.use(engine):
+        key = _snapshot_key(report_name, "data", filters)
+        etag = f'"{key}"'
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
+        
+        cached = report_cache.read(key, "json")
+        if cached is not None:
+            return Response(cached, media_type="application/json", headers=_cache_headers(etag, True))
+        
+        body = encode_payload(report.build_snapshot_payload(filters))
+    else:
+        with get_db() as (cursor, connection):
+            key = report_cache.key(cursor, report, "data", filters)
+            etag = f'"{key}"'
+            if _etag_matches(request, etag):
+                return _not_modified(etag)
+            
+            cached = report_cache.read(key, "json")
+            if cached is not None:
+                return Response(cached, media_type="application/json", headers=_cache_headers(etag, True))
+            
+            body = encode_payload(report.build_payload(cursor, filters))
+    
+    report_cache.put(key, "json", body)
+    return Response(body, media_type="application/json", headers=_cache_headers(etag, False))
+
+
+def _pdf_response(pdf: BinaryIO, filename: str, headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """
+    Stream a cached PDF from an already open handle
+
+    The handle was opened before the cache could evict the entry, so the
+    download completes even if the file is unlinked meanwhile (FileResponse
+    would only open the path once the response starts).
+    """
+    size = os.fstat(pdf.fileno()).st_size
+
+    def chunks():
+        with pdf:
+            while True:
+                chunk = pdf.read(64 * 1024)
+                if not chunk:
+                    break
+                yield chunk
+
+    return StreamingResponse(
+        chunks(),
+        media_type="application/pdf",
+        headers={
+            **(headers or {}),
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Content-Length": str(size)
+        },
+        # Closes the handle if the client goes away before the stream starts
+        background=BackgroundTask(pdf.close)
+    )
+
+
+def _render_pdf_response(request: Request, report_name: str, filters: Dict[str, Any],
+                         engine: Optional[str] = None) -> Response:
+    """Serve a report PDF from the report cache, rendering it in the report process pool on a miss"""
+    report = get_report(report_name)
+    
+    if analytics_snapshot.use(engine):
+        key = _snapshot_key(report_name, "pdf", filters)
+        etag = f'"{key}"'
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
+        
+        pdf = report_cache.open(key, "pdf")
+        hit = pdf is not None
+        if not hit:
+            data = report.load_snapshot(filters)
+    else:
+        with get_db() as (cursor, connection):
+            key = report_cache.key(cursor, report, "pdf", filters)
+            etag = f'"{key}"'
+            if _etag_matches(request, etag):
+                return _not_modified(etag)
+            
+            pdf = report_cache.open(key, "pdf")
+            hit = pdf is not None
+            if not hit:
+                data = report.load(cursor, filters)
+    
+    if not hit:
+        if report.is_empty(data):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=report.empty_detail
+            )
+        
+        if isinstance(data, list):
+            logger.info(f"Retrieved {len(data)} records for {report_name}")
+        
+        pdf = report_jobs.render_open(report, data, filters, key)
+    
+    # Create filename
+    filename = f"{report.filename}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    
+    logger.info(f"✅ PDF {'served from cache' if hit else 'generated successfully'}: {filename}")
+    
+    return _pdf_response(pdf, filename, _cache_headers(etag, hit))
+
+
 # ============================================
 # BRANCH APPOINTMENT SUMMARY REPORT
 # ============================================
 
 @router.get("/branch-appointments/pdf", status_code=status.HTTP_200_OK)
 def get_branch_appointment_summary_pdf(
+    request: Request,
     date_from: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     date_to: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
     branch_name: Optional[str] = Query(None, description="Filter by specific branch")
@@ -47,69 +198,7 @@ def get_branch_appointment_summary_pdf(
     """
     try:
         logger.info(f"Generating branch appointment summary PDF with filters: date_from={date_from}, date_to={date_to}, branch={branch_name}")
-        
-        with get_db() as (cursor, connection):
-            # Build query with filters
-            query = """
-                SELECT 
-                    branch_name,
-                    available_date,
-                    status,
-                    appointment_count
-                FROM branch_appointment_daily_summary
-                WHERE 1=1
-            """
-            params = []
-            
-            # Add date filters
-            if date_from:
-                query += " AND available_date >= %s"
-                params.append(date_from)
-            
-            if date_to:
-                query += " AND available_date <= %s"
-                params.append(date_to)
-            
-            # Add branch filter
-            if branch_name:
-                query += " AND branch_name = %s"
-                params.append(branch_name)
-            
-            query += " ORDER BY available_date DESC, branch_name, status"
-            
-            cursor.execute(query, params)
-            data = cursor.fetchall()
-            
-            if not data:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="No appointment data found for the specified filters"
-                )
-            
-            logger.info(f"Retrieved {len(data)} appointment records")
-            
-            # Generate PDF
-            pdf_buffer = pdf_generator.generate_branch_appointment_summary(
-                data=data,
-                date_from=date_from,
-                date_to=date_to
-            )
-            
-            # Create filename
-            filename = f"branch_appointment_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-            
-            logger.info(f"✅ PDF generated successfully: {filename}")
-            
-            # Return PDF as streaming response
-            return StreamingResponse(
-                pdf_buffer,
-                media_type="application/pdf",
-                headers={
-                    "Content-Disposition": f"attachment; filename={filename}",
-                    "Content-Type": "application/pdf"
-                }
-            )
-            
+        return _render_pdf_response(request, "branch-appointments", {"date_from": date_from, "date_to": date_to, "branch_name": branch_name})
     except HTTPException:
         raise
     except Exception as e:
@@ -126,9 +215,11 @@ def get_branch_appointment_summary_pdf(
 
 @router.get("/doctor-revenue/pdf", status_code=status.HTTP_200_OK)
 def get_doctor_revenue_pdf(
+    request: Request,
     year: Optional[int] = Query(None, description="Filter by year (e.g., 2024)"),
-    month: Optional[str] = Query(None, description="Filter by month (YYYY-MM format)"),
-    doctor_id: Optional[str] = Query(None, description="Filter by specific doctor ID")
+    month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Filter by month (YYYY-MM format)"),
+    doctor_id: Optional[str] = Query(None, description="Filter by specific doctor ID"),
+    engine: Optional[str] = Query(None, pattern="^(live|snapshot)$", description="Data source: live or snapshot (analytics copy)")
 ):
     """
     Generate PDF report for doctor-wise revenue
@@ -139,6 +230,7 @@ def get_doctor_revenue_pdf(
     - year: Optional year filter (e.g., 2024)
     - month: Optional month filter in YYYY-MM format
     - doctor_id: Optional specific doctor UUID
+    - engine: "snapshot" reads the local analytics snapshot instead of MySQL
     
     **Returns**: PDF file
     
@@ -150,72 +242,13 @@ def get_doctor_revenue_pdf(
     """
     try:
         logger.info(f"Generating doctor revenue PDF with filters: year={year}, month={month}, doctor_id={doctor_id}")
-        
-        with get_db() as (cursor, connection):
-            # Build query with filters
-            query = """
-                SELECT 
-                    doctor_id,
-                    doctor_name,
-                    month,
-                    revenue
-                FROM doctor_monthly_revenue
-                WHERE 1=1
-            """
-            params = []
-            
-            # Add year filter
-            if year:
-                query += " AND YEAR(STR_TO_DATE(CONCAT(month, '-01'), '%Y-%m-%d')) = %s"
-                params.append(year)
-            
-            # Add month filter
-            if month:
-                query += " AND month = %s"
-                params.append(month)
-            
-            # Add doctor filter
-            if doctor_id:
-                query += " AND doctor_id = %s"
-                params.append(doctor_id)
-            
-            query += " ORDER BY month DESC, revenue DESC"
-            
-            cursor.execute(query, params)
-            data = cursor.fetchall()
-            
-            if not data:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="No revenue data found for the specified filters"
-                )
-            
-            logger.info(f"Retrieved {len(data)} revenue records")
-            
-            # Generate PDF
-            pdf_buffer = pdf_generator.generate_doctor_revenue_report(
-                data=data,
-                year=year,
-                month=month
-            )
-            
-            # Create filename
-            filename = f"doctor_revenue_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-            
-            logger.info(f"✅ PDF generated successfully: {filename}")
-            
-            # Return PDF as streaming response
-            return StreamingResponse(
-                pdf_buffer,
-                media_type="application/pdf",
-                headers={
-                    "Content-Disposition": f"attachment; filename={filename}",
-                    "Content-Type": "application/pdf"
-                }
-            )
-            
+        return _render_pdf_response(
+            request, "doctor-revenue", {"year": year, "month": month, "doctor_id": doctor_id}, engine
+        )
     except HTTPException:
         raise
+    except SnapshotUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
     except Exception as e:
         logger.error(f"❌ Error generating doctor revenue PDF: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -230,6 +263,7 @@ def get_doctor_revenue_pdf(
 
 @router.get("/outstanding-balances/pdf", status_code=status.HTTP_200_OK)
 def get_outstanding_balances_pdf(
+    request: Request,
     min_balance: Optional[float] = Query(None, ge=0, description="Minimum balance filter"),
     max_balance: Optional[float] = Query(None, ge=0, description="Maximum balance filter"),
     sort_by: str = Query("balance_desc", description="Sort order: balance_desc, balance_asc")
@@ -260,63 +294,7 @@ def get_outstanding_balances_pdf(
     """
     try:
         logger.info(f"Generating outstanding balances PDF with filters: min={min_balance}, max={max_balance}, sort={sort_by}")
-        
-        with get_db() as (cursor, connection):
-            # Build query with filters
-            query = """
-                SELECT 
-                    patient_id,
-                    patient_name,
-                    patient_balance
-                FROM patients_outstanding_balances
-                WHERE 1=1
-            """
-            params = []
-            
-            # Add balance filters
-            if min_balance is not None:
-                query += " AND patient_balance >= %s"
-                params.append(min_balance)
-            
-            if max_balance is not None:
-                query += " AND patient_balance <= %s"
-                params.append(max_balance)
-            
-            # Add sorting
-            if sort_by == "balance_asc":
-                query += " ORDER BY patient_balance ASC"
-            else:  # balance_desc (default)
-                query += " ORDER BY patient_balance DESC"
-            
-            cursor.execute(query, params)
-            data = cursor.fetchall()
-            
-            if not data:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="No patients with outstanding balances found for the specified filters"
-                )
-            
-            logger.info(f"Retrieved {len(data)} patients with outstanding balances")
-            
-            # Generate PDF
-            pdf_buffer = pdf_generator.generate_outstanding_balance_report(data=data)
-            
-            # Create filename
-            filename = f"outstanding_balances_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-            
-            logger.info(f"✅ PDF generated successfully: {filename}")
-            
-            # Return PDF as streaming response
-            return StreamingResponse(
-                pdf_buffer,
-                media_type="application/pdf",
-                headers={
-                    "Content-Disposition": f"attachment; filename={filename}",
-                    "Content-Type": "application/pdf"
-                }
-            )
-            
+        return _render_pdf_response(request, "outstanding-balances", {"min_balance": min_balance, "max_balance": max_balance, "sort_by": sort_by})
     except HTTPException:
         raise
     except Exception as e:
@@ -333,6 +311,7 @@ def get_outstanding_balances_pdf(
 
 @router.get("/branch-appointments/data", status_code=status.HTTP_200_OK)
 def get_branch_appointment_data(
+    request: Request,
     date_from: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     date_to: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
     branch_name: Optional[str] = Query(None, description="Filter by specific branch")
@@ -342,40 +321,10 @@ def get_branch_appointment_data(
     (Utility endpoint for previewing before generating PDF)
     """
     try:
-        with get_db() as (cursor, connection):
-            query = """
-                SELECT 
-                    branch_name,
-                    available_date,
-                    status,
-                    appointment_count
-                FROM branch_appointment_daily_summary
-                WHERE 1=1
-            """
-            params = []
-            
-            if date_from:
-                query += " AND available_date >= %s"
-                params.append(date_from)
-            
-            if date_to:
-                query += " AND available_date <= %s"
-                params.append(date_to)
-            
-            if branch_name:
-                query += " AND branch_name = %s"
-                params.append(branch_name)
-            
-            query += " ORDER BY available_date DESC, branch_name, status"
-            
-            cursor.execute(query, params)
-            data = cursor.fetchall()
-            
-            return {
-                "success": True,
-                "total_records": len(data),
-                "data": data
-            }
+        return _cached_json_response(
+            request, "branch-appointments",
+            {"date_from": date_from, "date_to": date_to, "branch_name": branch_name}
+        )
     except Exception as e:
         logger.error(f"Error fetching branch appointment data: {str(e)}")
         raise HTTPException(
@@ -386,53 +335,22 @@ def get_branch_appointment_data(
 
 @router.get("/doctor-revenue/data", status_code=status.HTTP_200_OK)
 def get_doctor_revenue_data(
+    request: Request,
     year: Optional[int] = Query(None, description="Filter by year"),
-    month: Optional[str] = Query(None, description="Filter by month (YYYY-MM)"),
-    doctor_id: Optional[str] = Query(None, description="Filter by doctor ID")
+    month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Filter by month (YYYY-MM)"),
+    doctor_id: Optional[str] = Query(None, description="Filter by doctor ID"),
+    engine: Optional[str] = Query(None, pattern="^(live|snapshot)$", description="Data source: live or snapshot (analytics copy)")
 ):
     """
     Get raw JSON data from doctor_monthly_revenue view
     (Utility endpoint for previewing before generating PDF)
     """
     try:
-        with get_db() as (cursor, connection):
-            query = """
-                SELECT 
-                    doctor_id,
-                    doctor_name,
-                    month,
-                    revenue
-                FROM doctor_monthly_revenue
-                WHERE 1=1
-            """
-            params = []
-            
-            if year:
-                query += " AND YEAR(STR_TO_DATE(CONCAT(month, '-01'), '%Y-%m-%d')) = %s"
-                params.append(year)
-            
-            if month:
-                query += " AND month = %s"
-                params.append(month)
-            
-            if doctor_id:
-                query += " AND doctor_id = %s"
-                params.append(doctor_id)
-            
-            query += " ORDER BY month DESC, revenue DESC"
-            
-            cursor.execute(query, params)
-            data = cursor.fetchall()
-            
-            # Calculate totals
-            total_revenue = sum(float(row['revenue']) for row in data)
-            
-            return {
-                "success": True,
-                "total_records": len(data),
-                "total_revenue": total_revenue,
-                "data": data
-            }
+        return _cached_json_response(
+            request, "doctor-revenue", {"year": year, "month": month, "doctor_id": doctor_id}, engine
+        )
+    except SnapshotUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching doctor revenue data: {str(e)}")
         raise HTTPException(
@@ -443,47 +361,20 @@ def get_doctor_revenue_data(
 
 @router.get("/outstanding-balances/data", status_code=status.HTTP_200_OK)
 def get_outstanding_balances_data(
+    request: Request,
     min_balance: Optional[float] = Query(None, ge=0, description="Minimum balance"),
-    max_balance: Optional[float] = Query(None, ge=0, description="Maximum balance")
+    max_balance: Optional[float] = Query(None, ge=0, description="Maximum balance"),
+    sort_by: str = Query("balance_desc", description="Sort order: balance_desc, balance_asc")
 ):
     """
     Get raw JSON data from patients_outstanding_balances view
     (Utility endpoint for previewing before generating PDF)
     """
     try:
-        with get_db() as (cursor, connection):
-            query = """
-                SELECT 
-                    patient_id,
-                    patient_name,
-                    patient_balance
-                FROM patients_outstanding_balances
-                WHERE 1=1
-            """
-            params = []
-            
-            if min_balance is not None:
-                query += " AND patient_balance >= %s"
-                params.append(min_balance)
-            
-            if max_balance is not None:
-                query += " AND patient_balance <= %s"
-                params.append(max_balance)
-            
-            query += " ORDER BY patient_balance DESC"
-            
-            cursor.execute(query, params)
-            data = cursor.fetchall()
-            
-            # Calculate totals
-            total_outstanding = sum(float(row['patient_balance']) for row in data)
-            
-            return {
-                "success": True,
-                "total_patients": len(data),
-                "total_outstanding": total_outstanding,
-                "data": data
-            }
+        return _cached_json_response(
+            request, "outstanding-balances",
+            {"min_balance": min_balance, "max_balance": max_balance, "sort_by": sort_by}
+        )
     except Exception as e:
         logger.error(f"Error fetching outstanding balances data: {str(e)}")
         raise HTTPException(
@@ -498,6 +389,7 @@ def get_outstanding_balances_data(
 
 @router.get("/treatments-by-category/pdf", status_code=status.HTTP_200_OK)
 def get_treatments_by_category_pdf(
+    request: Request,
     date_from: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     date_to: Optional[str] = Query(None, description="End date (YYYY-MM-DD)")
 ):
@@ -518,68 +410,7 @@ def get_treatments_by_category_pdf(
     """
     try:
         logger.info(f"Generating treatments by category PDF with filters: date_from={date_from}, date_to={date_to}")
-        
-        with get_db() as (cursor, connection):
-            # Build query to get treatments grouped by category
-            query = """
-                SELECT 
-                    tc.treatment_name,
-                    COUNT(t.treatment_id) as treatment_count,
-                    SUM(tc.base_price) as total_revenue
-                FROM treatment t
-                JOIN treatment_catalogue tc ON t.treatment_service_code = tc.treatment_service_code
-                JOIN consultation_record cr ON t.consultation_rec_id = cr.consultation_rec_id
-                WHERE 1=1
-            """
-            params = []
-            
-            # Add date filters
-            if date_from:
-                query += " AND DATE(cr.created_at) >= %s"
-                params.append(date_from)
-            
-            if date_to:
-                query += " AND DATE(cr.created_at) <= %s"
-                params.append(date_to)
-            
-            query += """
-                GROUP BY tc.treatment_service_code, tc.treatment_name
-                ORDER BY treatment_count DESC
-            """
-            
-            cursor.execute(query, params)
-            data = cursor.fetchall()
-            
-            if not data:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="No treatment data found for the specified period"
-                )
-            
-            logger.info(f"Retrieved {len(data)} treatment categories")
-            
-            # Generate PDF
-            pdf_buffer = pdf_generator.generate_treatments_by_category_report(
-                data=data,
-                date_from=date_from,
-                date_to=date_to
-            )
-            
-            # Create filename
-            filename = f"treatments_by_category_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-            
-            logger.info(f"✅ PDF generated successfully: {filename}")
-            
-            # Return PDF as streaming response
-            return StreamingResponse(
-                pdf_buffer,
-                media_type="application/pdf",
-                headers={
-                    "Content-Disposition": f"attachment; filename={filename}",
-                    "Content-Type": "application/pdf"
-                }
-            )
-            
+        return _render_pdf_response(request, "treatments-by-category", {"date_from": date_from, "date_to": date_to})
     except HTTPException:
         raise
     except Exception as e:
@@ -596,6 +427,7 @@ def get_treatments_by_category_pdf(
 
 @router.get("/insurance-vs-outofpocket/pdf", status_code=status.HTTP_200_OK)
 def get_insurance_vs_outofpocket_pdf(
+    request: Request,
     date_from: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     date_to: Optional[str] = Query(None, description="End date (YYYY-MM-DD)")
 ):
@@ -618,108 +450,7 @@ def get_insurance_vs_outofpocket_pdf(
     """
     try:
         logger.info(f"Generating insurance vs out-of-pocket PDF with filters: date_from={date_from}, date_to={date_to}")
-        
-        with get_db() as (cursor, connection):
-            # Query insurance claims
-            insurance_query = """
-                SELECT 
-                    COALESCE(SUM(claim_amount), 0) AS insurance_total,
-                    COUNT(*) AS insurance_count
-                FROM claim
-                WHERE 1=1
-            """
-            insurance_params = []
-            
-            if date_from:
-                insurance_query += " AND DATE(claim_date) >= %s"
-                insurance_params.append(date_from)
-            
-            if date_to:
-                insurance_query += " AND DATE(claim_date) <= %s"
-                insurance_params.append(date_to)
-            
-            cursor.execute(insurance_query, insurance_params)
-            insurance_result = cursor.fetchone()
-            
-            # Query out-of-pocket payments
-            outofpocket_query = """
-                SELECT 
-                    COALESCE(SUM(amount_paid), 0) AS out_of_pocket_total,
-                    COUNT(*) AS out_of_pocket_count
-                FROM payment
-                WHERE payment_method NOT IN ('Insurance')
-            """
-            outofpocket_params = []
-            
-            if date_from:
-                outofpocket_query += " AND DATE(payment_date) >= %s"
-                outofpocket_params.append(date_from)
-            
-            if date_to:
-                outofpocket_query += " AND DATE(payment_date) <= %s"
-                outofpocket_params.append(date_to)
-            
-            cursor.execute(outofpocket_query, outofpocket_params)
-            outofpocket_result = cursor.fetchone()
-            
-            # Get detailed breakdown by payment method
-            details_query = """
-                SELECT 
-                    payment_method,
-                    COUNT(DISTINCT patient_id) as patient_count,
-                    AVG(amount_paid) as avg_payment,
-                    SUM(amount_paid) as total
-                FROM payment
-                WHERE 1=1
-            """
-            details_params = []
-            
-            if date_from:
-                details_query += " AND DATE(payment_date) >= %s"
-                details_params.append(date_from)
-            
-            if date_to:
-                details_query += " AND DATE(payment_date) <= %s"
-                details_params.append(date_to)
-            
-            details_query += " GROUP BY payment_method ORDER BY total DESC"
-            
-            cursor.execute(details_query, details_params)
-            details = cursor.fetchall()
-            
-            # Prepare data for PDF generation
-            report_data = {
-                'insurance_total': float(insurance_result['insurance_total']) if insurance_result['insurance_total'] else 0,
-                'insurance_count': int(insurance_result['insurance_count']) if insurance_result['insurance_count'] else 0,
-                'out_of_pocket_total': float(outofpocket_result['out_of_pocket_total']) if outofpocket_result['out_of_pocket_total'] else 0,
-                'out_of_pocket_count': int(outofpocket_result['out_of_pocket_count']) if outofpocket_result['out_of_pocket_count'] else 0,
-                'details': details
-            }
-            
-            logger.info(f"Insurance: LKR {report_data['insurance_total']:,.2f}, Out-of-Pocket: LKR {report_data['out_of_pocket_total']:,.2f}")
-            
-            # Generate PDF
-            pdf_buffer = pdf_generator.generate_insurance_vs_outofpocket_report(
-                data=report_data,
-                date_from=date_from,
-                date_to=date_to
-            )
-            
-            # Create filename
-            filename = f"insurance_vs_outofpocket_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-            
-            logger.info(f"✅ PDF generated successfully: {filename}")
-            
-            # Return PDF as streaming response
-            return StreamingResponse(
-                pdf_buffer,
-                media_type="application/pdf",
-                headers={
-                    "Content-Disposition": f"attachment; filename={filename}",
-                    "Content-Type": "application/pdf"
-                }
-            )
-            
+        return _render_pdf_response(request, "insurance-vs-outofpocket", {"date_from": date_from, "date_to": date_to})
     except HTTPException:
         raise
     except Exception as e:
@@ -736,6 +467,7 @@ def get_insurance_vs_outofpocket_pdf(
 
 @router.get("/treatments-by-category/data", status_code=status.HTTP_200_OK)
 def get_treatments_by_category_data(
+    request: Request,
     date_from: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     date_to: Optional[str] = Query(None, description="End date (YYYY-MM-DD)")
 ):
@@ -744,45 +476,9 @@ def get_treatments_by_category_data(
     (Utility endpoint for previewing before generating PDF)
     """
     try:
-        with get_db() as (cursor, connection):
-            query = """
-                SELECT 
-                    tc.treatment_name,
-                    COUNT(t.treatment_id) as treatment_count,
-                    SUM(tc.base_price) as total_revenue
-                FROM treatment t
-                JOIN treatment_catalogue tc ON t.treatment_service_code = tc.treatment_service_code
-                JOIN consultation_record cr ON t.consultation_rec_id = cr.consultation_rec_id
-                WHERE 1=1
-            """
-            params = []
-            
-            if date_from:
-                query += " AND DATE(cr.created_at) >= %s"
-                params.append(date_from)
-            
-            if date_to:
-                query += " AND DATE(cr.created_at) <= %s"
-                params.append(date_to)
-            
-            query += """
-                GROUP BY tc.treatment_service_code, tc.treatment_name
-                ORDER BY treatment_count DESC
-            """
-            
-            cursor.execute(query, params)
-            data = cursor.fetchall()
-            
-            total_treatments = sum(int(row['treatment_count']) for row in data)
-            total_revenue = sum(float(row['total_revenue']) for row in data)
-            
-            return {
-                "success": True,
-                "total_categories": len(data),
-                "total_treatments": total_treatments,
-                "total_revenue": total_revenue,
-                "data": data
-            }
+        return _cached_json_response(
+            request, "treatments-by-category", {"date_from": date_from, "date_to": date_to}
+        )
     except Exception as e:
         logger.error(f"Error fetching treatments by category data: {str(e)}")
         raise HTTPException(
@@ -793,6 +489,7 @@ def get_treatments_by_category_data(
 
 @router.get("/insurance-vs-outofpocket/data", status_code=status.HTTP_200_OK)
 def get_insurance_vs_outofpocket_data(
+    request: Request,
     date_from: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     date_to: Optional[str] = Query(None, description="End date (YYYY-MM-DD)")
 ):
@@ -801,90 +498,272 @@ def get_insurance_vs_outofpocket_data(
     (Utility endpoint for previewing before generating PDF)
     """
     try:
-        with get_db() as (cursor, connection):
-            # Insurance payments
-            insurance_query = """
-                SELECT 
-                    COALESCE(SUM(amount_paid), 0) as total,
-                    COUNT(*) as count
-                FROM payment
-                WHERE payment_method = 'Insurance'
-            """
-            insurance_params = []
-            
-            if date_from:
-                insurance_query += " AND DATE(payment_date) >= %s"
-                insurance_params.append(date_from)
-            
-            if date_to:
-                insurance_query += " AND DATE(payment_date) <= %s"
-                insurance_params.append(date_to)
-            
-            cursor.execute(insurance_query, insurance_params)
-            insurance_result = cursor.fetchone()
-            
-            # Out-of-pocket payments
-            out_of_pocket_query = """
-                SELECT 
-                    COALESCE(SUM(amount_paid), 0) as total,
-                    COUNT(*) as count
-                FROM payment
-                WHERE payment_method != 'Insurance'
-            """
-            out_of_pocket_params = []
-            
-            if date_from:
-                out_of_pocket_query += " AND DATE(payment_date) >= %s"
-                out_of_pocket_params.append(date_from)
-            
-            if date_to:
-                out_of_pocket_query += " AND DATE(payment_date) <= %s"
-                out_of_pocket_params.append(date_to)
-            
-            cursor.execute(out_of_pocket_query, out_of_pocket_params)
-            out_of_pocket_result = cursor.fetchone()
-            
-            # Detailed breakdown
-            details_query = """
-                SELECT 
-                    payment_method,
-                    COUNT(DISTINCT patient_id) as patient_count,
-                    AVG(amount_paid) as avg_payment,
-                    SUM(amount_paid) as total
-                FROM payment
-                WHERE 1=1
-            """
-            details_params = []
-            
-            if date_from:
-                details_query += " AND DATE(payment_date) >= %s"
-                details_params.append(date_from)
-            
-            if date_to:
-                details_query += " AND DATE(payment_date) <= %s"
-                details_params.append(date_to)
-            
-            details_query += " GROUP BY payment_method ORDER BY total DESC"
-            
-            cursor.execute(details_query, details_params)
-            details = cursor.fetchall()
-            
-            grand_total = float(insurance_result['total']) + float(out_of_pocket_result['total'])
-            insurance_percentage = (float(insurance_result['total']) / grand_total * 100) if grand_total > 0 else 0
-            
-            return {
-                "success": True,
-                "insurance_total": insurance_result['total'],
-                "insurance_count": insurance_result['count'],
-                "out_of_pocket_total": out_of_pocket_result['total'],
-                "out_of_pocket_count": out_of_pocket_result['count'],
-                "grand_total": grand_total,
-                "insurance_percentage": insurance_percentage,
-                "details": details
-            }
+        return _cached_json_response(
+            request, "insurance-vs-outofpocket", {"date_from": date_from, "date_to": date_to}
+        )
     except Exception as e:
         logger.error(f"Error fetching insurance vs out-of-pocket data: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
+
+
+# ============================================
+# STREAMING EXPORTS (CSV / NDJSON)
+# ============================================
+
+def _export_response(report_name: str, filters: Dict[str, Any], format: str, gzip: bool) -> StreamingResponse:
+    """
+    Stream a report's rows as CSV or NDJSON
+
+    Rows are read in batches from an unbuffered cursor and sent as they are
+    encoded, so memory stays flat for multi-year extracts. With gzip=true
+    the body is a .gz file. Exports bypass the report cache.
+    """
+    report = get_report(report_name)
+    try:
+        export = report_export.open(report, filters, format, compress=gzip)
+    except ExportBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "5"}
+        )
+    
+    extension = f"{format}.gz" if gzip else format
+    filename = f"{report.filename}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    logger.info(f"Streaming {report_name} export: {filename}")
+    
+    return StreamingResponse(
+        iter(export),
+        media_type="application/gzip" if gzip else FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        # Releases the connection if the client goes away before the stream starts
+        background=BackgroundTask(export.close)
+    )
+
+
+@router.get("/branch-appointments/export")
+def export_branch_appointments(
+    date_from: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    branch_name: Optional[str] = Query(None, description="Filter by specific branch"),
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="Export format: csv, ndjson"),
+    gzip: bool = Query(False, description="Gzip-compress the export")
+):
+    """Stream branch appointment counts as CSV or NDJSON"""
+    try:
+        return _export_response(
+            "branch-appointments",
+            {"date_from": date_from, "date_to": date_to, "branch_name": branch_name}, format, gzip
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error exporting branch appointment data: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.get("/doctor-revenue/export")
+def export_doctor_revenue(
+    year: Optional[int] = Query(None, description="Filter by year"),
+    month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Filter by month (YYYY-MM)"),
+    doctor_id: Optional[str] = Query(None, description="Filter by doctor ID"),
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="Export format: csv, ndjson"),
+    gzip: bool = Query(False, description="Gzip-compress the export")
+):
+    """Stream doctor monthly revenue as CSV or NDJSON"""
+    try:
+        return _export_response(
+            "doctor-revenue", {"year": year, "month": month, "doctor_id": doctor_id}, format, gzip
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error exporting doctor revenue data: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.get("/outstanding-balances/export")
+def export_outstanding_balances(
+    min_balance: Optional[float] = Query(None, ge=0, description="Minimum balance"),
+    max_balance: Optional[float] = Query(None, ge=0, description="Maximum balance"),
+    sort_by: str = Query("balance_desc", description="Sort order: balance_desc, balance_asc"),
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="Export format: csv, ndjson"),
+    gzip: bool = Query(False, description="Gzip-compress the export")
+):
+    """Stream patients with outstanding balances as CSV or NDJSON"""
+    try:
+        return _export_response(
+            "outstanding-balances",
+            {"min_balance": min_balance, "max_balance": max_balance, "sort_by": sort_by}, format, gzip
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error exporting outstanding balances data: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.get("/treatments-by-category/export")
+def export_treatments_by_category(
+    date_from: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="Export format: csv, ndjson"),
+    gzip: bool = Query(False, description="Gzip-compress the export")
+):
+    """Stream treatment counts and revenue per catalogue entry as CSV or NDJSON"""
+    try:
+        return _export_response(
+            "treatments-by-category", {"date_from": date_from, "date_to": date_to}, format, gzip
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error exporting treatments by category data: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+# ============================================
+# BATCH REPORT DATA (one consistent snapshot)
+# ============================================
+
+class ReportBatchSpec(BaseModel):
+    report: str = Field(..., description="One of: " + ", ".join(BATCH_DOCUMENTS))
+    filters: Dict[str, Any] = Field(default_factory=dict, description="Same filters as the report's /data endpoint")
+    id: Optional[str] = Field(None, description="Key of this document in the results (defaults to the report name)")
+
+
+class ReportBatchRequest(BaseModel):
+    reports: List[ReportBatchSpec] = Field(..., min_length=1)
+    consistent: bool = Field(True, description="Read every document from one consistent snapshot (sequentially); false reads them concurrently")
+
+
+@router.post("/batch", status_code=status.HTTP_200_OK)
+def get_report_batch(request: ReportBatchRequest):
+    """
+    Fetch several report /data documents in one request
+    
+    Besides the reports (`branch-appointments`, `doctor-revenue`, ...) the
+    overview documents `invoice-statistics` (as `/invoices/statistics/summary`)
+    and `payment-statistics` (as `/payments/statistics/summary`) can be
+    requested. Every document is read inside one
+    `START TRANSACTION WITH CONSISTENT SNAPSHOT`, so they all describe the
+    same moment; per-document failures are listed under `errors`.
+    """
+    try:
+        body = report_batch.run([spec.model_dump() for spec in request.reports], consistent=request.consistent)
+        return Response(body, media_type="application/json")
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error fetching report batch: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch report batch: {str(e)}"
+        )
+
+
+# ============================================
+# REPORT JOBS (asynchronous PDF generation)
+# ============================================
+
+class ReportJobRequest(BaseModel):
+    report_type: str = Field(..., description="One of: " + ", ".join(REPORTS))
+    filters: Dict[str, Any] = Field(default_factory=dict, description="Same filters as the report's /pdf endpoint")
+
+
+@router.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+def submit_report_job(request: ReportJobRequest):
+    """
+    Queue a PDF report for background rendering
+    
+    Returns a job ID immediately; poll `/reports/jobs/{job_id}` and fetch the
+    file from `/reports/jobs/{job_id}/download` once its state is `done`.
+    A recently rendered report with the same filters is served from the
+    disk cache without re-rendering.
+    """
+    report = get_report(request.report_type)
+    if report is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown report type '{request.report_type}'. Valid types: {', '.join(REPORTS)}"
+        )
+    
+    try:
+        job = report_jobs.submit(report, request.filters)
+        logger.info(f"Report job {job.job_id} ({report.name}) {job.state}")
+        return {
+            "success": True,
+            "job": job.to_dict()
+        }
+    except ReportQueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error submitting report job: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to submit report job: {str(e)}"
+        )
+
+
+@router.get("/jobs/metrics", status_code=status.HTTP_200_OK)
+def get_report_job_metrics():
+    """Queue depth, render times and disk cache usage of the report job queue"""
+    return report_jobs.metrics()
+
+
+@router.get("/jobs/{job_id}", status_code=status.HTTP_200_OK)
+def get_report_job(job_id: str):
+    """Get the state of a report job"""
+    job = report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report job not found"
+        )
+    return {"job": job.to_dict()}
+
+
+@router.get("/jobs/{job_id}/download", status_code=status.HTTP_200_OK)
+def download_report_job(job_id: str):
+    """Download the PDF of a finished report job"""
+    job = report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report job not found"
+        )
+    if job.state != "done":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=job.error if job.state == "failed" else f"Report job is still {job.state}"
+        )
+    
+    pdf = report_jobs.open_result(job)
+    if pdf is None:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Report has expired from the cache; submit the job again"
+        )
+    
+    return _pdf_response(pdf, job.filename)
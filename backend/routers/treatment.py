@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, status, Query
 from typing import Optional, List
 from pydantic import BaseModel, Field, validator
 from core.database import get_db
+from services.doctor_daily_stats import doctor_daily_stats
 import logging
 import uuid
 
@@ -559,6 +560,8 @@ def delete_treatment(treatment_id: str):
             )
             connection.commit()
             
+            doctor_daily_stats.touch_consultation(cursor, treatment['consultation_rec_id'])
+            
             logger.info(f"✅ Treatment {treatment_id} deleted successfully")
             
             return {
@@ -0,0 +1,305 @@
+from fastapi import APIRouter, HTTPException, status
+from typing import Optional
+from datetime import date
+from pydantic import BaseModel, Field
+from core.database import get_db
+from services.waitlist import waitlist_service
+from services.doctor_stats import doctor_stats_service
+from services.doctor_daily_stats import doctor_daily_stats
+import logging
+
+router = APIRouter(tags=["waitlist"])
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ============================================
+# PYDANTIC SCHEMAS
+# ============================================
+
+class WaitlistRegisterRequest(BaseModel):
+    patient_id: str = Field(..., description="Patient ID (UUID)")
+    doctor_id: Optional[str] = Field(None, description="Preferred doctor (any if omitted)")
+    specialization_id: Optional[str] = Field(None, description="Required specialization (any if omitted)")
+    branch_id: Optional[str] = Field(None, description="Preferred branch (any if omitted)")
+    date_from: date = Field(..., description="Earliest acceptable date (YYYY-MM-DD)")
+    date_to: date = Field(..., description="Latest acceptable date (YYYY-MM-DD)")
+    priority: int = Field(0, ge=0, le=10, description="Higher priority waiters are offered slots first")
+    notes: Optional[str] = Field(None, description="Additional notes")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "patient_id": "patient-uuid-here",
+                "specialization_id": "specialization-uuid-here",
+                "branch_id": "branch-uuid-here",
+                "date_from": "2025-11-01",
+                "date_to": "2025-11-14",
+                "priority": 0
+            }
+        }
+
+
+# ============================================
+# REGISTER / CANCEL
+# ============================================
+
+@router.post("/", status_code=status.HTTP_201_CREATED)
+def register_waitlist_entry(request: WaitlistRegisterRequest):
+    """
+    Register interest in a freed slot
+
+    - The patient is offered the first cancelled slot that matches the
+      doctor / specialization / branch and date window
+    - Offers are held for a limited time (WAITLIST_HOLD_MINUTES)
+    """
+    if request.date_to < request.date_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_to must be on or after date_from"
+        )
+    if request.date_to < date.today():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Date window is already in the past"
+        )
+    if (request.date_to - request.date_from).days > waitlist_service.index.max_window_days:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date window cannot exceed {waitlist_service.index.max_window_days} days"
+        )
+
+    try:
+        with get_db() as (cursor, connection):
+            cursor.execute("SELECT patient_id FROM patient WHERE patient_id = %s", (request.patient_id,))
+            if not cursor.fetchone():
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Patient with ID {request.patient_id} not found"
+                )
+
+            cursor.execute(
+                """SELECT COUNT(*) as count FROM waitlist_entry
+                WHERE patient_id = %s AND status IN ('Waiting', 'Offered')""",
+                (request.patient_id,)
+            )
+            if cursor.fetchone()['count'] >= 5:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Patient already has 5 active waitlist entries"
+                )
+
+        entry = waitlist_service.register(
+            patient_id=request.patient_id,
+            date_from=request.date_from,
+            date_to=request.date_to,
+            doctor_id=request.doctor_id,
+            specialization_id=request.specialization_id,
+            branch_id=request.branch_id,
+            priority=request.priority,
+            notes=request.notes
+        )
+
+        logger.info(f"Waitlist entry {entry['waitlist_id']} registered for patient {request.patient_id}")
+
+        return {
+            "success": True,
+            "message": "Added to waitlist",
+            "waitlist_id": entry['waitlist_id']
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error registering waitlist entry: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while joining the waitlist: {str(e)}"
+        )
+
+
+@router.delete("/{waitlist_id}", status_code=status.HTTP_200_OK)
+def cancel_waitlist_entry(waitlist_id: str):
+    """Leave the waitlist; a slot currently held for this entry is offered to the next waiter"""
+    try:
+        released_slot = waitlist_service.cancel(waitlist_id)
+        next_offer = waitlist_service.offer_slot(released_slot) if released_slot else None
+
+        return {
+            "success": True,
+            "message": "Waitlist entry cancelled",
+            "waitlist_id": waitlist_id,
+            "slot_reoffered": next_offer is not None
+        }
+    except Exception as e:
+        logger.error(f"Error cancelling waitlist entry {waitlist_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while cancelling waitlist entry: {str(e)}"
+        )
+
+
+# ============================================
+# OFFERS
+# ============================================
+
+@router.post("/{waitlist_id}/accept", status_code=status.HTTP_201_CREATED)
+def accept_waitlist_offer(waitlist_id: str):
+    """Book the slot currently held for this waitlist entry"""
+    try:
+        with get_db() as (cursor, connection):
+            cursor.execute(
+                """SELECT waitlist_id, patient_id, status, offered_time_slot_id, hold_expires_at,
+                    hold_expires_at > NOW() as hold_active
+                FROM waitlist_entry WHERE waitlist_id = %s""",
+                (waitlist_id,)
+            )
+            entry = cursor.fetchone()
+
+            if not entry:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Waitlist entry with ID {waitlist_id} not found"
+                )
+            if entry['status'] != 'Offered' or not entry['offered_time_slot_id']:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"No open offer for this entry (status: {entry['status']})"
+                )
+            if not entry['hold_active']:
+                raise HTTPException(
+                    status_code=status.HTTP_410_GONE,
+                    detail="The offer has expired"
+                )
+
+            cursor.execute("SET @p_appointment_id = NULL")
+            cursor.execute("SET @p_error_message = NULL")
+            cursor.execute("SET @p_success = NULL")
+            cursor.execute(
+                """CALL BookAppointment(
+                    %s, %s, %s,
+                    @p_appointment_id, @p_error_message, @p_success
+                )""",
+                (entry['patient_id'], entry['offered_time_slot_id'], "Booked from waitlist")
+            )
+            cursor.execute("""
+                SELECT
+                    @p_appointment_id as appointment_id,
+                    @p_error_message as error_message,
+                    @p_success as success
+            """)
+            result = cursor.fetchone()
+
+            if not (result['success'] == 1 or result['success'] is True):
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=result['error_message'] or "Failed to book offered slot"
+                )
+
+            cursor.execute(
+                """UPDATE waitlist_entry
+                SET status = 'Booked', appointment_id = %s
+                WHERE waitlist_id = %s""",
+                (result['appointment_id'], waitlist_id)
+            )
+            connection.commit()
+
+            doctor_stats_service.invalidate_for_appointment(cursor, result['appointment_id'])
+            doctor_daily_stats.touch_appointment(cursor, result['appointment_id'])
+
+            logger.info(f"Waitlist entry {waitlist_id} booked appointment {result['appointment_id']}")
+
+            return {
+                "success": True,
+                "message": "Appointment booked from waitlist",
+                "appointment_id": result['appointment_id'],
+                "time_slot_id": entry['offered_time_slot_id']
+            }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error accepting waitlist offer {waitlist_id}: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while accepting the offer: {str(e)}"
+        )
+
+
+@router.post("/{waitlist_id}/decline", status_code=status.HTTP_200_OK)
+def decline_waitlist_offer(waitlist_id: str):
+    """Decline the held slot; the entry goes back in the queue and the slot goes to the next waiter"""
+    try:
+        released_slot = waitlist_service.decline(waitlist_id)
+        if not released_slot:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No open offer for this entry"
+            )
+        next_offer = waitlist_service.offer_slot(released_slot, exclude={waitlist_id})
+
+        return {
+            "success": True,
+            "message": "Offer declined",
+            "slot_reoffered": next_offer is not None
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error declining waitlist offer {waitlist_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while declining the offer: {str(e)}"
+        )
+
+
+# ============================================
+# GET ENDPOINTS
+# ============================================
+
+@router.get("/patient/{patient_id}", status_code=status.HTTP_200_OK)
+def get_patient_waitlist(patient_id: str, active_only: bool = True):
+    """Get a patient's waitlist entries including any slot currently offered"""
+    try:
+        with get_db() as (cursor, connection):
+            query = """
+                SELECT
+                    w.*,
+                    ts.available_date as offered_date,
+                    ts.start_time as offered_start_time,
+                    ts.end_time as offered_end_time,
+                    u.full_name as offered_doctor_name,
+                    b.branch_name as offered_branch_name
+                FROM waitlist_entry w
+                LEFT JOIN time_slot ts ON w.offered_time_slot_id = ts.time_slot_id
+                LEFT JOIN user u ON ts.doctor_id = u.user_id
+                LEFT JOIN branch b ON ts.branch_id = b.branch_id
+                WHERE w.patient_id = %s
+            """
+            if active_only:
+                query += " AND w.status IN ('Waiting', 'Offered')"
+            query += " ORDER BY w.created_at DESC"
+
+            cursor.execute(query, (patient_id,))
+            entries = cursor.fetchall()
+
+            return {
+                "patient_id": patient_id,
+                "total": len(entries),
+                "entries": entries or []
+            }
+    except Exception as e:
+        logger.error(f"Error fetching waitlist for patient {patient_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database error: {str(e)}"
+        )
+
+
+@router.get("/index/stats", status_code=status.HTTP_200_OK)
+def get_waitlist_index_stats():
+    """In-memory waitlist index size for this API worker"""
+    return {
+        "success": True,
+        "hold_minutes": waitlist_service.hold_minutes,
+        **waitlist_service.index.stats()
+    }
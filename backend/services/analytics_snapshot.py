@@ -0,0 +1,436 @@
+"""
+Analytics Snapshot Service for MedSync
+Keeps a local SQLite copy of the reporting fact tables, synced from MySQL
+on updated_at watermarks, so heavy report aggregates can run off the
+primary database
+"""
+
+from core.database import get_read_pool
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import threading
+import sqlite3
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_PATH = Path(__file__).resolve().parent.parent / "exports" / "analytics" / "snapshot.sqlite3"
+
+# Snapshot schema: the columns the reports read, nothing else
+SNAPSHOT_TABLES = {
+    "time_slot": "time_slot_id TEXT PRIMARY KEY, doctor_id TEXT, branch_id TEXT, available_date TEXT, is_booked INTEGER",
+    "appointment": "appointment_id TEXT PRIMARY KEY, time_slot_id TEXT, patient_id TEXT, status TEXT",
+    "consultation_record": "consultation_rec_id TEXT PRIMARY KEY, appointment_id TEXT, created_at TEXT",
+    "invoice": "invoice_id TEXT PRIMARY KEY, consultation_rec_id TEXT, sub_total REAL, tax_amount REAL, created_at TEXT",
+    "doctor": "doctor_id TEXT PRIMARY KEY, consultation_fee REAL, is_available INTEGER",
+    "employee": "employee_id TEXT PRIMARY KEY, branch_id TEXT, is_active INTEGER",
+    "user": "user_id TEXT PRIMARY KEY, full_name TEXT",
+    "branch": "branch_id TEXT PRIMARY KEY, branch_name TEXT",
+    "specialization": "specialization_id TEXT PRIMARY KEY, specialization_title TEXT",
+    "doctor_specialization": "doctor_id TEXT, specialization_id TEXT, PRIMARY KEY (doctor_id, specialization_id)",
+    "sync_state": "source TEXT PRIMARY KEY, synced_until TEXT, rows_copied INTEGER, synced_at TEXT",
+    "snapshot_meta": "name TEXT PRIMARY KEY, value TEXT",
+}
+
+SNAPSHOT_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_time_slot_doctor ON time_slot (doctor_id, available_date)",
+    "CREATE INDEX IF NOT EXISTS idx_appointment_slot ON appointment (time_slot_id)",
+    "CREATE INDEX IF NOT EXISTS idx_consultation_appointment ON consultation_record (appointment_id)",
+    "CREATE INDEX IF NOT EXISTS idx_invoice_consultation ON invoice (consultation_rec_id)",
+    "CREATE INDEX IF NOT EXISTS idx_invoice_created ON invoice (created_at)",
+]
+
+# (source, snapshot table, SELECT, watermark column)
+# Facts are copied incrementally by their watermark column; archived
+# appointments and slots land in the same snapshot tables as hot ones, so
+# snapshot queries see all history. Dimensions (no watermark) are small
+# and copied whole on every sync.
+SOURCES: List[Tuple[str, str, str, Optional[str]]] = [
+    ("time_slot", "time_slot",
+     "SELECT time_slot_id, doctor_id, branch_id, available_date, is_booked FROM time_slot", "updated_at"),
+    ("time_slot_archive", "time_slot",
+     "SELECT time_slot_id, doctor_id, branch_id, available_date, is_booked FROM time_slot_archive", "archived_at"),
+    ("appointment", "appointment",
+     "SELECT appointment_id, time_slot_id, patient_id, status FROM appointment", "updated_at"),
+    ("appointment_archive", "appointment",
+     "SELECT appointment_id, time_slot_id, patient_id, status FROM appointment_archive", "archived_at"),
+    ("consultation_record", "consultation_record",
+     "SELECT consultation_rec_id, appointment_id, created_at FROM consultation_record", "updated_at"),
+    ("invoice", "invoice",
+     "SELECT invoice_id, consultation_rec_id, sub_total, tax_amount, created_at FROM invoice", "updated_at"),
+    ("doctor", "doctor", "SELECT doctor_id, consultation_fee, is_available FROM doctor", None),
+    ("employee", "employee", "SELECT employee_id, branch_id, is_active FROM employee", None),
+    ("user", "user",
+     "SELECT u.user_id, u.full_name FROM user u JOIN employee e ON u.user_id = e.employee_id", None),
+    ("branch", "branch", "SELECT branch_id, branch_name FROM branch", None),
+    ("specialization", "specialization", "SELECT specialization_id, specialization_title FROM specialization", None),
+    ("doctor_specialization", "doctor_specialization",
+     "SELECT doctor_id, specialization_id FROM doctor_specialization", None),
+]
+
+class SnapshotUnavailable(Exception):
+    """Raised when a report asks for the snapshot engine but no usable snapshot exists"""
+
+
+def _sqlite_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat(sep=" ") if isinstance(value, datetime) else value.isoformat()
+    return value
+
+
+class AnalyticsSnapshotService:
+    """
+    Local analytical copy of the reporting tables
+
+    sync() reads, inside one consistent-snapshot MySQL transaction, the
+    fact rows changed since each source's watermark (minus
+    ANALYTICS_SNAPSHOT_OVERLAP seconds, for transactions that committed
+    after the previous sync with an earlier updated_at) and upserts them
+    into the SQLite file, which runs in WAL mode so readers keep their
+    view while a sync writes. Deletes leave no updated_at behind; the
+    nightly rebuild() recopies everything in one SQLite transaction.
+
+    Reports opt in per request with engine=snapshot, or for every request
+    with ANALYTICS_ENGINE=snapshot (which falls back to live until the
+    first sync finished). Their results are as fresh as the last sync.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('ANALYTICS_SNAPSHOT_ENABLED', 'false').lower() == 'true'
+        self.default_engine = os.getenv('ANALYTICS_ENGINE', 'live')
+        self.path = Path(os.getenv('ANALYTICS_SNAPSHOT_PATH', str(DEFAULT_SNAPSHOT_PATH)))
+        self.sync_seconds = int(os.getenv('ANALYTICS_SNAPSHOT_SYNC_SECONDS', '300'))
+        self.overlap_seconds = int(os.getenv('ANALYTICS_SNAPSHOT_OVERLAP', '120'))
+        self.batch_size = int(os.getenv('ANALYTICS_SNAPSHOT_BATCH_SIZE', '5000'))
+
+        self._write_lock = threading.Lock()
+
+    # ============================================
+    # SQLITE FILE
+    # ============================================
+
+    def _open_writer(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        snapshot = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        snapshot.execute("PRAGMA journal_mode = WAL")
+        snapshot.execute("PRAGMA synchronous = NORMAL")
+        for table, columns in SNAPSHOT_TABLES.items():
+            snapshot.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({columns})')
+        for statement in SNAPSHOT_INDEXES:
+            snapshot.execute(statement)
+        return snapshot
+
+    def _open_reader(self) -> sqlite3.Connection:
+        snapshot = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=30)
+        snapshot.row_factory = sqlite3.Row
+        return snapshot
+
+    def _meta(self, snapshot: sqlite3.Connection, name: str) -> Optional[str]:
+        row = snapshot.execute("SELECT value FROM snapshot_meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[Dict[str, Any]]:
+        snapshot = self._open_reader()
+        try:
+            return [dict(row) for row in snapshot.execute(sql, params).fetchall()]
+        finally:
+            snapshot.close()
+
+    # ============================================
+    # ENGINE SELECTION
+    # ============================================
+
+    def generation(self) -> Optional[int]:
+        """Counter bumped by every sync that copied rows (None before the first sync)"""
+        if not self.path.exists():
+            return None
+        try:
+            snapshot = self._open_reader()
+            try:
+                value = self._meta(snapshot, "generation")
+            finally:
+                snapshot.close()
+        except sqlite3.Error:
+            return None
+        return int(value) if value is not None else None
+
+    def use(self, engine: Optional[str] = None) -> bool:
+        """
+        Whether a report should read the snapshot
+
+        An explicit engine=snapshot fails with SnapshotUnavailable when there
+        is nothing to read; the ANALYTICS_ENGINE default quietly uses live.
+        """
+        requested = engine or self.default_engine
+        if requested != "snapshot":
+            return False
+        if self.enabled and self.generation() is not None:
+            return True
+        if engine is None:
+            return False
+        raise SnapshotUnavailable(
+            "Analytics snapshot is not available" if self.enabled
+            else "Analytics snapshot is disabled (ANALYTICS_SNAPSHOT_ENABLED)"
+        )
+
+    # ============================================
+    # SYNC
+    # ============================================
+
+    def _copy(self, mysql_connection, snapshot: sqlite3.Connection, table: str, select: str,
+              where: str = "", params: Tuple = ()) -> int:
+        cursor = mysql_connection.cursor(buffered=False)
+        try:
+            cursor.execute(select + where, params)
+            placeholders = ", ".join(["?"] * len(cursor.column_names))
+            statement = f'INSERT OR REPLACE INTO "{table}" VALUES ({placeholders})'
+            copied = 0
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                snapshot.executemany(statement, [tuple(_sqlite_value(value) for value in row) for row in rows])
+                copied += len(rows)
+            return copied
+        finally:
+            cursor.close()
+
+    def _run(self, full: bool) -> Dict[str, Any]:
+        started = time.perf_counter()
+        copied: Dict[str, int] = {}
+
+        with self._write_lock:
+            snapshot = self._open_writer()
+            mysql_connection = get_read_pool().get_connection()
+            try:
+                # One MySQL snapshot for every source, so facts and dimensions agree
+                mysql_connection.start_transaction(consistent_snapshot=True, readonly=True)
+                lookup = mysql_connection.cursor(buffered=True)
+                lookup.execute("SELECT NOW()")
+                now = lookup.fetchone()[0]
+                lookup.close()
+
+                watermarks = {
+                    source: synced_until
+                    for source, synced_until in snapshot.execute("SELECT source, synced_until FROM sync_state")
+                }
+                full = full or not watermarks
+
+                snapshot.execute("BEGIN IMMEDIATE")
+                if full:
+                    for table in SNAPSHOT_TABLES:
+                        if table not in ("sync_state", "snapshot_meta"):
+                            snapshot.execute(f'DELETE FROM "{table}"')
+
+                for source, table, select, watermark_column in SOURCES:
+                    if watermark_column is None:
+                        snapshot.execute(f'DELETE FROM "{table}"')
+                        copied[source] = self._copy(mysql_connection, snapshot, table, select)
+                    elif full or source not in watermarks:
+                        copied[source] = self._copy(mysql_connection, snapshot, table, select)
+                    else:
+                        since = datetime.fromisoformat(watermarks[source]) - timedelta(seconds=self.overlap_seconds)
+                        copied[source] = self._copy(
+                            mysql_connection, snapshot, table, select,
+                            f" WHERE {watermark_column} >= %s", (since,)
+                        )
+                    snapshot.execute(
+                        "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)",
+                        (source, _sqlite_value(now), copied[source], datetime.now().isoformat(sep=" "))
+                    )
+
+                fact_rows = sum(copied[source] for source, _, _, column in SOURCES if column is not None)
+                if full or fact_rows:
+                    generation = int(self._meta(snapshot, "generation") or 0) + 1
+                    snapshot.execute("INSERT OR REPLACE INTO snapshot_meta VALUES ('generation', ?)", (str(generation),))
+                snapshot.execute(
+                    "INSERT OR REPLACE INTO snapshot_meta VALUES ('synced_until', ?)", (_sqlite_value(now),)
+                )
+                snapshot.execute("COMMIT")
+                mysql_connection.rollback()
+            except Exception:
+                if snapshot.in_transaction:
+                    snapshot.execute("ROLLBACK")
+                raise
+            finally:
+                mysql_connection.close()
+                if full:
+                    snapshot.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                snapshot.close()
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+        mode = "full" if full else "incremental"
+        if full or fact_rows:
+            logger.info(f"Analytics snapshot {mode} sync copied {sum(copied.values())} rows in {elapsed_ms} ms")
+        return {
+            "mode": mode,
+            "synced_until": str(now),
+            "rows_copied": copied,
+            "elapsed_ms": elapsed_ms
+        }
+
+    def sync(self) -> Dict[str, Any]:
+        """Copy facts changed since the last watermarks (a full copy on the first run)"""
+        return self._run(full=False)
+
+    def rebuild(self) -> Dict[str, Any]:
+        """Recopy every table, dropping rows deleted in MySQL since the last rebuild"""
+        return self._run(full=True)
+
+    def status(self) -> Dict[str, Any]:
+        result = {
+            "enabled": self.enabled,
+            "default_engine": self.default_engine,
+            "path": str(self.path),
+            "generation": self.generation(),
+            "sources": []
+        }
+        if result["generation"] is None:
+            return result
+
+        snapshot = self._open_reader()
+        try:
+            result["synced_until"] = self._meta(snapshot, "synced_until")
+            result["size_bytes"] = self.path.stat().st_size
+            result["sources"] = [
+                {"source": row["source"], "synced_until": row["synced_until"],
+                 "rows_copied": row["rows_copied"], "synced_at": row["synced_at"]}
+                for row in snapshot.execute("SELECT * FROM sync_state ORDER BY source")
+            ]
+            result["table_rows"] = {
+                table: snapshot.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+                for table in SNAPSHOT_TABLES if table not in ("sync_state", "snapshot_meta")
+            }
+        finally:
+            snapshot.close()
+        return result
+
+    # ============================================
+    # REPORT QUERIES
+    # ============================================
+    # Same rows as the live queries in routers/doctor.py,
+    # services/doctor_performance.py (doctor_daily mirrors doctor_daily_stats)
+    # and services/report_data.py. Archived appointments are already part of the
+    # snapshot's appointment table, so no separate archive pass is needed.
+
+    def active_doctors(self) -> List[Dict[str, Any]]:
+        return self._query(
+            """SELECT d.doctor_id, u.full_name, d.consultation_fee, e.branch_id, b.branch_name
+            FROM doctor d
+            JOIN user u ON d.doctor_id = u.user_id
+            JOIN employee e ON d.doctor_id = e.employee_id
+            LEFT JOIN branch b ON e.branch_id = b.branch_id
+            WHERE e.is_active = 1"""
+        )
+
+    def doctor_daily(self, date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[Dict[str, Any]]:
+        """Per doctor and slot day, the doctor_daily_stats columns the performance report reads"""
+        query = """SELECT
+                ts.doctor_id,
+                ts.available_date as stat_date,
+                COUNT(DISTINCT a.appointment_id) as booked,
+                COUNT(DISTINCT CASE WHEN a.status = 'Completed' THEN a.appointment_id END) as completed,
+                COUNT(DISTINCT CASE WHEN a.status = 'No-Show' THEN a.appointment_id END) as no_show,
+                COUNT(DISTINCT CASE WHEN a.status = 'Cancelled' THEN a.appointment_id END) as cancelled,
+                COALESCE(SUM(i.sub_total + COALESCE(i.tax_amount, 0)), 0) as revenue
+            FROM time_slot ts
+            JOIN appointment a ON ts.time_slot_id = a.time_slot_id
+            LEFT JOIN consultation_record cr ON a.appointment_id = cr.appointment_id
+            LEFT JOIN invoice i ON cr.consultation_rec_id = i.consultation_rec_id
+            WHERE 1=1"""
+        params: List[Any] = []
+        if date_from:
+            query += " AND ts.available_date >= ? AND ts.available_date <= ?"
+            params += [date_from.isoformat(), date_to.isoformat()]
+        query += " GROUP BY ts.doctor_id, ts.available_date"
+        return self._query(query, tuple(params))
+
+    def doctor_unique_patients(self, date_from: Optional[date] = None,
+                               date_to: Optional[date] = None) -> Dict[str, int]:
+        query = """SELECT ts.doctor_id, COUNT(DISTINCT a.patient_id) as patients
+            FROM time_slot ts
+            JOIN appointment a ON ts.time_slot_id = a.time_slot_id
+            WHERE 1=1"""
+        params: List[Any] = []
+        if date_from:
+            query += " AND ts.available_date >= ? AND ts.available_date <= ?"
+            params += [date_from.isoformat(), date_to.isoformat()]
+        query += " GROUP BY ts.doctor_id"
+        return {row['doctor_id']: row['patients'] for row in self._query(query, tuple(params))}
+
+    def doctor_availability(self, branch_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        # Slots and specializations are aggregated separately, so neither multiplies the other
+        query = """SELECT
+                d.doctor_id,
+                u.full_name,
+                d.is_available,
+                e.branch_id,
+                b.branch_name,
+                COALESCE(slots.available_slots, 0) as available_slots,
+                COALESCE(slots.booked_slots, 0) as booked_slots,
+                specs.specializations
+            FROM doctor d
+            JOIN user u ON d.doctor_id = u.user_id
+            JOIN employee e ON d.doctor_id = e.employee_id
+            LEFT JOIN branch b ON e.branch_id = b.branch_id
+            LEFT JOIN (
+                SELECT doctor_id,
+                    SUM(is_booked = 0) as available_slots,
+                    SUM(is_booked = 1) as booked_slots
+                FROM time_slot
+                WHERE available_date >= ?
+                GROUP BY doctor_id
+            ) slots ON slots.doctor_id = d.doctor_id
+            LEFT JOIN (
+                SELECT doctor_id, group_concat(specialization_title, ', ') as specializations
+                FROM (
+                    SELECT DISTINCT ds.doctor_id, s.specialization_title
+                    FROM doctor_specialization ds
+                    JOIN specialization s ON ds.specialization_id = s.specialization_id
+                )
+                GROUP BY doctor_id
+            ) specs ON specs.doctor_id = d.doctor_id
+            WHERE e.is_active = 1"""
+        params: List[Any] = [date.today().isoformat()]
+        if branch_id:
+            query += " AND e.branch_id = ?"
+            params.append(branch_id)
+        query += " ORDER BY b.branch_name, u.full_name"
+        return self._query(query, tuple(params))
+
+    def doctor_revenue(self, first: Optional[date] = None, end: Optional[date] = None,
+                       doctor_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Revenue per doctor and month for invoices created in [first, end)"""
+        query = """SELECT
+                ts.doctor_id,
+                u.full_name as doctor_name,
+                substr(i.created_at, 1, 7) as month,
+                ROUND(SUM(i.sub_total + COALESCE(i.tax_amount, 0)), 2) as revenue
+            FROM invoice i
+            JOIN consultation_record cr ON i.consultation_rec_id = cr.consultation_rec_id
+            JOIN appointment a ON cr.appointment_id = a.appointment_id
+            JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+            JOIN user u ON ts.doctor_id = u.user_id
+            WHERE 1=1"""
+        params: List[Any] = []
+        if first:
+            query += " AND i.created_at >= ?"
+            params.append(first.isoformat())
+        if end:
+            query += " AND i.created_at < ?"
+            params.append(end.isoformat())
+        if doctor_id:
+            query += " AND ts.doctor_id = ?"
+            params.append(doctor_id)
+        query += " GROUP BY ts.doctor_id, u.full_name, month ORDER BY month DESC, revenue DESC"
+        return self._query(query, tuple(params))
+
+
+# Create singleton instance
+analytics_snapshot = AnalyticsSnapshotService()
@@ -0,0 +1,247 @@
+"""
+Archive Service for MedSync
+Moves past time slots and appointments into cold archive tables in
+bounded batches so the hot tables stay small as years of data accumulate
+"""
+
+from core.database import get_db
+from datetime import date, timedelta
+from typing import Optional, Dict, Any
+import threading
+import time as time_module
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+APPOINTMENT_COLUMNS = "appointment_id, time_slot_id, patient_id, status, notes, created_at, updated_at"
+TIME_SLOT_COLUMNS = "time_slot_id, doctor_id, branch_id, available_date, is_booked, start_time, end_time, created_at, updated_at"
+
+
+class ArchiveService:
+    """Batched archival of time_slot/appointment rows older than the horizon"""
+
+    # How long the cached watermark is trusted before re-reading it
+    CUTOFF_TTL_SECONDS = 300
+
+    def __init__(self):
+        self.horizon_days = int(os.getenv('ARCHIVE_HORIZON_DAYS', '365'))
+        self.batch_size = int(os.getenv('ARCHIVE_BATCH_SIZE', '500'))
+        self.max_batches = int(os.getenv('ARCHIVE_MAX_BATCHES', '200'))
+        self._cutoff: Optional[date] = None
+        self._cutoff_loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    # ------------------------------------------
+    # READ PATH HELPERS
+    # ------------------------------------------
+
+    def get_cutoff(self) -> Optional[date]:
+        """Date before which rows may have been archived (None if nothing archived yet)"""
+        now = time_module.monotonic()
+        with self._lock:
+            if now - self._cutoff_loaded_at < self.CUTOFF_TTL_SECONDS:
+                return self._cutoff
+        try:
+            with get_db() as (cursor, connection):
+                cursor.execute(
+                    "SELECT MIN(archived_before) AS cutoff FROM archive_watermark"
+                )
+                row = cursor.fetchone()
+                cutoff = row['cutoff'] if row else None
+        except Exception as e:
+            # Archive tables not installed yet - behave as if nothing is archived
+            logger.warning(f"Could not read archive watermark: {str(e)}")
+            cutoff = None
+        with self._lock:
+            self._cutoff = cutoff
+            self._cutoff_loaded_at = now
+        return cutoff
+
+    def needs_archive(self, date_from: Optional[date] = None) -> bool:
+        """
+        True when a read starting at date_from can reach archived rows.
+        date_from=None means an open-ended (all history) read.
+        """
+        cutoff = self.get_cutoff()
+        if cutoff is None:
+            return False
+        return date_from is None or date_from < cutoff
+
+    # ------------------------------------------
+    # ARCHIVAL JOB
+    # ------------------------------------------
+
+    def run(self, horizon_days: Optional[int] = None, batch_size: Optional[int] = None,
+            max_batches: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Archive rows dated before today - horizon_days
+
+        Booked slots go first together with all their appointments, whatever
+        their status, unless a consultation record still references one of
+        them (those are reported under appointments_retained); then any
+        unbooked slot nobody references. Each batch is its own short
+        transaction so locks are held briefly.
+        """
+        horizon_days = horizon_days if horizon_days is not None else self.horizon_days
+        batch_size = batch_size or self.batch_size
+        max_batches = max_batches or self.max_batches
+        cutoff = date.today() - timedelta(days=horizon_days)
+
+        appointments_moved = self._archive_appointments(cutoff, batch_size, max_batches)
+        slots_moved = self._archive_time_slots(cutoff, batch_size, max_batches)
+        retained = self._count_retained(cutoff)
+
+        with get_db() as (cursor, connection):
+            for table_name, moved in (("appointment", appointments_moved), ("time_slot", slots_moved)):
+                cursor.execute(
+                    """INSERT INTO archive_watermark (table_name, archived_before, rows_archived)
+                    VALUES (%s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        archived_before = GREATEST(archived_before, VALUES(archived_before)),
+                        rows_archived = rows_archived + VALUES(rows_archived)""",
+                    (table_name, cutoff, moved)
+                )
+
+        with self._lock:
+            self._cutoff_loaded_at = 0.0
+
+        logger.info(f"Archived {appointments_moved} appointments and {slots_moved} time slots before {cutoff}")
+        return {
+            "archived_before": str(cutoff),
+            "appointments_archived": appointments_moved,
+            "time_slots_archived": slots_moved,
+            "appointments_retained": retained
+        }
+
+    def _archive_appointments(self, cutoff: date, batch_size: int, max_batches: int) -> int:
+        """
+        Move booked slots before the cutoff together with all their appointments
+
+        Every status is covered (the ENUM has no other values), so the
+        candidate query does not filter on it. Batches are taken per slot, since a slot may hold a cancelled
+        appointment next to the one that rebooked it and archived
+        appointments are always read through time_slot_archive. A slot stays
+        hot while any of its appointments has a consultation record: the
+        record's foreign key and the clinical history reads need it there.
+        """
+        total = 0
+        for _ in range(max_batches):
+            with get_db() as (cursor, connection):
+                cursor.execute(
+                    """SELECT ts.time_slot_id
+                    FROM time_slot ts
+                    WHERE ts.available_date < %s
+                    AND EXISTS (
+                        SELECT 1 FROM appointment a
+                        WHERE a.time_slot_id = ts.time_slot_id
+                    )
+                    AND NOT EXISTS (
+                        SELECT 1 FROM appointment a
+                        JOIN consultation_record cr ON a.appointment_id = cr.appointment_id
+                        WHERE a.time_slot_id = ts.time_slot_id
+                    )
+                    LIMIT %s
+                    FOR UPDATE""",
+                    (cutoff, batch_size)
+                )
+                slot_ids = [row['time_slot_id'] for row in cursor.fetchall()]
+                if not slot_ids:
+                    break
+
+                placeholders = ", ".join(["%s"] * len(slot_ids))
+                cursor.execute(
+                    f"""INSERT IGNORE INTO appointment_archive ({APPOINTMENT_COLUMNS})
+                    SELECT {APPOINTMENT_COLUMNS} FROM appointment
+                    WHERE time_slot_id IN ({placeholders})""",
+                    slot_ids
+                )
+                cursor.execute(
+                    f"DELETE FROM appointment WHERE time_slot_id IN ({placeholders})",
+                    slot_ids
+                )
+                total += cursor.rowcount
+
+                # Move the freed slots in the same transaction so an archived
+                # appointment can always be joined to an archived slot
+                cursor.execute(
+                    f"""INSERT IGNORE INTO time_slot_archive ({TIME_SLOT_COLUMNS})
+                    SELECT {TIME_SLOT_COLUMNS} FROM time_slot
+                    WHERE time_slot_id IN ({placeholders})""",
+                    slot_ids
+                )
+                cursor.execute(
+                    f"DELETE FROM time_slot WHERE time_slot_id IN ({placeholders})",
+                    slot_ids
+                )
+            if len(slot_ids) < batch_size:
+                break
+        return total
+
+    def _count_retained(self, cutoff: date) -> Dict[str, int]:
+        """Appointments before the cutoff kept hot because of a consultation record, by status"""
+        with get_db() as (cursor, connection):
+            cursor.execute(
+                """SELECT a.status, COUNT(*) AS appointments
+                FROM appointment a
+                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+                WHERE ts.available_date < %s
+                AND EXISTS (
+                    SELECT 1 FROM appointment a2
+                    JOIN consultation_record cr ON a2.appointment_id = cr.appointment_id
+                    WHERE a2.time_slot_id = ts.time_slot_id
+                )
+                GROUP BY a.status""",
+                (cutoff,)
+            )
+            return {row['status']: int(row['appointments']) for row in cursor.fetchall()}
+
+    def _archive_time_slots(self, cutoff: date, batch_size: int, max_batches: int) -> int:
+        total = 0
+        for _ in range(max_batches):
+            with get_db() as (cursor, connection):
+                cursor.execute(
+                    """SELECT ts.time_slot_id
+                    FROM time_slot ts
+                    WHERE ts.available_date < %s
+                    AND NOT EXISTS (
+                        SELECT 1 FROM appointment a WHERE a.time_slot_id = ts.time_slot_id
+                    )
+                    LIMIT %s
+                    FOR UPDATE""",
+                    (cutoff, batch_size)
+                )
+                ids = [row['time_slot_id'] for row in cursor.fetchall()]
+                if not ids:
+                    break
+
+                placeholders = ", ".join(["%s"] * len(ids))
+                cursor.execute(
+                    f"""INSERT IGNORE INTO time_slot_archive ({TIME_SLOT_COLUMNS})
+                    SELECT {TIME_SLOT_COLUMNS} FROM time_slot
+                    WHERE time_slot_id IN ({placeholders})""",
+                    ids
+                )
+                cursor.execute(
+                    f"DELETE FROM time_slot WHERE time_slot_id IN ({placeholders})",
+                    ids
+                )
+                total += cursor.rowcount
+            if len(ids) < batch_size:
+                break
+        return total
+
+    def status(self) -> Dict[str, Any]:
+        with get_db() as (cursor, connection):
+            cursor.execute("SELECT * FROM archive_watermark ORDER BY table_name")
+            watermarks = cursor.fetchall()
+        return {
+            "horizon_days": self.horizon_days,
+            "batch_size": self.batch_size,
+            "max_batches": self.max_batches,
+            "watermarks": watermarks
+        }
+
+
+# Create singleton instance
+archive_service = ArchiveService()
@@ -0,0 +1,100 @@
+"""
+Branch Statistics Service for MedSync
+Reads the trigger-maintained branch counters and daily occupancy tables
+(database/13_branch_statistics.sql) and rebuilds them nightly
+"""
+
+from core.database import get_db
+from datetime import date, datetime
+from typing import Optional, Dict, Any, List
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+APPOINTMENT_STATUS_COLUMNS = {
+    'Scheduled': 'scheduled',
+    'Completed': 'completed',
+    'Cancelled': 'cancelled',
+    'No-Show': 'no_show'
+}
+
+
+class BranchStatisticsService:
+    """Primary-key lookups over branch_counters and branch_daily_occupancy"""
+
+    def get_counters(self, cursor, branch_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Counters for a branch, or None if the branch does not exist
+
+        A branch with no counter row yet (nothing recorded since the
+        last rebuild) reports zeros.
+        """
+        cursor.execute(
+            """SELECT
+                b.branch_id,
+                b.branch_name,
+                COALESCE(bc.active_employees, 0) as active_employees,
+                COALESCE(bc.active_doctors, 0) as active_doctors,
+                COALESCE(bc.patients, 0) as patients,
+                COALESCE(bc.appointments, 0) as appointments,
+                COALESCE(bc.scheduled, 0) as scheduled,
+                COALESCE(bc.completed, 0) as completed,
+                COALESCE(bc.cancelled, 0) as cancelled,
+                COALESCE(bc.no_show, 0) as no_show,
+                bc.updated_at
+            FROM branch b
+            LEFT JOIN branch_counters bc ON bc.branch_id = b.branch_id
+            WHERE b.branch_id = %s""",
+            (branch_id,)
+        )
+        return cursor.fetchone()
+
+    def appointment_total(self, counters: Dict[str, Any], status_filter: Optional[str] = None) -> int:
+        """Appointment count of a branch, optionally for one status"""
+        if status_filter:
+            return int(counters[APPOINTMENT_STATUS_COLUMNS[status_filter]])
+        return int(counters['appointments'])
+
+    def get_occupancy(self, cursor, branch_id: str, date_from: date, date_to: date) -> List[Dict[str, Any]]:
+        """Daily occupancy rows of a branch between two dates (inclusive)"""
+        cursor.execute(
+            """SELECT
+                stat_date,
+                total_slots,
+                booked_slots,
+                appointments,
+                scheduled,
+                completed,
+                cancelled,
+                no_show,
+                ROUND(booked_slots * 100.0 / NULLIF(total_slots, 0), 2) as occupancy_rate
+            FROM branch_daily_occupancy
+            WHERE branch_id = %s AND stat_date BETWEEN %s AND %s
+            ORDER BY stat_date""",
+            (branch_id, date_from, date_to)
+        )
+        return cursor.fetchall()
+
+    def rebuild(self) -> Dict[str, Any]:
+        """Recompute both tables from the base tables (nightly drift correction)"""
+        started = time.perf_counter()
+        with get_db() as (cursor, connection):
+            cursor.execute("CALL RebuildBranchStatistics()")
+            cursor.execute("SELECT COUNT(*) as branches FROM branch_counters")
+            branches = cursor.fetchone()['branches']
+            cursor.execute("SELECT COUNT(*) as days FROM branch_daily_occupancy")
+            days = cursor.fetchone()['days']
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(f"Branch statistics rebuilt: {branches} branches, {days} branch-days in {elapsed_ms} ms")
+        return {
+            "branches": branches,
+            "branch_days": days,
+            "elapsed_ms": elapsed_ms,
+            "rebuilt_at": datetime.now().isoformat()
+        }
+
+
+# Create singleton instance
+branch_statistics = BranchStatisticsService()
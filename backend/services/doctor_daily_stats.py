@@ -0,0 +1,350 @@
+"""
+Doctor Daily Statistics Rollup for MedSync
+Maintains doctor_daily_stats (one row per doctor per day) so doctor
+metrics read a handful of rollup rows instead of the full history
+"""
+
+from core.database import get_db
+from datetime import date, datetime
+from typing import Optional, Dict, Any, Iterable, List, Tuple
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = "doctor_daily_stats"
+
+# Per-appointment rows for one doctor, hot and archived. Archived
+# appointments never have a consultation, so their money columns are empty.
+_SOURCE_ROWS = """
+    SELECT ts.doctor_id, ts.available_date, a.patient_id, a.status,
+        cr.consultation_rec_id,
+        (SELECT COUNT(*) FROM treatment t
+            WHERE t.consultation_rec_id = cr.consultation_rec_id) as treatments,
+        (SELECT SUM(tc.base_price) FROM treatment t
+            JOIN treatment_catalogue tc ON t.treatment_service_code = tc.treatment_service_code
+            WHERE t.consultation_rec_id = cr.consultation_rec_id) as treatment_revenue,
+        i.invoice_id,
+        i.sub_total + COALESCE(i.tax_amount, 0) as invoice_amount
+    FROM appointment a
+    JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+    LEFT JOIN consultation_record cr ON cr.appointment_id = a.appointment_id
+    LEFT JOIN invoice i ON i.consultation_rec_id = cr.consultation_rec_id
+    WHERE ts.doctor_id = %s {date_filter}
+    UNION ALL
+    SELECT tsa.doctor_id, tsa.available_date, aa.patient_id, aa.status,
+        NULL, 0, NULL, NULL, NULL
+    FROM appointment_archive aa
+    JOIN time_slot_archive tsa ON aa.time_slot_id = tsa.time_slot_id
+    WHERE tsa.doctor_id = %s {archive_date_filter}
+"""
+
+_UPSERT_DAYS = """
+    INSERT INTO doctor_daily_stats (
+        doctor_id, stat_date, booked, completed, no_show, cancelled, unique_patients,
+        consultations, treatments, treatment_revenue, invoices, revenue
+    )
+    SELECT
+        src.doctor_id,
+        src.available_date,
+        COUNT(*),
+        SUM(src.status = 'Completed'),
+        SUM(src.status = 'No-Show'),
+        SUM(src.status = 'Cancelled'),
+        COUNT(DISTINCT src.patient_id),
+        COUNT(src.consultation_rec_id),
+        COALESCE(SUM(src.treatments), 0),
+        COALESCE(SUM(src.treatment_revenue), 0),
+        COUNT(src.invoice_id),
+        COALESCE(SUM(src.invoice_amount), 0)
+    FROM ({source}) src
+    GROUP BY src.doctor_id, src.available_date
+    ON DUPLICATE KEY UPDATE
+        booked = VALUES(booked),
+        completed = VALUES(completed),
+        no_show = VALUES(no_show),
+        cancelled = VALUES(cancelled),
+        unique_patients = VALUES(unique_patients),
+        consultations = VALUES(consultations),
+        treatments = VALUES(treatments),
+        treatment_revenue = VALUES(treatment_revenue),
+        invoices = VALUES(invoices),
+        revenue = VALUES(revenue)
+"""
+
+# Refreshed days that no longer have any appointment (all moved to another
+# doctor or day, or deleted): the upsert produces no row for them
+_DELETE_EMPTY_DAYS = """
+    DELETE s FROM doctor_daily_stats s
+    WHERE s.doctor_id = %s AND s.stat_date IN ({placeholders})
+    AND NOT EXISTS (
+        SELECT 1 FROM time_slot ts
+        JOIN appointment a ON a.time_slot_id = ts.time_slot_id
+        WHERE ts.doctor_id = s.doctor_id AND ts.available_date = s.stat_date
+    )
+    AND NOT EXISTS (
+        SELECT 1 FROM time_slot_archive tsa
+        JOIN appointment_archive aa ON aa.time_slot_id = tsa.time_slot_id
+        WHERE tsa.doctor_id = s.doctor_id AND tsa.available_date = s.stat_date
+    )
+"""
+
+_UPSERT_PATIENTS = """
+    INSERT INTO doctor_patient (doctor_id, patient_id, first_visit_date)
+    SELECT src.doctor_id, src.patient_id, MIN(src.available_date)
+    FROM ({source}) src
+    GROUP BY src.doctor_id, src.patient_id
+    ON DUPLICATE KEY UPDATE
+        first_visit_date = LEAST(first_visit_date, VALUES(first_visit_date))
+"""
+
+
+class DoctorDailyStatsService:
+    """
+    Keeps doctor_daily_stats in step with appointments, consultations,
+    treatments and invoices
+
+    Instead of applying +1/-1 deltas (which would need the previous status
+    of every changed row) each touched (doctor, day) is recomputed from the
+    base tables. A day is a few dozen appointments at most, so a refresh is
+    cheap and always converges to the right answer.
+
+    Three things feed it:
+    - write paths call touch_* after they commit
+    - a change poller picks up rows modified outside the API by updated_at
+    - a nightly reconciliation rebuilds every doctor from scratch
+    """
+
+    def __init__(self):
+        self.poll_seconds = int(os.getenv('DOCTOR_STATS_POLL_SECONDS', '300'))
+
+    # ------------------------------------------------------------------
+    # Refresh
+    # ------------------------------------------------------------------
+
+    def refresh_days(self, cursor, doctor_id: str, days: Iterable[date]) -> int:
+        """Recompute the rollup rows for one doctor on the given days (dropping days left empty)"""
+        days = sorted(set(days))
+        if not days:
+            return 0
+        placeholders = ", ".join(["%s"] * len(days))
+        source = _SOURCE_ROWS.format(
+            date_filter=f"AND ts.available_date IN ({placeholders})",
+            archive_date_filter=f"AND tsa.available_date IN ({placeholders})"
+        )
+        params = [doctor_id] + days + [doctor_id] + days
+        cursor.execute(_UPSERT_DAYS.format(source=source), params)
+        cursor.execute(_DELETE_EMPTY_DAYS.format(placeholders=placeholders), [doctor_id] + days)
+        cursor.execute(_UPSERT_PATIENTS.format(source=source), params)
+        return len(days)
+
+    def rebuild_doctor(self, cursor, doctor_id: str) -> int:
+        """Replace every rollup row of one doctor"""
+        source = _SOURCE_ROWS.format(date_filter="", archive_date_filter="")
+        cursor.execute("DELETE FROM doctor_daily_stats WHERE doctor_id = %s", (doctor_id,))
+        cursor.execute("DELETE FROM doctor_patient WHERE doctor_id = %s", (doctor_id,))
+        cursor.execute(_UPSERT_DAYS.format(source=source), (doctor_id, doctor_id))
+        days = cursor.rowcount
+        cursor.execute(_UPSERT_PATIENTS.format(source=source), (doctor_id, doctor_id))
+        return days
+
+    def refresh_keys(self, keys: Iterable[Tuple[str, date]]) -> int:
+        """Refresh a set of (doctor_id, day) keys, one transaction per doctor"""
+        by_doctor: Dict[str, set] = {}
+        for doctor_id, day in keys:
+            by_doctor.setdefault(doctor_id, set()).add(day)
+
+        refreshed = 0
+        for doctor_id, days in by_doctor.items():
+            with get_db() as (cursor, connection):
+                refreshed += self.refresh_days(cursor, doctor_id, days)
+        return refreshed
+
+    # ------------------------------------------------------------------
+    # Write path hooks
+    # ------------------------------------------------------------------
+    # Called after the caller has committed, through the caller's cursor.
+    # Failures are logged and left to the poller / reconciliation so they
+    # never fail the write that triggered them. Each statement is atomic
+    # on its own, so a failed refresh leaves the previous rows in place.
+
+    def touch(self, cursor, doctor_id: str, days: Iterable[date]):
+        try:
+            self.refresh_days(cursor, doctor_id, days)
+        except Exception as e:
+            logger.warning(f"Doctor stats refresh failed for {doctor_id}: {str(e)}")
+
+    def touch_appointment(self, cursor, appointment_id: str):
+        try:
+            cursor.execute(
+                """SELECT ts.doctor_id, ts.available_date FROM appointment a
+                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+                WHERE a.appointment_id = %s""",
+                (appointment_id,)
+            )
+            row = cursor.fetchone()
+            if row:
+                self.refresh_days(cursor, row['doctor_id'], [row['available_date']])
+        except Exception as e:
+            logger.warning(f"Doctor stats refresh failed for appointment {appointment_id}: {str(e)}")
+
+    def touch_consultation(self, cursor, consultation_rec_id: str):
+        try:
+            cursor.execute(
+                """SELECT a.appointment_id FROM consultation_record cr
+                JOIN appointment a ON cr.appointment_id = a.appointment_id
+                WHERE cr.consultation_rec_id = %s""",
+                (consultation_rec_id,)
+            )
+            row = cursor.fetchone()
+        except Exception as e:
+            logger.warning(f"Doctor stats refresh failed for consultation {consultation_rec_id}: {str(e)}")
+            return
+        if row:
+            self.touch_appointment(cursor, row['appointment_id'])
+
+    # ------------------------------------------------------------------
+    # Background jobs
+    # ------------------------------------------------------------------
+
+    def sync_changes(self) -> Dict[str, Any]:
+        """
+        Change poller: refresh the days of every appointment, consultation,
+        treatment or invoice modified since the last watermark
+
+        Deletes are invisible to the poller; the API delete paths touch the
+        rollup themselves and the nightly reconciliation covers the rest.
+        """
+        with get_db() as (cursor, connection):
+            cursor.execute("SELECT NOW() as now")
+            now = cursor.fetchone()['now']
+            cursor.execute(
+                "SELECT synced_until FROM rollup_watermark WHERE rollup_name = %s",
+                (ROLLUP_NAME,)
+            )
+            row = cursor.fetchone()
+
+        if not row:
+            result = self.reconcile()
+            self._save_watermark(now, result['days_refreshed'])
+            return {"mode": "initial_rebuild", **result}
+
+        since = row['synced_until']
+        with get_db() as (cursor, connection):
+            cursor.execute(
+                """SELECT ts.doctor_id, ts.available_date
+                FROM appointment a
+                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+                WHERE a.updated_at >= %s
+                UNION
+                SELECT ts.doctor_id, ts.available_date
+                FROM consultation_record cr
+                JOIN appointment a ON cr.appointment_id = a.appointment_id
+                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+                WHERE cr.updated_at >= %s
+                UNION
+                SELECT ts.doctor_id, ts.available_date
+                FROM treatment t
+                JOIN consultation_record cr ON t.consultation_rec_id = cr.consultation_rec_id
+                JOIN appointment a ON cr.appointment_id = a.appointment_id
+                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+                WHERE t.updated_at >= %s
+                UNION
+                SELECT ts.doctor_id, ts.available_date
+                FROM invoice i
+                JOIN consultation_record cr ON i.consultation_rec_id = cr.consultation_rec_id
+                JOIN appointment a ON cr.appointment_id = a.appointment_id
+                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+                WHERE i.updated_at >= %s""",
+                (since, since, since, since)
+            )
+            keys = [(row['doctor_id'], row['available_date']) for row in cursor.fetchall()]
+
+        refreshed = self.refresh_keys(keys)
+        self._save_watermark(now, refreshed)
+
+        if refreshed:
+            logger.info(f"Doctor stats poller refreshed {refreshed} doctor-days changed since {since}")
+        return {
+            "mode": "incremental",
+            "since": str(since),
+            "synced_until": str(now),
+            "days_refreshed": refreshed
+        }
+
+    def reconcile(self, doctor_id: Optional[str] = None) -> Dict[str, Any]:
+        """Rebuild the rollup for one doctor or all doctors, one transaction each"""
+        if doctor_id:
+            doctor_ids = [doctor_id]
+        else:
+            with get_db() as (cursor, connection):
+                cursor.execute("SELECT doctor_id FROM doctor")
+                doctor_ids = [row['doctor_id'] for row in cursor.fetchall()]
+
+        days = 0
+        for current in doctor_ids:
+            with get_db() as (cursor, connection):
+                days += self.rebuild_doctor(cursor, current)
+
+        logger.info(f"Doctor stats reconciled for {len(doctor_ids)} doctors ({days} doctor-days)")
+        return {
+            "doctors_reconciled": len(doctor_ids),
+            "days_refreshed": days
+        }
+
+    def _save_watermark(self, synced_until: datetime, refreshed: int):
+        with get_db() as (cursor, connection):
+            cursor.execute(
+                """INSERT INTO rollup_watermark (rollup_name, synced_until, rows_refreshed)
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    synced_until = VALUES(synced_until),
+                    rows_refreshed = rows_refreshed + VALUES(rows_refreshed)""",
+                (ROLLUP_NAME, synced_until, refreshed)
+            )
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get_totals(self, cursor, doctor_id: str) -> Optional[Dict[str, Any]]:
+        """All-time totals for a doctor, or None if the doctor does not exist"""
+        cursor.execute(
+            """SELECT
+                d.doctor_id,
+                d.is_available,
+                d.consultation_fee,
+                COALESCE(SUM(s.booked), 0) as booked,
+                COALESCE(SUM(s.completed), 0) as completed,
+                COALESCE(SUM(s.no_show), 0) as no_show,
+                COALESCE(SUM(s.cancelled), 0) as cancelled,
+                COALESCE(SUM(s.consultations), 0) as consultations,
+                COALESCE(SUM(s.treatments), 0) as treatments,
+                COALESCE(SUM(s.treatment_revenue), 0) as treatment_revenue,
+                COALESCE(SUM(s.invoices), 0) as invoices,
+                COALESCE(SUM(s.revenue), 0) as revenue,
+                (SELECT COUNT(*) FROM doctor_patient dp
+                    WHERE dp.doctor_id = d.doctor_id) as unique_patients
+            FROM doctor d
+            LEFT JOIN doctor_daily_stats s ON s.doctor_id = d.doctor_id
+            WHERE d.doctor_id = %s
+            GROUP BY d.doctor_id, d.is_available, d.consultation_fee""",
+            (doctor_id,)
+        )
+        return cursor.fetchone()
+
+    def get_daily(self, cursor, doctor_id: str, date_from: date) -> List[Dict[str, Any]]:
+        """Daily rows from date_from onwards, newest first"""
+        cursor.execute(
+            """SELECT stat_date, booked, completed, no_show, cancelled, unique_patients,
+                consultations, revenue
+            FROM doctor_daily_stats
+            WHERE doctor_id = %s AND stat_date >= %s AND booked > 0
+            ORDER BY stat_date DESC""",
+            (doctor_id, date_from)
+        )
+        return cursor.fetchall()
+
+
+# Create singleton instance
+doctor_daily_stats = DoctorDailyStatsService()
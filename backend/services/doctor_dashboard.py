@@ -0,0 +1,130 @@
+"""
+Doctor Dashboard Bundle Service for MedSync
+Builds every panel of the doctor dashboard (stats, today's appointments,
+upcoming appointments) for a single request and caches the bundle briefly
+"""
+
+from core.cache import TTLCache
+from services.doctor_stats import doctor_stats_service
+from services.fanout import fanout
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class DoctorDashboardService:
+    """Assembles and caches the doctor dashboard bundle"""
+
+    # Today's and upcoming appointments come from one range scan of the
+    # doctor's slots and are split in Python. Allergies and chronic
+    # conditions live in their own tables and are folded in per patient.
+    APPOINTMENTS_QUERY = """
+        SELECT
+            a.appointment_id,
+            a.patient_id,
+            a.status,
+            a.notes,
+            ts.available_date,
+            ts.start_time,
+            ts.end_time,
+            u.full_name as patient_name,
+            (SELECT GROUP_CONCAT(cn.condition_name ORDER BY cn.condition_name SEPARATOR ', ')
+                FROM patient_condition pc
+                JOIN conditions cn ON pc.condition_id = cn.condition_id
+                WHERE pc.patient_id = a.patient_id AND pc.is_chronic = TRUE) as chronic_conditions,
+            (SELECT GROUP_CONCAT(pa.allergy_name ORDER BY pa.allergy_name SEPARATOR ', ')
+                FROM patient_allergy pa
+                WHERE pa.patient_id = a.patient_id) as allergies
+        FROM time_slot ts
+        JOIN appointment a ON a.time_slot_id = ts.time_slot_id
+        JOIN user u ON a.patient_id = u.user_id
+        WHERE ts.doctor_id = %s
+        AND ts.available_date BETWEEN %s AND %s
+        ORDER BY ts.available_date, ts.start_time
+    """
+
+    def __init__(self):
+        self.cache = TTLCache(
+            ttl_seconds=int(os.getenv('DOCTOR_DASHBOARD_CACHE_TTL', '15')),
+            max_entries=int(os.getenv('DOCTOR_DASHBOARD_CACHE_SIZE', '2000'))
+        )
+        doctor_stats_service.on_invalidate(self.invalidate)
+
+    def get_bundle(self, doctor_id: str, days: int = 7) -> Optional[Dict[str, Any]]:
+        """
+        All dashboard panels for a doctor, or None if the doctor does not exist
+
+        The stats and appointment sections run concurrently. Bundles with a
+        failed section are returned but not cached.
+        """
+        today = date.today()
+        key = (doctor_id, today, days)
+        bundle = self.cache.get(key)
+        if bundle is not None:
+            return {**bundle, "cached": True}
+
+        end_date = today + timedelta(days=days)
+
+        def appointments_section(cursor):
+            cursor.execute(self.APPOINTMENTS_QUERY, (doctor_id, today, end_date))
+            return cursor.fetchall()
+
+        result = fanout.run(
+            {
+                "stats": lambda cursor: doctor_stats_service.get_stats(doctor_id, cursor),
+                "appointments": appointments_section
+            },
+            defaults={"appointments": []}
+        )
+
+        if "stats" in result.errors:
+            # The stats query doubles as the doctor existence check
+            raise RuntimeError(f"Could not load dashboard stats: {result.errors['stats']}")
+        stats = result.get("stats")
+        if stats is None:
+            return None
+
+        appointments = result.get("appointments") or []
+        today_appointments = [a for a in appointments if a['available_date'] == today]
+        upcoming = [
+            a for a in appointments
+            if a['available_date'] > today and a['status'] not in ('Cancelled', 'No-Show')
+        ]
+
+        bundle = {
+            "doctor_id": doctor_id,
+            "stats": stats,
+            "today_appointments": {
+                "date": str(today),
+                "total_count": len(today_appointments),
+                "appointments": today_appointments
+            },
+            "upcoming": {
+                "start_date": str(today + timedelta(days=1)),
+                "end_date": str(end_date),
+                "total_count": len(upcoming),
+                "appointments": upcoming
+            },
+            "generated_at": datetime.now().isoformat(),
+            **result.meta()
+        }
+        if not result.partial:
+            self.cache.set(key, bundle)
+        return {**bundle, "cached": False}
+
+    def invalidate(self, doctor_id: Optional[str] = None):
+        """Drop cached bundles for one doctor, or for every doctor if None"""
+        if doctor_id is None:
+            self.cache.clear()
+        else:
+            self.cache.delete_where(lambda key: key[0] == doctor_id)
+
+    def status(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+
+# Create singleton instance
+doctor_dashboard_service = DoctorDashboardService()
@@ -0,0 +1,306 @@
+"""
+Doctor Performance Analytics for MedSync
+Builds the all-doctors performance report from per-doctor, per-day NumPy
+arrays: period windows, rates, ranks, percentiles and trends
+"""
+
+from services.archive import archive_service
+from services.analytics_snapshot import analytics_snapshot
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rolling windows ending today; "all" is the whole history (future bookings included)
+PERIOD_DAYS = {"daily": 1, "weekly": 7, "monthly": 30, "yearly": 365}
+PERIODS = (*PERIOD_DAYS, "all")
+
+# Width in days of one point of the trend series
+SERIES_BUCKET_DAYS = {"daily": 1, "weekly": 1, "monthly": 1, "yearly": 7}
+
+METRICS = ("booked", "completed", "no_show", "cancelled", "revenue")
+
+# sort_by -> (column, descending)
+SORT_KEYS = {
+    "revenue": ("total_revenue", True),
+    "completion_rate": ("completion_rate", True),
+    "no_show_rate": ("no_show_rate", False),
+    "consultations": ("total_consultations", True),
+}
+
+
+def _rates(numerator: np.ndarray, denominator: np.ndarray, scale: float = 1.0) -> np.ndarray:
+    numerator = np.asarray(numerator, dtype=np.float64) * scale
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+
+def _change_pct(current: np.ndarray, previous: np.ndarray) -> List[Optional[float]]:
+    """Percent change per element; None where the previous window is empty"""
+    change = np.round(_rates(current - previous, previous, 100.0), 2)
+    return [value if base > 0 else None for value, base in zip(change.tolist(), previous.tolist())]
+
+
+def _ranks(values: np.ndarray, descending: bool = True) -> np.ndarray:
+    """1-based rank of every element (ties keep input order)"""
+    order = np.argsort(-values if descending else values, kind="stable")
+    ranks = np.empty(len(values), dtype=np.int64)
+    ranks[order] = np.arange(1, len(values) + 1)
+    return ranks
+
+
+class DoctorPerformanceAnalytics:
+    """
+    All-doctors performance report
+
+    Daily rows come from doctor_daily_stats (or the analytics snapshot),
+    which already hold hot and archived appointments per doctor and day,
+    so a report reads at most two windows of rollup rows instead of
+    joining appointments, consultations and invoices. One bincount per
+    metric over (doctor, window) buckets yields the current and previous
+    window totals; rates, ranks, percentiles and the trend series are
+    array operations on those totals.
+
+    Distinct patients are not additive across days: all-time counts come
+    from doctor_patient, windowed counts from one COUNT(DISTINCT) over the
+    window's time slots.
+    """
+
+    # ============================================
+    # LOADING
+    # ============================================
+
+    def _load_live(self, cursor, first: Optional[date], last: Optional[date],
+                   current_first: Optional[date]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, int]]:
+        cursor.execute(
+            """SELECT d.doctor_id, u.full_name, d.consultation_fee, e.branch_id, b.branch_name
+            FROM doctor d
+            JOIN user u ON d.doctor_id = u.user_id
+            JOIN employee e ON d.doctor_id = e.employee_id
+            LEFT JOIN branch b ON e.branch_id = b.branch_id
+            WHERE e.is_active = TRUE"""
+        )
+        doctors = cursor.fetchall()
+
+        query = """SELECT doctor_id, stat_date, booked, completed, no_show, cancelled, revenue
+            FROM doctor_daily_stats
+            WHERE 1=1"""
+        params = []
+        if first:
+            query += " AND stat_date >= %s AND stat_date <= %s"
+            params += [first, last]
+        cursor.execute(query, params)
+        daily = cursor.fetchall()
+
+        if current_first is None:
+            cursor.execute("SELECT doctor_id, COUNT(*) as patients FROM doctor_patient GROUP BY doctor_id")
+        else:
+            query = """SELECT ts.doctor_id, COUNT(DISTINCT a.patient_id) as patients
+                FROM appointment a
+                JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+                WHERE ts.available_date >= %s AND ts.available_date <= %s
+                GROUP BY ts.doctor_id"""
+            params = [current_first, last]
+            if archive_service.needs_archive(current_first):
+                query = """SELECT doctor_id, COUNT(DISTINCT patient_id) as patients FROM (
+                        SELECT ts.doctor_id, a.patient_id
+                        FROM appointment a
+                        JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+                        WHERE ts.available_date >= %s AND ts.available_date <= %s
+                        UNION ALL
+                        SELECT ts.doctor_id, a.patient_id
+                        FROM appointment_archive a
+                        JOIN time_slot_archive ts ON a.time_slot_id = ts.time_slot_id
+                        WHERE ts.available_date >= %s AND ts.available_date <= %s
+                    ) visits
+                    GROUP BY doctor_id"""
+                params = params * 2
+            cursor.execute(query, params)
+        patients = {row['doctor_id']: int(row['patients']) for row in cursor.fetchall()}
+        return doctors, daily, patients
+
+    def _load_snapshot(self, first: Optional[date], last: Optional[date],
+                       current_first: Optional[date]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, int]]:
+        doctors = analytics_snapshot.active_doctors()
+        daily = analytics_snapshot.doctor_daily(first, last)
+        patients = analytics_snapshot.doctor_unique_patients(current_first, last if current_first else None)
+        return doctors, daily, patients
+
+    # ============================================
+    # REPORT
+    # ============================================
+
+    def report(self, cursor=None, period: str = "monthly", sort_by: str = "revenue", top_count: int = 10,
+               use_snapshot: bool = False, today: Optional[date] = None) -> Dict[str, Any]:
+        """Performance report for the period; cursor is unused when reading the snapshot"""
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period '{period}' (expected one of {', '.join(PERIODS)})")
+        today = today or date.today()
+
+        if period == "all":
+            first = last = current_first = None
+        else:
+            days = PERIOD_DAYS[period]
+            current_first = today - timedelta(days=days - 1)
+            first, last = current_first - timedelta(days=days), today
+
+        if use_snapshot:
+            doctors, daily, patients = self._load_snapshot(first, last, current_first)
+        else:
+            doctors, daily, patients = self._load_live(cursor, first, last, current_first)
+
+        n = len(doctors)
+        index = {doctor['doctor_id']: i for i, doctor in enumerate(doctors)}
+        rows = [row for row in daily if row['doctor_id'] in index]
+        doctor_idx = np.fromiter((index[row['doctor_id']] for row in rows), dtype=np.int64, count=len(rows))
+        values = {
+            metric: np.fromiter((float(row[metric] or 0) for row in rows), dtype=np.float64, count=len(rows))
+            for metric in METRICS
+        }
+
+        # Window 1 = current, 0 = previous; "all" has only window 1
+        if current_first is None:
+            in_current = np.ones(len(rows), dtype=np.int64)
+            day_offset = None
+        else:
+            day_offset = np.fromiter(
+                ((row['stat_date'] - current_first).days if isinstance(row['stat_date'], date)
+                 else (date.fromisoformat(row['stat_date']) - current_first).days for row in rows),
+                dtype=np.int64, count=len(rows)
+            )
+            in_current = (day_offset >= 0).astype(np.int64)
+        bucket = doctor_idx * 2 + in_current
+        totals = {
+            metric: np.bincount(bucket, weights=column, minlength=2 * n).astype(np.float64).reshape(n, 2)
+            for metric, column in values.items()
+        }
+        current = {metric: total[:, 1] for metric, total in totals.items()}
+        previous = {metric: total[:, 0] for metric, total in totals.items()}
+
+        booked, completed, no_show = current['booked'], current['completed'], current['no_show']
+        revenue = current['revenue']
+        completion_rate = np.round(_rates(completed, booked, 100.0), 2)
+        no_show_rate = np.round(_rates(no_show, booked, 100.0), 2)
+        avg_revenue = np.round(_rates(revenue, completed), 2)
+        revenue = np.round(revenue, 2)
+        unique_patients = np.fromiter((patients.get(doctor['doctor_id'], 0) for doctor in doctors),
+                                      dtype=np.int64, count=n)
+
+        revenue_rank = _ranks(revenue)
+        revenue_percentile = (
+            np.round((n - revenue_rank) / (n - 1) * 100, 2) if n > 1 else np.full(n, 100.0)
+        )
+        columns = {
+            "total_revenue": revenue,
+            "completion_rate": completion_rate,
+            "no_show_rate": no_show_rate,
+            "total_consultations": booked,
+        }
+        column, descending = SORT_KEYS.get(sort_by, SORT_KEYS["consultations"])
+        order = np.argsort(-columns[column] if descending else columns[column], kind="stable")
+
+        consultations_change = _change_pct(booked, previous['booked']) if current_first else [None] * n
+        revenue_change = _change_pct(current['revenue'], previous['revenue']) if current_first else [None] * n
+
+        as_lists = {
+            "booked": booked.astype(np.int64).tolist(),
+            "completed": completed.astype(np.int64).tolist(),
+            "no_show": no_show.astype(np.int64).tolist(),
+            "cancelled": current['cancelled'].astype(np.int64).tolist(),
+            "unique_patients": unique_patients.tolist(),
+            "completion_rate": completion_rate.tolist(),
+            "no_show_rate": no_show_rate.tolist(),
+            "revenue": revenue.tolist(),
+            "avg_revenue": avg_revenue.tolist(),
+            "revenue_rank": revenue_rank.tolist(),
+            "revenue_percentile": revenue_percentile.tolist(),
+        }
+        doctors_metrics = [
+            {
+                "doctor_id": doctors[i]['doctor_id'],
+                "doctor_name": doctors[i]['full_name'],
+                "branch_name": doctors[i]['branch_name'],
+                "consultation_fee": float(doctors[i]['consultation_fee']) if doctors[i]['consultation_fee'] else 0.0,
+                "total_consultations": as_lists["booked"][i],
+                "completed_consultations": as_lists["completed"][i],
+                "no_shows": as_lists["no_show"][i],
+                "cancelled": as_lists["cancelled"][i],
+                "unique_patients": as_lists["unique_patients"][i],
+                "completion_rate": as_lists["completion_rate"][i],
+                "no_show_rate": as_lists["no_show_rate"][i],
+                "total_revenue": as_lists["revenue"][i],
+                "avg_revenue_per_consultation": as_lists["avg_revenue"][i],
+                "revenue_rank": as_lists["revenue_rank"][i],
+                "revenue_percentile": as_lists["revenue_percentile"][i],
+                "trend": {
+                    "consultations_change_pct": consultations_change[i],
+                    "revenue_change_pct": revenue_change[i]
+                }
+            }
+            for i in order.tolist()
+        ]
+
+        summary = {
+            "average_consultations": round(float(booked.mean()), 2) if n else 0,
+            "average_completion_rate": round(float(completion_rate.mean()), 2) if n else 0,
+            "average_no_show_rate": round(float(no_show_rate.mean()), 2) if n else 0,
+            "average_revenue": round(float(revenue.mean()), 2) if n else 0,
+            "total_consultations": int(booked.sum()),
+            "total_revenue": round(float(revenue.sum()), 2),
+            "revenue_percentiles": (
+                dict(zip(("p25", "p50", "p75", "p90"), np.round(np.percentile(revenue, [25, 50, 75, 90]), 2).tolist()))
+                if n else None
+            )
+        }
+
+        result = {
+            "period": period,
+            "window": {
+                "date_from": current_first.isoformat() if current_first else None,
+                "date_to": last.isoformat() if last else None
+            },
+            "summary": summary,
+            "top_performers": doctors_metrics[:top_count],
+            "bottom_performers": doctors_metrics[-top_count:] if n > top_count else [],
+            "all_doctors": doctors_metrics,
+            "total_doctors": n
+        }
+        if current_first is not None:
+            result["trend"] = self._trend(period, current_first, day_offset, in_current, values, previous)
+        return result
+
+    def _trend(self, period: str, current_first: date, day_offset: np.ndarray, in_current: np.ndarray,
+               values: Dict[str, np.ndarray], previous: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        """Totals against the previous window, and the current window bucketed into a series"""
+        bucket_days = SERIES_BUCKET_DAYS[period]
+        buckets = -(-PERIOD_DAYS[period] // bucket_days)
+        mask = in_current == 1
+        series_index = day_offset[mask] // bucket_days
+        booked = np.bincount(series_index, weights=values['booked'][mask], minlength=buckets)
+        revenue = np.bincount(series_index, weights=values['revenue'][mask], minlength=buckets)
+
+        current_booked, current_revenue = float(booked.sum()), float(revenue.sum())
+        previous_booked, previous_revenue = float(previous['booked'].sum()), float(previous['revenue'].sum())
+        return {
+            "previous_window": {
+                "date_from": (current_first - timedelta(days=PERIOD_DAYS[period])).isoformat(),
+                "date_to": (current_first - timedelta(days=1)).isoformat(),
+                "total_consultations": int(previous_booked),
+                "total_revenue": round(previous_revenue, 2)
+            },
+            "consultations_change_pct": _change_pct(np.array([current_booked]), np.array([previous_booked]))[0],
+            "revenue_change_pct": _change_pct(np.array([current_revenue]), np.array([previous_revenue]))[0],
+            "series": [
+                {
+                    "date_from": (current_first + timedelta(days=i * bucket_days)).isoformat(),
+                    "consultations": int(count),
+                    "revenue": round(amount, 2)
+                }
+                for i, (count, amount) in enumerate(zip(booked.tolist(), revenue.tolist()))
+            ]
+        }
+
+
+# Create singleton instance
+doctor_performance = DoctorPerformanceAnalytics()
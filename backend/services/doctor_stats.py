@@ -0,0 +1,170 @@
+"""
+Doctor Dashboard Statistics Service for MedSync
+Computes a doctor's dashboard counters in one conditional-aggregate query
+and caches the result per doctor per day
+"""
+
+from core.database import get_db
+from core.cache import TTLCache
+from datetime import date
+from typing import Optional, Dict, Any, Callable, List
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class DoctorStatsService:
+    """Shared source of the doctor dashboard counters"""
+
+    # Doctor existence check and all six counters in a single pass over the
+    # doctor's appointments. The nested join keeps unbooked slots out while
+    # still returning one row (with zero counts) for a doctor with no bookings;
+    # an unknown doctor returns no row at all.
+    STATS_QUERY = """
+        SELECT
+            d.doctor_id,
+            COALESCE(SUM(ts.available_date = %(today)s AND a.status <> 'Cancelled'), 0) as today_appointments,
+            COALESCE(SUM(ts.available_date = %(today)s AND a.status = 'Scheduled'
+                AND cr.consultation_rec_id IS NULL), 0) as pending_consultations,
+            COALESCE(SUM(ts.available_date = %(today)s AND a.status = 'Completed'), 0) as completed_today,
+            COUNT(DISTINCT CASE WHEN ts.available_date = %(today)s AND a.status = 'Completed'
+                THEN a.patient_id END) as patients_seen,
+            COALESCE(SUM(ts.available_date > %(today)s AND a.status = 'Scheduled'), 0) as upcoming_appointments,
+            COUNT(DISTINCT CASE WHEN a.status = 'Completed' THEN a.patient_id END) as total_patients
+        FROM doctor d
+        LEFT JOIN (
+            time_slot ts
+            JOIN appointment a ON a.time_slot_id = ts.time_slot_id
+            LEFT JOIN consultation_record cr ON cr.appointment_id = a.appointment_id
+        ) ON ts.doctor_id = d.doctor_id
+        WHERE d.doctor_id = %(doctor_id)s
+        GROUP BY d.doctor_id
+    """
+
+    COUNTERS = (
+        'today_appointments', 'pending_consultations', 'completed_today',
+        'patients_seen', 'upcoming_appointments', 'total_patients'
+    )
+
+    def __init__(self):
+        self.cache = TTLCache(
+            ttl_seconds=int(os.getenv('DOCTOR_STATS_CACHE_TTL', '60')),
+            max_entries=int(os.getenv('DOCTOR_STATS_CACHE_SIZE', '5000'))
+        )
+        self.queries = 0
+        self._listeners: List[Callable[[Optional[str]], None]] = []
+
+    def get_stats(self, doctor_id: str, cursor=None) -> Optional[Dict[str, int]]:
+        """
+        Dashboard counters for a doctor, or None if the doctor does not exist
+
+        On a cache miss the aggregate runs on the caller's cursor if given,
+        otherwise on a connection of its own.
+        """
+        key = (doctor_id, date.today())
+        stats = self.cache.get(key)
+        if stats is not None:
+            return stats
+
+        if cursor is not None:
+            stats = self.fetch(cursor, doctor_id, key[1])
+        else:
+            with get_db() as (cursor, connection):
+                stats = self.fetch(cursor, doctor_id, key[1])
+        if stats is not None:
+            self.cache.set(key, stats)
+        return stats
+
+    def fetch(self, cursor, doctor_id: str, today: Optional[date] = None) -> Optional[Dict[str, int]]:
+        """Run the aggregate through the caller's cursor, bypassing the cache"""
+        self.queries += 1
+        cursor.execute(self.STATS_QUERY, {"doctor_id": doctor_id, "today": today or date.today()})
+        row = cursor.fetchone()
+        if not row:
+            return None
+        return {name: int(row[name] or 0) for name in self.COUNTERS}
+
+    def invalidate(self, doctor_id: Optional[str] = None):
+        """Drop cached stats for one doctor, or for every doctor if None"""
+        if doctor_id is None:
+            self.cache.clear()
+        else:
+            self.cache.delete_where(lambda key: key[0] == doctor_id)
+        for listener in self._listeners:
+            listener(doctor_id)
+
+    def on_invalidate(self, listener: Callable[[Optional[str]], None]):
+        """
+        Register a callback run with the doctor_id (or None) on every
+        invalidation, so caches built on top of these stats are dropped
+        by the same write-path hooks
+        """
+        self._listeners.append(listener)
+
+    def invalidate_for_appointment(self, cursor, appointment_id: str):
+        """Drop cached stats for the doctor of an appointment"""
+        cursor.execute(
+            """SELECT ts.doctor_id FROM appointment a
+            JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+            WHERE a.appointment_id = %s""",
+            (appointment_id,)
+        )
+        row = cursor.fetchone()
+        if row:
+            self.invalidate(row['doctor_id'])
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "db_queries": self.queries,
+            **self.cache.stats()
+        }
+
+
+def benchmark(doctor_id: str, iterations: int = 100) -> Dict[str, Any]:
+    """
+    Measure database round trips and latency of the dashboard stats
+
+    The first call after invalidation should cost one query and every
+    following call zero. The previous endpoints issued seven queries
+    (existence check plus six COUNTs) on every request.
+    """
+    import time
+
+    doctor_stats_service.invalidate(doctor_id)
+    start_queries = doctor_stats_service.queries
+
+    started = time.perf_counter()
+    doctor_stats_service.get_stats(doctor_id)
+    cold_ms = (time.perf_counter() - started) * 1000
+    cold_queries = doctor_stats_service.queries - start_queries
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        doctor_stats_service.get_stats(doctor_id)
+    warm_ms = (time.perf_counter() - started) * 1000 / iterations
+    warm_queries = doctor_stats_service.queries - start_queries - cold_queries
+
+    return {
+        "doctor_id": doctor_id,
+        "iterations": iterations,
+        "legacy_queries_per_request": 7,
+        "cold_queries": cold_queries,
+        "cold_ms": round(cold_ms, 3),
+        "warm_queries_total": warm_queries,
+        "warm_ms_avg": round(warm_ms, 4)
+    }
+
+
+# Create singleton instance
+doctor_stats_service = DoctorStatsService()
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    if len(sys.argv) < 2:
+        print("usage: python -m services.doctor_stats <doctor_id> [iterations]")
+        sys.exit(1)
+    print(json.dumps(benchmark(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 100), indent=2))
@@ -0,0 +1,133 @@
+"""
+Concurrent Section Fan-out for MedSync
+Runs the independent sections of a composite read (profile, summary,
+dashboard) in parallel on separate pooled connections
+"""
+
+from core.database import get_db, create_pool
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class FanOutResult:
+    """Section values plus which sections failed or timed out"""
+
+    def __init__(self):
+        self.data: Dict[str, Any] = {}
+        self.errors: Dict[str, str] = {}
+        self.timings_ms: Dict[str, float] = {}
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.errors)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.data.get(name, default)
+
+    def meta(self) -> Dict[str, Any]:
+        """Response metadata describing missing sections"""
+        return {
+            "partial": self.partial,
+            "failed_sections": self.errors
+        }
+
+
+def fetch_all(query: str, params=()) -> Callable:
+    """Section that returns every row of a query"""
+    def section(cursor):
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    return section
+
+
+def fetch_one(query: str, params=()) -> Callable:
+    """Section that returns the first row of a query"""
+    def section(cursor):
+        cursor.execute(query, params)
+        return cursor.fetchone()
+    return section
+
+
+class FanOut:
+    """
+    Thread pool of section workers, each with its own read connection
+
+    A section is a callable taking a cursor. All sections of a request are
+    submitted at once, so latency is set by the slowest section rather than
+    the sum. Each section has a deadline: it is enforced server side with
+    MAX_EXECUTION_TIME and client side by abandoning the future, so a slow
+    section yields a partial result instead of holding up the response.
+    Each FanOut has a connection pool of its own with one connection per
+    worker, so a section never waits for (or fails on) a connection that
+    report exports or jobs on the shared read pool are holding. Excess
+    sections wait in the executor queue.
+    """
+
+    def __init__(self, name: str = "fanout", workers: Optional[int] = None,
+                 default_timeout: Optional[float] = None):
+        self.name = name
+        self.workers = workers or int(os.getenv('FANOUT_WORKERS', '16'))
+        self.default_timeout = default_timeout or float(os.getenv('FANOUT_SECTION_TIMEOUT', '3.0'))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=name)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = create_pool(f"medsync_{self.name}_pool", self.workers)
+        return self._pool
+
+    def _run_section(self, name: str, section: Callable, timeout: float):
+        started = time.perf_counter()
+        with get_db(self._get_pool()) as (cursor, connection):
+            cursor.execute("SET SESSION MAX_EXECUTION_TIME = %s", (int(timeout * 1000),))
+            value = section(cursor)
+        return value, (time.perf_counter() - started) * 1000
+
+    def run(self, sections: Dict[str, Callable], timeouts: Optional[Dict[str, float]] = None,
+            defaults: Optional[Dict[str, Any]] = None) -> FanOutResult:
+        """
+        Run sections concurrently and collect their results
+
+        Failed or timed-out sections get their value from defaults (None if
+        absent) and are listed in result.errors.
+        """
+        timeouts = timeouts or {}
+        defaults = defaults or {}
+        result = FanOutResult()
+        submitted_at = time.monotonic()
+
+        futures = {
+            name: self._executor.submit(self._run_section, name, section, timeouts.get(name, self.default_timeout))
+            for name, section in sections.items()
+        }
+
+        for name, future in futures.items():
+            deadline = submitted_at + timeouts.get(name, self.default_timeout)
+            try:
+                value, elapsed_ms = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                result.data[name] = value
+                result.timings_ms[name] = round(elapsed_ms, 2)
+            except FutureTimeoutError:
+                future.cancel()
+                result.data[name] = defaults.get(name)
+                result.errors[name] = "timeout"
+                logger.warning(f"Section '{name}' timed out")
+            except Exception as e:
+                result.data[name] = defaults.get(name)
+                result.errors[name] = str(e)
+                logger.error(f"Section '{name}' failed: {str(e)}")
+
+        return result
+
+
+# Create singleton instance
+fanout = FanOut()
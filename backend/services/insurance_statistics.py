@@ -0,0 +1,326 @@
+"""
+Insurance Statistics Service for MedSync
+Keeps insurance and claim aggregates (counts by status, expiring-soon,
+package popularity, claim totals) in memory, refreshed per insurance
+from the write paths and rebuilt when older than a staleness bound
+"""
+
+from core.database import get_db
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Optional, Dict, Any, Tuple
+import threading
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+EXPIRING_WINDOW_DAYS = 30
+
+
+class InsuranceStatisticsService:
+    """
+    In-memory insurance and claim aggregates
+
+    The snapshot holds one small record per package and per insurance
+    plus each insurance's claims grouped by claim_date. Everything the
+    endpoints report is derived from counters over those records, and a
+    write only reloads the rows of the insurance (or package) it touched.
+    Other API workers catch up within INSURANCE_STATS_MAX_AGE seconds,
+    when their next read rebuilds the snapshot; admins can force a rebuild
+    through the maintenance router.
+    """
+
+    def __init__(self):
+        self.max_age_seconds = int(os.getenv('INSURANCE_STATS_MAX_AGE', '300'))
+        self._lock = threading.RLock()
+        self._built_monotonic: Optional[float] = None
+        self.built_at: Optional[datetime] = None
+        self.updated_at: Optional[datetime] = None
+        self._reset()
+
+    def _reset(self):
+        self.packages: Dict[str, Dict[str, Any]] = {}
+        self.insurances: Dict[str, Tuple[str, str, Optional[date]]] = {}   # id -> (package_id, status, end_date)
+        self.claim_cells: Dict[str, Dict[date, list]] = {}                # insurance_id -> day -> [count, amount]
+        self.by_status: Counter = Counter()
+        self.active_by_package: Counter = Counter()
+        self.active_end_dates: Counter = Counter()
+        self.claims_by_day: Dict[date, list] = defaultdict(lambda: [0, 0.0])
+        self.claims_by_package_day: Dict[Tuple[str, date], list] = defaultdict(lambda: [0, 0.0])
+
+    # ============================================
+    # SNAPSHOT MAINTENANCE
+    # ============================================
+
+    def _apply_insurance(self, insurance_id: str, sign: int):
+        package_id, status, end_date = self.insurances[insurance_id]
+        self.by_status[status] += sign
+        if status == 'Active':
+            self.active_by_package[package_id] += sign
+            if end_date is not None:
+                self.active_end_dates[end_date] += sign
+        for day, (count, amount) in self.claim_cells.get(insurance_id, {}).items():
+            self._apply_cell(package_id, day, count * sign, amount * sign)
+
+    def _apply_cell(self, package_id: Optional[str], day: date, count: int, amount: float):
+        cell = self.claims_by_day[day]
+        cell[0] += count
+        cell[1] += amount
+        if package_id is not None:
+            cell = self.claims_by_package_day[(package_id, day)]
+            cell[0] += count
+            cell[1] += amount
+
+    def rebuild(self) -> Dict[str, Any]:
+        """Reload packages, insurances and per-day claim totals"""
+        started = time.perf_counter()
+        with get_db() as (cursor, connection):
+            cursor.execute(
+                """SELECT insurance_package_id, package_name, annual_limit, is_active
+                FROM insurance_package"""
+            )
+            packages = cursor.fetchall()
+            cursor.execute("SELECT insurance_id, insurance_package_id, status, end_date FROM insurance")
+            insurances = cursor.fetchall()
+            cursor.execute(
+                """SELECT insurance_id, claim_date, COUNT(*) as count, SUM(claim_amount) as amount
+                FROM claim
+                GROUP BY insurance_id, claim_date"""
+            )
+            claims = cursor.fetchall()
+
+        with self._lock:
+            self._reset()
+            for row in packages:
+                self.packages[row['insurance_package_id']] = row
+            for row in claims:
+                self.claim_cells.setdefault(row['insurance_id'], {})[row['claim_date']] = [
+                    int(row['count']), float(row['amount'] or 0)
+                ]
+            for row in insurances:
+                self.insurances[row['insurance_id']] = (row['insurance_package_id'], row['status'], row['end_date'])
+                self._apply_insurance(row['insurance_id'], 1)
+            # Claims whose insurance row is gone still count towards the totals
+            for insurance_id, cells in self.claim_cells.items():
+                if insurance_id not in self.insurances:
+                    for day, (count, amount) in cells.items():
+                        self._apply_cell(None, day, count, amount)
+            self.built_at = self.updated_at = datetime.now()
+            self._built_monotonic = time.monotonic()
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(f"Insurance statistics rebuilt: {len(insurances)} insurances, {len(claims)} claim days in {elapsed_ms} ms")
+        return {
+            "packages": len(packages),
+            "insurances": len(insurances),
+            "claim_days": len(claims),
+            "elapsed_ms": elapsed_ms
+        }
+
+    def _ensure_fresh(self):
+        if self._built_monotonic is None or time.monotonic() - self._built_monotonic > self.max_age_seconds:
+            self.rebuild()
+
+    # ============================================
+    # INCREMENTAL REFRESH (called by the write paths)
+    # ============================================
+
+    def refresh_package(self, cursor, package_id: str):
+        """Reload one package after it was created, updated or deleted"""
+        try:
+            cursor.execute(
+                """SELECT insurance_package_id, package_name, annual_limit, is_active
+                FROM insurance_package WHERE insurance_package_id = %s""",
+                (package_id,)
+            )
+            row = cursor.fetchone()
+        except Exception as e:
+            logger.warning(f"Could not refresh insurance package {package_id}: {str(e)}")
+            return
+        with self._lock:
+            if self._built_monotonic is None:
+                return
+            if row:
+                self.packages[package_id] = row
+            else:
+                self.packages.pop(package_id, None)
+            self.updated_at = datetime.now()
+
+    def refresh_insurance(self, cursor, insurance_id: str):
+        """Reload one insurance and its claims after any insurance or claim write"""
+        try:
+            cursor.execute(
+                "SELECT insurance_package_id, status, end_date FROM insurance WHERE insurance_id = %s",
+                (insurance_id,)
+            )
+            row = cursor.fetchone()
+            cursor.execute(
+                """SELECT claim_date, COUNT(*) as count, SUM(claim_amount) as amount
+                FROM claim WHERE insurance_id = %s
+                GROUP BY claim_date""",
+                (insurance_id,)
+            )
+            cells = {r['claim_date']: [int(r['count']), float(r['amount'] or 0)] for r in cursor.fetchall()}
+        except Exception as e:
+            logger.warning(f"Could not refresh insurance statistics for {insurance_id}: {str(e)}")
+            return
+
+        with self._lock:
+            if self._built_monotonic is None:
+                return
+            if insurance_id in self.insurances:
+                self._apply_insurance(insurance_id, -1)
+                del self.insurances[insurance_id]
+            else:
+                for day, (count, amount) in self.claim_cells.get(insurance_id, {}).items():
+                    self._apply_cell(None, day, -count, -amount)
+
+            self.claim_cells[insurance_id] = cells
+            if row:
+                self.insurances[insurance_id] = (row['insurance_package_id'], row['status'], row['end_date'])
+                self._apply_insurance(insurance_id, 1)
+            else:
+                for day, (count, amount) in cells.items():
+                    self._apply_cell(None, day, count, amount)
+            if not cells:
+                del self.claim_cells[insurance_id]
+            self.updated_at = datetime.now()
+
+    def invalidate(self):
+        """Drop the snapshot so the next read rebuilds it"""
+        with self._lock:
+            self._built_monotonic = None
+
+    # ============================================
+    # READS
+    # ============================================
+
+    def _freshness(self) -> Dict[str, Any]:
+        return {
+            "snapshot_built_at": self.built_at.isoformat() if self.built_at else None,
+            "snapshot_updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def insurance_statistics(self) -> Dict[str, Any]:
+        """Statistics in the /insurance/statistics/summary shape"""
+        self._ensure_fresh()
+        today = date.today()
+        with self._lock:
+            popular = max(
+                ((package_id, count) for package_id, count in self.active_by_package.items() if count > 0),
+                key=lambda item: item[1],
+                default=None
+            )
+            return {
+                "total_active_packages": sum(1 for p in self.packages.values() if p['is_active']),
+                "insurances_by_status": {s: c for s, c in self.by_status.items() if c > 0},
+                "expiring_soon": sum(
+                    self.active_end_dates.get(today + timedelta(days=offset), 0)
+                    for offset in range(EXPIRING_WINDOW_DAYS + 1)
+                ),
+                "most_popular_package": {
+                    "package_name": self.packages.get(popular[0], {}).get('package_name'),
+                    "count": popular[1]
+                } if popular else None,
+                **self._freshness()
+            }
+
+    def claims_statistics(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict[str, Any]:
+        """Statistics in the /claims/statistics/summary shape"""
+        self._ensure_fresh()
+        filtered = bool(start_date and end_date)
+
+        def in_range(day):
+            return not filtered or start_date <= day <= end_date
+
+        with self._lock:
+            total_count, total_amount = 0, 0.0
+            months = defaultdict(lambda: [0, 0.0])
+            for day, (count, amount) in self.claims_by_day.items():
+                if count and in_range(day):
+                    total_count += count
+                    total_amount += amount
+                    month = months[day.strftime('%Y-%m')]
+                    month[0] += count
+                    month[1] += amount
+
+            packages = defaultdict(lambda: [0, 0.0])
+            if not filtered:
+                # Unfiltered, every package is listed even without claims
+                for package_id in self.packages:
+                    packages[package_id] = [0, 0.0]
+            for (package_id, day), (count, amount) in self.claims_by_package_day.items():
+                if count and in_range(day):
+                    packages[package_id][0] += count
+                    packages[package_id][1] += amount
+
+            by_package = sorted(
+                (
+                    {
+                        "package_name": self.packages.get(package_id, {}).get('package_name'),
+                        "count": count,
+                        "total": round(amount, 2)
+                    }
+                    for package_id, (count, amount) in packages.items()
+                ),
+                key=lambda row: row['total'],
+                reverse=True
+            )
+
+            return {
+                "overall": {
+                    "total": total_count,
+                    "sum": round(total_amount, 2),
+                    "avg": round(total_amount / total_count, 2) if total_count else 0
+                },
+                "by_package": by_package,
+                "monthly_trend": [
+                    {"month": month, "count": count, "total": round(amount, 2)}
+                    for month, (count, amount) in sorted(months.items(), reverse=True)[:12]
+                ],
+                **self._freshness()
+            }
+
+    def insurance_summary(self, insurance_id: str) -> Optional[Dict[str, Any]]:
+        """Limit utilisation of one insurance, or None if it does not exist"""
+        self._ensure_fresh()
+        if insurance_id not in self.insurances:
+            # May have been created through another worker since the last rebuild
+            with get_db() as (cursor, connection):
+                self.refresh_insurance(cursor, insurance_id)
+
+        year = date.today().year
+        with self._lock:
+            record = self.insurances.get(insurance_id)
+            if record is None:
+                return None
+            package = self.packages.get(record[0])
+            annual_limit = float(package['annual_limit']) if package else 0.0
+            cells = self.claim_cells.get(insurance_id, {})
+            year_count = sum(count for day, (count, amount) in cells.items() if day.year == year)
+            year_total = sum(amount for day, (count, amount) in cells.items() if day.year == year)
+            all_time = sum(amount for count, amount in cells.values())
+
+        return {
+            "annual_limit": annual_limit,
+            "current_year_total": year_total,
+            "remaining_limit": annual_limit - year_total,
+            "utilization_percentage": (year_total / annual_limit * 100) if annual_limit > 0 else 0,
+            "all_time_total": all_time,
+            "claim_count": year_count,
+            **self._freshness()
+        }
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "max_age_seconds": self.max_age_seconds,
+            "insurances": len(self.insurances),
+            "packages": len(self.packages),
+            **self._freshness()
+        }
+
+
+# Create singleton instance
+insurance_statistics = InsuranceStatisticsService()
@@ -0,0 +1,447 @@
+"""
+Medication Search Index for MedSync
+In-memory prefix and n-gram index over medication names and manufacturers,
+so the prescription typeahead ranks matches without scanning medication
+"""
+
+from core.database import get_db
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import unicodedata
+import threading
+import bisect
+import heapq
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# Relevance ranks, as the SQL search ordered them
+RANK_EXACT_NAME = 1
+RANK_NAME_PREFIX = 2
+RANK_EXACT_MANUFACTURER = 3
+RANK_MANUFACTURER_PREFIX = 4
+RANK_CONTAINS = 5
+
+_INDEX_COLUMNS = "medication_id, generic_name, manufacturer, form, updated_at"
+
+
+def normalize(text: Optional[str]) -> str:
+    """Case- and accent-insensitive form of a name (as the column collation compares them)"""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text.strip().casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def grams(text: str) -> Iterable[str]:
+    """Distinct 1-, 2- and 3-character substrings of a normalized name"""
+    return {text[i:i + n] for n in (1, 2, 3) for i in range(len(text) - n + 1)}
+
+
+class MedicationSearchIndex:
+    """
+    Ranked medication search without touching MySQL
+
+    Per medication the index keeps the normalized name, manufacturer and
+    form. A sorted name list answers the name prefix ranks by bisection
+    (exact matches sort first within a prefix range). A sorted list of
+    distinct manufacturers, each with its medications in name order,
+    answers the manufacturer ranks: the makers in the prefix range are
+    merged by name and the merge stops at the limit, so a prefix shared by
+    thousands of medications costs no more than a rare one. Posting lists
+    of every 1-, 2- and 3-gram answer "contains": a query is checked only
+    against the medications holding all of its grams (set intersections,
+    rarest list first). Substrings so common that even the rarest list
+    would leave thousands of candidates are answered by walking names in
+    order until the limit is reached, without building any set. Results
+    come out ordered by (rank, name), so a lookup stays in the
+    millisecond range at 100k medications, common prefixes and
+    substrings included (see the benchmark at the bottom of this module).
+
+    Posting lists are append-only: an edit adds the new grams and leaves
+    the old ones, and every candidate is re-checked against its current
+    name, so stale entries only cost a comparison until the next rebuild.
+
+    Freshness: writes through the medication endpoints update the index
+    directly; changes made by other processes are picked up through the
+    'medication' counter in report_data_version
+    (database/19_medication_search.sql), checked at most every
+    MEDICATION_SEARCH_REFRESH_SECONDS.
+    """
+
+    def __init__(self):
+        self.refresh_seconds = float(os.getenv('MEDICATION_SEARCH_REFRESH_SECONDS', '5'))
+        self.overlap_seconds = int(os.getenv('MEDICATION_SEARCH_OVERLAP', '60'))
+
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._reset()
+        self._version: Optional[int] = None
+        self._watermark: Optional[datetime] = None
+        self._checked_at = 0.0
+        self.built_at: Optional[datetime] = None
+
+    def _reset(self):
+        self._entries: Dict[str, Tuple[str, str, str]] = {}     # id -> (name, manufacturer, form)
+        self._by_name: List[Tuple[str, str]] = []                # (name, id), sorted
+        self._makers: List[str] = []                             # distinct manufacturers, sorted
+        self._by_manufacturer: Dict[str, List[Tuple[str, str]]] = {}  # manufacturer -> (name, id), sorted
+        self._postings: Dict[str, List[str]] = {}                # gram -> ids (append-only)
+        self._by_form: Dict[str, set] = {}                       # form -> ids
+
+    @property
+    def ready(self) -> bool:
+        return self.built_at is not None
+
+    # ============================================
+    # INDEX MAINTENANCE
+    # ============================================
+
+    def _add(self, medication_id: str, generic_name: str, manufacturer: str, form: str):
+        name, maker = normalize(generic_name), normalize(manufacturer)
+        previous = self._entries.get(medication_id)
+        if previous is not None:
+            if previous == (name, maker, form):
+                return
+            self._discard(medication_id)
+        self._entries[medication_id] = (name, maker, form)
+        bisect.insort(self._by_name, (name, medication_id))
+        if maker not in self._by_manufacturer:
+            bisect.insort(self._makers, maker)
+        bisect.insort(self._by_manufacturer.setdefault(maker, []), (name, medication_id))
+        self._by_form.setdefault(form, set()).add(medication_id)
+        for gram in grams(name) | grams(maker):
+            self._postings.setdefault(gram, []).append(medication_id)
+
+    def _discard(self, medication_id: str):
+        entry = self._entries.pop(medication_id, None)
+        if entry is None:
+            return
+        name, maker, form = entry
+        self._by_form.get(form, set()).discard(medication_id)
+        for keys in (self._by_name, self._by_manufacturer.get(maker, [])):
+            position = bisect.bisect_left(keys, (name, medication_id))
+            if position < len(keys) and keys[position] == (name, medication_id):
+                del keys[position]
+        if not self._by_manufacturer.get(maker, True):
+            del self._by_manufacturer[maker]
+            del self._makers[bisect.bisect_left(self._makers, maker)]
+
+    def _apply(self, rows: List[Dict[str, Any]]):
+        for row in rows:
+            self._add(row['medication_id'], row['generic_name'], row['manufacturer'], row['form'])
+            if row.get('updated_at') and (self._watermark is None or row['updated_at'] > self._watermark):
+                self._watermark = row['updated_at']
+
+    def _read_version(self, cursor) -> int:
+        # Sum of the counter's shards (database/22_report_version_shards.sql)
+        cursor.execute("SELECT COALESCE(SUM(version), 0) as version FROM report_data_version WHERE table_name = 'medication'")
+        return int(cursor.fetchone()['version'])
+
+    def rebuild(self, cursor=None) -> Dict[str, Any]:
+        """Load every medication into a fresh index (also drops stale postings)"""
+        if cursor is None:
+            with get_db() as (cursor, connection):
+                return self.rebuild(cursor)
+
+        started = time.perf_counter()
+        version = self._read_version(cursor)
+        cursor.execute(f"SELECT {_INDEX_COLUMNS} FROM medication")
+        rows = cursor.fetchall()
+
+        # Built aside and swapped in, so searches keep using the old index meanwhile;
+        # sorting once is far cheaper than insort per row
+        entries: Dict[str, Tuple[str, str, str]] = {}
+        by_form: Dict[str, set] = {}
+        postings: Dict[str, List[str]] = {}
+        watermark: Optional[datetime] = None
+        for row in rows:
+            name, maker = normalize(row['generic_name']), normalize(row['manufacturer'])
+            entries[row['medication_id']] = (name, maker, row['form'])
+            by_form.setdefault(row['form'], set()).add(row['medication_id'])
+            for gram in grams(name) | grams(maker):
+                postings.setdefault(gram, []).append(row['medication_id'])
+            if row.get('updated_at') and (watermark is None or row['updated_at'] > watermark):
+                watermark = row['updated_at']
+        by_name = sorted((name, medication_id) for medication_id, (name, _, _) in entries.items())
+        by_manufacturer: Dict[str, List[Tuple[str, str]]] = {}
+        for name, medication_id in by_name:
+            by_manufacturer.setdefault(entries[medication_id][1], []).append((name, medication_id))
+        makers = sorted(by_manufacturer)
+
+        with self._lock:
+            self._entries, self._by_name = entries, by_name
+            self._makers, self._by_manufacturer = makers, by_manufacturer
+            self._postings, self._by_form = postings, by_form
+            # Read before the rows: anything written since shows up as a newer version
+            self._version = version
+            self._watermark = watermark
+            self._checked_at = time.monotonic()
+            self.built_at = datetime.now()
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(f"Medication search index built: {len(rows)} medications, {len(postings)} grams in {elapsed_ms} ms")
+        return {"medications": len(rows), "grams": len(postings), "elapsed_ms": elapsed_ms}
+
+    def refresh(self, cursor, force: bool = False) -> bool:
+        """
+        Catch up with changes made elsewhere; True if anything was reloaded
+
+        Cheap when nothing changed: one primary key read, at most every
+        refresh_seconds (force skips the wait).
+        """
+        if not self.ready:
+            self.rebuild(cursor)
+            return True
+        if not force and time.monotonic() - self._checked_at < self.refresh_seconds:
+            return False
+        # One catch-up at a time; concurrent callers search the current index
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            return self._catch_up(cursor)
+        finally:
+            self._refresh_lock.release()
+
+    def _catch_up(self, cursor) -> bool:
+        # MySQL is read without holding _lock, so searches never wait on it;
+        # the lock is taken only to read the watermark and apply the rows
+        self._checked_at = time.monotonic()
+        version = self._read_version(cursor)
+        if version == self._version:
+            return False
+
+        with self._lock:
+            since = self._watermark - timedelta(seconds=self.overlap_seconds) if self._watermark else None
+        if since is None:
+            cursor.execute(f"SELECT {_INDEX_COLUMNS} FROM medication")
+        else:
+            cursor.execute(f"SELECT {_INDEX_COLUMNS} FROM medication WHERE updated_at >= %s", (since,))
+        rows = cursor.fetchall()
+        with self._lock:
+            self._apply(rows)
+            known = set(self._entries)
+
+        # Deletes leave no updated_at behind: reconcile ids when the counts disagree.
+        # Only ids indexed before the read are dropped, so a row upserted meanwhile stays
+        cursor.execute("SELECT COUNT(*) as total FROM medication")
+        if cursor.fetchone()['total'] != len(known):
+            cursor.execute("SELECT medication_id FROM medication")
+            existing = {row['medication_id'] for row in cursor.fetchall()}
+            with self._lock:
+                for medication_id in known - existing:
+                    self._discard(medication_id)
+
+        self._version = version
+        return True
+
+    def upsert(self, cursor, medication_id: str):
+        """Re-read one medication after this process wrote it"""
+        if not self.ready:
+            return
+        cursor.execute(f"SELECT {_INDEX_COLUMNS} FROM medication WHERE medication_id = %s", (medication_id,))
+        row = cursor.fetchone()
+        with self._lock:
+            if row is None:
+                self._discard(medication_id)
+            else:
+                self._apply([row])
+
+    def remove(self, medication_id: str):
+        with self._lock:
+            self._discard(medication_id)
+
+    # ============================================
+    # SEARCH
+    # ============================================
+
+    def _prefix_range(self, keys: List[Tuple[str, str]], prefix: str) -> Iterable[Tuple[str, str]]:
+        position = bisect.bisect_left(keys, (prefix, ""))
+        while position < len(keys) and keys[position][0].startswith(prefix):
+            yield keys[position]
+            position += 1
+
+    def _maker_range(self, prefix: str) -> Iterable[str]:
+        position = bisect.bisect_left(self._makers, prefix)
+        while position < len(self._makers) and self._makers[position].startswith(prefix):
+            yield self._makers[position]
+            position += 1
+
+    def search(self, query: str, form: Optional[str] = None, limit: int = 50) -> List[Tuple[str, int]]:
+        """(medication_id, rank) of the best matches, ordered by rank then name"""
+        q = normalize(query)
+        if not q:
+            return []
+
+        with self._lock:
+            entries = self._entries
+            results: List[Tuple[str, int]] = []
+            taken = set()
+
+            def wanted(medication_id: str) -> bool:
+                return medication_id not in taken and (form is None or entries[medication_id][2] == form)
+
+            # Ranks 1-2: the name range is already in (exact, then prefix) name order
+            for name, medication_id in self._prefix_range(self._by_name, q):
+                if wanted(medication_id):
+                    results.append((medication_id, RANK_EXACT_NAME if name == q else RANK_NAME_PREFIX))
+                    taken.add(medication_id)
+                    if len(results) >= limit:
+                        return results
+
+            # Ranks 3-4: the exact manufacturer's list, then the lists of the
+            # longer manufacturers merged by name, stopping at the limit
+            makers = [maker for maker in self._maker_range(q) if maker != q]
+            ranked = [(RANK_EXACT_MANUFACTURER, self._by_manufacturer.get(q, ())),
+                      (RANK_MANUFACTURER_PREFIX, heapq.merge(*(self._by_manufacturer[maker] for maker in makers)))]
+            for rank, keys in ranked:
+                for _, medication_id in keys:
+                    if wanted(medication_id):
+                        results.append((medication_id, rank))
+                        taken.add(medication_id)
+                        if len(results) >= limit:
+                            return results
+
+            # Rank 5: substring anywhere else
+            needed = limit - len(results)
+            # Every gram of the query must occur: posting lists, rarest first
+            query_grams = {q} if len(q) <= 3 else {q[i:i + 3] for i in range(len(q) - 2)}
+            postings = sorted((self._postings.get(gram, ()) for gram in query_grams), key=len)
+
+            # The rarest list, thinned by the form's share of the index, bounds the
+            # matches; it is exact when the query is a gram itself
+            share = len(self._by_form.get(form, ())) / len(entries) if form is not None and entries else 1.0
+            estimate = int(len(postings[0]) * share)
+
+            if self._walk_names(estimate, needed):
+                # Common substring: walking names in order finds enough matches long
+                # before the end. The walk gives up once it has looked at as many
+                # names as there are candidates (matches may cluster late in name
+                # order) and checks the candidates instead
+                found = []
+                for position, (name, medication_id) in enumerate(self._by_name):
+                    if position >= estimate:
+                        break
+                    if wanted(medication_id) and (q in name or q in entries[medication_id][1]):
+                        found.append((medication_id, RANK_CONTAINS))
+                        if len(found) >= needed:
+                            return results + found
+                else:
+                    return results + found
+
+            candidates = self._intersect(postings, form)
+            matches = []
+            for medication_id in candidates:
+                entry = entries.get(medication_id)
+                if entry is not None and wanted(medication_id) and (q in entry[0] or q in entry[1]):
+                    matches.append((entry[0], medication_id))
+            for _, medication_id in heapq.nsmallest(needed, matches):
+                results.append((medication_id, RANK_CONTAINS))
+            return results
+
+    def _intersect(self, postings: List[List[str]], form: Optional[str]) -> set:
+        """Ids in every posting list (and of the form), rarest list first"""
+        candidates = set(postings[0])
+        if form is not None:
+            candidates &= self._by_form.get(form, set())
+        for ids in postings[1:]:
+            # Checking a few candidates directly beats walking a much longer list
+            if len(candidates) * 16 < len(ids):
+                break
+            candidates.intersection_update(ids)
+        return candidates
+
+    def _walk_names(self, candidates: int, needed: int) -> bool:
+        """Whether walking names in order is expected to find needed matches before checking this many candidates"""
+        return candidates ** 2 > needed * len(self._entries)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "medications": len(self._entries),
+                "grams": len(self._postings),
+                "postings": sum(len(ids) for ids in self._postings.values()),
+                "version": self._version,
+                "watermark": self._watermark.isoformat() if self._watermark else None,
+                "built_at": self.built_at.isoformat() if self.built_at else None
+            }
+
+
+# Create singleton instance
+medication_search = MedicationSearchIndex()
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+# python -m services.medication_search [--medications 100000] [--queries 2000]
+# Builds an index over synthetic names (no database) and times typeahead
+# lookups for every prefix length of a sample of names, manufacturer
+# prefixes (including a family of "Acme" makers sharing one prefix) and
+# common substrings, with and without a form filter.
+
+if __name__ == "__main__":
+    import argparse
+    import random
+
+    parser = argparse.ArgumentParser(description="Time medication typeahead lookups on a synthetic index")
+    parser.add_argument("--medications", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(7)
+    syllables = ["pa", "ra", "ce", "ta", "mol", "ibu", "pro", "fen", "amo", "xi", "cil", "lin", "met", "for",
+                 "min", "ator", "va", "sta", "tin", "lo", "sar", "tan", "om", "epra", "zole", "cet", "iri", "zine"]
+    # 350 varied makers plus a family of 50 sharing one prefix ("Acme0 Pharma" .. "Acme49 Labs"),
+    # so manufacturer prefixes such as "a", "acme" and "acme1" match thousands of medications
+    makers = [f"{random.choice(syllables).title()}{random.choice(['Pharma', 'Labs', 'Medica', 'Health'])}"
+              for _ in range(350)]
+    makers += [f"Acme{i} {random.choice(['Pharma', 'Labs'])}" for i in range(50)]
+    forms = ["Tablet", "Capsule", "Injection", "Syrup", "Other"]
+    rows = [
+        {"medication_id": f"{i:08d}", "generic_name": "".join(random.choices(syllables, k=random.randint(2, 4))).title(),
+         "manufacturer": random.choice(makers), "form": random.choice(forms), "updated_at": None}
+        for i in range(args.medications)
+    ]
+
+    class _Rows:
+        def execute(self, query, params=()):
+            self.query = query
+
+        def fetchone(self):
+            return {"version": 0}
+
+        def fetchall(self):
+            return rows
+
+    index = MedicationSearchIndex()
+    print(index.rebuild(_Rows()))
+
+    def timed(query: str, form: Optional[str] = None) -> float:
+        started = time.perf_counter()
+        index.search(query, form=form, limit=args.limit)
+        return (time.perf_counter() - started) * 1000
+
+    def report(label: str, timings: List[float]):
+        timings.sort()
+        print(f"{label:<24} {len(timings):>6} lookups: p50 {timings[len(timings) // 2]:.3f} ms, "
+              f"p99 {timings[int(len(timings) * 0.99)]:.3f} ms, max {timings[-1]:.3f} ms")
+
+    # Every prefix of a sample of generic names and of manufacturers, as a typeahead sends them
+    for label, column in (("name prefixes", "generic_name"), ("manufacturer prefixes", "manufacturer")):
+        timings = []
+        for text in (row[column] for row in random.sample(rows, args.queries)):
+            for length in range(1, len(text) + 1):
+                timings.append(timed(text[:length], form=random.choice([None, None, "Tablet"])))
+        report(label, timings)
+
+    # Substrings that sit inside thousands of names or manufacturers (rank 5 without a prefix hit)
+    common = ["me", "ce", "ta", "in", "ar", "ab", "ol", "ma", "he", "cme", "zol", "ato", "pha", "lab"]
+    report("common substrings", [timed(query, form) for query in common for form in (None, "Tablet")])
+
+    for query in ("a", "ac", "acme", "acme1", "acme49 l", "me", "zz", "ator", "labs"):
+        print(f"  {query!r:<12} {timed(query):.3f} ms")
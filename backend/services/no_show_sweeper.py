@@ -0,0 +1,160 @@
+"""
+No-Show Sweeper for MedSync
+End-of-day job that marks past Scheduled appointments without a
+consultation record as No-Show using batched set-based updates
+"""
+
+from core.database import get_db
+from services.doctor_stats import doctor_stats_service
+from services.doctor_daily_stats import doctor_daily_stats
+from datetime import date, datetime, timedelta
+from typing import Optional, Dict, Any
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class NoShowSweeper:
+    """Transitions stale Scheduled appointments to No-Show"""
+
+    def __init__(self):
+        self.grace_minutes = int(os.getenv('NO_SHOW_GRACE_MINUTES', '60'))
+        self.batch_size = int(os.getenv('NO_SHOW_BATCH_SIZE', '1000'))
+
+    def run(self, grace_minutes: Optional[int] = None, batch_size: Optional[int] = None,
+            dry_run: bool = False, doctor_id: Optional[str] = None,
+            date_from: Optional[date] = None, date_to: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Mark appointments whose slot ended more than grace_minutes ago
+
+        Each batch selects up to batch_size candidate IDs and flips them with
+        one UPDATE in its own transaction. The candidates are read with
+        FOR UPDATE, and the UPDATE re-checks the status, so an appointment
+        completed between the two statements is left alone and only the
+        rows actually flipped are counted. Candidates are paged by
+        (available_date, appointment_id), so a dry run counts all of them
+        and a real run never re-reads a row it left. doctor_id and
+        date_from / date_to narrow the sweep (e.g. to re-run one day).
+        """
+        grace_minutes = grace_minutes if grace_minutes is not None else self.grace_minutes
+        batch_size = batch_size or self.batch_size
+        cutoff = datetime.now() - timedelta(minutes=grace_minutes)
+
+        # Sargable prefilter on available_date; the exact end-time check
+        # only runs on rows from the cutoff date itself
+        scope, scope_params = "", []
+        if doctor_id:
+            scope += " AND ts.doctor_id = %s"
+            scope_params.append(doctor_id)
+        if date_from:
+            scope += " AND ts.available_date >= %s"
+            scope_params.append(date_from)
+        last_date = min(cutoff.date(), date_to) if date_to else cutoff.date()
+
+        candidates_query = """
+            SELECT a.appointment_id, ts.doctor_id, ts.branch_id, ts.available_date
+            FROM appointment a
+            JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+            LEFT JOIN consultation_record cr ON a.appointment_id = cr.appointment_id
+            WHERE a.status = 'Scheduled'
+            AND cr.consultation_rec_id IS NULL
+            AND ts.available_date <= %s
+            AND TIMESTAMP(ts.available_date, ts.end_time) < %s
+            {scope}
+            {after}
+            ORDER BY ts.available_date, a.appointment_id
+            LIMIT %s
+            {lock}
+        """
+        after_clause = "AND (ts.available_date > %s OR (ts.available_date = %s AND a.appointment_id > %s))"
+
+        total_marked = 0
+        batches = 0
+        by_branch: Dict[str, int] = {}
+        by_doctor: Dict[str, int] = {}
+        touched_days = set()
+        last = None
+
+        while True:
+            with get_db() as (cursor, connection):
+                # A real run locks its candidates, so none changes status (or
+                # gets a consultation record) before the UPDATE commits
+                lock = "" if dry_run else "FOR UPDATE OF a"
+                if last is None:
+                    cursor.execute(
+                        candidates_query.format(scope=scope, after="", lock=lock),
+                        (last_date, cutoff, *scope_params, batch_size)
+                    )
+                else:
+                    cursor.execute(
+                        candidates_query.format(scope=scope, after=after_clause, lock=lock),
+                        (last_date, cutoff, *scope_params, last[0], last[0], last[1], batch_size)
+                    )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+
+                updated = rows
+                if dry_run:
+                    marked = len(rows)
+                else:
+                    ids = [row['appointment_id'] for row in rows]
+                    placeholders = ", ".join(["%s"] * len(ids))
+                    cursor.execute(
+                        f"""UPDATE appointment
+                        SET status = 'No-Show'
+                        WHERE appointment_id IN ({placeholders})
+                        AND status = 'Scheduled'
+                        AND NOT EXISTS (
+                            SELECT 1 FROM consultation_record cr
+                            WHERE cr.appointment_id = appointment.appointment_id
+                        )""",
+                        ids
+                    )
+                    marked = cursor.rowcount
+                    if marked < len(rows):
+                        # Only the rows the guarded UPDATE changed count towards the result
+                        cursor.execute(
+                            f"""SELECT appointment_id FROM appointment
+                            WHERE appointment_id IN ({placeholders}) AND status = 'No-Show'""",
+                            ids
+                        )
+                        flipped = {row['appointment_id'] for row in cursor.fetchall()}
+                        updated = [row for row in rows if row['appointment_id'] in flipped]
+                    connection.commit()
+
+            batches += 1
+            total_marked += marked
+            for row in updated:
+                by_branch[row['branch_id']] = by_branch.get(row['branch_id'], 0) + 1
+                by_doctor[row['doctor_id']] = by_doctor.get(row['doctor_id'], 0) + 1
+                touched_days.add((row['doctor_id'], row['available_date']))
+
+            last = (rows[-1]['available_date'], rows[-1]['appointment_id'])
+            if len(rows) < batch_size:
+                break
+
+        if not dry_run:
+            for doctor_id in by_doctor:
+                doctor_stats_service.invalidate(doctor_id)
+            try:
+                doctor_daily_stats.refresh_keys(touched_days)
+            except Exception as e:
+                logger.warning(f"Doctor stats refresh after no-show sweep failed: {str(e)}")
+
+        logger.info(f"No-show sweep {'(dry run) ' if dry_run else ''}marked {total_marked} appointments in {batches} batches")
+        return {
+            "dry_run": dry_run,
+            "cutoff": cutoff.isoformat(timespec='seconds'),
+            "grace_minutes": grace_minutes,
+            "batches": batches,
+            "total_marked": total_marked,
+            "doctors_affected": len(by_doctor),
+            "by_branch": by_branch,
+            "by_doctor": by_doctor
+        }
+
+
+# Create singleton instance
+no_show_sweeper = NoShowSweeper()
@@ -0,0 +1,253 @@
+"""
+Patient Statistics Service for MedSync
+Keeps the global patient metrics (gender, blood group, branch and age
+counters, recent registrations) as an in-memory snapshot that is updated
+incrementally by the write paths and rebuilt nightly
+"""
+
+from core.database import get_db
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Optional, Dict, Any
+import threading
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+RECENT_DAYS = 30
+
+AGE_GROUP_SQL = """
+    CASE
+        WHEN TIMESTAMPDIFF(YEAR, u.DOB, CURDATE()) < 18 THEN 'Under 18'
+        WHEN TIMESTAMPDIFF(YEAR, u.DOB, CURDATE()) BETWEEN 18 AND 30 THEN '18-30'
+        WHEN TIMESTAMPDIFF(YEAR, u.DOB, CURDATE()) BETWEEN 31 AND 50 THEN '31-50'
+        WHEN TIMESTAMPDIFF(YEAR, u.DOB, CURDATE()) BETWEEN 51 AND 70 THEN '51-70'
+        ELSE 'Over 70'
+    END
+"""
+
+
+def age_group(dob: date, today: Optional[date] = None) -> str:
+    """Python twin of AGE_GROUP_SQL for incremental updates"""
+    today = today or date.today()
+    age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+    if age < 18:
+        return 'Under 18'
+    if age <= 30:
+        return '18-30'
+    if age <= 50:
+        return '31-50'
+    if age <= 70:
+        return '51-70'
+    return 'Over 70'
+
+
+class PatientStatisticsService:
+    """
+    In-memory patient metrics snapshot
+
+    A rebuild groups every patient once by (gender, blood group, branch,
+    age group) and folds the result into counters. Registrations and
+    allergy changes then adjust the counters in place, so reads never touch
+    the database. Ages drift as birthdays pass, so the nightly job rebuilds
+    the snapshot; each API worker keeps its own copy, and
+    PATIENT_STATS_MAX_AGE bounds how stale a copy can get before the next
+    read rebuilds it.
+    """
+
+    def __init__(self):
+        self.max_age_seconds = int(os.getenv('PATIENT_STATS_MAX_AGE', '3600'))
+        self._lock = threading.Lock()
+        self._built_monotonic: Optional[float] = None
+        self._stale = True
+        self.built_at: Optional[datetime] = None
+        self.updated_at: Optional[datetime] = None
+        self.total = 0
+        self.by_gender: Counter = Counter()
+        self.by_blood_group: Counter = Counter()
+        self.by_branch: Counter = Counter()
+        self.by_age_group: Counter = Counter()
+        self.registrations_by_day: Counter = Counter()
+        self.with_allergies = 0
+        self.with_active_appointments = 0
+
+    # ============================================
+    # FULL REBUILD
+    # ============================================
+
+    def rebuild(self) -> Dict[str, Any]:
+        """Recompute every counter from the database"""
+        started = time.perf_counter()
+        since = date.today() - timedelta(days=RECENT_DAYS)
+
+        with get_db() as (cursor, connection):
+            cursor.execute(f"""
+                SELECT
+                    u.gender,
+                    p.blood_group,
+                    b.branch_name,
+                    {AGE_GROUP_SQL} as age_group,
+                    COUNT(*) as count
+                FROM patient p
+                JOIN user u ON p.patient_id = u.user_id
+                LEFT JOIN branch b ON p.registered_branch_id = b.branch_id
+                GROUP BY u.gender, p.blood_group, b.branch_name, age_group
+            """)
+            groups = cursor.fetchall()
+
+            cursor.execute("""
+                SELECT DATE(created_at) as day, COUNT(*) as count
+                FROM patient
+                WHERE created_at >= %s
+                GROUP BY DATE(created_at)
+            """, (since,))
+            registrations = cursor.fetchall()
+
+            cursor.execute("SELECT COUNT(DISTINCT patient_id) as count FROM patient_allergy")
+            with_allergies = cursor.fetchone()['count']
+
+            cursor.execute("""
+                SELECT COUNT(DISTINCT patient_id) as count
+                FROM appointment
+                WHERE status IN ('Scheduled', 'Pending')
+            """)
+            with_active_appointments = cursor.fetchone()['count']
+
+        by_gender, by_blood_group, by_branch, by_age_group = Counter(), Counter(), Counter(), Counter()
+        total = 0
+        for row in groups:
+            count = int(row['count'])
+            total += count
+            by_gender[row['gender']] += count
+            by_blood_group[row['blood_group']] += count
+            if row['branch_name'] is not None:
+                by_branch[row['branch_name']] += count
+            by_age_group[row['age_group']] += count
+
+        with self._lock:
+            self.total = total
+            self.by_gender = by_gender
+            self.by_blood_group = by_blood_group
+            self.by_branch = by_branch
+            self.by_age_group = by_age_group
+            self.registrations_by_day = Counter({row['day']: int(row['count']) for row in registrations})
+            self.with_allergies = int(with_allergies)
+            self.with_active_appointments = int(with_active_appointments)
+            self.built_at = self.updated_at = datetime.now()
+            self._built_monotonic = time.monotonic()
+            self._stale = False
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(f"Patient statistics rebuilt: {total} patients in {elapsed_ms} ms")
+        return {"total_patients": total, "groups": len(groups), "elapsed_ms": elapsed_ms}
+
+    def mark_stale(self):
+        """Force a rebuild on the next read"""
+        with self._lock:
+            self._stale = True
+
+    def _needs_rebuild(self) -> bool:
+        return (
+            self._stale
+            or self._built_monotonic is None
+            or time.monotonic() - self._built_monotonic > self.max_age_seconds
+        )
+
+    # ============================================
+    # INCREMENTAL UPDATES (called after the write succeeded)
+    # ============================================
+
+    def record_registration(self, gender: str, dob: date, blood_group: str, branch_name: Optional[str]):
+        """Count a newly registered patient"""
+        with self._lock:
+            if self._built_monotonic is None:
+                return
+            today = date.today()
+            self.total += 1
+            self.by_gender[gender] += 1
+            self.by_blood_group[blood_group] += 1
+            if branch_name:
+                self.by_branch[branch_name] += 1
+            self.by_age_group[age_group(dob, today)] += 1
+            self.registrations_by_day[today] += 1
+            self.updated_at = datetime.now()
+
+    def record_allergy_change(self, cursor, patient_id: str, added: bool):
+        """
+        Adjust the patients-with-allergies counter after an allergy was added
+        or removed. Only a patient's first allergy (or the removal of their
+        last one) changes the count.
+        """
+        try:
+            cursor.execute(
+                "SELECT COUNT(*) as count FROM patient_allergy WHERE patient_id = %s",
+                (patient_id,)
+            )
+            remaining = cursor.fetchone()['count']
+        except Exception as e:
+            logger.warning(f"Could not update allergy statistics for patient {patient_id}: {str(e)}")
+            self.mark_stale()
+            return
+
+        with self._lock:
+            if self._built_monotonic is None:
+                return
+            if added and remaining == 1:
+                self.with_allergies += 1
+            elif not added and remaining == 0:
+                self.with_allergies = max(0, self.with_allergies - 1)
+            self.updated_at = datetime.now()
+
+    # ============================================
+    # READ
+    # ============================================
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Metrics in the /patients/metrics/statistics shape plus freshness"""
+        if self._needs_rebuild():
+            self.rebuild()
+
+        since = date.today() - timedelta(days=RECENT_DAYS)
+        with self._lock:
+            return {
+                "total_patients": self.total,
+                "by_gender": [
+                    {"gender": gender, "count": count}
+                    for gender, count in self.by_gender.items() if count
+                ],
+                "by_blood_group": [
+                    {"blood_group": blood_group, "count": count}
+                    for blood_group, count in self.by_blood_group.most_common() if count
+                ],
+                "by_branch": [
+                    {"branch_name": branch_name, "count": count}
+                    for branch_name, count in self.by_branch.items() if count
+                ],
+                "by_age_group": [
+                    {"age_group": group, "count": self.by_age_group[group]}
+                    for group in sorted(self.by_age_group) if self.by_age_group[group]
+                ],
+                "new_patients_last_30_days": sum(
+                    count for day, count in self.registrations_by_day.items() if day >= since
+                ),
+                "patients_with_active_appointments": self.with_active_appointments,
+                "patients_with_allergies": self.with_allergies,
+                "snapshot_built_at": self.built_at.isoformat(),
+                "snapshot_updated_at": self.updated_at.isoformat(),
+                "snapshot_age_seconds": round(time.monotonic() - self._built_monotonic, 1)
+            }
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "built_at": self.built_at.isoformat() if self.built_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "max_age_seconds": self.max_age_seconds,
+            "stale": self._needs_rebuild(),
+            "total_patients": self.total
+        }
+
+
+# Create singleton instance
+patient_statistics = PatientStatisticsService()
@@ -7,22 +7,354 @@ from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Image
+from reportlab.platypus import SimpleDocTemplate, Table, LongTable, TableStyle, Paragraph, Spacer, PageBreak, Image
+from reportlab.platypus.flowables import Flowable
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
 from reportlab.pdfgen import canvas
 from io import BytesIO
 from datetime import datetime
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
 
+class PagedTable(Flowable):
+    """
+    Data table laid out one page of rows at a time
+
+    A platypus Table re-splits its whole remainder at every page break,
+    so a table of n rows costs O(n^2) to lay out and keeps every formatted
+    cell alive until the end. PagedTable keeps the source rows instead: at
+    each page break it formats only the next window of rows into a
+    LongTable (header repeated), lets that split, and carries the rest
+    forward as a new PagedTable. Layout is linear in the row count, and a
+    report small enough for one window comes out as the same single table
+    as before.
+
+    style uses the coordinates of the equivalent single table (row 0 is the
+    header, then one row per source row, then the optional footer row).
+    format_row(index, row) returns the cells of 1-based source row index;
+    row_style(index, row) may return extra (command, column, *values)
+    entries for that row; runs of rows with the same entry become a single
+    style command.
+    """
+
+    min_window = int(os.getenv('REPORT_TABLE_WINDOW_ROWS', '64'))
+
+    def __init__(self, header, rows, format_row, col_widths, style, footer=None, row_style=None,
+                 start=0, window=None):
+        Flowable.__init__(self)
+        self.header = header
+        self.rows = rows
+        self.format_row = format_row
+        self.col_widths = col_widths
+        self.style = style
+        self.footer = footer
+        self.row_style = row_style
+        self.start = start
+        self.window = window or self.min_window
+        self._table = None
+        self._table_rows = 0
+
+    @property
+    def remaining(self) -> int:
+        return len(self.rows) - self.start
+
+    def _global_rows(self) -> int:
+        return 1 + len(self.rows) + (1 if self.footer is not None else 0)
+
+    def _localize(self, command, count: int, with_footer: bool):
+        """Map a full-table style command onto a window of count rows (empty if it misses it)"""
+        name, (c0, r0), (c1, r1), *values = command
+        total = self._global_rows()
+        r0 = r0 + total if r0 < 0 else r0
+        r1 = r1 + total if r1 < 0 else r1
+        first, last = self.start + 1, self.start + count       # global rows in this window
+        footer_row = len(self.rows) + 1
+
+        pieces = []
+        if r0 == 0:
+            pieces.append((0, 0, 0))
+        body_from, body_to = max(r0, first), min(r1, last)
+        if body_from <= body_to:
+            pieces.append((body_from - self.start, body_to - self.start, body_from - r0))
+        if with_footer and r0 <= footer_row <= r1:
+            pieces.append((count + 1, count + 1, footer_row - r0))
+        if not pieces:
+            return []
+
+        if name == 'ROWBACKGROUNDS':
+            # Alternation has to continue where the previous window left off
+            cycle = values[0]
+            return [
+                (name, (c0, lo), (c1, hi), [cycle[(phase + i) % len(cycle)] for i in range(len(cycle))])
+                for lo, hi, phase in pieces
+            ]
+        return [(name, (c0, pieces[0][0]), (c1, pieces[-1][1]), *values)]
+
+    def _window_table(self, count: int) -> LongTable:
+        with_footer = self.footer is not None and self.start + count >= len(self.rows)
+        table_data = [self.header]
+        commands = []
+        # Consecutive rows with the same row_style entry share one command
+        runs = {}   # (command, column, *values) -> [first, last] local row
+        for index in range(self.start + 1, self.start + count + 1):
+            row = self.rows[index - 1]
+            table_data.append(self.format_row(index, row))
+            if self.row_style is not None:
+                local = index - self.start
+                for entry in self.row_style(index, row):
+                    key = tuple(entry)
+                    run = runs.get(key)
+                    if run is not None and run[1] == local - 1:
+                        run[1] = local
+                        continue
+                    if run is not None:
+                        commands.append((key[0], (key[1], run[0]), (key[1], run[1]), *key[2:]))
+                    runs[key] = [local, local]
+        for (name, column, *values), (first, last) in runs.items():
+            commands.append((name, (column, first), (column, last), *values))
+        if with_footer:
+            table_data.append(self.footer)
+
+        style = []
+        for command in self.style:
+            style.extend(self._localize(command, count, with_footer))
+
+        table = LongTable(table_data, colWidths=self.col_widths, repeatRows=1)
+        table.setStyle(TableStyle(style + commands))
+        return table
+
+    def wrap(self, availWidth, availHeight):
+        # Frames may wrap the same flowable more than once: keep the table already built
+        count = self._table_rows if self._table is not None else min(self.window, self.remaining)
+        while True:
+            if self._table is None or count != self._table_rows:
+                self._table = self._window_table(count)
+                self._table_rows = count
+            width, height = self._table.wrap(availWidth, availHeight)
+            # Too tall for the frame (it gets split) or every row included (it gets drawn)
+            if height > availHeight or count >= self.remaining:
+                return width, height
+            count = min(count * 2, self.remaining)
+
+    def split(self, availWidth, availHeight):
+        # Normally called right after wrap() found the window too tall: reuse its table
+        count = self._table_rows if self._table is not None else min(self.window, self.remaining)
+        while True:
+            table = self._table if self._table is not None and count == self._table_rows else self._window_table(count)
+            parts = table.split(availWidth, availHeight)
+            if not parts:
+                return []
+            if parts[0] is not table or count >= self.remaining:
+                break
+            # The whole window fits in the space left: try a bigger one
+            count = min(count * 2, self.remaining)
+
+        if parts[0] is table:
+            return [table]
+
+        consumed = len(parts[0]._cellvalues) - 1    # minus the repeated header
+        rest = PagedTable(
+            self.header, self.rows, self.format_row, self.col_widths, self.style,
+            footer=self.footer, row_style=self.row_style,
+            # Next page holds about as many rows as this one
+            start=self.start + consumed, window=max(consumed + consumed // 4 + 1, 8)
+        )
+        return [parts[0], rest]
+
+    def draw(self):
+        self._table.drawOn(self.canv, 0, 0)
+
+
+# ============================================
+# REPORT TEMPLATES
+# ============================================
+# Everything about a report's layout that does not depend on its data is
+# built once at import (tables) or with the stylesheet (paragraphs): column
+# headers and widths, table style commands, summary table styles and the
+# parsed fixed texts. A render only formats its rows and fills in numbers.
+# Cells stay plain strings; only text with markup or wrapping is a Paragraph.
+
+ACCENT_COLOR = colors.HexColor('#7c3aed')
+MUTED_COLOR = colors.HexColor('#64748b')
+TEXT_COLOR = colors.HexColor('#1a2332')
+GRID_COLOR = colors.HexColor('#e2e8f0')
+TOTAL_COLOR = colors.HexColor('#10b981')
+
+
+def summary_style(background: str, label: str, grid: str) -> TableStyle:
+    """Style of a two-column label/value summary table"""
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor(background)),
+        ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor(label)),
+        ('TEXTCOLOR', (1, 0), (1, -1), TEXT_COLOR),
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('FONTNAME', (1, 0), (1, -1), 'Helvetica-Bold'),
+        ('PADDING', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor(grid))
+    ])
+
+
+class TableTemplate:
+    """
+    Header, column widths and style commands of one report's data table
+
+    Commands use the coordinates of the full table (row 0 is the header,
+    row -1 the total row when there is one), as PagedTable expects. Both
+    variants, with and without a total row, are built up front and shared
+    by every render, so they must not be modified.
+    """
+
+    def __init__(self, header, col_widths, header_color: str, stripe_color: str, aligns,
+                 total_color: colors.Color = TOTAL_COLOR):
+        self.header = header
+        self.col_widths = col_widths
+
+        head = [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(header_color)),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 11),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ]
+        cells = [('ALIGN', (first, 0), (last, -1), align) for first, last, align in aligns] + [
+            ('GRID', (0, 0), (-1, -1), 1, GRID_COLOR),
+            ('PADDING', (0, 0), (-1, -1), 8),
+        ]
+        total = [
+            ('BACKGROUND', (0, -1), (-1, -1), total_color),
+            ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, -1), (-1, -1), 11),
+        ]
+        stripe = colors.HexColor(stripe_color)
+        self._with_total = head + self._body(-2, stripe) + cells + total
+        self._without_total = head + self._body(-1, stripe) + cells
+
+    @staticmethod
+    def _body(last_row: int, stripe: colors.Color):
+        return [
+            ('BACKGROUND', (0, 1), (-1, last_row), colors.white),
+            ('TEXTCOLOR', (0, 1), (-1, last_row), TEXT_COLOR),
+            ('FONTNAME', (0, 1), (-1, last_row), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, last_row), 9),
+            ('ROWBACKGROUNDS', (0, 1), (-1, last_row), [colors.white, stripe]),
+        ]
+
+    def style(self, with_total: bool):
+        return self._with_total if with_total else self._without_total
+
+
+class FixedText:
+    """
+    Paragraph text that is the same in every document
+
+    The markup is parsed once; each document gets its own Paragraph built
+    from the parsed fragments (flowables keep layout state, so they are
+    not shared between documents).
+    """
+
+    def __init__(self, text: str, style: ParagraphStyle):
+        self.style = style
+        self._parsed = Paragraph(text, style)
+
+    def flowable(self) -> Paragraph:
+        return Paragraph(self._parsed.text, self.style, frags=self._parsed.frags)
+
+
+BRANCH_APPOINTMENTS_TABLE = TableTemplate(
+    ['Branch Name', 'Date', 'Status', 'Count'], [2*inch, 1.5*inch, 1.5*inch, 1*inch],
+    '#7c3aed', '#f8fafc', [(3, 3, 'CENTER'), (2, 2, 'CENTER')]
+)
+DOCTOR_REVENUE_TABLE = TableTemplate(
+    ['Month', 'Revenue (LKR)', '% of Total'], [2.5*inch, 2*inch, 1.5*inch],
+    '#0ea5e9', '#f0f9ff', [(1, -1, 'RIGHT')]
+)
+OUTSTANDING_BALANCES_TABLE = TableTemplate(
+    ['#', 'Patient Name', 'Outstanding Balance (LKR)', 'Status'], [0.5*inch, 2.5*inch, 2*inch, 1.5*inch],
+    '#f59e0b', '#fef3c7', [(0, 0, 'CENTER'), (2, 2, 'RIGHT'), (3, 3, 'CENTER')],
+    total_color=colors.HexColor('#ef4444')
+)
+TREATMENTS_TABLE = TableTemplate(
+    ['#', 'Treatment Category', 'Count', 'Revenue (LKR)', '% of Total'],
+    [0.5*inch, 2.5*inch, 1*inch, 1.5*inch, 1*inch],
+    '#8b5cf6', '#ede9fe', [(0, 0, 'CENTER'), (2, 2, 'CENTER'), (3, 3, 'RIGHT'), (4, 4, 'CENTER')],
+    total_color=ACCENT_COLOR
+)
+
+SUMMARY_COL_WIDTHS = [2.5*inch, 3*inch]
+BRANCH_APPOINTMENTS_SUMMARY = summary_style('#f8fafc', '#475569', '#e2e8f0')
+DOCTOR_REVENUE_SUMMARY = summary_style('#f0f9ff', '#475569', '#0ea5e9')
+OUTSTANDING_BALANCES_SUMMARY = summary_style('#fef3c7', '#92400e', '#f59e0b')
+TREATMENTS_SUMMARY = summary_style('#ede9fe', '#6b21a8', '#a855f7')
+INSURANCE_SUMMARY = summary_style('#dbeafe', '#1e40af', '#3b82f6')
+
+# Outstanding balance status cells (row_style entries)
+BALANCE_HIGH_STYLE = [('TEXTCOLOR', 3, colors.HexColor('#ef4444')), ('FONTNAME', 3, 'Helvetica-Bold')]
+BALANCE_MEDIUM_STYLE = [('TEXTCOLOR', 3, colors.HexColor('#f59e0b')), ('FONTNAME', 3, 'Helvetica-Bold')]
+BALANCE_LOW_STYLE = [('TEXTCOLOR', 3, colors.HexColor('#10b981'))]
+
+INSURANCE_COMPARISON_COL_WIDTHS = [2*inch, 1.5*inch, 1.5*inch, 1.5*inch]
+_INSURANCE_COMPARISON_COMMANDS = [
+    # Header row
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 11),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+
+    # Insurance row
+    ('BACKGROUND', (0, 1), (-1, 1), colors.HexColor('#dbeafe')),
+    ('TEXTCOLOR', (0, 1), (-1, 1), colors.HexColor('#1e40af')),
+    ('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 1), (-1, 1), 10),
+
+    # Out-of-pocket row
+    ('BACKGROUND', (0, 2), (-1, 2), colors.HexColor('#fef3c7')),
+    ('TEXTCOLOR', (0, 2), (-1, 2), colors.HexColor('#92400e')),
+    ('FONTNAME', (0, 2), (-1, 2), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 2), (-1, 2), 10),
+
+    # All cells
+    ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+    ('ALIGN', (2, 0), (2, -1), 'CENTER'),
+    ('GRID', (0, 0), (-1, -1), 1, GRID_COLOR),
+    ('PADDING', (0, 0), (-1, -1), 10),
+]
+INSURANCE_COMPARISON_STYLE = TableStyle(_INSURANCE_COMPARISON_COMMANDS)
+INSURANCE_COMPARISON_TOTAL_STYLE = TableStyle(_INSURANCE_COMPARISON_COMMANDS + [
+    ('BACKGROUND', (0, 3), (-1, 3), TOTAL_COLOR),
+    ('TEXTCOLOR', (0, 3), (-1, 3), colors.white),
+    ('FONTNAME', (0, 3), (-1, 3), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 3), (-1, 3), 11),
+])
+
+INSURANCE_DETAILS_HEADER = ['Payment Method', 'Patient Count', 'Avg Payment', 'Total Amount']
+INSURANCE_DETAILS_STYLE = [
+    ('BACKGROUND', (0, 0), (-1, 0), MUTED_COLOR),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8fafc')]),
+    ('TEXTCOLOR', (0, 1), (-1, -1), TEXT_COLOR),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+    ('GRID', (0, 0), (-1, -1), 1, GRID_COLOR),
+    ('PADDING', (0, 0), (-1, -1), 8),
+]
+
+
 class PDFGenerator:
     """Professional PDF Generator for medical reports"""
     
     def __init__(self):
         self.styles = getSampleStyleSheet()
         self._setup_custom_styles()
+        self._setup_fixed_texts()
     
     def _setup_custom_styles(self):
         """Setup custom paragraph styles"""
@@ -31,7 +363,7 @@ class PDFGenerator:
             name='CustomTitle',
             parent=self.styles['Heading1'],
             fontSize=24,
-            textColor=colors.HexColor('#7c3aed'),
+            textColor=ACCENT_COLOR,
             spaceAfter=30,
             alignment=TA_CENTER,
             fontName='Helvetica-Bold'
@@ -42,7 +374,7 @@ class PDFGenerator:
             name='CustomSubtitle',
             parent=self.styles['Normal'],
             fontSize=12,
-            textColor=colors.HexColor('#64748b'),
+            textColor=MUTED_COLOR,
             spaceAfter=20,
             alignment=TA_CENTER,
             fontName='Helvetica'
@@ -53,7 +385,7 @@ class PDFGenerator:
             name='SectionHeader',
             parent=self.styles['Heading2'],
             fontSize=16,
-            textColor=colors.HexColor('#1a2332'),
+            textColor=TEXT_COLOR,
             spaceAfter=12,
             spaceBefore=20,
             fontName='Helvetica-Bold'
@@ -69,24 +401,58 @@ class PDFGenerator:
             fontName='Helvetica'
         ))
     
+    def _setup_fixed_texts(self):
+        """Parse the titles, section headers and notes that never change"""
+        title, section, info = self.styles['CustomTitle'], self.styles['SectionHeader'], self.styles['InfoText']
+        self.texts = {
+            'branch_title': FixedText("Branch-wise Appointment Summary", title),
+            'branch_section': FixedText("Appointment Details by Branch", section),
+            'revenue_title': FixedText("Doctor-wise Revenue Report", title),
+            'revenue_section': FixedText("Revenue Details by Doctor", section),
+            'balances_title': FixedText("Patients with Outstanding Balances", title),
+            'balances_warning': FixedText(
+                "<b>⚠️ Action Required:</b> The following patients have outstanding balances that require follow-up.",
+                info
+            ),
+            'balances_section': FixedText("Outstanding Balance Details", section),
+            'balances_note': FixedText(
+                "<b>Note:</b> Status levels - High: >10,000 LKR | Medium: 5,000-10,000 LKR | Low: <5,000 LKR",
+                info
+            ),
+            'treatments_title': FixedText("Treatment Analysis by Category", title),
+            'treatments_section': FixedText("Treatment Breakdown by Category", section),
+            'insurance_title': FixedText("Insurance Coverage vs Out-of-Pocket Analysis", title),
+            'insurance_section': FixedText("Payment Method Comparison", section),
+            'insurance_details_section': FixedText("Detailed Payment Breakdown", section),
+        }
+    
+    def _fixed(self, name: str) -> Paragraph:
+        return self.texts[name].flowable()
+    
+    def _new_document(self, buffer) -> SimpleDocTemplate:
+        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=60, bottomMargin=60)
+        # One timestamp for the whole document, drawn on every page
+        doc.generated_label = f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        return doc
+    
     def _add_header_footer(self, canvas, doc):
         """Add header and footer to each page"""
         canvas.saveState()
         
         # Header
         canvas.setFont('Helvetica-Bold', 10)
-        canvas.setFillColor(colors.HexColor('#7c3aed'))
+        canvas.setFillColor(ACCENT_COLOR)
         canvas.drawString(50, A4[1] - 40, "MedSync Clinic Management System")
         
         # Footer
         canvas.setFont('Helvetica', 8)
-        canvas.setFillColor(colors.HexColor('#64748b'))
-        canvas.drawString(50, 30, f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        canvas.setFillColor(MUTED_COLOR)
+        canvas.drawString(50, 30, doc.generated_label)
         canvas.drawRightString(A4[0] - 50, 30, f"Page {doc.page}")
         
         canvas.restoreState()
     
-    def generate_branch_appointment_summary(self, data, date_from=None, date_to=None):
+    def generate_branch_appointment_summary(self, data, date_from=None, date_to=None, output=None):
         """
         Generate Branch-wise Appointment Summary PDF
         
@@ -94,18 +460,18 @@ class PDFGenerator:
             data: List of records from branch_appointment_daily_summary view
             date_from: Optional start date filter
             date_to: Optional end date filter
+            output: Optional binary file to write to instead of a new BytesIO
         
         Returns:
-            BytesIO: PDF file buffer
+            BytesIO: PDF file buffer (or output)
         """
         try:
-            buffer = BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=60, bottomMargin=60)
+            buffer = output if output is not None else BytesIO()
+            doc = self._new_document(buffer)
             elements = []
             
             # Title
-            title = Paragraph("Branch-wise Appointment Summary", self.styles['CustomTitle'])
-            elements.append(title)
+            elements.append(self._fixed('branch_title'))
             
             # Date range subtitle
             if date_from and date_to:
@@ -131,86 +497,33 @@ class PDFGenerator:
                 ['Report Date:', datetime.now().strftime('%Y-%m-%d %H:%M')]
             ]
             
-            summary_table = Table(summary_data, colWidths=[2.5*inch, 3*inch])
-            summary_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f8fafc')),
-                ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#475569')),
-                ('TEXTCOLOR', (1, 0), (1, -1), colors.HexColor('#1a2332')),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('FONTNAME', (1, 0), (1, -1), 'Helvetica-Bold'),
-                ('PADDING', (0, 0), (-1, -1), 8),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0'))
-            ]))
+            summary_table = Table(summary_data, colWidths=SUMMARY_COL_WIDTHS)
+            summary_table.setStyle(BRANCH_APPOINTMENTS_SUMMARY)
             elements.append(summary_table)
             elements.append(Spacer(1, 30))
             
             # Data table
-            section_header = Paragraph("Appointment Details by Branch", self.styles['SectionHeader'])
-            elements.append(section_header)
+            elements.append(self._fixed('branch_section'))
             elements.append(Spacer(1, 10))
             
-            # Table headers
-            table_data = [['Branch Name', 'Date', 'Status', 'Count']]
-            
-            # Group data by branch
-            branch_totals = {}
-            for row in data:
-                branch = row['branch_name']
-                date = row['available_date'].strftime('%Y-%m-%d') if hasattr(row['available_date'], 'strftime') else str(row['available_date'])
-                status = row['status']
-                count = str(row['appointment_count'])
-                
-                table_data.append([branch, date, status, count])
-                
-                # Calculate branch totals
-                if branch not in branch_totals:
-                    branch_totals[branch] = 0
-                branch_totals[branch] += int(row['appointment_count'])
+            # Table rows (formatted page by page by PagedTable)
+            def format_row(idx, row):
+                available_date = row['available_date']
+                return [
+                    row['branch_name'],
+                    available_date.strftime('%Y-%m-%d') if hasattr(available_date, 'strftime') else str(available_date),
+                    row['status'],
+                    str(row['appointment_count'])
+                ]
             
             # Add totals row only if there's data
-            if len(data) > 0:
-                table_data.append(['', '', 'TOTAL', str(total_appointments)])
-            
-            # Create table
-            col_widths = [2*inch, 1.5*inch, 1.5*inch, 1*inch]
-            table = Table(table_data, colWidths=col_widths, repeatRows=1)
-            
-            # Table styling
-            style_list = [
-                # Header row
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#7c3aed')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 11),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                
-                # Data rows
-                ('BACKGROUND', (0, 1), (-1, -2 if len(data) > 0 else -1), colors.white),
-                ('TEXTCOLOR', (0, 1), (-1, -2 if len(data) > 0 else -1), colors.HexColor('#1a2332')),
-                ('FONTNAME', (0, 1), (-1, -2 if len(data) > 0 else -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -2 if len(data) > 0 else -1), 9),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -2 if len(data) > 0 else -1), [colors.white, colors.HexColor('#f8fafc')]),
-                
-                # All cells
-                ('ALIGN', (3, 0), (3, -1), 'CENTER'),
-                ('ALIGN', (2, 0), (2, -1), 'CENTER'),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
-                ('PADDING', (0, 0), (-1, -1), 8),
-            ]
-            
-            # Add total row styling only if there's data
-            if len(data) > 0:
-                style_list.extend([
-                    ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#10b981')),
-                    ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
-                    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, -1), (-1, -1), 11),
-                ])
-            
-            table.setStyle(TableStyle(style_list))
+            total_row = ['', '', 'TOTAL', str(total_appointments)] if len(data) > 0 else None
             
-            elements.append(table)
+            template = BRANCH_APPOINTMENTS_TABLE
+            elements.append(PagedTable(
+                template.header, data, format_row, template.col_widths, template.style(total_row is not None),
+                footer=total_row
+            ))
             
             # Build PDF
             doc.build(elements, onFirstPage=self._add_header_footer, onLaterPages=self._add_header_footer)
@@ -222,7 +535,7 @@ class PDFGenerator:
             logger.error(f"Error generating branch appointment summary PDF: {str(e)}")
             raise
     
-    def generate_doctor_revenue_report(self, data, year=None, month=None):
+    def generate_doctor_revenue_report(self, data, year=None, month=None, output=None):
         """
         Generate Doctor-wise Revenue Report PDF
         
@@ -230,13 +543,14 @@ class PDFGenerator:
             data: List of records from doctor_monthly_revenue view
             year: Optional year filter
             month: Optional month filter
+            output: Optional binary file to write to instead of a new BytesIO
         
         Returns:
-            BytesIO: PDF file buffer
+            BytesIO: PDF file buffer (or output)
         """
         try:
-            buffer = BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=60, bottomMargin=60)
+            buffer = output if output is not None else BytesIO()
+            doc = self._new_document(buffer)
             elements = []
             
             # Get doctor name if single doctor data
@@ -247,7 +561,7 @@ class PDFGenerator:
             if doctor_name_display:
                 title = Paragraph(f"Revenue Report - {doctor_name_display}", self.styles['CustomTitle'])
             else:
-                title = Paragraph("Doctor-wise Revenue Report", self.styles['CustomTitle'])
+                title = self._fixed('revenue_title')
             elements.append(title)
             
             # Subtitle
@@ -281,82 +595,33 @@ class PDFGenerator:
                 ['Report Generated:', datetime.now().strftime('%Y-%m-%d %H:%M')]
             ]
             
-            summary_table = Table(summary_data, colWidths=[2.5*inch, 3*inch])
-            summary_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f0f9ff')),
-                ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#475569')),
-                ('TEXTCOLOR', (1, 0), (1, -1), colors.HexColor('#1a2332')),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('FONTNAME', (1, 0), (1, -1), 'Helvetica-Bold'),
-                ('PADDING', (0, 0), (-1, -1), 8),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#0ea5e9'))
-            ]))
+            summary_table = Table(summary_data, colWidths=SUMMARY_COL_WIDTHS)
+            summary_table.setStyle(DOCTOR_REVENUE_SUMMARY)
             elements.append(summary_table)
             elements.append(Spacer(1, 30))
             
             # Data table
-            section_header = Paragraph("Revenue Details by Doctor", self.styles['SectionHeader'])
-            elements.append(section_header)
+            elements.append(self._fixed('revenue_section'))
             elements.append(Spacer(1, 10))
             
-            # Table headers
-            table_data = [['Month', 'Revenue (LKR)', '% of Total']]
-            
-            # Add data rows
-            for row in data:
-                month = row['month'] if row['month'] else 'N/A'
+            # Table rows (formatted page by page by PagedTable)
+            def format_row(idx, row):
                 revenue = float(row['revenue'])
                 percentage = (revenue / total_revenue * 100) if total_revenue > 0 else 0
-                
-                table_data.append([
-                    month,
+                return [
+                    row['month'] if row['month'] else 'N/A',
                     f"{revenue:,.2f}",
                     f"{percentage:.1f}%"
-                ])
+                ]
             
             # Add total row only if there's data
-            if len(data) > 0:
-                table_data.append(['TOTAL', f"{total_revenue:,.2f}", '100%'])
-            
-            # Create table
-            col_widths = [2.5*inch, 2*inch, 1.5*inch]
-            table = Table(table_data, colWidths=col_widths, repeatRows=1)
-            
-            # Table styling
-            style_list = [
-                # Header row
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0ea5e9')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 11),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                
-                # Data rows (only if we have data rows before total)
-                ('BACKGROUND', (0, 1), (-1, -2 if len(data) > 0 else -1), colors.white),
-                ('TEXTCOLOR', (0, 1), (-1, -2 if len(data) > 0 else -1), colors.HexColor('#1a2332')),
-                ('FONTNAME', (0, 1), (-1, -2 if len(data) > 0 else -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -2 if len(data) > 0 else -1), 9),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -2 if len(data) > 0 else -1), [colors.white, colors.HexColor('#f0f9ff')]),
-                
-                # All cells alignment
-                ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
-                ('PADDING', (0, 0), (-1, -1), 8),
-            ]
-            
-            # Add total row styling only if there's data
-            if len(data) > 0:
-                style_list.extend([
-                    ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#10b981')),
-                    ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
-                    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, -1), (-1, -1), 11),
-                ])
-            
-            table.setStyle(TableStyle(style_list))
+            total_row = ['TOTAL', f"{total_revenue:,.2f}", '100%'] if len(data) > 0 else None
             
-            elements.append(table)
+            template = DOCTOR_REVENUE_TABLE
+            elements.append(PagedTable(
+                template.header, data, format_row, template.col_widths, template.style(total_row is not None),
+                footer=total_row
+            ))
             
             # Build PDF
             doc.build(elements, onFirstPage=self._add_header_footer, onLaterPages=self._add_header_footer)
@@ -368,24 +633,24 @@ class PDFGenerator:
             logger.error(f"Error generating doctor revenue PDF: {str(e)}")
             raise
     
-    def generate_outstanding_balance_report(self, data):
+    def generate_outstanding_balance_report(self, data, output=None):
         """
         Generate Outstanding Patient Balances Report PDF
         
         Args:
             data: List of records from patients_outstanding_balances view
+            output: Optional binary file to write to instead of a new BytesIO
         
         Returns:
-            BytesIO: PDF file buffer
+            BytesIO: PDF file buffer (or output)
         """
         try:
-            buffer = BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=60, bottomMargin=60)
+            buffer = output if output is not None else BytesIO()
+            doc = self._new_document(buffer)
             elements = []
             
             # Title
-            title = Paragraph("Patients with Outstanding Balances", self.styles['CustomTitle'])
-            elements.append(title)
+            elements.append(self._fixed('balances_title'))
             
             # Subtitle
             subtitle = Paragraph(
@@ -407,42 +672,24 @@ class PDFGenerator:
                 ['Report Date:', datetime.now().strftime('%Y-%m-%d %H:%M')]
             ]
             
-            summary_table = Table(summary_data, colWidths=[2.5*inch, 3*inch])
-            summary_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#fef3c7')),
-                ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#92400e')),
-                ('TEXTCOLOR', (1, 0), (1, -1), colors.HexColor('#1a2332')),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('FONTNAME', (1, 0), (1, -1), 'Helvetica-Bold'),
-                ('PADDING', (0, 0), (-1, -1), 8),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#f59e0b'))
-            ]))
+            summary_table = Table(summary_data, colWidths=SUMMARY_COL_WIDTHS)
+            summary_table.setStyle(OUTSTANDING_BALANCES_SUMMARY)
             elements.append(summary_table)
             elements.append(Spacer(1, 30))
             
             # Warning message
-            warning = Paragraph(
-                "<b>⚠️ Action Required:</b> The following patients have outstanding balances that require follow-up.",
-                self.styles['InfoText']
-            )
-            elements.append(warning)
+            elements.append(self._fixed('balances_warning'))
             elements.append(Spacer(1, 15))
             
             # Data table
-            section_header = Paragraph("Outstanding Balance Details", self.styles['SectionHeader'])
-            elements.append(section_header)
+            elements.append(self._fixed('balances_section'))
             elements.append(Spacer(1, 10))
             
-            # Table headers
-            table_data = [['#', 'Patient Name', 'Outstanding Balance (LKR)', 'Status']]
-            
-            # Add data rows
-            for idx, row in enumerate(data, 1):
-                patient_name = row.get('patient_name', 'Unknown')
+            # Table rows (formatted page by page by PagedTable)
+            def format_row(idx, row):
                 balance = float(row['patient_balance'])
                 
-                # Determine status color based on balance
+                # Determine status based on balance
                 if balance > 10000:
                     status = 'High'
                 elif balance > 5000:
@@ -450,76 +697,34 @@ class PDFGenerator:
                 else:
                     status = 'Low'
                 
-                table_data.append([
+                return [
                     str(idx),
-                    patient_name,
+                    row.get('patient_name', 'Unknown'),
                     f"{balance:,.2f}",
                     status
-                ])
-            
-            # Add total row only if there's data
-            if len(data) > 0:
-                table_data.append(['', 'TOTAL', f"{total_outstanding:,.2f}", ''])
-            
-            # Create table
-            col_widths = [0.5*inch, 2.5*inch, 2*inch, 1.5*inch]
-            table = Table(table_data, colWidths=col_widths, repeatRows=1)
-            
-            # Table styling
-            table_style = [
-                # Header row
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f59e0b')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 11),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                
-                # Data rows
-                ('BACKGROUND', (0, 1), (-1, -2 if len(data) > 0 else -1), colors.white),
-                ('TEXTCOLOR', (0, 1), (-1, -2 if len(data) > 0 else -1), colors.HexColor('#1a2332')),
-                ('FONTNAME', (0, 1), (-1, -2 if len(data) > 0 else -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -2 if len(data) > 0 else -1), 9),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -2 if len(data) > 0 else -1), [colors.white, colors.HexColor('#fef3c7')]),
-                
-                # All cells
-                ('ALIGN', (0, 0), (0, -1), 'CENTER'),
-                ('ALIGN', (2, 0), (2, -1), 'RIGHT'),
-                ('ALIGN', (3, 0), (3, -1), 'CENTER'),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
-                ('PADDING', (0, 0), (-1, -1), 8),
-            ]
-            
-            # Add total row styling only if there's data
-            if len(data) > 0:
-                table_style.extend([
-                    ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#ef4444')),
-                    ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
-                    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, -1), (-1, -1), 11),
-                ])
+                ]
             
-            # Add color coding for status
-            for idx, row in enumerate(data, 1):
+            # Color coding for status
+            def row_style(idx, row):
                 balance = float(row['patient_balance'])
                 if balance > 10000:
-                    table_style.append(('TEXTCOLOR', (3, idx), (3, idx), colors.HexColor('#ef4444')))
-                    table_style.append(('FONTNAME', (3, idx), (3, idx), 'Helvetica-Bold'))
+                    return BALANCE_HIGH_STYLE
                 elif balance > 5000:
-                    table_style.append(('TEXTCOLOR', (3, idx), (3, idx), colors.HexColor('#f59e0b')))
-                    table_style.append(('FONTNAME', (3, idx), (3, idx), 'Helvetica-Bold'))
-                else:
-                    table_style.append(('TEXTCOLOR', (3, idx), (3, idx), colors.HexColor('#10b981')))
+                    return BALANCE_MEDIUM_STYLE
+                return BALANCE_LOW_STYLE
+            
+            # Add total row only if there's data
+            total_row = ['', 'TOTAL', f"{total_outstanding:,.2f}", ''] if len(data) > 0 else None
             
-            table.setStyle(TableStyle(table_style))
-            elements.append(table)
+            template = OUTSTANDING_BALANCES_TABLE
+            elements.append(PagedTable(
+                template.header, data, format_row, template.col_widths, template.style(total_row is not None),
+                footer=total_row, row_style=row_style
+            ))
             
             # Add footer note
             elements.append(Spacer(1, 20))
-            footer_note = Paragraph(
-                "<b>Note:</b> Status levels - High: >10,000 LKR | Medium: 5,000-10,000 LKR | Low: <5,000 LKR",
-                self.styles['InfoText']
-            )
-            elements.append(footer_note)
+            elements.append(self._fixed('balances_note'))
             
             # Build PDF
             doc.build(elements, onFirstPage=self._add_header_footer, onLaterPages=self._add_header_footer)
@@ -531,7 +736,7 @@ class PDFGenerator:
             logger.error(f"Error generating outstanding balance PDF: {str(e)}")
             raise
     
-    def generate_treatments_by_category_report(self, data, date_from=None, date_to=None):
+    def generate_treatments_by_category_report(self, data, date_from=None, date_to=None, output=None):
         """
         Generate Treatments by Category Report PDF
         
@@ -539,18 +744,18 @@ class PDFGenerator:
             data: List of treatment records grouped by category
             date_from: Optional start date filter
             date_to: Optional end date filter
+            output: Optional binary file to write to instead of a new BytesIO
         
         Returns:
-            BytesIO: PDF file buffer
+            BytesIO: PDF file buffer (or output)
         """
         try:
-            buffer = BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=60, bottomMargin=60)
+            buffer = output if output is not None else BytesIO()
+            doc = self._new_document(buffer)
             elements = []
             
             # Title
-            title = Paragraph("Treatment Analysis by Category", self.styles['CustomTitle'])
-            elements.append(title)
+            elements.append(self._fixed('treatments_title'))
             
             # Subtitle with date range
             if date_from and date_to:
@@ -580,88 +785,36 @@ class PDFGenerator:
                 ['Report Generated:', datetime.now().strftime('%Y-%m-%d %H:%M')]
             ]
             
-            summary_table = Table(summary_data, colWidths=[2.5*inch, 3*inch])
-            summary_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#ede9fe')),
-                ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#6b21a8')),
-                ('TEXTCOLOR', (1, 0), (1, -1), colors.HexColor('#1a2332')),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('FONTNAME', (1, 0), (1, -1), 'Helvetica-Bold'),
-                ('PADDING', (0, 0), (-1, -1), 8),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#a855f7'))
-            ]))
+            summary_table = Table(summary_data, colWidths=SUMMARY_COL_WIDTHS)
+            summary_table.setStyle(TREATMENTS_SUMMARY)
             elements.append(summary_table)
             elements.append(Spacer(1, 30))
             
             # Data table
-            section_header = Paragraph("Treatment Breakdown by Category", self.styles['SectionHeader'])
-            elements.append(section_header)
+            elements.append(self._fixed('treatments_section'))
             elements.append(Spacer(1, 10))
             
-            # Table headers
-            table_data = [['#', 'Treatment Category', 'Count', 'Revenue (LKR)', '% of Total']]
-            
-            # Add data rows
-            for idx, row in enumerate(data, 1):
-                category_name = row['treatment_name']
+            # Table rows (formatted page by page by PagedTable)
+            def format_row(idx, row):
                 count = int(row['treatment_count'])
                 revenue = float(row['total_revenue'])
                 percentage = (count / total_treatments * 100) if total_treatments > 0 else 0
-                
-                table_data.append([
+                return [
                     str(idx),
-                    category_name,
+                    row['treatment_name'],
                     str(count),
                     f"{revenue:,.2f}",
                     f"{percentage:.1f}%"
-                ])
+                ]
             
             # Add total row only if there's data
-            if len(data) > 0:
-                table_data.append(['', 'TOTAL', str(total_treatments), f"{total_revenue:,.2f}", '100%'])
-            
-            # Create table
-            col_widths = [0.5*inch, 2.5*inch, 1*inch, 1.5*inch, 1*inch]
-            table = Table(table_data, colWidths=col_widths, repeatRows=1)
-            
-            # Table styling with gradient effect
-            style_list = [
-                # Header row
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#8b5cf6')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 11),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                
-                # Data rows
-                ('BACKGROUND', (0, 1), (-1, -2 if len(data) > 0 else -1), colors.white),
-                ('TEXTCOLOR', (0, 1), (-1, -2 if len(data) > 0 else -1), colors.HexColor('#1a2332')),
-                ('FONTNAME', (0, 1), (-1, -2 if len(data) > 0 else -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -2 if len(data) > 0 else -1), 9),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -2 if len(data) > 0 else -1), [colors.white, colors.HexColor('#ede9fe')]),
-                
-                # All cells
-                ('ALIGN', (0, 0), (0, -1), 'CENTER'),
-                ('ALIGN', (2, 0), (2, -1), 'CENTER'),
-                ('ALIGN', (3, 0), (3, -1), 'RIGHT'),
-                ('ALIGN', (4, 0), (4, -1), 'CENTER'),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
-                ('PADDING', (0, 0), (-1, -1), 8),
-            ]
-            
-            # Add total row styling only if there's data
-            if len(data) > 0:
-                style_list.extend([
-                    ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#7c3aed')),
-                    ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
-                    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, -1), (-1, -1), 11),
-                ])
+            total_row = ['', 'TOTAL', str(total_treatments), f"{total_revenue:,.2f}", '100%'] if len(data) > 0 else None
             
-            table.setStyle(TableStyle(style_list))
-            
-            elements.append(table)
+            template = TREATMENTS_TABLE
+            elements.append(PagedTable(
+                template.header, data, format_row, template.col_widths, template.style(total_row is not None),
+                footer=total_row
+            ))
             
             # Add insights section
             elements.append(Spacer(1, 20))
@@ -683,7 +836,7 @@ class PDFGenerator:
             logger.error(f"Error generating treatments by category PDF: {str(e)}")
             raise
     
-    def generate_insurance_vs_outofpocket_report(self, data, date_from=None, date_to=None):
+    def generate_insurance_vs_outofpocket_report(self, data, date_from=None, date_to=None, output=None):
         """
         Generate Insurance Coverage vs Out-of-Pocket Payments Report PDF
         
@@ -691,18 +844,18 @@ class PDFGenerator:
             data: Dictionary with insurance and out-of-pocket payment data
             date_from: Optional start date filter
             date_to: Optional end date filter
+            output: Optional binary file to write to instead of a new BytesIO
         
         Returns:
-            BytesIO: PDF file buffer
+            BytesIO: PDF file buffer (or output)
         """
         try:
-            buffer = BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=60, bottomMargin=60)
+            buffer = output if output is not None else BytesIO()
+            doc = self._new_document(buffer)
             elements = []
             
             # Title
-            title = Paragraph("Insurance Coverage vs Out-of-Pocket Analysis", self.styles['CustomTitle'])
-            elements.append(title)
+            elements.append(self._fixed('insurance_title'))
             
             # Subtitle
             if date_from and date_to:
@@ -735,23 +888,13 @@ class PDFGenerator:
                 ['Report Generated:', datetime.now().strftime('%Y-%m-%d %H:%M')]
             ]
             
-            summary_table = Table(summary_data, colWidths=[2.5*inch, 3*inch])
-            summary_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#dbeafe')),
-                ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#1e40af')),
-                ('TEXTCOLOR', (1, 0), (1, -1), colors.HexColor('#1a2332')),
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('FONTNAME', (1, 0), (1, -1), 'Helvetica-Bold'),
-                ('PADDING', (0, 0), (-1, -1), 8),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#3b82f6'))
-            ]))
+            summary_table = Table(summary_data, colWidths=SUMMARY_COL_WIDTHS)
+            summary_table.setStyle(INSURANCE_SUMMARY)
             elements.append(summary_table)
             elements.append(Spacer(1, 30))
             
             # Visual comparison section
-            section_header = Paragraph("Payment Method Comparison", self.styles['SectionHeader'])
-            elements.append(section_header)
+            elements.append(self._fixed('insurance_section'))
             elements.append(Spacer(1, 10))
             
             # Comparison table
@@ -780,79 +923,28 @@ class PDFGenerator:
                     str(data.get('insurance_count', 0) + data.get('out_of_pocket_count', 0))
                 ])
             
-            comparison_table = Table(comparison_data, colWidths=[2*inch, 1.5*inch, 1.5*inch, 1.5*inch])
-            
-            style_list = [
-                # Header row
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 11),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                
-                # Insurance row
-                ('BACKGROUND', (0, 1), (-1, 1), colors.HexColor('#dbeafe')),
-                ('TEXTCOLOR', (0, 1), (-1, 1), colors.HexColor('#1e40af')),
-                ('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 1), (-1, 1), 10),
-                
-                # Out-of-pocket row
-                ('BACKGROUND', (0, 2), (-1, 2), colors.HexColor('#fef3c7')),
-                ('TEXTCOLOR', (0, 2), (-1, 2), colors.HexColor('#92400e')),
-                ('FONTNAME', (0, 2), (-1, 2), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 2), (-1, 2), 10),
-                
-                # All cells
-                ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
-                ('ALIGN', (2, 0), (2, -1), 'CENTER'),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
-                ('PADDING', (0, 0), (-1, -1), 10),
-            ]
-            
-            # Add total row styling only if there's data
-            if grand_total > 0:
-                style_list.extend([
-                    ('BACKGROUND', (0, 3), (-1, 3), colors.HexColor('#10b981')),
-                    ('TEXTCOLOR', (0, 3), (-1, 3), colors.white),
-                    ('FONTNAME', (0, 3), (-1, 3), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 3), (-1, 3), 11),
-                ])
-            
-            comparison_table.setStyle(TableStyle(style_list))
+            comparison_table = Table(comparison_data, colWidths=INSURANCE_COMPARISON_COL_WIDTHS)
+            comparison_table.setStyle(INSURANCE_COMPARISON_TOTAL_STYLE if grand_total > 0 else INSURANCE_COMPARISON_STYLE)
             elements.append(comparison_table)
             
             # Detailed breakdown if available
             if 'details' in data and data['details']:
                 elements.append(Spacer(1, 30))
-                section_header2 = Paragraph("Detailed Payment Breakdown", self.styles['SectionHeader'])
-                elements.append(section_header2)
+                elements.append(self._fixed('insurance_details_section'))
                 elements.append(Spacer(1, 10))
                 
-                details_data = [['Payment Method', 'Patient Count', 'Avg Payment', 'Total Amount']]
-                
-                for detail in data['details']:
-                    details_data.append([
+                def format_detail(idx, detail):
+                    return [
                         detail['payment_method'],
                         str(detail.get('patient_count', 0)),
                         f"LKR {float(detail.get('avg_payment', 0)):,.2f}",
                         f"LKR {float(detail.get('total', 0)):,.2f}"
-                    ])
+                    ]
                 
-                details_table = Table(details_data, colWidths=[2*inch, 1.5*inch, 1.5*inch, 1.5*inch])
-                details_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#64748b')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),
-                    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8fafc')]),
-                    ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#1a2332')),
-                    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 1), (-1, -1), 9),
-                    ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0')),
-                    ('PADDING', (0, 0), (-1, -1), 8),
-                ]))
-                elements.append(details_table)
+                elements.append(PagedTable(
+                    INSURANCE_DETAILS_HEADER, data['details'], format_detail,
+                    INSURANCE_COMPARISON_COL_WIDTHS, INSURANCE_DETAILS_STYLE
+                ))
             
             # Add insights
             elements.append(Spacer(1, 20))
@@ -877,3 +969,113 @@ class PDFGenerator:
 
 # Create singleton instance
 pdf_generator = PDFGenerator()
+
+
+def render_report(renderer: str, data, options: dict, path: str) -> int:
+    """
+    Render one report straight into a PDF file and return its size
+
+    Entry point for the report job process pool: it only needs this module
+    (not the database layer), and the PDF goes to disk page by page instead
+    of travelling back to the API process as one bytes object.
+    """
+    with open(path, "wb") as output:
+        getattr(pdf_generator, renderer)(data=data, output=output, **options)
+    return os.path.getsize(path)
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+# python -m services.pdf_generator                      all five reports, 1k and 10k rows
+# python -m services.pdf_generator --report outstanding-balances --rows 10000 100000 1000000
+# Each run renders in a fresh process so its peak RSS is its own; rows/s
+# is the number to track across changes to the templates and PagedTable.
+
+BENCHMARK_REPORTS = {
+    "branch-appointments": "generate_branch_appointment_summary",
+    "doctor-revenue": "generate_doctor_revenue_report",
+    "outstanding-balances": "generate_outstanding_balance_report",
+    "treatments-by-category": "generate_treatments_by_category_report",
+    "insurance-vs-outofpocket": "generate_insurance_vs_outofpocket_report",
+}
+
+
+def _benchmark_rows(report: str, count: int):
+    from datetime import date, timedelta
+    if report == "branch-appointments":
+        statuses = ('Scheduled', 'Completed', 'Cancelled', 'No-Show')
+        return [
+            {'branch_name': f"Branch {i % 12}", 'available_date': date(2020, 1, 1) + timedelta(days=i // 48),
+             'status': statuses[i % 4], 'appointment_count': i % 40 + 1}
+            for i in range(count)
+        ]
+    if report == "doctor-revenue":
+        return [
+            {'doctor_id': str(i % 40), 'doctor_name': f"Doctor {i % 40}",
+             'month': f"{2020 + i // 480}-{(i // 40) % 12 + 1:02d}", 'revenue': (i * 53) % 90000 + 500}
+            for i in range(count)
+        ]
+    if report == "treatments-by-category":
+        return [
+            {'treatment_name': f"Treatment {i}", 'treatment_count': (i * 7) % 300 + 1,
+             'total_revenue': (i * 7) % 300 * 2500 + 1000}
+            for i in range(count)
+        ]
+    if report == "insurance-vs-outofpocket":
+        # The details table is the only part that grows with the data
+        details = [
+            {'payment_method': f"Method {i}", 'patient_count': i % 900 + 1,
+             'avg_payment': (i * 31) % 8000 + 100, 'total': (i * 31) % 8000 * (i % 900 + 1) + 100}
+            for i in range(count)
+        ]
+        return {
+            'insurance_total': 2_500_000, 'out_of_pocket_total': 1_750_000,
+            'insurance_count': 900, 'out_of_pocket_count': 1400, 'details': details
+        }
+    return [
+        {'patient_id': str(i), 'patient_name': f"Patient {i}", 'patient_balance': (i * 37) % 15000 + 1}
+        for i in range(count)
+    ]
+
+
+def _benchmark_run(report: str, count: int, path: str) -> dict:
+    import resource
+    import time
+
+    data = _benchmark_rows(report, count)
+    data_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    size = render_report(BENCHMARK_REPORTS[report], data, {}, path)
+    elapsed = time.perf_counter() - started
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "report": report,
+        "rows": count,
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(count / elapsed),
+        "pdf_mb": round(size / 1024 / 1024, 1),
+        "data_rss_mb": round(data_rss / 1024),      # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(peak_rss / 1024)
+    }
+
+
+if __name__ == "__main__":
+    from concurrent.futures import ProcessPoolExecutor
+    import argparse
+    import multiprocessing
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Render synthetic reports and measure rows/s and peak RSS")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--report", choices=list(BENCHMARK_REPORTS), nargs="+", default=list(BENCHMARK_REPORTS))
+    args = parser.parse_args()
+
+    print(f"{'report':<26} {'rows':>10} {'seconds':>9} {'rows/s':>8} {'pdf MB':>7} {'data RSS MB':>12} {'peak RSS MB':>12}")
+    for report in args.report:
+        for count in args.rows:
+            with tempfile.TemporaryDirectory() as directory:
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                    result = pool.submit(_benchmark_run, report, count, f"{directory}/report.pdf").result()
+            print(f"{result['report']:<26} {result['rows']:>10} {result['seconds']:>9} {result['rows_per_second']:>8} "
+                  f"{result['pdf_mb']:>7} {result['data_rss_mb']:>12} {result['peak_rss_mb']:>12}")
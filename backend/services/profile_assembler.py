@@ -0,0 +1,372 @@
+"""
+Patient Profile Assembler for MedSync
+Builds the nested patient document (appointments, allergies, consultations,
+billing...) in a single round trip with JSON_ARRAYAGG / JSON_OBJECT
+"""
+
+from core.database import get_db
+from typing import Any, Dict, Iterable, Optional
+import logging
+import json
+
+try:
+    import orjson
+
+    def _loads(value):
+        return orjson.loads(value)
+except ImportError:  # pragma: no cover - orjson is listed in requirements.txt
+    def _loads(value):
+        return json.loads(value)
+
+logger = logging.getLogger(__name__)
+
+
+def _iso(column: str) -> str:
+    """Timestamp formatted like FastAPI serializes datetimes (%% escapes the DB-API placeholder)"""
+    return f"DATE_FORMAT({column}, '%%Y-%%m-%%dT%%H:%%i:%%s')"
+
+
+# ============================================
+# PATIENT ROW
+# ============================================
+
+PATIENT_INFO_QUERY = """
+    SELECT
+        p.*,
+        u.full_name,
+        u.NIC,
+        u.email,
+        u.gender,
+        u.DOB,
+        TIMESTAMPDIFF(YEAR, u.DOB, CURDATE()) as age,
+        c.contact_num1,
+        c.contact_num2,
+        b.branch_name as registered_branch,
+        CONCAT(ba.address_line1, ', ', ba.city, ', ', ba.province) as branch_address,
+        bc.contact_num1 as branch_contact{aggregates}
+    FROM patient p
+    JOIN user u ON p.patient_id = u.user_id
+    JOIN contact c ON u.contact_id = c.contact_id
+    LEFT JOIN branch b ON p.registered_branch_id = b.branch_id
+    LEFT JOIN address ba ON b.address_id = ba.address_id
+    LEFT JOIN contact bc ON b.contact_id = bc.contact_id
+    WHERE p.patient_id = %s
+"""
+
+# ============================================
+# PER-SECTION QUERIES (one round trip each)
+# ============================================
+
+SECTION_QUERIES = {
+    "appointments": """
+        SELECT
+            a.*,
+            ts.available_date as appointment_date,
+            ts.start_time,
+            ts.end_time,
+            du.full_name as doctor_name,
+            GROUP_CONCAT(s.specialization_title SEPARATOR ', ') as specialization,
+            b.branch_name
+        FROM appointment a
+        JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+        JOIN doctor d ON ts.doctor_id = d.doctor_id
+        JOIN user du ON d.doctor_id = du.user_id
+        JOIN employee e ON d.doctor_id = e.employee_id
+        JOIN branch b ON e.branch_id = b.branch_id
+        LEFT JOIN doctor_specialization ds ON d.doctor_id = ds.doctor_id
+        LEFT JOIN specialization s ON ds.specialization_id = s.specialization_id
+        WHERE a.patient_id = %s
+        GROUP BY a.appointment_id, ts.available_date, ts.start_time, ts.end_time, du.full_name, b.branch_name
+        ORDER BY ts.available_date DESC, ts.start_time DESC
+    """,
+    "allergies": """
+        SELECT * FROM patient_allergy
+        WHERE patient_id = %s
+        ORDER BY allergy_name
+    """,
+    "consultations": """
+        SELECT
+            cr.*,
+            du.full_name as doctor_name,
+            GROUP_CONCAT(s.specialization_title SEPARATOR ', ') as specialization,
+            a.time_slot_id,
+            ts.available_date as consultation_date
+        FROM consultation_record cr
+        JOIN appointment a ON cr.appointment_id = a.appointment_id
+        JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+        JOIN doctor d ON ts.doctor_id = d.doctor_id
+        JOIN user du ON d.doctor_id = du.user_id
+        LEFT JOIN doctor_specialization ds ON d.doctor_id = ds.doctor_id
+        LEFT JOIN specialization s ON ds.specialization_id = s.specialization_id
+        WHERE a.patient_id = %s
+        GROUP BY cr.consultation_rec_id, du.full_name, a.time_slot_id, ts.available_date
+        ORDER BY ts.available_date DESC
+    """,
+    "prescriptions": """
+        SELECT
+            pi.*,
+            m.generic_name,
+            m.manufacturer,
+            m.form,
+            du.full_name as doctor_name,
+            cr.diagnoses
+        FROM prescription_item pi
+        JOIN medication m ON pi.medication_id = m.medication_id
+        JOIN consultation_record cr ON pi.consultation_rec_id = cr.consultation_rec_id
+        JOIN appointment a ON cr.appointment_id = a.appointment_id
+        JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+        JOIN doctor d ON ts.doctor_id = d.doctor_id
+        JOIN user du ON d.doctor_id = du.user_id
+        WHERE a.patient_id = %s
+        ORDER BY pi.created_at DESC
+    """,
+    "invoices": """
+        SELECT
+            i.*,
+            a.patient_id
+        FROM invoice i
+        JOIN consultation_record cr ON i.consultation_rec_id = cr.consultation_rec_id
+        JOIN appointment a ON cr.appointment_id = a.appointment_id
+        WHERE a.patient_id = %s
+        ORDER BY i.created_at DESC
+    """,
+    "payments": """
+        SELECT * FROM payment
+        WHERE patient_id = %s
+        ORDER BY payment_date DESC
+    """
+}
+
+# ============================================
+# AGGREGATED SECTIONS (JSON subqueries of the patient row)
+# ============================================
+# Each entry is a correlated subquery returning a JSON array, plus the
+# (keys, descending) used to restore the per-section ORDER BY after
+# decoding, since JSON_ARRAYAGG does not guarantee element order.
+
+_DOCTOR_SPECIALIZATIONS = """(SELECT GROUP_CONCAT(s.specialization_title SEPARATOR ', ')
+                FROM doctor_specialization ds
+                JOIN specialization s ON ds.specialization_id = s.specialization_id
+                WHERE ds.doctor_id = ts.doctor_id)"""
+
+AGGREGATE_SECTIONS = {
+    "appointments": (f"""
+        (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+            'appointment_id', a.appointment_id,
+            'time_slot_id', a.time_slot_id,
+            'patient_id', a.patient_id,
+            'status', a.status,
+            'notes', a.notes,
+            'created_at', {_iso('a.created_at')},
+            'updated_at', {_iso('a.updated_at')},
+            'appointment_date', ts.available_date,
+            'start_time', CAST(ts.start_time AS CHAR),
+            'end_time', CAST(ts.end_time AS CHAR),
+            'doctor_name', du.full_name,
+            'specialization', {_DOCTOR_SPECIALIZATIONS},
+            'branch_name', b.branch_name))
+        FROM appointment a
+        JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+        JOIN user du ON ts.doctor_id = du.user_id
+        JOIN employee e ON ts.doctor_id = e.employee_id
+        JOIN branch b ON e.branch_id = b.branch_id
+        WHERE a.patient_id = p.patient_id)""",
+        (("appointment_date", "start_time"), True)),
+    "allergies": (f"""
+        (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+            'patient_allergy_id', pa.patient_allergy_id,
+            'patient_id', pa.patient_id,
+            'allergy_name', pa.allergy_name,
+            'severity', pa.severity,
+            'reaction_description', pa.reaction_description,
+            'diagnosed_date', pa.diagnosed_date,
+            'created_at', {_iso('pa.created_at')},
+            'updated_at', {_iso('pa.updated_at')}))
+        FROM patient_allergy pa
+        WHERE pa.patient_id = p.patient_id)""",
+        (("allergy_name",), False)),
+    "consultations": (f"""
+        (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+            'consultation_rec_id', cr.consultation_rec_id,
+            'appointment_id', cr.appointment_id,
+            'symptoms', cr.symptoms,
+            'diagnoses', cr.diagnoses,
+            'follow_up_required', cr.follow_up_required,
+            'follow_up_date', cr.follow_up_date,
+            'created_at', {_iso('cr.created_at')},
+            'updated_at', {_iso('cr.updated_at')},
+            'doctor_name', du.full_name,
+            'specialization', {_DOCTOR_SPECIALIZATIONS},
+            'time_slot_id', a.time_slot_id,
+            'consultation_date', ts.available_date))
+        FROM consultation_record cr
+        JOIN appointment a ON cr.appointment_id = a.appointment_id
+        JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+        JOIN user du ON ts.doctor_id = du.user_id
+        WHERE a.patient_id = p.patient_id)""",
+        (("consultation_date",), True)),
+    "prescriptions": (f"""
+        (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+            'prescription_item_id', pi.prescription_item_id,
+            'medication_id', pi.medication_id,
+            'consultation_rec_id', pi.consultation_rec_id,
+            'dosage', pi.dosage,
+            'frequency', pi.frequency,
+            'duration_days', pi.duration_days,
+            'instructions', pi.instructions,
+            'created_at', {_iso('pi.created_at')},
+            'updated_at', {_iso('pi.updated_at')},
+            'generic_name', m.generic_name,
+            'manufacturer', m.manufacturer,
+            'form', m.form,
+            'doctor_name', du.full_name,
+            'diagnoses', cr.diagnoses))
+        FROM prescription_item pi
+        JOIN medication m ON pi.medication_id = m.medication_id
+        JOIN consultation_record cr ON pi.consultation_rec_id = cr.consultation_rec_id
+        JOIN appointment a ON cr.appointment_id = a.appointment_id
+        JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+        JOIN user du ON ts.doctor_id = du.user_id
+        WHERE a.patient_id = p.patient_id)""",
+        (("created_at",), True)),
+    "invoices": (f"""
+        (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+            'invoice_id', i.invoice_id,
+            'consultation_rec_id', i.consultation_rec_id,
+            'sub_total', i.sub_total,
+            'tax_amount', i.tax_amount,
+            'due_date', i.due_date,
+            'created_at', {_iso('i.created_at')},
+            'updated_at', {_iso('i.updated_at')},
+            'patient_id', a.patient_id))
+        FROM invoice i
+        JOIN consultation_record cr ON i.consultation_rec_id = cr.consultation_rec_id
+        JOIN appointment a ON cr.appointment_id = a.appointment_id
+        WHERE a.patient_id = p.patient_id)""",
+        (("created_at",), True)),
+    "payments": (f"""
+        (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+            'payment_id', pay.payment_id,
+            'patient_id', pay.patient_id,
+            'amount_paid', pay.amount_paid,
+            'payment_method', pay.payment_method,
+            'status', pay.status,
+            'payment_date', pay.payment_date,
+            'notes', pay.notes,
+            'created_at', {_iso('pay.created_at')},
+            'updated_at', {_iso('pay.updated_at')}))
+        FROM payment pay
+        WHERE pay.patient_id = p.patient_id)""",
+        (("payment_date",), True)),
+}
+
+COMPLETE_PROFILE_SECTIONS = ("appointments", "allergies", "consultations", "prescriptions", "invoices", "payments")
+
+
+class ProfileAssembler:
+    """Loads a patient row with any of its related sections"""
+
+    def assemble(self, cursor, patient_id: str,
+                 sections: Iterable[str] = COMPLETE_PROFILE_SECTIONS) -> Optional[Dict[str, Any]]:
+        """
+        One query: the patient row plus a JSON array column per section
+
+        Returns the patient row with every requested section decoded into a
+        list, or None if the patient does not exist.
+        """
+        sections = list(sections)
+        aggregates = "".join(
+            f",\n        {AGGREGATE_SECTIONS[name][0].strip()} as {name}"
+            for name in sections
+        )
+        cursor.execute(PATIENT_INFO_QUERY.format(aggregates=aggregates), (patient_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+
+        for name in sections:
+            items = _loads(row[name]) if row[name] else []
+            keys, descending = AGGREGATE_SECTIONS[name][1]
+            items.sort(key=lambda item: tuple(item.get(k) or "" for k in keys), reverse=descending)
+            row[name] = items
+        return row
+
+    def section_readers(self, patient_id: str, sections: Iterable[str] = COMPLETE_PROFILE_SECTIONS) -> Dict[str, Any]:
+        """Per-section query callables (for services.fanout or sequential use)"""
+        def reader(query, one=False):
+            def section(cursor):
+                cursor.execute(query, (patient_id,))
+                return cursor.fetchone() if one else cursor.fetchall()
+            return section
+
+        readers = {"patient_info": reader(PATIENT_INFO_QUERY.format(aggregates=""), one=True)}
+        for name in sections:
+            readers[name] = reader(SECTION_QUERIES[name])
+        return readers
+
+
+def benchmark(patient_id: Optional[str] = None, iterations: int = 20) -> Dict[str, Any]:
+    """
+    Compare per-section queries with the aggregated query
+
+    Without a patient_id the patient with the longest appointment history
+    is used. Reports the average wall time of sequential per-section
+    queries on one connection, the concurrent fan-out, and the single
+    aggregated query including JSON decoding.
+    """
+    import time
+    from services.fanout import fanout
+
+    with get_db() as (cursor, connection):
+        if not patient_id:
+            cursor.execute(
+                """SELECT patient_id, COUNT(*) as appointments FROM appointment
+                GROUP BY patient_id ORDER BY appointments DESC LIMIT 1"""
+            )
+            top = cursor.fetchone()
+            if not top:
+                return {"error": "No appointments to benchmark"}
+            patient_id = top['patient_id']
+
+        readers = profile_assembler.section_readers(patient_id)
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for section in readers.values():
+                section(cursor)
+        sequential_ms = (time.perf_counter() - started) * 1000 / iterations
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            document = profile_assembler.assemble(cursor, patient_id)
+        aggregated_ms = (time.perf_counter() - started) * 1000 / iterations
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fanout.run(profile_assembler.section_readers(patient_id))
+    fanout_ms = (time.perf_counter() - started) * 1000 / iterations
+
+    return {
+        "patient_id": patient_id,
+        "iterations": iterations,
+        "section_sizes": {name: len(document[name]) for name in COMPLETE_PROFILE_SECTIONS} if document else {},
+        "sequential_sections": {"round_trips": len(readers), "avg_ms": round(sequential_ms, 3)},
+        "fanout_sections": {"round_trips": len(readers), "avg_ms": round(fanout_ms, 3)},
+        "aggregated": {"round_trips": 1, "avg_ms": round(aggregated_ms, 3)}
+    }
+
+
+# Create singleton instance
+profile_assembler = ProfileAssembler()
+
+
+if __name__ == "__main__":
+    import sys
+
+    print(json.dumps(
+        benchmark(
+            sys.argv[1] if len(sys.argv) > 1 else None,
+            int(sys.argv[2]) if len(sys.argv) > 2 else 20
+        ),
+        indent=2
+    ))
@@ -0,0 +1,190 @@
+"""
+Report Batch Service for MedSync
+Evaluates several report /data documents and statistics summaries in one
+request, all read from a single consistent MySQL snapshot
+"""
+
+from core.database import get_db, get_read_pool
+from services.report_data import get_report, encode_payload, REPORTS
+from services.report_cache import report_cache
+from services.revenue_ledger import revenue_ledger
+from services.fanout import FanOut
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import json
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def _as_date(value) -> Optional[date]:
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+# Documents of the overview page that are not report definitions:
+# name -> (filters, reader(cursor, filters) -> document)
+STATISTICS: Dict[str, Tuple[Tuple[str, ...], Callable]] = {
+    "invoice-statistics": (
+        (),
+        lambda cursor, filters: revenue_ledger.invoice_statistics(cursor)
+    ),
+    "payment-statistics": (
+        ("date_from", "date_to"),
+        lambda cursor, filters: revenue_ledger.payment_summary(
+            cursor, _as_date(filters.get("date_from")), _as_date(filters.get("date_to"))
+        )
+    ),
+}
+
+DOCUMENTS = (*REPORTS, *STATISTICS)
+
+
+class ReportBatchService:
+    """
+    Several documents from one point in time
+
+    By default every document is read in one read-only transaction opened
+    WITH CONSISTENT SNAPSHOT, so the totals of one report agree with the
+    rows of another even while writes continue. An InnoDB read view
+    belongs to a single session, so these reads run one after another on
+    that connection; each report's cache key is computed inside the
+    snapshot as well, and a cached body (written at that same data
+    version) is spliced in without running its queries.
+
+    With consistent=False every document is read on its own connection
+    through a FanOut of the batch service's own (REPORT_BATCH_WORKERS
+    threads and connections), concurrently, at the cost of each one
+    seeing a slightly different moment. Long report reads never occupy
+    the shared fanout workers that the 3 s dashboard and profile sections
+    depend on; extra documents wait in the batch executor's queue.
+    """
+
+    def __init__(self):
+        self.max_documents = int(os.getenv('REPORT_BATCH_MAX_DOCUMENTS', '20'))
+        self.timeout = float(os.getenv('REPORT_BATCH_TIMEOUT', '30'))
+        self.fanout = FanOut(
+            "report_batch",
+            workers=int(os.getenv('REPORT_BATCH_WORKERS', '4')),
+            default_timeout=self.timeout
+        )
+
+    # ============================================
+    # SPECS
+    # ============================================
+
+    def resolve(self, specs: List[Dict[str, Any]]) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """(result id, document name, filters) per spec; ids default to the name, numbered when repeated"""
+        if not specs:
+            raise ValueError("At least one report is required")
+        if len(specs) > self.max_documents:
+            raise ValueError(f"At most {self.max_documents} reports per batch")
+
+        resolved = []
+        seen = set()
+        for position, spec in enumerate(specs):
+            name = spec["report"]
+            if name not in DOCUMENTS:
+                raise ValueError(f"Unknown report '{name}'. Valid reports: {', '.join(DOCUMENTS)}")
+            result_id = spec.get("id") or (name if name not in seen else f"{name}#{position}")
+            if result_id in seen:
+                raise ValueError(f"Duplicate result id '{result_id}'")
+            seen.add(result_id)
+            seen.add(name)
+            resolved.append((result_id, name, spec.get("filters") or {}))
+        return resolved
+
+    # ============================================
+    # DOCUMENTS
+    # ============================================
+
+    def _read(self, cursor, name: str, filters: Dict[str, Any]) -> Tuple[bytes, bool]:
+        """Encoded document and whether it came from the report cache"""
+        report = get_report(name)
+        if report is None:
+            allowed, reader = STATISTICS[name]
+            return encode_payload(reader(cursor, {key: filters.get(key) for key in allowed})), False
+
+        key = report_cache.key(cursor, report, "data", filters)
+        cached = report_cache.read(key, "json")
+        if cached is not None:
+            return cached, True
+
+        body = encode_payload(report.build_payload(cursor, filters))
+        report_cache.put(key, "json", body)
+        return body, False
+
+    def _read_consistent(self, documents: List[Tuple[str, str, Dict[str, Any]]]):
+        bodies: Dict[str, bytes] = {}
+        errors: Dict[str, str] = {}
+        timings: Dict[str, float] = {}
+        cached: List[str] = []
+
+        with get_db(get_read_pool()) as (cursor, connection):
+            connection.start_transaction(consistent_snapshot=True, isolation_level='REPEATABLE READ', readonly=True)
+            cursor.execute("SELECT NOW(6) as snapshot_at")
+            snapshot_at = cursor.fetchone()['snapshot_at']
+
+            for result_id, name, filters in documents:
+                started = time.perf_counter()
+                try:
+                    bodies[result_id], hit = self._read(cursor, name, filters)
+                    if hit:
+                        cached.append(result_id)
+                except Exception as e:
+                    # A failed SELECT does not end the transaction; later documents keep the snapshot
+                    errors[result_id] = str(e)
+                    logger.error(f"Batch document '{result_id}' failed: {str(e)}")
+                timings[result_id] = round((time.perf_counter() - started) * 1000, 2)
+
+        return bodies, errors, timings, cached, snapshot_at
+
+    def _read_concurrent(self, documents: List[Tuple[str, str, Dict[str, Any]]]):
+        def section(name: str, filters: Dict[str, Any]) -> Callable:
+            return lambda cursor: self._read(cursor, name, filters)
+
+        result = self.fanout.run(
+            {result_id: section(name, filters) for result_id, name, filters in documents}
+        )
+        bodies = {result_id: value[0] for result_id, value in result.data.items() if value is not None}
+        cached = [result_id for result_id, value in result.data.items() if value is not None and value[1]]
+        return bodies, result.errors, result.timings_ms, cached, None
+
+    def run(self, specs: List[Dict[str, Any]], consistent: bool = True) -> bytes:
+        """One JSON document holding every requested document under its result id"""
+        started = time.perf_counter()
+        documents = self.resolve(specs)
+
+        if consistent:
+            bodies, errors, timings, cached, snapshot_at = self._read_consistent(documents)
+        else:
+            bodies, errors, timings, cached, snapshot_at = self._read_concurrent(documents)
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(
+            f"Report batch: {len(documents)} documents ({len(cached)} cached, {len(errors)} failed, "
+            f"{'consistent' if consistent else 'concurrent'}) in {elapsed_ms} ms"
+        )
+
+        # Bodies are already encoded (cached ones straight from disk): splice them in
+        results = b",".join(
+            json.dumps(result_id).encode() + b":" + bodies[result_id]
+            for result_id, _, _ in documents if result_id in bodies
+        )
+        head = encode_payload({
+            "success": not errors,
+            "consistent": consistent,
+            "snapshot_at": snapshot_at,
+            "errors": errors,
+            "cached": cached,
+            "timings_ms": timings,
+            "elapsed_ms": elapsed_ms
+        })
+        return head[:-1] + b',"results":{' + results + b"}}"
+
+
+# Create singleton instance
+report_batch = ReportBatchService()
@@ -0,0 +1,290 @@
+"""
+Report Cache Service for MedSync
+Content-addressed disk cache for report data and rendered PDFs, keyed by
+report type, normalized filters and the data version of the report's
+source tables (database/15_report_data_version.sql; per day for periods
+that already ended, database/21_report_day_version.sql). Counters are
+sharded per writer connection (database/22_report_version_shards.sql) and
+summed here.
+"""
+
+from services.report_data import ReportDefinition
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional
+import threading
+import hashlib
+import logging
+import json
+import time
+import uuid
+import os
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / "exports" / "reports"
+
+# Sources whose changes are also counted per reported date (database/21_report_day_version.sql)
+DAY_VERSIONED_SOURCES = ("appointment", "invoice", "payment", "claim", "treatment",
+                         "consultation_record", "report_summaries")
+
+
+class ReportCache:
+    """
+    Size-bounded LRU of report results on disk
+
+    A key is the SHA-256 of (report, kind, filters, source table versions),
+    so an entry never needs invalidating: any write to a source table bumps
+    its version and later requests simply compute a different key. The key
+    doubles as the ETag. Entries older than REPORT_CACHE_TTL are dropped
+    anyway (safety net for writes that bypass the version triggers), and
+    the least recently used entries are evicted once the directory exceeds
+    REPORT_CACHE_MAX_MB. Recency is tracked in memory and seeded from file
+    modification times on startup.
+
+    Eviction may unlink a file at any time, so responses should stream from
+    a handle taken with open() (opened under the same lock as eviction; an
+    unlinked file stays readable through it) rather than from a path.
+    """
+
+    # Temp files younger than this may still be written by a live render
+    TEMP_MAX_AGE_SECONDS = 3600
+
+    def __init__(self):
+        self.cache_dir = Path(os.getenv('REPORT_CACHE_DIR', str(DEFAULT_CACHE_DIR)))
+        self.ttl_seconds = int(os.getenv('REPORT_CACHE_TTL', '86400'))
+        self.max_bytes = int(os.getenv('REPORT_CACHE_MAX_MB', '256')) * 1024 * 1024
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()   # file name -> size, least recent first
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load_index()
+
+    def _load_index(self):
+        files = []
+        now = time.time()
+        for path in self.cache_dir.iterdir():
+            if not path.is_file():
+                continue
+            stat = path.stat()
+            if path.suffix == ".tmp":
+                # Only clean up leftovers; another API worker may be rendering into a fresh one
+                if now - stat.st_mtime >= self.TEMP_MAX_AGE_SECONDS:
+                    path.unlink(missing_ok=True)
+            else:
+                files.append((stat.st_mtime, path.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total_bytes += size
+
+    # ============================================
+    # KEYS
+    # ============================================
+
+    def data_version(self, cursor, report: ReportDefinition,
+                     filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Change counters of the report's source tables
+
+        For a period that ended before today, sources with per-day counters
+        are versioned by the sum of their counters over that period, so
+        today's writes and summary refreshes of other days leave the key
+        (and the pre-generated entry) alone.
+        """
+        period = report.closed_period(filters or {})
+        daily = [table for table in report.sources if period and table in DAY_VERSIONED_SOURCES]
+        whole = [table for table in report.sources if table not in daily]
+
+        version: Dict[str, Any] = {}
+        if whole:
+            placeholders = ", ".join(["%s"] * len(whole))
+            cursor.execute(
+                f"""SELECT table_name, SUM(version) as version
+                FROM report_data_version
+                WHERE table_name IN ({placeholders})
+                GROUP BY table_name""",
+                whole
+            )
+            version.update({row['table_name']: int(row['version']) for row in cursor.fetchall()})
+        if daily:
+            placeholders = ", ".join(["%s"] * len(daily))
+            cursor.execute(
+                f"""SELECT table_name, SUM(version) as version
+                FROM report_day_version
+                WHERE table_name IN ({placeholders}) AND stat_date BETWEEN %s AND %s
+                GROUP BY table_name""",
+                [*daily, period[0], period[1]]
+            )
+            sums = {row['table_name']: int(row['version']) for row in cursor.fetchall()}
+            version.update({
+                table: f"{period[0]}..{period[1]}:{sums.get(table, 0)}" for table in daily
+            })
+        return version
+
+    def key(self, cursor, report: ReportDefinition, kind: str, filters: Dict[str, Any]) -> str:
+        """Cache key (and ETag) of a report result at the current data version"""
+        return self.key_at(report, kind, filters, self.data_version(cursor, report, filters))
+
+    def key_at(self, report: ReportDefinition, kind: str, filters: Dict[str, Any], version: Dict[str, Any]) -> str:
+        """Cache key of a report result at an explicit version (e.g. an analytics snapshot generation)"""
+        payload = json.dumps(
+            {
+                "report": report.name,
+                "kind": kind,
+                "filters": report.normalize_filters(filters),
+                "version": version
+            },
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    # ============================================
+    # ENTRIES
+    # ============================================
+
+    def path(self, key: str, suffix: str) -> Path:
+        return self.cache_dir / f"{key}.{suffix}"
+
+    def get(self, key: str, suffix: str) -> Optional[Path]:
+        """Path of a live entry (marking it recently used), or None"""
+        path = self.path(key, suffix)
+        with self._lock:
+            return path if self._touch(path) else None
+
+    def open(self, key: str, suffix: str) -> Optional[BinaryIO]:
+        """Open binary handle on a live entry (marking it recently used), or None"""
+        path = self.path(key, suffix)
+        with self._lock:
+            if not self._touch(path):
+                return None
+            try:
+                return open(path, "rb")
+            except FileNotFoundError:
+                self._forget(path.name)
+                return None
+
+    def read(self, key: str, suffix: str) -> Optional[bytes]:
+        """Content of a live entry, or None"""
+        handle = self.open(key, suffix)
+        if handle is None:
+            return None
+        with handle:
+            return handle.read()
+
+    def _touch(self, path: Path) -> bool:
+        """Check a live entry and mark it recently used; the caller holds _lock"""
+        if path.name not in self._entries:
+            self.misses += 1
+            return False
+        try:
+            expired = time.time() - path.stat().st_mtime >= self.ttl_seconds
+        except FileNotFoundError:
+            expired = True
+        if expired:
+            self._forget(path.name)
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return False
+        self._entries.move_to_end(path.name)
+        self.hits += 1
+        return True
+
+    def contains(self, key: str, suffix: str) -> bool:
+        """Whether a live entry exists (without touching recency or hit counters)"""
+        path = self.path(key, suffix)
+        with self._lock:
+            if path.name not in self._entries:
+                return False
+        try:
+            return time.time() - path.stat().st_mtime < self.ttl_seconds
+        except FileNotFoundError:
+            return False
+
+    def temp_path(self, key: str, suffix: str) -> Path:
+        """Scratch file for an entry being written (removed on a later startup if left behind)"""
+        return self.cache_dir / f"{self.path(key, suffix).name}.{uuid.uuid4().hex}.tmp"
+
+    def put(self, key: str, suffix: str, content: bytes) -> Path:
+        """Store an entry, evicting least recently used ones beyond the size bound"""
+        tmp_path = self.temp_path(key, suffix)
+        tmp_path.write_bytes(content)
+        return self.adopt(key, suffix, tmp_path)
+
+    def adopt(self, key: str, suffix: str, tmp_path: Path) -> Path:
+        """Move a finished temp_path() file into the cache as the entry for key"""
+        path = self.path(key, suffix)
+        size = tmp_path.stat().st_size
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._forget(path.name)
+            self._entries[path.name] = size
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                name, size = self._entries.popitem(last=False)
+                self._total_bytes -= size
+                (self.cache_dir / name).unlink(missing_ok=True)
+                self.evictions += 1
+        return path
+
+    def adopt_open(self, key: str, suffix: str, tmp_path: Path) -> BinaryIO:
+        """adopt() that also returns an open handle, taken before eviction can reach the file"""
+        handle = open(tmp_path, "rb")
+        try:
+            self.adopt(key, suffix, tmp_path)
+        except Exception:
+            handle.close()
+            raise
+        return handle
+
+    def _forget(self, name: str):
+        size = self._entries.pop(name, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def purge_expired(self) -> Dict[str, Any]:
+        """Delete entries older than the TTL"""
+        now = time.time()
+        removed = 0
+        with self._lock:
+            for name in list(self._entries):
+                path = self.cache_dir / name
+                try:
+                    if now - path.stat().st_mtime < self.ttl_seconds:
+                        continue
+                except FileNotFoundError:
+                    pass
+                self._forget(name)
+                path.unlink(missing_ok=True)
+                removed += 1
+        return {"removed_files": removed}
+
+    def clear(self) -> Dict[str, Any]:
+        with self._lock:
+            removed = len(self._entries)
+            for name in self._entries:
+                (self.cache_dir / name).unlink(missing_ok=True)
+            self._entries.clear()
+            self._total_bytes = 0
+        return {"removed_files": removed}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": str(self.cache_dir),
+            "ttl_seconds": self.ttl_seconds,
+            "max_bytes": self.max_bytes,
+            "files": len(self._entries),
+            "bytes": self._total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+# Create singleton instance
+report_cache = ReportCache()
@@ -0,0 +1,795 @@
+"""
+Report Data Service for MedSync
+Loads the rows behind each PDF report and describes how each report type
+is rendered, so the synchronous endpoints and the report job queue share
+one definition per report
+"""
+
+from services.report_summaries import report_summaries
+from services.analytics_snapshot import analytics_snapshot
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import json
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# REPORT QUERIES
+# ============================================
+# Row reports are built as (query, params) so the PDF and /data paths can
+# fetch them whole and the exports can stream them from an unbuffered
+# cursor. The builders take a cursor to pick summary or live tables.
+
+def _fetch_all(cursor, statement: Tuple[str, List[Any]]):
+    cursor.execute(*statement)
+    return cursor.fetchall()
+
+
+def branch_appointments_query(cursor, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                              branch_name: Optional[str] = None) -> Tuple[str, List[Any]]:
+    """Appointments per branch, day and status"""
+    if report_summaries.serves(cursor, "branch_appointment_daily"):
+        query = """
+            SELECT
+                b.branch_name,
+                s.available_date,
+                s.status,
+                s.appointment_count
+            FROM report_branch_appointment_daily s
+            JOIN branch b ON s.branch_id = b.branch_id
+            WHERE 1=1
+        """
+        date_column = "s.available_date"
+    else:
+        query = """
+            SELECT
+                b.branch_name,
+                ts.available_date,
+                a.status,
+                COUNT(*) as appointment_count
+            FROM appointment a
+            JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+            JOIN branch b ON ts.branch_id = b.branch_id
+            WHERE 1=1
+        """
+        date_column = "ts.available_date"
+    params = []
+
+    if date_from:
+        query += f" AND {date_column} >= %s"
+        params.append(date_from)
+
+    if date_to:
+        query += f" AND {date_column} <= %s"
+        params.append(date_to)
+
+    if branch_name:
+        query += " AND b.branch_name = %s"
+        params.append(branch_name)
+
+    if date_column == "ts.available_date":
+        query += " GROUP BY b.branch_id, b.branch_name, ts.available_date, a.status"
+
+    query += " ORDER BY available_date DESC, branch_name, status"
+    return query, params
+
+
+def fetch_branch_appointments(cursor, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                              branch_name: Optional[str] = None):
+    return _fetch_all(cursor, branch_appointments_query(cursor, date_from, date_to, branch_name))
+
+
+def _month_range(year: Optional[int], month: Optional[str]) -> Tuple[Optional[date], Optional[date]]:
+    """[first, end) month starts for the year / 'YYYY-MM' filters, so month columns stay sargable"""
+    first = end = None
+    if year:
+        first, end = date(int(year), 1, 1), date(int(year) + 1, 1, 1)
+    if month:
+        month_first = datetime.strptime(month, "%Y-%m").date()
+        month_end = (month_first + timedelta(days=32)).replace(day=1)
+        first = max(first, month_first) if first else month_first
+        end = min(end, month_end) if end else month_end
+    return first, end
+
+
+def _month_period(year: Optional[int] = None, month: Optional[str] = None, **_) -> Optional[Tuple[date, date]]:
+    """Days covered by the year / month filters (None when unbounded)"""
+    first, end = _month_range(year, month)
+    return (first, end - timedelta(days=1)) if first else None
+
+
+def _date_period(date_from: Optional[str] = None, date_to: Optional[str] = None, **_) -> Optional[Tuple[date, date]]:
+    """Days covered by the date_from / date_to filters (None when either is open)"""
+    if not date_from or not date_to:
+        return None
+    return date.fromisoformat(str(date_from)), date.fromisoformat(str(date_to))
+
+
+def doctor_revenue_query(cursor, year: Optional[int] = None, month: Optional[str] = None,
+                         doctor_id: Optional[str] = None) -> Tuple[str, List[Any]]:
+    """Invoiced revenue per doctor and month (month of invoice creation)"""
+    first, end = _month_range(year, month)
+
+    if report_summaries.serves(cursor, "doctor_monthly_revenue"):
+        query = """
+            SELECT
+                s.doctor_id,
+                u.full_name as doctor_name,
+                DATE_FORMAT(s.revenue_month, '%Y-%m') as month,
+                s.revenue
+            FROM report_doctor_monthly_revenue s
+            JOIN user u ON s.doctor_id = u.user_id
+            WHERE 1=1
+        """
+        month_column, doctor_column, group_by = "s.revenue_month", "s.doctor_id", ""
+    else:
+        query = """
+            SELECT
+                ts.doctor_id,
+                u.full_name as doctor_name,
+                DATE_FORMAT(i.created_at, '%Y-%m') as month,
+                SUM(i.sub_total + COALESCE(i.tax_amount, 0)) as revenue
+            FROM invoice i
+            JOIN consultation_record cr ON i.consultation_rec_id = cr.consultation_rec_id
+            JOIN appointment a ON cr.appointment_id = a.appointment_id
+            JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+            JOIN user u ON ts.doctor_id = u.user_id
+            WHERE 1=1
+        """
+        month_column, doctor_column = "i.created_at", "ts.doctor_id"
+        group_by = " GROUP BY ts.doctor_id, u.full_name, month"
+    params = []
+
+    if first:
+        query += f" AND {month_column} >= %s"
+        params.append(first)
+
+    if end:
+        query += f" AND {month_column} < %s"
+        params.append(end)
+
+    if doctor_id:
+        query += f" AND {doctor_column} = %s"
+        params.append(doctor_id)
+
+    query += group_by + " ORDER BY month DESC, revenue DESC"
+    return query, params
+
+
+def fetch_doctor_revenue(cursor, year: Optional[int] = None, month: Optional[str] = None,
+                         doctor_id: Optional[str] = None):
+    return _fetch_all(cursor, doctor_revenue_query(cursor, year, month, doctor_id))
+
+
+def fetch_doctor_revenue_snapshot(year: Optional[int] = None, month: Optional[str] = None,
+                                  doctor_id: Optional[str] = None):
+    """Same rows as fetch_doctor_revenue, read from the analytics snapshot"""
+    first, end = _month_range(year, month)
+    return analytics_snapshot.doctor_revenue(first, end, doctor_id)
+
+
+def outstanding_balances_query(cursor, min_balance: Optional[float] = None, max_balance: Optional[float] = None,
+                               sort_by: str = "balance_desc") -> Tuple[str, List[Any]]:
+    """Patients with a positive balance (patient_balance is kept current by the payment paths)"""
+    query = """
+        SELECT
+            pb.patient_id,
+            u.full_name as patient_name,
+            pb.total_balance as patient_balance
+        FROM patient_balance pb
+        JOIN user u ON pb.patient_id = u.user_id
+        WHERE pb.total_balance > 0
+    """
+    params = []
+
+    if min_balance is not None:
+        query += " AND pb.total_balance >= %s"
+        params.append(min_balance)
+
+    if max_balance is not None:
+        query += " AND pb.total_balance <= %s"
+        params.append(max_balance)
+
+    if sort_by == "balance_asc":
+        query += " ORDER BY pb.total_balance ASC"
+    else:  # balance_desc (default)
+        query += " ORDER BY pb.total_balance DESC"
+    return query, params
+
+
+def fetch_outstanding_balances(cursor, min_balance: Optional[float] = None, max_balance: Optional[float] = None,
+                               sort_by: str = "balance_desc"):
+    return _fetch_all(cursor, outstanding_balances_query(cursor, min_balance, max_balance, sort_by))
+
+
+def treatments_by_category_query(cursor, date_from: Optional[str] = None,
+                                date_to: Optional[str] = None) -> Tuple[str, List[Any]]:
+    """Treatment count and revenue per treatment catalogue entry"""
+    query = """
+        SELECT
+            tc.treatment_name,
+            COUNT(t.treatment_id) as treatment_count,
+            SUM(tc.base_price) as total_revenue
+        FROM treatment t
+        JOIN treatment_catalogue tc ON t.treatment_service_code = tc.treatment_service_code
+        JOIN consultation_record cr ON t.consultation_rec_id = cr.consultation_rec_id
+        WHERE 1=1
+    """
+    params = []
+
+    if date_from:
+        query += " AND DATE(cr.created_at) >= %s"
+        params.append(date_from)
+
+    if date_to:
+        query += " AND DATE(cr.created_at) <= %s"
+        params.append(date_to)
+
+    query += """
+        GROUP BY tc.treatment_service_code, tc.treatment_name
+        ORDER BY treatment_count DESC
+    """
+    return query, params
+
+
+def fetch_treatments_by_category(cursor, date_from: Optional[str] = None, date_to: Optional[str] = None):
+    return _fetch_all(cursor, treatments_by_category_query(cursor, date_from, date_to))
+
+
+def _date_filter(column: str, date_from: Optional[str], date_to: Optional[str]) -> Tuple[str, List[Any]]:
+    """Inclusive date range on a DATE column, compared bare so an index range applies"""
+    where, params = "", []
+    if date_from:
+        where += f" AND {column} >= %s"
+        params.append(date_from)
+    if date_to:
+        where += f" AND {column} <= %s"
+        params.append(date_to)
+    return where, params
+
+
+def fetch_payment_mix(cursor, date_from: Optional[str] = None, date_to: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Claim totals and per-method payment totals for a date range
+
+    All sums and counts come from one grouped range scan of
+    report_payment_mix_daily (database/17_payment_mix_daily.sql); distinct
+    patients per method, which cannot be summed across days, from
+    idx_payment_date_report without reading payment rows.
+    """
+    where, params = _date_filter("mix_date", date_from, date_to)
+    cursor.execute(
+        f"""SELECT source, payment_method, SUM(row_count) as row_count, SUM(amount) as amount
+        FROM report_payment_mix_daily
+        WHERE 1=1{where}
+        GROUP BY source, payment_method
+        HAVING SUM(row_count) > 0""",
+        params
+    )
+    mix = cursor.fetchall()
+
+    where, params = _date_filter("payment_date", date_from, date_to)
+    cursor.execute(
+        f"""SELECT payment_method, COUNT(DISTINCT patient_id) as patient_count
+        FROM payment
+        WHERE 1=1{where}
+        GROUP BY payment_method""",
+        params
+    )
+    patients = {row['payment_method']: int(row['patient_count']) for row in cursor.fetchall()}
+
+    claims = [row for row in mix if row['source'] == 'claim']
+    methods = sorted(
+        (
+            {
+                'payment_method': row['payment_method'],
+                'patient_count': patients.get(row['payment_method'], 0),
+                'avg_payment': (row['amount'] / row['row_count']).quantize(Decimal('0.000001')),
+                'total': row['amount'],
+                'count': int(row['row_count'])
+            }
+            for row in mix if row['source'] == 'payment'
+        ),
+        key=lambda method: method['total'],
+        reverse=True
+    )
+    return {
+        'claim_total': sum((row['amount'] for row in claims), Decimal(0)),
+        'claim_count': sum(int(row['row_count']) for row in claims),
+        'methods': methods
+    }
+
+
+def _method_totals(methods: List[Dict[str, Any]], insurance: bool) -> Tuple[Decimal, int]:
+    selected = [method for method in methods if (method['payment_method'] == 'Insurance') == insurance]
+    return sum((method['total'] for method in selected), Decimal(0)), sum(method['count'] for method in selected)
+
+
+def _method_details(methods: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{key: method[key] for key in ('payment_method', 'patient_count', 'avg_payment', 'total')} for method in methods]
+
+
+def fetch_insurance_vs_outofpocket(cursor, date_from: Optional[str] = None, date_to: Optional[str] = None):
+    """Claim totals, out-of-pocket payment totals and the per-method breakdown"""
+    mix = fetch_payment_mix(cursor, date_from, date_to)
+    out_of_pocket_total, out_of_pocket_count = _method_totals(mix['methods'], insurance=False)
+
+    return {
+        'insurance_total': float(mix['claim_total']),
+        'insurance_count': mix['claim_count'],
+        'out_of_pocket_total': float(out_of_pocket_total),
+        'out_of_pocket_count': out_of_pocket_count,
+        'details': _method_details(mix['methods'])
+    }
+
+
+def fetch_payment_split(cursor, date_from: Optional[str] = None, date_to: Optional[str] = None):
+    """Insurance vs other payment totals (the /insurance-vs-outofpocket/data preview)"""
+    mix = fetch_payment_mix(cursor, date_from, date_to)
+    insurance_total, insurance_count = _method_totals(mix['methods'], insurance=True)
+    out_of_pocket_total, out_of_pocket_count = _method_totals(mix['methods'], insurance=False)
+
+    grand_total = float(insurance_total) + float(out_of_pocket_total)
+    insurance_percentage = (float(insurance_total) / grand_total * 100) if grand_total > 0 else 0
+
+    return {
+        "insurance_total": insurance_total,
+        "insurance_count": insurance_count,
+        "out_of_pocket_total": out_of_pocket_total,
+        "out_of_pocket_count": out_of_pocket_count,
+        "grand_total": grand_total,
+        "insurance_percentage": insurance_percentage,
+        "details": _method_details(mix['methods'])
+    }
+
+
+# ============================================
+# /data PAYLOADS
+# ============================================
+
+def branch_appointments_payload(cursor, **filters):
+    data = fetch_branch_appointments(cursor, **filters)
+    return {
+        "success": True,
+        "total_records": len(data),
+        "data": data
+    }
+
+
+def doctor_revenue_document(data):
+    return {
+        "success": True,
+        "total_records": len(data),
+        "total_revenue": sum(float(row['revenue']) for row in data),
+        "data": data
+    }
+
+
+def doctor_revenue_payload(cursor, **filters):
+    return doctor_revenue_document(fetch_doctor_revenue(cursor, **filters))
+
+
+def outstanding_balances_payload(cursor, **filters):
+    data = fetch_outstanding_balances(cursor, **filters)
+    return {
+        "success": True,
+        "total_patients": len(data),
+        "total_outstanding": sum(float(row['patient_balance']) for row in data),
+        "data": data
+    }
+
+
+def treatments_by_category_payload(cursor, **filters):
+    data = fetch_treatments_by_category(cursor, **filters)
+    return {
+        "success": True,
+        "total_categories": len(data),
+        "total_treatments": sum(int(row['treatment_count']) for row in data),
+        "total_revenue": sum(float(row['total_revenue']) for row in data),
+        "data": data
+    }
+
+
+def insurance_vs_outofpocket_payload(cursor, **filters):
+    return {"success": True, **fetch_payment_split(cursor, **filters)}
+
+
+def json_default(value):
+    """JSON encoding of the values MySQL returns (as FastAPI's jsonable_encoder would)"""
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_payload(payload: Dict[str, Any]) -> bytes:
+    return json.dumps(payload, default=json_default).encode()
+
+
+# ============================================
+# REPORT DEFINITIONS
+# ============================================
+
+class ReportDefinition:
+    """
+    One PDF report type
+
+    fetch(cursor, **filters) loads the data; renderer names the
+    PDFGenerator method that draws it and render_filters the filters that
+    method also takes (they appear in the report heading). sources are the
+    tables whose report_data_version counters key the report cache. Row
+    reports also set query(cursor, **filters) -> (sql, params), which the
+    streaming exports execute themselves. payload(cursor, **filters) builds
+    the JSON document of the report's /data endpoint. Reports the analytics
+    snapshot can answer set snapshot(**filters), returning the rows fetch
+    would, and document(rows), building the /data document from them.
+    period(**filters) returns the first and last day the filters cover,
+    which lets the report cache key a closed period by per-day versions.
+    """
+
+    def __init__(self, name: str, fetch: Callable, renderer: str, filters: Tuple[str, ...],
+                 render_filters: Tuple[str, ...], sources: Tuple[str, ...], filename: str,
+                 empty_detail: Optional[str] = None, query: Optional[Callable] = None,
+                 payload: Optional[Callable] = None, snapshot: Optional[Callable] = None,
+                 document: Optional[Callable] = None, period: Optional[Callable] = None):
+        self.name = name
+        self.fetch = fetch
+        self.query = query
+        self.payload = payload
+        self.snapshot = snapshot
+        self.document = document
+        self.period = period
+        self.renderer = renderer
+        self.filters = filters
+        self.render_filters = render_filters
+        self.sources = sources
+        self.filename = filename
+        self.empty_detail = empty_detail
+
+    def normalize_filters(self, filters: Dict[str, Any]) -> Dict[str, Any]:
+        """Known filters only, in declaration order, unset ones dropped"""
+        return {key: filters[key] for key in self.filters if filters.get(key) is not None}
+
+    def closed_period(self, filters: Dict[str, Any]) -> Optional[Tuple[date, date]]:
+        """(first, last) day of the filtered period if it ended before today, else None"""
+        if self.period is None:
+            return None
+        try:
+            period = self.period(**self.normalize_filters(filters))
+        except ValueError:
+            return None
+        return period if period and period[1] < date.today() else None
+
+    def load(self, cursor, filters: Dict[str, Any]):
+        return self.fetch(cursor, **self.normalize_filters(filters))
+
+    def build_payload(self, cursor, filters: Dict[str, Any]) -> Dict[str, Any]:
+        return self.payload(cursor, **self.normalize_filters(filters))
+
+    def load_snapshot(self, filters: Dict[str, Any]):
+        if self.snapshot is None:
+            raise ValueError(f"Report '{self.name}' cannot be read from the analytics snapshot")
+        return self.snapshot(**self.normalize_filters(filters))
+
+    def build_snapshot_payload(self, filters: Dict[str, Any]) -> Dict[str, Any]:
+        return self.document(self.load_snapshot(filters))
+
+    def statement(self, cursor, filters: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        return self.query(cursor, **self.normalize_filters(filters))
+
+    def render_options(self, filters: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: filters.get(key) for key in self.render_filters}
+
+    def is_empty(self, data) -> bool:
+        return self.empty_detail is not None and not data
+
+
+REPORTS: Dict[str, ReportDefinition] = {
+    definition.name: definition
+    for definition in (
+        ReportDefinition(
+            name="branch-appointments",
+            fetch=fetch_branch_appointments,
+            renderer="generate_branch_appointment_summary",
+            filters=("date_from", "date_to", "branch_name"),
+            render_filters=("date_from", "date_to"),
+            sources=("appointment", "branch", "report_summaries"),
+            filename="branch_appointment_summary",
+            empty_detail="No appointment data found for the specified filters",
+            query=branch_appointments_query,
+            payload=branch_appointments_payload,
+            period=_date_period
+        ),
+        ReportDefinition(
+            name="doctor-revenue",
+            fetch=fetch_doctor_revenue,
+            renderer="generate_doctor_revenue_report",
+            filters=("year", "month", "doctor_id"),
+            render_filters=("year", "month"),
+            sources=("invoice", "user", "report_summaries"),
+            filename="doctor_revenue_report",
+            empty_detail="No revenue data found for the specified filters",
+            query=doctor_revenue_query,
+            payload=doctor_revenue_payload,
+            snapshot=fetch_doctor_revenue_snapshot,
+            document=doctor_revenue_document,
+            period=_month_period
+        ),
+        ReportDefinition(
+            name="outstanding-balances",
+            fetch=fetch_outstanding_balances,
+            renderer="generate_outstanding_balance_report",
+            filters=("min_balance", "max_balance", "sort_by"),
+            render_filters=(),
+            sources=("patient_balance", "user"),
+            filename="outstanding_balances",
+            empty_detail="No patients with outstanding balances found for the specified filters",
+            query=outstanding_balances_query,
+            payload=outstanding_balances_payload
+        ),
+        ReportDefinition(
+            name="treatments-by-category",
+            fetch=fetch_treatments_by_category,
+            renderer="generate_treatments_by_category_report",
+            filters=("date_from", "date_to"),
+            render_filters=("date_from", "date_to"),
+            sources=("treatment", "treatment_catalogue", "consultation_record"),
+            filename="treatments_by_category",
+            empty_detail="No treatment data found for the specified period",
+            query=treatments_by_category_query,
+            payload=treatments_by_category_payload,
+            period=_date_period
+        ),
+        ReportDefinition(
+            name="insurance-vs-outofpocket",
+            fetch=fetch_insurance_vs_outofpocket,
+            renderer="generate_insurance_vs_outofpocket_report",
+            filters=("date_from", "date_to"),
+            render_filters=("date_from", "date_to"),
+            sources=("claim", "payment", "report_summaries"),
+            filename="insurance_vs_outofpocket",
+            payload=insurance_vs_outofpocket_payload,
+            period=_date_period
+        ),
+    )
+}
+
+
+def get_report(name: str) -> Optional[ReportDefinition]:
+    return REPORTS.get(name)
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+# python -m services.report_data --seed-payments 5000000
+# python -m services.report_data
+# python -m services.report_data --cleanup
+#
+# Everything runs in a scratch schema (REPORT_BENCH_SCHEMA, default
+# <DB_NAME>_bench) holding CREATE TABLE ... LIKE copies of payment, claim,
+# the payment ledger and report_payment_mix_daily: same columns and
+# indexes, no triggers and no foreign keys. Seeding therefore never
+# touches live rows, posts nothing to the live ledgers or data versions
+# and leaves the report cache alone. The rollup copy is rebuilt from the
+# seeded rows the way RebuildPaymentMixDaily does it; the benchmark
+# connection switches to the scratch schema, so the report's own queries
+# run unchanged against the copies. --cleanup drops the schema.
+
+_BENCHMARK_TABLES = ("payment", "claim", "payment_ledger", "report_payment_mix_daily")
+_BENCHMARK_METHODS = ('Cash', 'Credit Card', 'Debit Card', 'Online', 'Insurance', 'Other')
+_BENCHMARK_STATUSES = ('Completed', 'Completed', 'Completed', 'Pending', 'Failed', 'Refunded')
+
+
+def _benchmark_schema() -> str:
+    import os
+    from core.database import DB_CONFIG
+    return os.getenv('REPORT_BENCH_SCHEMA', f"{DB_CONFIG['database']}_bench")
+
+
+def _legacy_payment_mix_statements(date_from: Optional[str], date_to: Optional[str]) -> List[Tuple[str, List[Any]]]:
+    """The three DATE()-filtered queries the insurance report ran before the payment mix rollup"""
+    def dated(query: str, column: str) -> Tuple[str, List[Any]]:
+        params = []
+        if date_from:
+            query += f" AND DATE({column}) >= %s"
+            params.append(date_from)
+        if date_to:
+            query += f" AND DATE({column}) <= %s"
+            params.append(date_to)
+        return query, params
+
+    details, params = dated(
+        """SELECT payment_method, COUNT(DISTINCT patient_id) as patient_count,
+            AVG(amount_paid) as avg_payment, SUM(amount_paid) as total
+        FROM payment WHERE 1=1""", "payment_date"
+    )
+    return [
+        dated("SELECT COALESCE(SUM(claim_amount), 0), COUNT(*) FROM claim WHERE 1=1", "claim_date"),
+        dated("SELECT COALESCE(SUM(amount_paid), 0), COUNT(*) FROM payment WHERE payment_method NOT IN ('Insurance')",
+              "payment_date"),
+        (details + " GROUP BY payment_method ORDER BY total DESC", params),
+    ]
+
+
+class _RecordingCursor:
+    """Passes statements through to a cursor and keeps them for EXPLAIN"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.statements: List[Tuple[str, List[Any]]] = []
+
+    def execute(self, query, params=()):
+        self.statements.append((query, params))
+        return self.cursor.execute(query, params)
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+
+def _benchmark_seed(count: int, batch_size: int = 10_000):
+    import random
+    import uuid
+    from core.database import get_db, DB_CONFIG
+
+    schema, live = _benchmark_schema(), DB_CONFIG['database']
+    with get_db() as (cursor, connection):
+        cursor.execute("SELECT patient_id FROM patient")
+        patients = [row['patient_id'] for row in cursor.fetchall()]
+        if not patients:
+            raise SystemExit("No patients to attach benchmark payments to")
+
+        # IF [NOT] EXISTS notes would raise under raise_on_warnings
+        cursor.execute("SET SESSION sql_notes = 0")
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{schema}`")
+        for table in _BENCHMARK_TABLES:
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS `{schema}`.`{table}` LIKE `{live}`.`{table}`")
+        cursor.execute(f"INSERT IGNORE INTO `{schema}`.claim SELECT * FROM `{live}`.claim")
+        connection.commit()
+
+        today = date.today()
+        for offset in range(0, count, batch_size):
+            rows = [
+                (
+                    str(uuid.uuid4()),
+                    random.choice(patients),
+                    round(random.uniform(10, 500), 2),
+                    random.choice(_BENCHMARK_METHODS),
+                    random.choice(_BENCHMARK_STATUSES),
+                    today - timedelta(days=random.randrange(5 * 365))
+                )
+                for _ in range(min(batch_size, count - offset))
+            ]
+            cursor.executemany(
+                f"""INSERT INTO `{schema}`.payment (payment_id, patient_id, amount_paid, payment_method, status, payment_date)
+                VALUES (%s, %s, %s, %s, %s, %s)""",
+                rows
+            )
+            connection.commit()
+            print(f"seeded {offset + len(rows)}/{count}", end="\r", flush=True)
+        print()
+
+        cursor.execute(f"DELETE FROM `{schema}`.report_payment_mix_daily")
+        cursor.execute(
+            f"""INSERT INTO `{schema}`.report_payment_mix_daily (mix_date, source, payment_method, row_count, amount)
+            SELECT payment_date, 'payment', payment_method, COUNT(*), SUM(amount_paid)
+            FROM `{schema}`.payment
+            GROUP BY payment_date, payment_method"""
+        )
+        cursor.execute(
+            f"""INSERT INTO `{schema}`.report_payment_mix_daily (mix_date, source, payment_method, row_count, amount)
+            SELECT claim_date, 'claim', '', COUNT(*), SUM(claim_amount)
+            FROM `{schema}`.claim
+            GROUP BY claim_date"""
+        )
+        for table in _BENCHMARK_TABLES:
+            cursor.execute(f"ANALYZE TABLE `{schema}`.`{table}`")
+            cursor.fetchall()
+
+
+def _benchmark_cleanup():
+    from core.database import get_db
+
+    schema = _benchmark_schema()
+    with get_db() as (cursor, connection):
+        cursor.execute("SET SESSION sql_notes = 0")
+        cursor.execute(f"DROP DATABASE IF EXISTS `{schema}`")
+    print(f"dropped benchmark schema {schema}")
+
+
+def _explain(cursor, statements: List[Tuple[str, List[Any]]]) -> List[str]:
+    lines = []
+    for query, params in statements:
+        cursor.execute("EXPLAIN " + query, params)
+        for row in cursor.fetchall():
+            lines.append(
+                f"    {str(row['table']):<26} type={str(row['type']):<6} key={row['key'] or '-':<33} "
+                f"rows={str(row['rows']):<9} {row['Extra'] or ''}"
+            )
+    return lines
+
+
+def _benchmark_ranges(repeat: int):
+    import statistics
+    import time
+    from core.database import get_db
+    from services.revenue_ledger import revenue_ledger
+
+    today = date.today()
+    ranges = [
+        ("all time", None, None),
+        ("last 365 days", (today - timedelta(days=365)).isoformat(), today.isoformat()),
+        ("last 30 days", (today - timedelta(days=30)).isoformat(), today.isoformat()),
+        ("yesterday", (today - timedelta(days=1)).isoformat(), (today - timedelta(days=1)).isoformat()),
+    ]
+
+    def timed(run) -> float:
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            samples.append((time.perf_counter() - started) * 1000)
+        return round(statistics.median(samples), 2)
+
+    schema = _benchmark_schema()
+    with get_db() as (cursor, connection):
+        try:
+            # Unqualified table names below resolve to the scratch copies
+            cursor.execute(f"USE `{schema}`")
+        except Exception:
+            raise SystemExit(f"No benchmark schema {schema}: run with --seed-payments N first")
+        cursor.execute("SELECT COUNT(*) as payments FROM payment")
+        print(f"{schema}: {cursor.fetchone()['payments']} payments, median of {repeat} runs\n")
+
+        for label, date_from, date_to in ranges:
+            legacy = _legacy_payment_mix_statements(date_from, date_to)
+
+            def run_legacy():
+                for query, params in legacy:
+                    cursor.execute(query, params)
+                    cursor.fetchall()
+
+            recorder = _RecordingCursor(cursor)
+            fetch_payment_mix(recorder, date_from, date_to)
+
+            print(f"{label}: legacy {timed(run_legacy)} ms, "
+                  f"payment mix {timed(lambda: fetch_payment_mix(cursor, date_from, date_to))} ms")
+            print("  legacy plan")
+            print("\n".join(_explain(cursor, legacy)))
+            print("  payment mix plan")
+            print("\n".join(_explain(cursor, recorder.statements)))
+
+            # The revenue ledger's reads of payment (partial months and the daily list)
+            ledger = _RecordingCursor(cursor)
+            revenue_ledger.payment_summary(
+                ledger,
+                date.fromisoformat(date_from) if date_from else None,
+                date.fromisoformat(date_to) if date_to else None
+            )
+            print("  revenue ledger plan")
+            print("\n".join(_explain(cursor, [
+                (query, params) for query, params in ledger.statements if "FROM payment\n" in query
+            ])))
+            print()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare the insurance vs out-of-pocket queries with the payment mix rollup")
+    parser.add_argument("--seed-payments", type=int, metavar="N",
+                        help="insert N synthetic payments into the scratch schema first")
+    parser.add_argument("--cleanup", action="store_true", help="drop the scratch schema and exit")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.cleanup:
+        _benchmark_cleanup()
+    else:
+        if args.seed_payments:
+            _benchmark_seed(args.seed_payments)
+        _benchmark_ranges(args.repeat)
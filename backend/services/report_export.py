@@ -0,0 +1,219 @@
+"""
+Report Export Service for MedSync
+Streams report rows as CSV or NDJSON straight from an unbuffered cursor,
+optionally gzip-compressed, so large extracts use constant memory
+"""
+
+from core.database import create_pool
+from services.report_data import ReportDefinition, json_default
+from io import StringIO
+from typing import Any, Callable, Dict, Iterator, List
+import threading
+import logging
+import json
+import zlib
+import csv
+import os
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class ExportBusy(Exception):
+    """Raised when every export slot stayed busy for REPORT_EXPORT_ACQUIRE_TIMEOUT seconds"""
+
+
+class ReportExport:
+    """
+    One export in progress
+
+    The query runs in the constructor, so SQL errors surface before the
+    response starts; afterwards rows are pulled with fetchmany() from an
+    unbuffered cursor and encoded chunk by chunk. The connection and the
+    export slot belong to the export until iteration finishes or the
+    response is closed; release is called exactly once, on close.
+    """
+
+    def __init__(self, report: ReportDefinition, filters: Dict[str, Any], fmt: str, compress: bool,
+                 batch_size: int, chunk_bytes: int, net_write_timeout: int, pool, release: Callable[[], None]):
+        self.report = report
+        self.fmt = fmt
+        self.compress = compress
+        self.batch_size = batch_size
+        self.chunk_bytes = chunk_bytes
+        self.rows = 0
+
+        self._release = release
+        self._closed = False
+        self._connection = None
+        self._cursor = None
+        try:
+            self._connection = pool.get_connection()
+            # Choosing summary or live tables needs a regular (buffered) read first
+            lookup = self._connection.cursor(dictionary=True, buffered=True)
+            try:
+                # A slow client must not make the server drop the result mid-stream
+                lookup.execute("SET SESSION net_write_timeout = %s", (net_write_timeout,))
+                query, params = report.statement(lookup, filters)
+            finally:
+                lookup.close()
+
+            self._cursor = self._connection.cursor(buffered=False)
+            self._cursor.execute(query, params)
+            self.columns: List[str] = list(self._cursor.column_names)
+        except Exception:
+            self.close()
+            raise
+
+    # ============================================
+    # ENCODING
+    # ============================================
+
+    def _encode_rows(self, rows) -> str:
+        if self.fmt == "csv":
+            buffer = StringIO()
+            csv.writer(buffer).writerows(rows)
+            return buffer.getvalue()
+        return "".join(
+            json.dumps(dict(zip(self.columns, row)), default=json_default) + "\n"
+            for row in rows
+        )
+
+    def _header(self) -> str:
+        if self.fmt == "csv":
+            buffer = StringIO()
+            csv.writer(buffer).writerow(self.columns)
+            return buffer.getvalue()
+        return ""
+
+    def _text_chunks(self) -> Iterator[bytes]:
+        # Send the header at once so the client sees the download start
+        header = self._header()
+        if header:
+            yield header.encode()
+
+        pending: List[str] = []
+        pending_size = 0
+
+        while True:
+            rows = self._cursor.fetchmany(self.batch_size)
+            if not rows:
+                break
+            self.rows += len(rows)
+            text = self._encode_rows(rows)
+            pending.append(text)
+            pending_size += len(text)
+            if pending_size >= self.chunk_bytes:
+                yield "".join(pending).encode()
+                pending, pending_size = [], 0
+
+        if pending:
+            yield "".join(pending).encode()
+
+    def __iter__(self) -> Iterator[bytes]:
+        try:
+            if not self.compress:
+                yield from self._text_chunks()
+            else:
+                # wbits=31: gzip container, so the output is a valid .gz file
+                compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+                for chunk in self._text_chunks():
+                    compressed = compressor.compress(chunk)
+                    if compressed:
+                        yield compressed
+                yield compressor.flush()
+            logger.info(f"Exported {self.rows} {self.report.name} rows as {self.fmt}{'.gz' if self.compress else ''}")
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Return the connection and free the export slot
+
+        When the client went away mid-stream, draining the rest of the result
+        could mean reading millions of rows nobody wants. The socket is shut
+        down instead: the server aborts the query on its next write, and the
+        pool reconnects the connection the next time it hands it out.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        connection, self._connection = self._connection, None
+        try:
+            if connection is None:
+                return
+            abandoned = connection.unread_result
+            try:
+                if abandoned:
+                    connection.shutdown()
+                elif self._cursor is not None:
+                    self._cursor.close()
+            except Exception as e:
+                logger.warning(f"Error closing {self.report.name} export cursor: {str(e)}")
+            try:
+                connection.close()
+            except Exception as e:
+                # Expected after shutdown(): the session reset fails, the connection still goes back
+                if not abandoned:
+                    logger.warning(f"Error returning {self.report.name} export connection: {str(e)}")
+        finally:
+            self._release()
+
+
+class ReportExportService:
+    """
+    Creates streaming exports for the row reports
+
+    A slow client can hold an export open for up to net_write_timeout, so
+    exports get a small pool of their own (REPORT_EXPORT_MAX_CONCURRENT
+    connections) rather than draining the shared read pool. A semaphore
+    with one permit per connection makes a request wait up to
+    REPORT_EXPORT_ACQUIRE_TIMEOUT seconds for a free slot before it gives
+    up with ExportBusy.
+    """
+
+    def __init__(self):
+        self.batch_size = int(os.getenv('REPORT_EXPORT_BATCH_SIZE', '1000'))
+        self.chunk_bytes = int(os.getenv('REPORT_EXPORT_CHUNK_KB', '64')) * 1024
+        self.net_write_timeout = int(os.getenv('REPORT_EXPORT_NET_WRITE_TIMEOUT', '600'))
+        self.max_concurrent = int(os.getenv('REPORT_EXPORT_MAX_CONCURRENT', '4'))
+        self.acquire_timeout = float(os.getenv('REPORT_EXPORT_ACQUIRE_TIMEOUT', '5'))
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = create_pool('medsync_export_pool', self.max_concurrent)
+        return self._pool
+
+    def open(self, report: ReportDefinition, filters: Dict[str, Any], fmt: str, compress: bool = False) -> ReportExport:
+        if report.query is None:
+            raise ValueError(f"Report '{report.name}' has no row export")
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported export format '{fmt}'")
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise ExportBusy(f"All {self.max_concurrent} export slots are busy; try again shortly")
+        try:
+            pool = self._get_pool()
+        except Exception:
+            self._slots.release()
+            raise
+        return ReportExport(
+            report, filters, fmt, compress,
+            batch_size=self.batch_size,
+            chunk_bytes=self.chunk_bytes,
+            net_write_timeout=self.net_write_timeout,
+            pool=pool,
+            release=self._slots.release
+        )
+
+
+# Create singleton instance
+report_export = ReportExportService()
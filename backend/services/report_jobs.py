@@ -0,0 +1,290 @@
+"""
+Report Job Service for MedSync
+Queues PDF report requests, renders them in a bounded process pool and
+keeps the finished files in the report cache
+"""
+
+from core.database import get_db, get_read_pool
+from services.pdf_generator import render_report
+from services.report_data import ReportDefinition
+from services.report_cache import report_cache
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional
+import multiprocessing
+import threading
+import logging
+import json
+import time
+import uuid
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class ReportQueueFull(Exception):
+    """Raised when the number of waiting jobs reached REPORT_JOB_MAX_PENDING"""
+
+
+class ReportJob:
+    """One submitted report; state goes queued -> running -> done | failed"""
+
+    def __init__(self, report: ReportDefinition, filters: Dict[str, Any]):
+        self.job_id = str(uuid.uuid4())
+        self.report = report
+        self.filters = filters
+        self.request_key = json.dumps({"report": report.name, "filters": filters}, sort_keys=True, default=str)
+        self.cache_key: Optional[str] = None
+        self.state = "queued"
+        self.error: Optional[str] = None
+        self.cache_hit = False
+        self.rows: Optional[int] = None
+        self.size_bytes: Optional[int] = None
+        self.render_ms: Optional[float] = None
+        self.submitted_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def filename(self) -> str:
+        return f"{self.report.filename}_{self.submitted_at.strftime('%Y%m%d_%H%M%S')}.pdf"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "report_type": self.report.name,
+            "filters": self.filters,
+            "state": self.state,
+            "error": self.error,
+            "cache_hit": self.cache_hit,
+            "rows": self.rows,
+            "size_bytes": self.size_bytes,
+            "render_ms": self.render_ms,
+            "submitted_at": self.submitted_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class ReportJobService:
+    """
+    Report job queue
+
+    A job runs its SQL on a read connection in a dispatcher thread and hands
+    the rows to a process pool for rendering, so ReportLab's CPU work never
+    holds the API process's GIL. Dispatcher threads match the render
+    workers, so at most REPORT_RENDER_WORKERS jobs are in flight and the
+    rest wait in the queue (bounded by REPORT_JOB_MAX_PENDING).
+
+    Finished PDFs go to the report cache under the same key the /pdf
+    endpoints use, so a submit whose report is already cached at the
+    current data version completes immediately from disk. Job records live
+    in this process and are forgotten REPORT_JOB_RETENTION seconds after
+    they finish. The API therefore has to run as a single worker process
+    (the Dockerfile's plain uvicorn command): with several workers, a job
+    status or download request can land on a worker that never saw the
+    job. The rendered PDFs themselves are shared through the disk cache.
+    """
+
+    def __init__(self):
+        self.workers = int(os.getenv('REPORT_RENDER_WORKERS', '2'))
+        self.max_pending = int(os.getenv('REPORT_JOB_MAX_PENDING', '20'))
+        self.retention_seconds = int(os.getenv('REPORT_JOB_RETENTION', '3600'))
+
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, ReportJob] = {}
+        self._dispatcher = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="report-job")
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._render_times = deque(maxlen=200)
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "cache_hits": 0, "rejected": 0}
+
+    # ============================================
+    # RENDERING
+    # ============================================
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: the API process has DB pools and threads that must not be forked
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def render(self, report: ReportDefinition, data, filters: Dict[str, Any], key: str) -> Path:
+        """
+        Render a report in the process pool into the cache entry for key
+
+        The worker writes the PDF to a temp file in the cache directory,
+        which is then moved into place, so even very large reports never
+        exist as one bytes object in either process.
+        """
+        return report_cache.adopt(key, "pdf", self._render_temp(report, data, filters, key))
+
+    def render_open(self, report: ReportDefinition, data, filters: Dict[str, Any], key: str) -> BinaryIO:
+        """render(), returning an open handle on the PDF for streaming it in a response"""
+        return report_cache.adopt_open(key, "pdf", self._render_temp(report, data, filters, key))
+
+    def _render_temp(self, report: ReportDefinition, data, filters: Dict[str, Any], key: str) -> Path:
+        tmp_path = report_cache.temp_path(key, "pdf")
+        started = time.perf_counter()
+        try:
+            self._get_pool().submit(
+                render_report, report.renderer, data, report.render_options(filters), str(tmp_path)
+            ).result()
+        except Exception as e:
+            tmp_path.unlink(missing_ok=True)
+            if isinstance(e, BrokenProcessPool):
+                # A worker died (e.g. OOM); start a fresh pool for later jobs
+                with self._lock:
+                    self._pool = None
+            raise
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+        self._render_times.append(elapsed_ms)
+        return tmp_path
+
+    # ============================================
+    # RETENTION
+    # ============================================
+
+    def purge_expired(self) -> Dict[str, Any]:
+        """Forget finished jobs past their retention and drop expired cache files"""
+        cutoff = datetime.now().timestamp() - self.retention_seconds
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished_at is not None and job.finished_at.timestamp() < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+        return {"removed_jobs": len(expired), **report_cache.purge_expired()}
+
+    # ============================================
+    # JOBS
+    # ============================================
+
+    def submit(self, report: ReportDefinition, filters: Dict[str, Any]) -> ReportJob:
+        """Queue a report, or return a fresh cached or already pending job for the same filters"""
+        filters = report.normalize_filters(filters)
+        job = ReportJob(report, filters)
+
+        with get_db(get_read_pool()) as (cursor, connection):
+            job.cache_key = report_cache.key(cursor, report, "pdf", filters)
+        cached = report_cache.open(job.cache_key, "pdf")
+        if cached is not None:
+            with cached:
+                cached_size = os.fstat(cached.fileno()).st_size
+
+        # Duplicate check and insert under one lock hold, so two identical
+        # submits can never both queue a job
+        with self._lock:
+            for pending in self._jobs.values():
+                if pending.request_key == job.request_key and pending.state in ("queued", "running"):
+                    return pending
+
+            if cached is not None:
+                job.state = "done"
+                job.cache_hit = True
+                job.size_bytes = cached_size
+                job.finished_at = datetime.now()
+                self._jobs[job.job_id] = job
+                self.counters["submitted"] += 1
+                self.counters["cache_hits"] += 1
+                return job
+
+            if self._count("queued") >= self.max_pending:
+                self.counters["rejected"] += 1
+                raise ReportQueueFull(f"Report queue is full ({self.max_pending} jobs waiting)")
+
+            self._jobs[job.job_id] = job
+            self.counters["submitted"] += 1
+
+        self._dispatcher.submit(self._run, job)
+        return job
+
+    def _run(self, job: ReportJob):
+        job.state = "running"
+        job.started_at = datetime.now()
+        try:
+            with get_db(get_read_pool()) as (cursor, connection):
+                # Re-key: the data may have changed while the job was queued
+                job.cache_key = report_cache.key(cursor, job.report, "pdf", job.filters)
+                data = job.report.load(cursor, job.filters)
+
+            if job.report.is_empty(data):
+                job.error = job.report.empty_detail
+                job.state = "failed"
+            else:
+                job.rows = len(data) if isinstance(data, list) else None
+                started = time.perf_counter()
+                path = self.render(job.report, data, job.filters, job.cache_key)
+                job.render_ms = round((time.perf_counter() - started) * 1000, 2)
+                job.size_bytes = path.stat().st_size
+                job.state = "done"
+        except Exception as e:
+            logger.error(f"Report job {job.job_id} ({job.report.name}) failed: {str(e)}", exc_info=True)
+            job.error = str(e)
+            job.state = "failed"
+        finally:
+            job.finished_at = datetime.now()
+            with self._lock:
+                self.counters["completed" if job.state == "done" else "failed"] += 1
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        return self._jobs.get(job_id)
+
+    def open_result(self, job: ReportJob) -> Optional[BinaryIO]:
+        """Open handle on the PDF of a finished job, or None if it has expired from the cache"""
+        if job.state != "done":
+            return None
+        return report_cache.open(job.cache_key, "pdf")
+
+    # ============================================
+    # METRICS
+    # ============================================
+
+    def _count(self, state: str) -> int:
+        """Jobs in a state; the caller holds _lock"""
+        return sum(1 for job in self._jobs.values() if job.state == state)
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return self._count("queued")
+
+    def metrics(self) -> Dict[str, Any]:
+        render_times = sorted(self._render_times)
+        with self._lock:
+            queued = self._count("queued")
+            running = self._count("running")
+            counters = dict(self.counters)
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "queue_depth": queued,
+            "running": running,
+            **counters,
+            "render_ms": {
+                "samples": len(render_times),
+                "avg": round(sum(render_times) / len(render_times), 2) if render_times else None,
+                "p50": render_times[len(render_times) // 2] if render_times else None,
+                "p95": render_times[int(len(render_times) * 0.95)] if render_times else None,
+                "max": render_times[-1] if render_times else None
+            },
+            "disk_cache": report_cache.stats()
+        }
+
+    def shutdown(self):
+        self._dispatcher.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+# Create singleton instance
+report_jobs = ReportJobService()
@@ -0,0 +1,135 @@
+"""
+Report Pre-generation Service for MedSync
+Builds the standard report variants into the report cache overnight, so
+the morning's report requests are served from disk instead of rendered
+"""
+
+from core.database import get_db, get_read_pool
+from services.report_data import get_report, encode_payload
+from services.report_cache import report_cache
+from services.report_jobs import report_jobs
+from datetime import date, timedelta
+from typing import Any, Dict, List, Tuple
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class ReportPregenerationService:
+    """
+    Nightly warm-up of the report cache
+
+    A variant is a report plus exactly the filters the staff reports page
+    sends: no dates, the current year for doctor revenue and the default
+    sort for balances, repeated per branch and for the standard periods
+    (yesterday, month to date, previous month). For each variant the /data
+    JSON is built here and the PDF rendered in the report process pool,
+    under the same cache keys the endpoints compute, so a request made
+    before the report's source tables change is a cache hit. Anything else
+    still renders on demand.
+
+    Scheduled after the nightly rebuilds, which bump data versions and
+    would otherwise invalidate the fresh entries straight away. Closed
+    periods (yesterday, previous month) are keyed by per-day versions, so
+    their entries survive today's writes and summary refreshes of other
+    days; changes only the nightly rebuilds pick up (cascaded deletes)
+    reach them through the cache TTL.
+    """
+
+    def __init__(self):
+        self.render_pdfs = os.getenv('REPORT_PREGENERATE_PDF', 'true').lower() == 'true'
+
+    # ============================================
+    # VARIANTS
+    # ============================================
+
+    def _periods(self, today: date) -> List[Tuple[date, date]]:
+        """Yesterday, month to date and the previous month, relative to the last closed day"""
+        day = today - timedelta(days=1)
+        month_start = day.replace(day=1)
+        previous_end = month_start - timedelta(days=1)
+        periods = [(day, day), (month_start, day), (previous_end.replace(day=1), previous_end)]
+        return list(dict.fromkeys(periods))
+
+    def variants(self, cursor, today: date) -> List[Tuple[str, Dict[str, Any]]]:
+        cursor.execute("SELECT branch_name FROM branch WHERE is_active = TRUE ORDER BY branch_name")
+        branches = [None] + [row['branch_name'] for row in cursor.fetchall()]
+
+        ranges = [{}] + [
+            {"date_from": start.isoformat(), "date_to": end.isoformat()}
+            for start, end in self._periods(today)
+        ]
+        day = today - timedelta(days=1)
+        previous = day.replace(day=1) - timedelta(days=1)
+
+        variants = [
+            ("branch-appointments", {**dates, "branch_name": branch})
+            for dates in ranges for branch in branches
+        ]
+        variants += [
+            ("doctor-revenue", {"year": today.year}),
+            ("doctor-revenue", {"year": day.year, "month": day.strftime("%Y-%m")}),
+            ("doctor-revenue", {"year": previous.year, "month": previous.strftime("%Y-%m")}),
+            ("outstanding-balances", {"sort_by": "balance_desc"}),
+        ]
+        variants += [("treatments-by-category", dates) for dates in ranges]
+        variants += [("insurance-vs-outofpocket", dates) for dates in ranges]
+        return variants
+
+    # ============================================
+    # GENERATION
+    # ============================================
+
+    def _generate(self, report_name: str, filters: Dict[str, Any], counts: Dict[str, int]):
+        report = get_report(report_name)
+        data = None
+        pdf_key = None
+
+        # One read transaction: the version in each key matches the rows read under it
+        with get_db(get_read_pool()) as (cursor, connection):
+            data_key = report_cache.key(cursor, report, "data", filters)
+            if report_cache.contains(data_key, "json"):
+                counts["cached"] += 1
+            else:
+                report_cache.put(data_key, "json", encode_payload(report.build_payload(cursor, filters)))
+                counts["data_built"] += 1
+
+            if self.render_pdfs:
+                pdf_key = report_cache.key(cursor, report, "pdf", filters)
+                if report_cache.contains(pdf_key, "pdf"):
+                    counts["cached"] += 1
+                    pdf_key = None
+                else:
+                    data = report.load(cursor, filters)
+
+        if pdf_key is None:
+            return
+        if report.is_empty(data):
+            counts["skipped_empty"] += 1
+            return
+        report_jobs.render(report, data, filters, pdf_key)
+        counts["pdfs_rendered"] += 1
+
+    def run(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        counts = {"data_built": 0, "pdfs_rendered": 0, "cached": 0, "skipped_empty": 0, "failed": 0}
+
+        with get_db(get_read_pool()) as (cursor, connection):
+            variants = self.variants(cursor, date.today())
+
+        for report_name, filters in variants:
+            try:
+                self._generate(report_name, filters, counts)
+            except Exception as e:
+                counts["failed"] += 1
+                logger.warning(f"Pre-generating {report_name} {filters} failed: {str(e)}")
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(f"Report pre-generation: {len(variants)} variants, {counts} in {elapsed_ms} ms")
+        return {"variants": len(variants), **counts, "elapsed_ms": elapsed_ms}
+
+
+# Create singleton instance
+report_pregeneration = ReportPregenerationService()
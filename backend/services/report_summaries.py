@@ -0,0 +1,222 @@
+"""
+Report Summary Service for MedSync
+Refreshes the materialized report summaries (database/16_report_summaries.sql)
+partition by partition and decides whether reports may read them or have
+to fall back to the live aggregate
+"""
+
+from core.database import get_db
+from datetime import datetime
+from typing import Optional, Dict, Any
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# summary name -> procedure recomputing one (partition_date, partition_key)
+SUMMARIES = {
+    "branch_appointment_daily": "RefreshBranchAppointmentPartition",
+    "doctor_monthly_revenue": "RefreshDoctorRevenuePartition",
+}
+
+
+class ReportSummaryService:
+    """
+    Incremental maintenance of report_branch_appointment_daily and
+    report_doctor_monthly_revenue
+
+    Triggers mark the partitions a write touched in report_summary_dirty;
+    refresh() recomputes marked partitions oldest first, one transaction
+    each, and only clears a mark if nobody re-marked it meanwhile. Every
+    run is written to report_refresh_log.
+
+    Reports read a summary while REPORT_DATA_SOURCE is 'summary' and its
+    oldest pending mark is younger than REPORT_SUMMARY_MAX_STALENESS
+    seconds; otherwise (refresher stopped or behind, migration missing)
+    they run the live query, which is always correct but slower.
+
+    report_payment_mix_daily (database/17_payment_mix_daily.sql) is posted
+    synchronously by its triggers and only takes part in the nightly
+    rebuild.
+    """
+
+    def __init__(self):
+        self.data_source = os.getenv('REPORT_DATA_SOURCE', 'summary')
+        self.max_staleness_seconds = int(os.getenv('REPORT_SUMMARY_MAX_STALENESS', '300'))
+        self.refresh_seconds = int(os.getenv('REPORT_SUMMARY_REFRESH_SECONDS', '60'))
+        self.batch_size = int(os.getenv('REPORT_SUMMARY_BATCH_SIZE', '500'))
+
+    # ============================================
+    # READ PATH
+    # ============================================
+
+    def staleness_seconds(self, cursor, summary_name: str) -> float:
+        """Age of the oldest unrefreshed change to a summary (0 when up to date)"""
+        cursor.execute(
+            """SELECT TIMESTAMPDIFF(MICROSECOND, MIN(first_marked_at), CURRENT_TIMESTAMP(6)) as age
+            FROM report_summary_dirty
+            WHERE summary_name = %s""",
+            (summary_name,)
+        )
+        row = cursor.fetchone()
+        return round(int(row['age']) / 1_000_000, 3) if row and row['age'] is not None else 0.0
+
+    def serves(self, cursor, summary_name: str) -> bool:
+        """Whether a report should read the summary instead of the live aggregate"""
+        if self.data_source != 'summary':
+            return False
+        try:
+            return self.staleness_seconds(cursor, summary_name) <= self.max_staleness_seconds
+        except Exception as e:
+            logger.warning(f"Report summary {summary_name} unavailable, using live query: {str(e)}")
+            return False
+
+    # ============================================
+    # REFRESH
+    # ============================================
+
+    def _log(self, cursor, mode: str, partitions: int, started_at: datetime,
+             duration_ms: float, error: Optional[str] = None):
+        cursor.execute(
+            """INSERT INTO report_refresh_log (mode, partitions, started_at, finished_at, duration_ms, error)
+            VALUES (%s, %s, %s, %s, %s, %s)""",
+            (mode, partitions, started_at, datetime.now(), duration_ms, error)
+        )
+
+    def _write_failure_log(self, mode: str, partitions: int, started_at: datetime, started: float, error: str):
+        try:
+            with get_db() as (cursor, connection):
+                elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+                self._log(cursor, mode, partitions, started_at, elapsed_ms, error)
+        except Exception as e:
+            logger.warning(f"Could not write report refresh log: {str(e)}")
+
+    def refresh(self) -> Dict[str, Any]:
+        """Recompute up to REPORT_SUMMARY_BATCH_SIZE marked partitions"""
+        started_at = datetime.now()
+        started = time.perf_counter()
+        refreshed = 0
+        try:
+            with get_db() as (cursor, connection):
+                cursor.execute(
+                    """SELECT summary_name, partition_date, partition_key, marked_at
+                    FROM report_summary_dirty
+                    ORDER BY first_marked_at
+                    LIMIT %s""",
+                    (self.batch_size,)
+                )
+                marks = cursor.fetchall()
+
+                for mark in marks:
+                    procedure = SUMMARIES.get(mark['summary_name'])
+                    if procedure is not None:
+                        cursor.execute(f"CALL {procedure}(%s, %s)", (mark['partition_date'], mark['partition_key']))
+                        # Re-keys cached reports over closed periods that include this partition
+                        cursor.execute(
+                            "CALL BumpReportDayVersion('report_summaries', %s)",
+                            (mark['partition_date'],)
+                        )
+                    # A newer mark means a write landed after this refresh read the partition
+                    cursor.execute(
+                        """DELETE FROM report_summary_dirty
+                        WHERE summary_name = %s AND partition_date = %s AND partition_key = %s
+                            AND marked_at = %s""",
+                        (mark['summary_name'], mark['partition_date'], mark['partition_key'], mark['marked_at'])
+                    )
+                    connection.commit()
+                    refreshed += 1
+
+                elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+                if refreshed:
+                    # Cached report results read before this refresh are now outdated
+                    cursor.execute("CALL BumpReportDataVersion('report_summaries')")
+                    self._log(cursor, 'incremental', refreshed, started_at, elapsed_ms)
+        except Exception as e:
+            logger.error(f"Report summary refresh failed after {refreshed} partitions: {str(e)}", exc_info=True)
+            self._write_failure_log('incremental', refreshed, started_at, started, str(e))
+            raise
+
+        if refreshed:
+            logger.info(f"Report summaries: refreshed {refreshed} partitions in {elapsed_ms} ms")
+        return {
+            "partitions": refreshed,
+            "more_pending": len(marks) == self.batch_size,
+            "elapsed_ms": elapsed_ms
+        }
+
+    def rebuild(self) -> Dict[str, Any]:
+        """Recompute every summary from scratch (covers cascaded deletes no trigger sees)"""
+        started_at = datetime.now()
+        started = time.perf_counter()
+        try:
+            with get_db() as (cursor, connection):
+                cursor.execute("CALL RebuildReportSummaries()")
+                cursor.execute("CALL RebuildPaymentMixDaily()")
+                cursor.execute("SELECT COUNT(*) as rows_count FROM report_branch_appointment_daily")
+                branch_rows = cursor.fetchone()['rows_count']
+                cursor.execute("SELECT COUNT(*) as rows_count FROM report_doctor_monthly_revenue")
+                revenue_rows = cursor.fetchone()['rows_count']
+                cursor.execute("SELECT COUNT(*) as rows_count FROM report_payment_mix_daily")
+                payment_mix_rows = cursor.fetchone()['rows_count']
+                cursor.execute("CALL BumpReportDataVersion('report_summaries')")
+                elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+                self._log(cursor, 'full', branch_rows + revenue_rows + payment_mix_rows, started_at, elapsed_ms)
+        except Exception as e:
+            logger.error(f"Report summary rebuild failed: {str(e)}", exc_info=True)
+            self._write_failure_log('full', 0, started_at, started, str(e))
+            raise
+
+        logger.info(
+            f"Report summaries rebuilt: {branch_rows} branch rows, {revenue_rows} revenue rows, "
+            f"{payment_mix_rows} payment mix rows in {elapsed_ms} ms"
+        )
+        return {
+            "branch_appointment_rows": branch_rows,
+            "doctor_revenue_rows": revenue_rows,
+            "payment_mix_rows": payment_mix_rows,
+            "elapsed_ms": elapsed_ms,
+            "rebuilt_at": datetime.now().isoformat()
+        }
+
+    # ============================================
+    # STATUS
+    # ============================================
+
+    def status(self) -> Dict[str, Any]:
+        with get_db() as (cursor, connection):
+            summaries = {}
+            for summary_name in SUMMARIES:
+                cursor.execute(
+                    "SELECT COUNT(*) as pending FROM report_summary_dirty WHERE summary_name = %s",
+                    (summary_name,)
+                )
+                pending = cursor.fetchone()['pending']
+                staleness = self.staleness_seconds(cursor, summary_name)
+                summaries[summary_name] = {
+                    "pending_partitions": int(pending),
+                    "staleness_seconds": staleness,
+                    "serving": self.data_source == 'summary' and staleness <= self.max_staleness_seconds
+                }
+
+            cursor.execute(
+                """SELECT mode, partitions, started_at, finished_at, duration_ms, error
+                FROM report_refresh_log
+                ORDER BY refresh_id DESC
+                LIMIT 10"""
+            )
+            recent = cursor.fetchall()
+
+        return {
+            "data_source": self.data_source,
+            "max_staleness_seconds": self.max_staleness_seconds,
+            "summaries": summaries,
+            "recent_refreshes": [
+                {**row, "duration_ms": float(row['duration_ms']) if row['duration_ms'] is not None else None}
+                for row in recent
+            ]
+        }
+
+
+# Create singleton instance
+report_summaries = ReportSummaryService()
@@ -0,0 +1,256 @@
+"""
+Revenue Ledger Service for MedSync
+Serves invoice and payment statistics from the trigger-posted monthly
+ledgers (database/14_revenue_ledger.sql) and rebuilds them nightly
+"""
+
+from core.database import get_db
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Optional, Dict, Any, List, Tuple
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(day: date) -> date:
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def split_range(date_from: Optional[date], date_to: Optional[date]) -> Tuple[Optional[Tuple], List[Tuple[date, date]]]:
+    """
+    Split a payment date range into whole ledger months and leftover days
+
+    Returns ((first_month, last_month) or None, [(day_from, day_to), ...]).
+    A missing month bound means open-ended; leftover day ranges are
+    inclusive and must be read from the payment table.
+    """
+    first = date_from if date_from is None or date_from.day == 1 else next_month(date_from)
+    if date_to is None:
+        last = None
+    elif next_month(date_to) - timedelta(days=1) == date_to:
+        last = month_start(date_to)
+    else:
+        last = month_start(month_start(date_to) - timedelta(days=1))
+
+    # No whole month inside the range: read it all from the payment table
+    if first is not None and last is not None and first > last:
+        return None, [(date_from, date_to)]
+
+    leftovers = []
+    if date_from is not None and first != date_from:
+        leftovers.append((date_from, first - timedelta(days=1)))
+    if date_to is not None and last is not None and next_month(last) <= date_to:
+        leftovers.append((next_month(last), date_to))
+    return (first, last), leftovers
+
+
+class RevenueLedgerService:
+    """Reads of revenue_ledger / payment_ledger"""
+
+    # ============================================
+    # INVOICE STATISTICS
+    # ============================================
+
+    def invoice_statistics(self, cursor, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Totals for /invoices/statistics/summary
+
+        Overdue = everything falling due before today: whole past months
+        come from the ledger's due_* columns, the current month's days
+        from an index range on invoice.due_date.
+        """
+        today = today or date.today()
+        this_month = month_start(today)
+
+        cursor.execute(
+            """SELECT
+                COALESCE(SUM(invoice_count), 0) as total_invoices,
+                COALESCE(SUM(invoiced_amount + tax_amount), 0) as total_revenue,
+                COALESCE(SUM(CASE WHEN ledger_month < %s THEN due_count END), 0) as overdue_count,
+                COALESCE(SUM(CASE WHEN ledger_month < %s THEN due_amount END), 0) as overdue_amount,
+                COALESCE(SUM(CASE WHEN ledger_month = %s THEN invoice_count END), 0) as month_count,
+                COALESCE(SUM(CASE WHEN ledger_month = %s THEN invoiced_amount + tax_amount END), 0) as month_amount,
+                MAX(updated_at) as ledger_updated_at
+            FROM revenue_ledger""",
+            (this_month, this_month, this_month, this_month)
+        )
+        totals = cursor.fetchone()
+
+        cursor.execute(
+            """SELECT COUNT(*) as count, COALESCE(SUM(sub_total + COALESCE(tax_amount, 0)), 0) as amount
+            FROM invoice
+            WHERE due_date >= %s AND due_date < %s""",
+            (this_month, today)
+        )
+        overdue_this_month = cursor.fetchone()
+
+        return {
+            "total_revenue": float(totals['total_revenue']),
+            "total_invoices": int(totals['total_invoices']),
+            "overdue_invoices": {
+                "count": int(totals['overdue_count']) + int(overdue_this_month['count']),
+                "amount": float(totals['overdue_amount']) + float(overdue_this_month['amount'])
+            },
+            "current_month": {
+                "count": int(totals['month_count']),
+                "amount": float(totals['month_amount'])
+            },
+            "ledger_updated_at": totals['ledger_updated_at']
+        }
+
+    # ============================================
+    # PAYMENT STATISTICS
+    # ============================================
+
+    def payment_breakdown(self, cursor, date_from: Optional[date], date_to: Optional[date]) -> Dict[Tuple[str, str], List]:
+        """(status, payment_method) -> [count, amount] for a payment_date range"""
+        cells = defaultdict(lambda: [0, 0.0])
+        months, leftovers = split_range(date_from, date_to)
+
+        if months is not None:
+            conditions, params = [], []
+            if months[0] is not None:
+                conditions.append("ledger_month >= %s")
+                params.append(months[0])
+            if months[1] is not None:
+                conditions.append("ledger_month <= %s")
+                params.append(months[1])
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            cursor.execute(
+                f"""SELECT status, payment_method, SUM(payment_count) as count, SUM(amount) as amount
+                FROM payment_ledger
+                {where}
+                GROUP BY status, payment_method""",
+                params
+            )
+            for row in cursor.fetchall():
+                cell = cells[(row['status'], row['payment_method'])]
+                cell[0] += int(row['count'])
+                cell[1] += float(row['amount'])
+
+        for day_from, day_to in leftovers:
+            conditions, params = [], []
+            if day_from is not None:
+                conditions.append("payment_date >= %s")
+                params.append(day_from)
+            if day_to is not None:
+                conditions.append("payment_date <= %s")
+                params.append(day_to)
+            cursor.execute(
+                f"""SELECT status, payment_method, COUNT(*) as count, SUM(amount_paid) as amount
+                FROM payment
+                WHERE {' AND '.join(conditions)}
+                GROUP BY status, payment_method""",
+                params
+            )
+            for row in cursor.fetchall():
+                cell = cells[(row['status'], row['payment_method'])]
+                cell[0] += int(row['count'])
+                cell[1] += float(row['amount'] or 0)
+
+        return cells
+
+    def payment_statistics(self, cursor, date_from: Optional[date] = None,
+                           date_to: Optional[date] = None) -> Dict[str, Any]:
+        """by_status / by_payment_method in the /payments/statistics/summary shape"""
+        cells = self.payment_breakdown(cursor, date_from, date_to)
+
+        by_status = defaultdict(lambda: [0, 0.0])
+        by_method = defaultdict(lambda: [0, 0.0])
+        for (status, method), (count, amount) in cells.items():
+            if count == 0:
+                continue
+            by_status[status][0] += count
+            by_status[status][1] += amount
+            by_method[method][0] += count
+            by_method[method][1] += amount
+
+        return {
+            "by_status": [
+                {"status": status, "count": count, "total_amount": round(amount, 2)}
+                for status, (count, amount) in by_status.items()
+            ],
+            "by_payment_method": sorted(
+                (
+                    {"payment_method": method, "count": count, "total_amount": round(amount, 2)}
+                    for method, (count, amount) in by_method.items()
+                ),
+                key=lambda row: row['total_amount'],
+                reverse=True
+            )
+        }
+
+    def payment_summary(self, cursor, date_from: Optional[date] = None,
+                        date_to: Optional[date] = None) -> Dict[str, Any]:
+        """The /payments/statistics/summary document: ledger totals plus the newest 30 days"""
+        summary = self.payment_statistics(cursor, date_from, date_to)
+
+        date_filter = ""
+        params = []
+        if date_from and date_to:
+            date_filter = "WHERE payment_date BETWEEN %s AND %s"
+            params = [date_from, date_to]
+        elif date_from:
+            date_filter = "WHERE payment_date >= %s"
+            params = [date_from]
+        elif date_to:
+            date_filter = "WHERE payment_date <= %s"
+            params = [date_to]
+
+        # Daily statistics (newest 30 days, read in payment_date index order)
+        cursor.execute(
+            f"""SELECT 
+                payment_date,
+                COUNT(*) as payment_count,
+                SUM(amount_paid) as daily_total
+            FROM payment
+            {date_filter}
+            GROUP BY payment_date
+            ORDER BY payment_date DESC
+            LIMIT 30""",
+            params
+        )
+        daily_stats = cursor.fetchall()
+
+        return {
+            "by_status": summary['by_status'],
+            "by_payment_method": summary['by_payment_method'],
+            "daily_statistics": daily_stats or [],
+            "date_range": {
+                "from": str(date_from) if date_from else None,
+                "to": str(date_to) if date_to else None
+            }
+        }
+
+    # ============================================
+    # REBUILD
+    # ============================================
+
+    def rebuild(self) -> Dict[str, Any]:
+        """Recompute both ledgers from invoice and payment (nightly drift correction)"""
+        started = time.perf_counter()
+        with get_db() as (cursor, connection):
+            cursor.execute("CALL RebuildRevenueLedger()")
+            cursor.execute("SELECT COUNT(*) as rows_count FROM revenue_ledger")
+            revenue_rows = cursor.fetchone()['rows_count']
+            cursor.execute("SELECT COUNT(*) as rows_count FROM payment_ledger")
+            payment_rows = cursor.fetchone()['rows_count']
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(f"Revenue ledger rebuilt: {revenue_rows} revenue rows, {payment_rows} payment rows in {elapsed_ms} ms")
+        return {
+            "revenue_ledger_rows": revenue_rows,
+            "payment_ledger_rows": payment_rows,
+            "elapsed_ms": elapsed_ms,
+            "rebuilt_at": datetime.now().isoformat()
+        }
+
+
+# Create singleton instance
+revenue_ledger = RevenueLedgerService()
@@ -0,0 +1,145 @@
+"""
+Background Job Scheduler for MedSync
+Runs periodic maintenance jobs (archival, sweeps, rollup reconciliation)
+in daemon threads started from the FastAPI lifespan handler
+"""
+
+from core.database import get_db_connection, get_db_cursor
+from datetime import datetime, timedelta, time
+from typing import Callable, Dict, Optional, Any
+import threading
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledJob:
+    """A named job that runs either every N seconds or once a day at a fixed time"""
+
+    def __init__(self, name: str, func: Callable[[], Any],
+                 interval_seconds: Optional[int] = None, daily_at: Optional[time] = None):
+        if not interval_seconds and not daily_at:
+            raise ValueError("A job needs either interval_seconds or daily_at")
+        self.name = name
+        self.func = func
+        self.interval_seconds = interval_seconds
+        self.daily_at = daily_at
+        self.runs = 0
+        self.last_started_at: Optional[datetime] = None
+        self.last_finished_at: Optional[datetime] = None
+        self.last_result: Any = None
+        self.last_error: Optional[str] = None
+        self.running = False
+
+    def seconds_until_next_run(self, now: datetime) -> float:
+        """Seconds to wait before the next run"""
+        if self.interval_seconds:
+            return float(self.interval_seconds)
+        next_run = datetime.combine(now.date(), self.daily_at)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        return (next_run - now).total_seconds()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "interval_seconds": self.interval_seconds,
+            "daily_at": str(self.daily_at) if self.daily_at else None,
+            "runs": self.runs,
+            "running": self.running,
+            "last_started_at": self.last_started_at.isoformat() if self.last_started_at else None,
+            "last_finished_at": self.last_finished_at.isoformat() if self.last_finished_at else None,
+            "last_result": self.last_result,
+            "last_error": self.last_error
+        }
+
+
+class JobScheduler:
+    """Thread-based scheduler; each job gets its own daemon thread"""
+
+    def __init__(self):
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._stop_event = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def register(self, name: str, func: Callable[[], Any],
+                 interval_seconds: Optional[int] = None, daily_at: Optional[time] = None):
+        """Register a job. Jobs registered after start() are picked up on the next start()"""
+        self.jobs[name] = ScheduledJob(name, func, interval_seconds, daily_at)
+
+    def start(self):
+        """Start all registered jobs unless ENABLE_BACKGROUND_JOBS is false"""
+        if os.getenv('ENABLE_BACKGROUND_JOBS', 'true').lower() in ('0', 'false', 'no'):
+            logger.info("Background jobs disabled via ENABLE_BACKGROUND_JOBS")
+            return
+        self._stop_event.clear()
+        for job in self.jobs.values():
+            thread = threading.Thread(target=self._loop, args=(job,), name=f"job-{job.name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {len(self._threads)} background jobs")
+
+    def stop(self):
+        """Signal all job threads to exit"""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def _loop(self, job: ScheduledJob):
+        while not self._stop_event.wait(job.seconds_until_next_run(datetime.now())):
+            try:
+                self.run_now(job.name)
+            except Exception:
+                # Already logged and recorded on the job; keep the loop alive
+                pass
+
+    def run_now(self, name: str, **kwargs) -> Dict[str, Any]:
+        """
+        Run a job immediately in the calling thread
+
+        A MySQL named lock makes sure only one API worker runs a given job
+        at a time; if another worker holds it the run is skipped. Keyword
+        arguments are passed to the job function (manual runs with custom bounds).
+        """
+        job = self.jobs.get(name)
+        if not job:
+            raise KeyError(f"Unknown job: {name}")
+
+        with self._lock:
+            if job.running:
+                return {"skipped": True, "reason": "already running"}
+            job.running = True
+
+        try:
+            with get_db_connection() as connection:
+                with get_db_cursor(connection) as cursor:
+                    cursor.execute("SELECT GET_LOCK(%s, 0) AS acquired", (f"medsync_job_{name}",))
+                    if not cursor.fetchone()['acquired']:
+                        logger.info(f"Job {name} skipped, another worker holds the lock")
+                        return {"skipped": True, "reason": "locked by another worker"}
+                    try:
+                        job.last_started_at = datetime.now()
+                        job.last_result = job.func(**kwargs)
+                        job.last_error = None
+                        job.runs += 1
+                        logger.info(f"Job {name} finished: {job.last_result}")
+                        return job.last_result
+                    except Exception as e:
+                        job.last_error = str(e)
+                        logger.error(f"Job {name} failed: {str(e)}", exc_info=True)
+                        raise
+                    finally:
+                        job.last_finished_at = datetime.now()
+                        cursor.execute("SELECT RELEASE_LOCK(%s)", (f"medsync_job_{name}",))
+        finally:
+            job.running = False
+
+    def status(self):
+        return [job.to_dict() for job in self.jobs.values()]
+
+
+# Create singleton instance
+scheduler = JobScheduler()
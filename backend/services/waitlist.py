@@ -0,0 +1,377 @@
+"""
+Waitlist Service for MedSync
+Keeps an in-memory priority index of waiting patients and offers freed
+time slots to the best matching waiter as a time-limited hold
+"""
+
+from core.database import get_db
+from datetime import date, datetime, timedelta
+from typing import Optional, Dict, Any, List, Set, Tuple
+import heapq
+import itertools
+import threading
+import logging
+import uuid
+import zlib
+import os
+
+logger = logging.getLogger(__name__)
+
+ENTRY_COLUMNS = "waitlist_id, patient_id, doctor_id, specialization_id, branch_id, date_from, date_to, priority, created_at"
+
+
+class WaitlistIndex:
+    """
+    Priority index of Waiting entries
+
+    Every entry is pushed into one heap per day of its date window, keyed by
+    (doctor_id, specialization_id, branch_id, date) exactly as the patient
+    asked (None = any). A freed slot can only match the handful of keys built
+    from its own doctor, the doctor's specializations, its branch and None
+    wildcards, so finding the best waiter is a few heap peeks: O(k log n).
+    Removed entries are dropped lazily when they surface at a heap top.
+
+    The index also keeps the count and XOR of CRC32(waitlist_id) of its
+    entries, which matches the same aggregate over the Waiting rows in MySQL
+    while this worker has seen every write (see WaitlistService.sync).
+    """
+
+    def __init__(self, max_window_days: int = 90):
+        self.max_window_days = max_window_days
+        self._heaps: Dict[Tuple, List] = {}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._seq = itertools.count()
+        self._checksum = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, entry: Dict[str, Any]):
+        created_at = entry.get('created_at') or datetime.now()
+        rank = (-int(entry.get('priority') or 0), created_at.timestamp(), next(self._seq))
+        first_day = max(entry['date_from'], date.today())
+        last_day = min(entry['date_to'], first_day + timedelta(days=self.max_window_days))
+
+        with self._lock:
+            if entry['waitlist_id'] not in self._entries:
+                self._checksum ^= zlib.crc32(entry['waitlist_id'].encode())
+            self._entries[entry['waitlist_id']] = entry
+            day = first_day
+            while day <= last_day:
+                key = (entry.get('doctor_id'), entry.get('specialization_id'), entry.get('branch_id'), day)
+                heapq.heappush(self._heaps.setdefault(key, []), (rank, entry['waitlist_id']))
+                day += timedelta(days=1)
+
+    def remove(self, waitlist_id: str):
+        with self._lock:
+            if self._entries.pop(waitlist_id, None) is not None:
+                self._checksum ^= zlib.crc32(waitlist_id.encode())
+
+    def best_match(self, doctor_id: str, branch_id: str, specialization_ids: List[str],
+                   available_date: date, exclude: Set[str] = frozenset()) -> Optional[Dict[str, Any]]:
+        """Best waiting entry for a slot with these attributes, or None (entries in exclude are skipped)"""
+        best = None
+        with self._lock:
+            for doc in (doctor_id, None):
+                for spec in list(specialization_ids) + [None]:
+                    for branch in (branch_id, None):
+                        heap = self._heaps.get((doc, spec, branch, available_date))
+                        skipped = []
+                        while heap and (heap[0][1] not in self._entries or heap[0][1] in exclude):
+                            item = heapq.heappop(heap)
+                            if item[1] in self._entries:
+                                skipped.append(item)
+                        if heap and (best is None or heap[0][0] < best[0]):
+                            best = heap[0]
+                        for item in skipped:
+                            heapq.heappush(heap, item)
+            return self._entries.get(best[1]) if best else None
+
+    def prune(self, before: date):
+        """Drop heaps for days that have already passed"""
+        with self._lock:
+            for key in [key for key in self._heaps if key[3] < before]:
+                del self._heaps[key]
+
+    def signature(self) -> Tuple[int, int]:
+        """(entry count, XOR of CRC32 of the entry IDs)"""
+        with self._lock:
+            return len(self._entries), self._checksum
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "waiting_entries": len(self._entries),
+                "heaps": len(self._heaps),
+                "heap_items": sum(len(heap) for heap in self._heaps.values())
+            }
+
+
+class WaitlistService:
+    """Registration, slot offers and hold lifecycle for the waitlist"""
+
+    def __init__(self):
+        self.hold_minutes = int(os.getenv('WAITLIST_HOLD_MINUTES', '30'))
+        self.index = WaitlistIndex(int(os.getenv('WAITLIST_MAX_WINDOW_DAYS', '90')))
+
+    def load(self, cursor=None) -> int:
+        """
+        Rebuild the in-memory index from the Waiting rows in the database
+
+        The new index is built aside and swapped in, so offers running
+        meanwhile keep using the old one instead of a half-filled index.
+        """
+        index = WaitlistIndex(self.index.max_window_days)
+        try:
+            if cursor is None:
+                with get_db() as (own_cursor, connection):
+                    self._fill(own_cursor, index)
+            else:
+                self._fill(cursor, index)
+        except Exception as e:
+            logger.warning(f"Could not load waitlist: {str(e)}")
+            return len(self.index)
+        self.index = index
+        logger.info(f"Loaded {len(index)} waitlist entries")
+        return len(index)
+
+    def _fill(self, cursor, index: WaitlistIndex):
+        cursor.execute(
+            f"""SELECT {ENTRY_COLUMNS}
+            FROM waitlist_entry
+            WHERE status = 'Waiting'"""
+        )
+        for entry in cursor.fetchall():
+            index.add(entry)
+
+    def sync(self, cursor) -> bool:
+        """
+        Reload the index when the Waiting rows differ from it
+
+        Registrations, offers and re-queues made by other API workers only
+        reach MySQL, so every offer compares a cheap aggregate over the
+        Waiting rows with the index's own before trusting it. Returns True
+        when the index was reloaded.
+        """
+        cursor.execute(
+            """SELECT COUNT(*) AS entries, COALESCE(BIT_XOR(CRC32(waitlist_id)), 0) AS checksum
+            FROM waitlist_entry
+            WHERE status = 'Waiting'"""
+        )
+        row = cursor.fetchone()
+        if (int(row['entries']), int(row['checksum'])) == self.index.signature():
+            return False
+        self.load(cursor)
+        return True
+
+    def register(self, patient_id: str, date_from: date, date_to: date, doctor_id: Optional[str] = None,
+                 specialization_id: Optional[str] = None, branch_id: Optional[str] = None,
+                 priority: int = 0, notes: Optional[str] = None) -> Dict[str, Any]:
+        entry = {
+            "waitlist_id": str(uuid.uuid4()),
+            "patient_id": patient_id,
+            "doctor_id": doctor_id,
+            "specialization_id": specialization_id,
+            "branch_id": branch_id,
+            "date_from": date_from,
+            "date_to": date_to,
+            "priority": priority,
+            "created_at": datetime.now()
+        }
+        with get_db() as (cursor, connection):
+            cursor.execute(
+                """INSERT INTO waitlist_entry (
+                    waitlist_id, patient_id, doctor_id, specialization_id, branch_id,
+                    date_from, date_to, priority, status, notes
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 'Waiting', %s)""",
+                (entry['waitlist_id'], patient_id, doctor_id, specialization_id, branch_id,
+                 date_from, date_to, priority, notes)
+            )
+        self.index.add(entry)
+        return entry
+
+    def cancel(self, waitlist_id: str) -> Optional[str]:
+        """
+        Cancel an entry. Returns the slot that was on hold for it (if any) so
+        the caller can re-offer it.
+        """
+        self.index.remove(waitlist_id)
+        with get_db() as (cursor, connection):
+            cursor.execute(
+                "SELECT status, offered_time_slot_id FROM waitlist_entry WHERE waitlist_id = %s FOR UPDATE",
+                (waitlist_id,)
+            )
+            entry = cursor.fetchone()
+            if not entry or entry['status'] not in ('Waiting', 'Offered'):
+                return None
+            cursor.execute(
+                "UPDATE waitlist_entry SET status = 'Cancelled' WHERE waitlist_id = %s",
+                (waitlist_id,)
+            )
+        return entry['offered_time_slot_id'] if entry['status'] == 'Offered' else None
+
+    def decline(self, waitlist_id: str) -> Optional[str]:
+        """
+        Turn down the slot on hold for an entry and put the entry back in the
+        queue with its original rank. Returns the released slot, or None when
+        the entry had no open offer.
+        """
+        with get_db() as (cursor, connection):
+            cursor.execute(
+                f"""SELECT {ENTRY_COLUMNS}, status, offered_time_slot_id
+                FROM waitlist_entry WHERE waitlist_id = %s FOR UPDATE""",
+                (waitlist_id,)
+            )
+            entry = cursor.fetchone()
+            if not entry or entry['status'] != 'Offered':
+                return None
+            self._requeue(cursor, [entry])
+        return entry['offered_time_slot_id']
+
+    def _requeue(self, cursor, entries: List[Dict[str, Any]]):
+        """Release the holds of these Offered entries; still-valid ones wait again, the rest expire"""
+        placeholders = ", ".join(["%s"] * len(entries))
+        cursor.execute(
+            f"""UPDATE waitlist_entry
+            SET status = IF(date_to >= CURDATE(), 'Waiting', 'Expired'),
+                offered_time_slot_id = NULL,
+                hold_expires_at = NULL
+            WHERE waitlist_id IN ({placeholders}) AND status = 'Offered'""",
+            [entry['waitlist_id'] for entry in entries]
+        )
+        for entry in entries:
+            if entry['date_to'] >= date.today():
+                self.index.add(entry)
+
+    def get_hold(self, cursor, time_slot_id: str) -> Optional[Dict[str, Any]]:
+        """Active hold on a slot, read through the caller's cursor"""
+        cursor.execute(
+            """SELECT waitlist_id, patient_id, hold_expires_at
+            FROM waitlist_entry
+            WHERE offered_time_slot_id = %s
+            AND status = 'Offered'
+            AND hold_expires_at > NOW()""",
+            (time_slot_id,)
+        )
+        return cursor.fetchone()
+
+    def get_holds(self, cursor, time_slot_ids: List[str]) -> Dict[str, str]:
+        """Map of slot ID -> patient ID for every actively held slot in the list"""
+        if not time_slot_ids:
+            return {}
+        placeholders = ", ".join(["%s"] * len(time_slot_ids))
+        cursor.execute(
+            f"""SELECT offered_time_slot_id, patient_id
+            FROM waitlist_entry
+            WHERE offered_time_slot_id IN ({placeholders})
+            AND status = 'Offered'
+            AND hold_expires_at > NOW()""",
+            time_slot_ids
+        )
+        return {row['offered_time_slot_id']: row['patient_id'] for row in cursor.fetchall()}
+
+    def offer_slot(self, time_slot_id: str, exclude: Set[str] = frozenset()) -> Optional[Dict[str, Any]]:
+        """
+        Offer a freed slot to the best matching waiter (other than exclude)
+
+        The hold is claimed with a conditional UPDATE on status = 'Waiting',
+        so when several API workers race only one offer is issued; entries
+        another worker already served are dropped and the next best is tried.
+        """
+        with get_db() as (cursor, connection):
+            cursor.execute(
+                """SELECT time_slot_id, doctor_id, branch_id, available_date, start_time, is_booked
+                FROM time_slot WHERE time_slot_id = %s""",
+                (time_slot_id,)
+            )
+            slot = cursor.fetchone()
+            if not slot or slot['is_booked'] or slot['available_date'] < date.today():
+                return None
+            if self.get_hold(cursor, time_slot_id):
+                return None
+
+            cursor.execute(
+                "SELECT specialization_id FROM doctor_specialization WHERE doctor_id = %s",
+                (slot['doctor_id'],)
+            )
+            specialization_ids = [row['specialization_id'] for row in cursor.fetchall()]
+            self.sync(cursor)
+
+            while True:
+                entry = self.index.best_match(
+                    slot['doctor_id'], slot['branch_id'], specialization_ids, slot['available_date'],
+                    exclude
+                )
+                if not entry:
+                    return None
+                self.index.remove(entry['waitlist_id'])
+
+                cursor.execute(
+                    """UPDATE waitlist_entry
+                    SET status = 'Offered',
+                        offered_time_slot_id = %s,
+                        hold_expires_at = NOW() + INTERVAL %s MINUTE
+                    WHERE waitlist_id = %s AND status = 'Waiting'""",
+                    (time_slot_id, self.hold_minutes, entry['waitlist_id'])
+                )
+                if cursor.rowcount == 1:
+                    connection.commit()
+                    logger.info(f"Offered slot {time_slot_id} to waitlist entry {entry['waitlist_id']}")
+                    return {
+                        "waitlist_id": entry['waitlist_id'],
+                        "patient_id": entry['patient_id'],
+                        "time_slot_id": time_slot_id,
+                        "available_date": str(slot['available_date']),
+                        "start_time": str(slot['start_time']),
+                        "hold_minutes": self.hold_minutes
+                    }
+
+    def expire_holds(self) -> Dict[str, Any]:
+        """
+        Re-queue entries whose hold lapsed, expire outdated entries, then
+        re-offer the released slots to someone other than the lapsed holder
+        """
+        with get_db() as (cursor, connection):
+            cursor.execute(
+                f"""SELECT {ENTRY_COLUMNS}, offered_time_slot_id
+                FROM waitlist_entry
+                WHERE status = 'Offered' AND hold_expires_at <= NOW()
+                FOR UPDATE"""
+            )
+            lapsed = cursor.fetchall()
+            if lapsed:
+                self._requeue(cursor, lapsed)
+
+            cursor.execute(
+                """SELECT waitlist_id FROM waitlist_entry
+                WHERE status = 'Waiting' AND date_to < CURDATE()"""
+            )
+            outdated = [row['waitlist_id'] for row in cursor.fetchall()]
+            if outdated:
+                placeholders = ", ".join(["%s"] * len(outdated))
+                cursor.execute(
+                    f"""UPDATE waitlist_entry SET status = 'Expired'
+                    WHERE waitlist_id IN ({placeholders}) AND status = 'Waiting'""",
+                    outdated
+                )
+
+        for waitlist_id in outdated:
+            self.index.remove(waitlist_id)
+        self.index.prune(date.today())
+
+        reoffered = 0
+        for row in lapsed:
+            if row['offered_time_slot_id'] and self.offer_slot(row['offered_time_slot_id'], {row['waitlist_id']}):
+                reoffered += 1
+
+        return {
+            "holds_expired": len(lapsed),
+            "entries_requeued": sum(1 for row in lapsed if row['date_to'] >= date.today()),
+            "entries_expired": len(outdated),
+            "slots_reoffered": reoffered
+        }
+
+
+# Create singleton instance
+waitlist_service = WaitlistService()
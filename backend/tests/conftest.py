@@ -0,0 +1,88 @@
+"""
+Shared fixtures for the MedSync backend tests
+
+These are integration tests against the MySQL schema in database/. They
+need the DB_* environment variables of a seeded database and are skipped
+when it cannot be reached.
+"""
+
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('ENABLE_BACKGROUND_JOBS', 'false')
+
+
+@pytest.fixture(scope="session")
+def database():
+    """The core.database module, or skip when MySQL is unavailable"""
+    try:
+        from core import database as db_module
+        with db_module.get_db() as (cursor, connection):
+            cursor.execute("SELECT 1 AS ok")
+    except Exception as e:
+        pytest.skip(f"MySQL not available: {e}")
+    return db_module
+
+
+@pytest.fixture
+def seed(database):
+    """An existing patient and a doctor with a branch to hang test slots on"""
+    with database.get_db() as (cursor, connection):
+        cursor.execute("SELECT patient_id FROM patient LIMIT 1")
+        patient = cursor.fetchone()
+        cursor.execute(
+            """SELECT d.doctor_id, e.branch_id
+            FROM doctor d JOIN employee e ON d.doctor_id = e.employee_id
+            LIMIT 1"""
+        )
+        doctor = cursor.fetchone()
+    if not patient or not doctor:
+        pytest.skip("Database has no seeded patient/doctor")
+    return {
+        "patient_id": patient['patient_id'],
+        "doctor_id": doctor['doctor_id'],
+        "branch_id": doctor['branch_id'],
+    }
+
+
+@pytest.fixture
+def make_slots(database, seed):
+    """Create time slots (optionally with an appointment) and remove them afterwards"""
+    created = []
+
+    def factory(available_date, count, status=None):
+        rows = []
+        with database.get_db() as (cursor, connection):
+            for i in range(count):
+                time_slot_id = str(uuid.uuid4())
+                cursor.execute(
+                    """INSERT INTO time_slot
+                    (time_slot_id, doctor_id, branch_id, available_date, is_booked, start_time, end_time)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)""",
+                    (time_slot_id, seed['doctor_id'], seed['branch_id'], available_date,
+                     status is not None, f"{i // 4:02d}:{(i % 4) * 15:02d}:00",
+                     f"{i // 4:02d}:{(i % 4) * 15 + 10:02d}:00")
+                )
+                appointment_id = None
+                if status is not None:
+                    appointment_id = str(uuid.uuid4())
+                    cursor.execute(
+                        """INSERT INTO appointment (appointment_id, time_slot_id, patient_id, status)
+                        VALUES (%s, %s, %s, %s)""",
+                        (appointment_id, time_slot_id, seed['patient_id'], status)
+                    )
+                created.append(time_slot_id)
+                rows.append({"time_slot_id": time_slot_id, "appointment_id": appointment_id})
+        return rows
+
+    yield factory
+
+    if created:
+        placeholders = ", ".join(["%s"] * len(created))
+        with database.get_db() as (cursor, connection):
+            cursor.execute(f"DELETE FROM appointment WHERE time_slot_id IN ({placeholders})", created)
+            cursor.execute(f"DELETE FROM time_slot WHERE time_slot_id IN ({placeholders})", created)
@@ -0,0 +1,34 @@
+from datetime import date
+
+import pytest
+
+
+@pytest.fixture
+def doctor_daily_stats(database):
+    from services.doctor_daily_stats import doctor_daily_stats
+    return doctor_daily_stats
+
+
+def _day_row(database, doctor_id, day):
+    with database.get_db() as (cursor, connection):
+        cursor.execute(
+            "SELECT booked FROM doctor_daily_stats WHERE doctor_id = %s AND stat_date = %s",
+            (doctor_id, day)
+        )
+        return cursor.fetchone()
+
+
+def test_refresh_drops_days_left_empty(doctor_daily_stats, database, make_slots, seed):
+    day = date(2001, 1, 3)
+    rows = make_slots(day, 2, status='Scheduled')
+    doctor_daily_stats.refresh_keys([(seed['doctor_id'], day)])
+    assert _day_row(database, seed['doctor_id'], day)['booked'] == 2
+
+    with database.get_db() as (cursor, connection):
+        cursor.execute(
+            "DELETE FROM appointment WHERE appointment_id IN (%s, %s)",
+            [row['appointment_id'] for row in rows]
+        )
+    doctor_daily_stats.refresh_keys([(seed['doctor_id'], day)])
+
+    assert _day_row(database, seed['doctor_id'], day) is None
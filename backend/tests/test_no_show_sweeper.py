@@ -0,0 +1,40 @@
+from datetime import date
+
+import pytest
+
+
+@pytest.fixture
+def no_show_sweeper(database):
+    from services.no_show_sweeper import no_show_sweeper
+    return no_show_sweeper
+
+
+def test_dry_run_counts_every_batch(no_show_sweeper, make_slots, seed):
+    baseline = no_show_sweeper.run(grace_minutes=0, batch_size=10000, dry_run=True)
+    make_slots(date(2001, 1, 1), 7, status='Scheduled')
+
+    result = no_show_sweeper.run(grace_minutes=0, batch_size=3, dry_run=True)
+
+    assert result['total_marked'] == baseline['total_marked'] + 7
+    assert result['batches'] >= 3
+    assert result['by_branch'][seed['branch_id']] == baseline['by_branch'].get(seed['branch_id'], 0) + 7
+    assert result['by_doctor'][seed['doctor_id']] == baseline['by_doctor'].get(seed['doctor_id'], 0) + 7
+    assert sum(result['by_doctor'].values()) == result['total_marked']
+
+
+def test_run_marks_candidates_across_batches(no_show_sweeper, database, make_slots, seed):
+    day = date(2001, 1, 2)
+    rows = make_slots(day, 5, status='Scheduled')
+
+    # Scoped to the fixture rows: a real run must not touch the rest of the database
+    result = no_show_sweeper.run(grace_minutes=0, batch_size=2, doctor_id=seed['doctor_id'],
+                                 date_from=day, date_to=day)
+
+    assert result['total_marked'] == 5
+    assert result['by_doctor'] == {seed['doctor_id']: 5}
+
+    ids = [row['appointment_id'] for row in rows]
+    placeholders = ", ".join(["%s"] * len(ids))
+    with database.get_db() as (cursor, connection):
+        cursor.execute(f"SELECT status FROM appointment WHERE appointment_id IN ({placeholders})", ids)
+        assert {row['status'] for row in cursor.fetchall()} == {'No-Show'}
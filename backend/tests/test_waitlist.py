@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def routers(database):
+    from routers import appointment, waitlist
+    return appointment, waitlist
+
+
+@pytest.fixture
+def waitlist_entry(database, routers, seed):
+    """A top-priority entry for the seeded doctor ten days from now, deleted afterwards"""
+    from fastapi import HTTPException
+    _, waitlist = routers
+    day = date.today() + timedelta(days=10)
+    try:
+        response = waitlist.register_waitlist_entry(waitlist.WaitlistRegisterRequest(
+            patient_id=seed['patient_id'],
+            doctor_id=seed['doctor_id'],
+            branch_id=seed['branch_id'],
+            date_from=day,
+            date_to=day,
+            priority=10
+        ))
+    except HTTPException as e:
+        pytest.skip(f"Could not register waitlist entry: {e.detail}")
+    yield day, response['waitlist_id']
+    with database.get_db() as (cursor, connection):
+        cursor.execute("DELETE FROM waitlist_entry WHERE waitlist_id = %s", (response['waitlist_id'],))
+
+
+def entry_status(database, waitlist_id):
+    with database.get_db() as (cursor, connection):
+        cursor.execute("SELECT * FROM waitlist_entry WHERE waitlist_id = %s", (waitlist_id,))
+        return cursor.fetchone()
+
+
+def cancel_and_offer(database, routers, make_slots, waitlist_entry):
+    appointment, _ = routers
+    day, waitlist_id = waitlist_entry
+    slot = make_slots(day, 1, status='Scheduled')[0]
+
+    response = appointment.cancel_appointment(slot['appointment_id'])
+    assert response['offered_to_waitlist']
+    entry = entry_status(database, waitlist_id)
+    if entry['offered_time_slot_id'] != slot['time_slot_id']:
+        pytest.skip("Another waiting entry outranks the test entry")
+    return slot, waitlist_id
+
+
+def test_cancel_offer_accept_rebooks_slot(database, routers, make_slots, waitlist_entry):
+    _, waitlist = routers
+    slot, waitlist_id = cancel_and_offer(database, routers, make_slots, waitlist_entry)
+
+    response = waitlist.accept_waitlist_offer(waitlist_id)
+
+    assert response['time_slot_id'] == slot['time_slot_id']
+    with database.get_db() as (cursor, connection):
+        cursor.execute(
+            "SELECT appointment_id, status FROM appointment WHERE time_slot_id = %s",
+            (slot['time_slot_id'],)
+        )
+        statuses = {row['appointment_id']: row['status'] for row in cursor.fetchall()}
+        cursor.execute("SELECT is_booked FROM time_slot WHERE time_slot_id = %s", (slot['time_slot_id'],))
+        assert cursor.fetchone()['is_booked']
+    assert statuses == {slot['appointment_id']: 'Cancelled', response['appointment_id']: 'Scheduled'}
+    assert entry_status(database, waitlist_id)['status'] == 'Booked'
+
+
+def test_decline_requeues_entry(database, routers, make_slots, waitlist_entry):
+    _, waitlist = routers
+    slot, waitlist_id = cancel_and_offer(database, routers, make_slots, waitlist_entry)
+
+    waitlist.decline_waitlist_offer(waitlist_id)
+
+    entry = entry_status(database, waitlist_id)
+    assert entry['status'] == 'Waiting'
+    assert entry['offered_time_slot_id'] is None
+    assert waitlist_id in waitlist.waitlist_service.index._entries
@@ -0,0 +1,13 @@
+-- ============================================================
+-- NO-SHOW SWEEPER SUPPORT
+-- Index used by services/no_show_sweeper.py to find stale
+-- Scheduled appointments without scanning the whole table
+-- ============================================================
+
+USE `medsync_db`;
+
+-- Candidates are found by status first, then joined to their slot
+CREATE INDEX idx_appointment_status_slot ON appointment (status, time_slot_id);
+
+-- Date-bounded lookups of a doctor's slots (dashboard and sweeper joins)
+CREATE INDEX idx_time_slot_doctor_date ON time_slot (doctor_id, available_date);
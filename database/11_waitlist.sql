@@ -0,0 +1,34 @@
+-- ============================================================
+-- WAITLIST SYSTEM
+-- Patients register interest in a doctor / specialization / branch
+-- within a date window; freed slots are offered to the best waiter
+-- ============================================================
+
+USE `medsync_db`;
+
+CREATE TABLE IF NOT EXISTS waitlist_entry (
+    waitlist_id CHAR(36) PRIMARY KEY,
+    patient_id CHAR(36) NOT NULL,
+    doctor_id CHAR(36),             -- NULL = any doctor
+    specialization_id CHAR(36),     -- NULL = any specialization
+    branch_id CHAR(36),             -- NULL = any branch
+    date_from DATE NOT NULL,
+    date_to DATE NOT NULL,
+    priority TINYINT NOT NULL DEFAULT 0,  -- Higher is served first
+    status ENUM('Waiting', 'Offered', 'Booked', 'Expired', 'Cancelled') DEFAULT 'Waiting',
+    offered_time_slot_id CHAR(36),  -- Slot held for this patient while status = 'Offered'
+    hold_expires_at DATETIME,
+    appointment_id CHAR(36),        -- Set once the offer is accepted
+    notes TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (patient_id) REFERENCES patient(patient_id) ON DELETE CASCADE,
+    FOREIGN KEY (doctor_id) REFERENCES doctor(doctor_id) ON DELETE CASCADE,
+    FOREIGN KEY (specialization_id) REFERENCES specialization(specialization_id) ON DELETE CASCADE,
+    FOREIGN KEY (branch_id) REFERENCES branch(branch_id) ON DELETE CASCADE,
+    FOREIGN KEY (offered_time_slot_id) REFERENCES time_slot(time_slot_id) ON DELETE SET NULL,
+    INDEX idx_waitlist_status (status),
+    INDEX idx_waitlist_patient (patient_id, status),
+    INDEX idx_waitlist_offered_slot (offered_time_slot_id, status),
+    CHECK (date_to >= date_from)
+);
@@ -0,0 +1,56 @@
+-- ============================================================
+-- DOCTOR DAILY STATISTICS ROLLUP
+-- One row per doctor per appointment day, maintained by
+-- services/doctor_daily_stats.py from the API write paths, a change
+-- poller and a nightly reconciliation job
+-- ============================================================
+
+USE `medsync_db`;
+
+-- 1. DAILY ROLLUP
+-- Counts cover hot and archived appointments. Revenue and treatment
+-- columns are attributed to the day of the consultation's appointment.
+CREATE TABLE IF NOT EXISTS doctor_daily_stats (
+    doctor_id CHAR(36) NOT NULL,
+    stat_date DATE NOT NULL,
+    booked INT NOT NULL DEFAULT 0,              -- All appointments, any status
+    completed INT NOT NULL DEFAULT 0,
+    no_show INT NOT NULL DEFAULT 0,
+    cancelled INT NOT NULL DEFAULT 0,
+    unique_patients INT NOT NULL DEFAULT 0,     -- Distinct patients that day
+    consultations INT NOT NULL DEFAULT 0,
+    treatments INT NOT NULL DEFAULT 0,
+    treatment_revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    invoices INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14,2) NOT NULL DEFAULT 0,   -- Invoice sub_total + tax
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (doctor_id, stat_date),
+    FOREIGN KEY (doctor_id) REFERENCES doctor(doctor_id) ON DELETE CASCADE
+);
+
+-- 2. DOCTOR / PATIENT PAIRS
+-- Distinct patients are not additive across days, so all-time unique
+-- patients are counted from this set instead of summing daily rows
+CREATE TABLE IF NOT EXISTS doctor_patient (
+    doctor_id CHAR(36) NOT NULL,
+    patient_id CHAR(36) NOT NULL,
+    first_visit_date DATE NOT NULL,
+    PRIMARY KEY (doctor_id, patient_id),
+    FOREIGN KEY (doctor_id) REFERENCES doctor(doctor_id) ON DELETE CASCADE
+);
+
+-- 3. ROLLUP WATERMARKS
+-- Change pollers record how far they have synced here
+CREATE TABLE IF NOT EXISTS rollup_watermark (
+    rollup_name VARCHAR(64) PRIMARY KEY,
+    synced_until DATETIME NOT NULL,
+    rows_refreshed BIGINT NOT NULL DEFAULT 0,
+    last_run_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- 4. CHANGE POLLER INDEXES
+-- Let the poller find rows modified since its watermark without a scan
+CREATE INDEX idx_appointment_updated_at ON appointment (updated_at);
+CREATE INDEX idx_consultation_record_updated_at ON consultation_record (updated_at);
+CREATE INDEX idx_treatment_updated_at ON treatment (updated_at);
+CREATE INDEX idx_invoice_updated_at ON invoice (updated_at);
@@ -0,0 +1,418 @@
+-- ============================================================
+-- BRANCH STATISTICS AND OCCUPANCY COUNTERS
+-- Per-branch counters and per-branch-per-day occupancy, kept
+-- current by triggers on employee, doctor, patient, time_slot and
+-- appointment so branch dashboards read one row instead of
+-- counting. services/branch_statistics.py rebuilds them nightly to
+-- correct drift from cascaded deletes (which do not fire triggers).
+-- ============================================================
+
+USE `medsync_db`;
+
+-- 1. BRANCH COUNTERS
+-- Appointment counts cover the hot tables, like the queries they replace
+CREATE TABLE IF NOT EXISTS branch_counters (
+    branch_id CHAR(36) PRIMARY KEY,
+    active_employees INT NOT NULL DEFAULT 0,
+    active_doctors INT NOT NULL DEFAULT 0,
+    patients INT NOT NULL DEFAULT 0,            -- Registered at this branch
+    appointments INT NOT NULL DEFAULT 0,        -- Any status
+    scheduled INT NOT NULL DEFAULT 0,
+    completed INT NOT NULL DEFAULT 0,
+    cancelled INT NOT NULL DEFAULT 0,
+    no_show INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (branch_id) REFERENCES branch(branch_id) ON DELETE CASCADE
+);
+
+-- 2. DAILY OCCUPANCY
+CREATE TABLE IF NOT EXISTS branch_daily_occupancy (
+    branch_id CHAR(36) NOT NULL,
+    stat_date DATE NOT NULL,
+    total_slots INT NOT NULL DEFAULT 0,
+    booked_slots INT NOT NULL DEFAULT 0,
+    appointments INT NOT NULL DEFAULT 0,
+    scheduled INT NOT NULL DEFAULT 0,
+    completed INT NOT NULL DEFAULT 0,
+    cancelled INT NOT NULL DEFAULT 0,
+    no_show INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (branch_id, stat_date),
+    FOREIGN KEY (branch_id) REFERENCES branch(branch_id) ON DELETE CASCADE
+);
+
+-- Paged branch appointment listings (newest first)
+CREATE INDEX idx_time_slot_branch_date ON time_slot (branch_id, available_date);
+
+DELIMITER $$
+
+-- =============================================
+-- Procedure: BumpBranchCounters
+-- =============================================
+DROP PROCEDURE IF EXISTS `BumpBranchCounters`$$
+
+CREATE PROCEDURE `BumpBranchCounters`(
+    IN p_branch_id CHAR(36),
+    IN p_employees INT,
+    IN p_doctors INT,
+    IN p_patients INT
+)
+BEGIN
+    INSERT INTO branch_counters (branch_id, active_employees, active_doctors, patients)
+    VALUES (p_branch_id, p_employees, p_doctors, p_patients)
+    ON DUPLICATE KEY UPDATE
+        active_employees = active_employees + p_employees,
+        active_doctors = active_doctors + p_doctors,
+        patients = patients + p_patients;
+END$$
+
+-- =============================================
+-- Procedure: BumpBranchSlot
+-- =============================================
+DROP PROCEDURE IF EXISTS `BumpBranchSlot`$$
+
+CREATE PROCEDURE `BumpBranchSlot`(
+    IN p_branch_id CHAR(36),
+    IN p_date DATE,
+    IN p_slots INT,
+    IN p_booked INT
+)
+BEGIN
+    INSERT INTO branch_daily_occupancy (branch_id, stat_date, total_slots, booked_slots)
+    VALUES (p_branch_id, p_date, p_slots, p_booked)
+    ON DUPLICATE KEY UPDATE
+        total_slots = total_slots + p_slots,
+        booked_slots = booked_slots + p_booked;
+END$$
+
+-- =============================================
+-- Procedure: BumpBranchAppointment
+-- Adds p_delta appointments with p_status to a branch and day
+-- =============================================
+DROP PROCEDURE IF EXISTS `BumpBranchAppointment`$$
+
+CREATE PROCEDURE `BumpBranchAppointment`(
+    IN p_branch_id CHAR(36),
+    IN p_date DATE,
+    IN p_status VARCHAR(20),
+    IN p_delta INT
+)
+BEGIN
+    DECLARE v_scheduled INT DEFAULT IF(p_status = 'Scheduled', p_delta, 0);
+    DECLARE v_completed INT DEFAULT IF(p_status = 'Completed', p_delta, 0);
+    DECLARE v_cancelled INT DEFAULT IF(p_status = 'Cancelled', p_delta, 0);
+    DECLARE v_no_show INT DEFAULT IF(p_status = 'No-Show', p_delta, 0);
+
+    IF p_branch_id IS NOT NULL THEN
+        INSERT INTO branch_counters (branch_id, appointments, scheduled, completed, cancelled, no_show)
+        VALUES (p_branch_id, p_delta, v_scheduled, v_completed, v_cancelled, v_no_show)
+        ON DUPLICATE KEY UPDATE
+            appointments = appointments + p_delta,
+            scheduled = scheduled + v_scheduled,
+            completed = completed + v_completed,
+            cancelled = cancelled + v_cancelled,
+            no_show = no_show + v_no_show;
+
+        INSERT INTO branch_daily_occupancy (branch_id, stat_date, appointments, scheduled, completed, cancelled, no_show)
+        VALUES (p_branch_id, p_date, p_delta, v_scheduled, v_completed, v_cancelled, v_no_show)
+        ON DUPLICATE KEY UPDATE
+            appointments = appointments + p_delta,
+            scheduled = scheduled + v_scheduled,
+            completed = completed + v_completed,
+            cancelled = cancelled + v_cancelled,
+            no_show = no_show + v_no_show;
+    END IF;
+END$$
+
+-- =============================================
+-- Procedure: RebuildBranchStatistics
+-- Recomputes both tables from the base tables
+-- =============================================
+DROP PROCEDURE IF EXISTS `RebuildBranchStatistics`$$
+
+CREATE PROCEDURE `RebuildBranchStatistics`()
+BEGIN
+    DELETE FROM branch_counters;
+    DELETE FROM branch_daily_occupancy;
+
+    INSERT INTO branch_counters (
+        branch_id, active_employees, active_doctors, patients,
+        appointments, scheduled, completed, cancelled, no_show
+    )
+    SELECT
+        b.branch_id,
+        COALESCE(emp.active_employees, 0),
+        COALESCE(emp.active_doctors, 0),
+        COALESCE(pat.patients, 0),
+        COALESCE(apt.appointments, 0),
+        COALESCE(apt.scheduled, 0),
+        COALESCE(apt.completed, 0),
+        COALESCE(apt.cancelled, 0),
+        COALESCE(apt.no_show, 0)
+    FROM branch b
+    LEFT JOIN (
+        SELECT e.branch_id, COUNT(*) as active_employees, COUNT(d.doctor_id) as active_doctors
+        FROM employee e
+        LEFT JOIN doctor d ON d.doctor_id = e.employee_id
+        WHERE e.is_active = TRUE
+        GROUP BY e.branch_id
+    ) emp ON emp.branch_id = b.branch_id
+    LEFT JOIN (
+        SELECT registered_branch_id, COUNT(*) as patients
+        FROM patient
+        GROUP BY registered_branch_id
+    ) pat ON pat.registered_branch_id = b.branch_id
+    LEFT JOIN (
+        SELECT
+            ts.branch_id,
+            COUNT(*) as appointments,
+            SUM(a.status = 'Scheduled') as scheduled,
+            SUM(a.status = 'Completed') as completed,
+            SUM(a.status = 'Cancelled') as cancelled,
+            SUM(a.status = 'No-Show') as no_show
+        FROM appointment a
+        JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+        GROUP BY ts.branch_id
+    ) apt ON apt.branch_id = b.branch_id;
+
+    INSERT INTO branch_daily_occupancy (
+        branch_id, stat_date, total_slots, booked_slots,
+        appointments, scheduled, completed, cancelled, no_show
+    )
+    SELECT
+        ts.branch_id,
+        ts.available_date,
+        COUNT(*),
+        COALESCE(SUM(ts.is_booked), 0),
+        COUNT(a.appointment_id),
+        COALESCE(SUM(a.status = 'Scheduled'), 0),
+        COALESCE(SUM(a.status = 'Completed'), 0),
+        COALESCE(SUM(a.status = 'Cancelled'), 0),
+        COALESCE(SUM(a.status = 'No-Show'), 0)
+    FROM time_slot ts
+    LEFT JOIN appointment a ON a.time_slot_id = ts.time_slot_id
+    GROUP BY ts.branch_id, ts.available_date;
+END$$
+
+-- =============================================
+-- Triggers: employee
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_branch_stats_employee_insert`$$
+
+CREATE TRIGGER `trg_branch_stats_employee_insert`
+AFTER INSERT ON `employee`
+FOR EACH ROW
+BEGIN
+    -- The doctor row is inserted afterwards and counted by its own trigger
+    IF NEW.is_active THEN
+        CALL BumpBranchCounters(NEW.branch_id, 1, 0, 0);
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_branch_stats_employee_update`$$
+
+CREATE TRIGGER `trg_branch_stats_employee_update`
+AFTER UPDATE ON `employee`
+FOR EACH ROW
+BEGIN
+    DECLARE v_is_doctor INT;
+
+    IF NOT (OLD.branch_id <=> NEW.branch_id) OR NOT (OLD.is_active <=> NEW.is_active) THEN
+        SET v_is_doctor = EXISTS(SELECT 1 FROM doctor WHERE doctor_id = NEW.employee_id);
+        IF OLD.is_active THEN
+            CALL BumpBranchCounters(OLD.branch_id, -1, -v_is_doctor, 0);
+        END IF;
+        IF NEW.is_active THEN
+            CALL BumpBranchCounters(NEW.branch_id, 1, v_is_doctor, 0);
+        END IF;
+    END IF;
+END$$
+
+-- BEFORE DELETE: the doctor row is removed by cascade, which fires no trigger
+DROP TRIGGER IF EXISTS `trg_branch_stats_employee_delete`$$
+
+CREATE TRIGGER `trg_branch_stats_employee_delete`
+BEFORE DELETE ON `employee`
+FOR EACH ROW
+BEGIN
+    IF OLD.is_active THEN
+        CALL BumpBranchCounters(
+            OLD.branch_id, -1,
+            -EXISTS(SELECT 1 FROM doctor WHERE doctor_id = OLD.employee_id), 0
+        );
+    END IF;
+END$$
+
+-- =============================================
+-- Triggers: doctor
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_branch_stats_doctor_insert`$$
+
+CREATE TRIGGER `trg_branch_stats_doctor_insert`
+AFTER INSERT ON `doctor`
+FOR EACH ROW
+BEGIN
+    DECLARE v_branch_id CHAR(36);
+
+    SELECT branch_id INTO v_branch_id
+    FROM employee
+    WHERE employee_id = NEW.doctor_id AND is_active = TRUE;
+
+    IF v_branch_id IS NOT NULL THEN
+        CALL BumpBranchCounters(v_branch_id, 0, 1, 0);
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_branch_stats_doctor_delete`$$
+
+CREATE TRIGGER `trg_branch_stats_doctor_delete`
+AFTER DELETE ON `doctor`
+FOR EACH ROW
+BEGIN
+    DECLARE v_branch_id CHAR(36);
+
+    SELECT branch_id INTO v_branch_id
+    FROM employee
+    WHERE employee_id = OLD.doctor_id AND is_active = TRUE;
+
+    IF v_branch_id IS NOT NULL THEN
+        CALL BumpBranchCounters(v_branch_id, 0, -1, 0);
+    END IF;
+END$$
+
+-- =============================================
+-- Triggers: patient
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_branch_stats_patient_insert`$$
+
+CREATE TRIGGER `trg_branch_stats_patient_insert`
+AFTER INSERT ON `patient`
+FOR EACH ROW
+BEGIN
+    CALL BumpBranchCounters(NEW.registered_branch_id, 0, 0, 1);
+END$$
+
+DROP TRIGGER IF EXISTS `trg_branch_stats_patient_update`$$
+
+CREATE TRIGGER `trg_branch_stats_patient_update`
+AFTER UPDATE ON `patient`
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.registered_branch_id <=> NEW.registered_branch_id) THEN
+        CALL BumpBranchCounters(OLD.registered_branch_id, 0, 0, -1);
+        CALL BumpBranchCounters(NEW.registered_branch_id, 0, 0, 1);
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_branch_stats_patient_delete`$$
+
+CREATE TRIGGER `trg_branch_stats_patient_delete`
+AFTER DELETE ON `patient`
+FOR EACH ROW
+BEGIN
+    CALL BumpBranchCounters(OLD.registered_branch_id, 0, 0, -1);
+END$$
+
+-- =============================================
+-- Triggers: time_slot
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_branch_stats_slot_insert`$$
+
+CREATE TRIGGER `trg_branch_stats_slot_insert`
+AFTER INSERT ON `time_slot`
+FOR EACH ROW
+BEGIN
+    CALL BumpBranchSlot(NEW.branch_id, NEW.available_date, 1, IF(NEW.is_booked, 1, 0));
+END$$
+
+DROP TRIGGER IF EXISTS `trg_branch_stats_slot_update`$$
+
+CREATE TRIGGER `trg_branch_stats_slot_update`
+AFTER UPDATE ON `time_slot`
+FOR EACH ROW
+BEGIN
+    DECLARE v_status VARCHAR(20);
+
+    IF NOT (OLD.branch_id <=> NEW.branch_id)
+        OR NOT (OLD.available_date <=> NEW.available_date)
+        OR NOT (OLD.is_booked <=> NEW.is_booked) THEN
+        CALL BumpBranchSlot(OLD.branch_id, OLD.available_date, -1, -IF(OLD.is_booked, 1, 0));
+        CALL BumpBranchSlot(NEW.branch_id, NEW.available_date, 1, IF(NEW.is_booked, 1, 0));
+    END IF;
+
+    -- A moved slot carries its appointment with it
+    IF NOT (OLD.branch_id <=> NEW.branch_id) OR NOT (OLD.available_date <=> NEW.available_date) THEN
+        SET v_status = (SELECT status FROM appointment WHERE time_slot_id = NEW.time_slot_id);
+        IF v_status IS NOT NULL THEN
+            CALL BumpBranchAppointment(OLD.branch_id, OLD.available_date, v_status, -1);
+            CALL BumpBranchAppointment(NEW.branch_id, NEW.available_date, v_status, 1);
+        END IF;
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_branch_stats_slot_delete`$$
+
+CREATE TRIGGER `trg_branch_stats_slot_delete`
+AFTER DELETE ON `time_slot`
+FOR EACH ROW
+BEGIN
+    CALL BumpBranchSlot(OLD.branch_id, OLD.available_date, -1, -IF(OLD.is_booked, 1, 0));
+END$$
+
+-- =============================================
+-- Triggers: appointment
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_branch_stats_appointment_insert`$$
+
+CREATE TRIGGER `trg_branch_stats_appointment_insert`
+AFTER INSERT ON `appointment`
+FOR EACH ROW
+BEGIN
+    DECLARE v_branch_id CHAR(36);
+    DECLARE v_date DATE;
+
+    SELECT branch_id, available_date INTO v_branch_id, v_date
+    FROM time_slot WHERE time_slot_id = NEW.time_slot_id;
+
+    CALL BumpBranchAppointment(v_branch_id, v_date, NEW.status, 1);
+END$$
+
+DROP TRIGGER IF EXISTS `trg_branch_stats_appointment_update`$$
+
+CREATE TRIGGER `trg_branch_stats_appointment_update`
+AFTER UPDATE ON `appointment`
+FOR EACH ROW
+BEGIN
+    DECLARE v_branch_id CHAR(36);
+    DECLARE v_date DATE;
+
+    IF NOT (OLD.status <=> NEW.status) OR NOT (OLD.time_slot_id <=> NEW.time_slot_id) THEN
+        SELECT branch_id, available_date INTO v_branch_id, v_date
+        FROM time_slot WHERE time_slot_id = OLD.time_slot_id;
+        CALL BumpBranchAppointment(v_branch_id, v_date, OLD.status, -1);
+
+        SELECT branch_id, available_date INTO v_branch_id, v_date
+        FROM time_slot WHERE time_slot_id = NEW.time_slot_id;
+        CALL BumpBranchAppointment(v_branch_id, v_date, NEW.status, 1);
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_branch_stats_appointment_delete`$$
+
+CREATE TRIGGER `trg_branch_stats_appointment_delete`
+AFTER DELETE ON `appointment`
+FOR EACH ROW
+BEGIN
+    DECLARE v_branch_id CHAR(36);
+    DECLARE v_date DATE;
+
+    SELECT branch_id, available_date INTO v_branch_id, v_date
+    FROM time_slot WHERE time_slot_id = OLD.time_slot_id;
+
+    CALL BumpBranchAppointment(v_branch_id, v_date, OLD.status, -1);
+END$$
+
+DELIMITER ;
+
+-- 3. INITIAL BACKFILL
+CALL RebuildBranchStatistics();
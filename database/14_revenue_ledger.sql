@@ -0,0 +1,289 @@
+-- ============================================================
+-- MONTHLY REVENUE LEDGER
+-- Invoice and payment totals per branch per month, posted by
+-- triggers on invoice and payment so the statistics endpoints
+-- read a few ledger rows instead of aggregating both tables.
+-- services/revenue_ledger.py rebuilds the ledger nightly to
+-- correct drift from cascaded invoice deletes (which fire no
+-- triggers).
+-- ============================================================
+
+USE `medsync_db`;
+
+-- 1. REVENUE LEDGER
+-- Invoices are posted to the branch of their appointment's slot and the
+-- month they were created; due_* columns to the month they fall due.
+-- Payments are posted to the patient's registered branch and the month
+-- of payment_date.
+CREATE TABLE IF NOT EXISTS revenue_ledger (
+    branch_id CHAR(36) NOT NULL,
+    ledger_month DATE NOT NULL,                         -- First day of the month
+    invoice_count INT NOT NULL DEFAULT 0,
+    invoiced_amount DECIMAL(14,2) NOT NULL DEFAULT 0,   -- Invoice sub_total
+    tax_amount DECIMAL(14,2) NOT NULL DEFAULT 0,
+    due_count INT NOT NULL DEFAULT 0,
+    due_amount DECIMAL(14,2) NOT NULL DEFAULT 0,        -- sub_total + tax falling due
+    paid_count INT NOT NULL DEFAULT 0,
+    paid_amount DECIMAL(14,2) NOT NULL DEFAULT 0,       -- Completed payments
+    refunded_count INT NOT NULL DEFAULT 0,
+    refunded_amount DECIMAL(14,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (branch_id, ledger_month),
+    INDEX idx_revenue_ledger_month (ledger_month)
+);
+
+-- 2. PAYMENT LEDGER
+-- Every payment by method and status, for the payment summary
+CREATE TABLE IF NOT EXISTS payment_ledger (
+    branch_id CHAR(36) NOT NULL,
+    ledger_month DATE NOT NULL,
+    payment_method VARCHAR(20) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    payment_count INT NOT NULL DEFAULT 0,
+    amount DECIMAL(14,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (ledger_month, branch_id, payment_method, status)
+);
+
+-- Sargable lookups for the part of a range the ledger does not cover:
+-- overdue invoices of the current month and partial-month payments
+CREATE INDEX idx_invoice_due_date ON invoice (due_date);
+CREATE INDEX idx_payment_date_amount ON payment (payment_date, amount_paid);
+
+DELIMITER $$
+
+-- =============================================
+-- Procedure: PostInvoiceToLedger
+-- Posts (p_sign = 1) or reverses (p_sign = -1) one invoice
+-- =============================================
+DROP PROCEDURE IF EXISTS `PostInvoiceToLedger`$$
+
+CREATE PROCEDURE `PostInvoiceToLedger`(
+    IN p_consultation_rec_id CHAR(36),
+    IN p_created_at TIMESTAMP,
+    IN p_due_date DATE,
+    IN p_sub_total DECIMAL(10,2),
+    IN p_tax_amount DECIMAL(10,2),
+    IN p_sign INT
+)
+BEGIN
+    DECLARE v_branch_id CHAR(36);
+    DECLARE v_total DECIMAL(12,2) DEFAULT p_sub_total + COALESCE(p_tax_amount, 0);
+
+    SELECT ts.branch_id INTO v_branch_id
+    FROM consultation_record cr
+    JOIN appointment a ON cr.appointment_id = a.appointment_id
+    JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+    WHERE cr.consultation_rec_id = p_consultation_rec_id;
+
+    IF v_branch_id IS NOT NULL THEN
+        INSERT INTO revenue_ledger (branch_id, ledger_month, invoice_count, invoiced_amount, tax_amount)
+        VALUES (
+            v_branch_id, DATE_FORMAT(p_created_at, '%Y-%m-01'),
+            p_sign, p_sign * p_sub_total, p_sign * COALESCE(p_tax_amount, 0)
+        )
+        ON DUPLICATE KEY UPDATE
+            invoice_count = invoice_count + p_sign,
+            invoiced_amount = invoiced_amount + p_sign * p_sub_total,
+            tax_amount = tax_amount + p_sign * COALESCE(p_tax_amount, 0);
+
+        IF p_due_date IS NOT NULL THEN
+            INSERT INTO revenue_ledger (branch_id, ledger_month, due_count, due_amount)
+            VALUES (v_branch_id, DATE_FORMAT(p_due_date, '%Y-%m-01'), p_sign, p_sign * v_total)
+            ON DUPLICATE KEY UPDATE
+                due_count = due_count + p_sign,
+                due_amount = due_amount + p_sign * v_total;
+        END IF;
+    END IF;
+END$$
+
+-- =============================================
+-- Procedure: PostPaymentToLedger
+-- =============================================
+DROP PROCEDURE IF EXISTS `PostPaymentToLedger`$$
+
+CREATE PROCEDURE `PostPaymentToLedger`(
+    IN p_patient_id CHAR(36),
+    IN p_payment_date DATE,
+    IN p_payment_method VARCHAR(20),
+    IN p_status VARCHAR(20),
+    IN p_amount DECIMAL(10,2),
+    IN p_sign INT
+)
+BEGIN
+    DECLARE v_branch_id CHAR(36);
+    DECLARE v_month DATE DEFAULT DATE_FORMAT(p_payment_date, '%Y-%m-01');
+    DECLARE v_paid INT DEFAULT IF(p_status = 'Completed', p_sign, 0);
+    DECLARE v_refunded INT DEFAULT IF(p_status = 'Refunded', p_sign, 0);
+
+    SELECT registered_branch_id INTO v_branch_id
+    FROM patient WHERE patient_id = p_patient_id;
+
+    IF v_branch_id IS NOT NULL THEN
+        INSERT INTO payment_ledger (branch_id, ledger_month, payment_method, status, payment_count, amount)
+        VALUES (v_branch_id, v_month, p_payment_method, p_status, p_sign, p_sign * p_amount)
+        ON DUPLICATE KEY UPDATE
+            payment_count = payment_count + p_sign,
+            amount = amount + p_sign * p_amount;
+
+        IF v_paid <> 0 OR v_refunded <> 0 THEN
+            INSERT INTO revenue_ledger (branch_id, ledger_month, paid_count, paid_amount, refunded_count, refunded_amount)
+            VALUES (v_branch_id, v_month, v_paid, v_paid * p_amount, v_refunded, v_refunded * p_amount)
+            ON DUPLICATE KEY UPDATE
+                paid_count = paid_count + v_paid,
+                paid_amount = paid_amount + v_paid * p_amount,
+                refunded_count = refunded_count + v_refunded,
+                refunded_amount = refunded_amount + v_refunded * p_amount;
+        END IF;
+    END IF;
+END$$
+
+-- =============================================
+-- Procedure: RebuildRevenueLedger
+-- =============================================
+DROP PROCEDURE IF EXISTS `RebuildRevenueLedger`$$
+
+CREATE PROCEDURE `RebuildRevenueLedger`()
+BEGIN
+    DELETE FROM revenue_ledger;
+    DELETE FROM payment_ledger;
+
+    INSERT INTO revenue_ledger (branch_id, ledger_month, invoice_count, invoiced_amount, tax_amount)
+    SELECT
+        ts.branch_id,
+        DATE_FORMAT(i.created_at, '%Y-%m-01'),
+        COUNT(*),
+        SUM(i.sub_total),
+        SUM(COALESCE(i.tax_amount, 0))
+    FROM invoice i
+    JOIN consultation_record cr ON i.consultation_rec_id = cr.consultation_rec_id
+    JOIN appointment a ON cr.appointment_id = a.appointment_id
+    JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+    GROUP BY ts.branch_id, DATE_FORMAT(i.created_at, '%Y-%m-01');
+
+    INSERT INTO revenue_ledger (branch_id, ledger_month, due_count, due_amount)
+    SELECT
+        ts.branch_id,
+        DATE_FORMAT(i.due_date, '%Y-%m-01') as due_month,
+        COUNT(*),
+        SUM(i.sub_total + COALESCE(i.tax_amount, 0))
+    FROM invoice i
+    JOIN consultation_record cr ON i.consultation_rec_id = cr.consultation_rec_id
+    JOIN appointment a ON cr.appointment_id = a.appointment_id
+    JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+    WHERE i.due_date IS NOT NULL
+    GROUP BY ts.branch_id, due_month
+    ON DUPLICATE KEY UPDATE
+        due_count = VALUES(due_count),
+        due_amount = VALUES(due_amount);
+
+    INSERT INTO payment_ledger (branch_id, ledger_month, payment_method, status, payment_count, amount)
+    SELECT
+        p.registered_branch_id,
+        DATE_FORMAT(pay.payment_date, '%Y-%m-01'),
+        pay.payment_method,
+        pay.status,
+        COUNT(*),
+        SUM(pay.amount_paid)
+    FROM payment pay
+    JOIN patient p ON pay.patient_id = p.patient_id
+    GROUP BY p.registered_branch_id, DATE_FORMAT(pay.payment_date, '%Y-%m-01'), pay.payment_method, pay.status;
+
+    INSERT INTO revenue_ledger (branch_id, ledger_month, paid_count, paid_amount, refunded_count, refunded_amount)
+    SELECT
+        branch_id,
+        ledger_month,
+        SUM(IF(status = 'Completed', payment_count, 0)),
+        SUM(IF(status = 'Completed', amount, 0)),
+        SUM(IF(status = 'Refunded', payment_count, 0)),
+        SUM(IF(status = 'Refunded', amount, 0))
+    FROM payment_ledger
+    GROUP BY branch_id, ledger_month
+    ON DUPLICATE KEY UPDATE
+        paid_count = VALUES(paid_count),
+        paid_amount = VALUES(paid_amount),
+        refunded_count = VALUES(refunded_count),
+        refunded_amount = VALUES(refunded_amount);
+END$$
+
+-- =============================================
+-- Triggers: invoice
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_ledger_invoice_insert`$$
+
+CREATE TRIGGER `trg_ledger_invoice_insert`
+AFTER INSERT ON `invoice`
+FOR EACH ROW
+BEGIN
+    CALL PostInvoiceToLedger(NEW.consultation_rec_id, NEW.created_at, NEW.due_date, NEW.sub_total, NEW.tax_amount, 1);
+END$$
+
+DROP TRIGGER IF EXISTS `trg_ledger_invoice_update`$$
+
+CREATE TRIGGER `trg_ledger_invoice_update`
+AFTER UPDATE ON `invoice`
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.sub_total <=> NEW.sub_total)
+        OR NOT (OLD.tax_amount <=> NEW.tax_amount)
+        OR NOT (OLD.due_date <=> NEW.due_date)
+        OR NOT (OLD.created_at <=> NEW.created_at)
+        OR NOT (OLD.consultation_rec_id <=> NEW.consultation_rec_id) THEN
+        CALL PostInvoiceToLedger(OLD.consultation_rec_id, OLD.created_at, OLD.due_date, OLD.sub_total, OLD.tax_amount, -1);
+        CALL PostInvoiceToLedger(NEW.consultation_rec_id, NEW.created_at, NEW.due_date, NEW.sub_total, NEW.tax_amount, 1);
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_ledger_invoice_delete`$$
+
+CREATE TRIGGER `trg_ledger_invoice_delete`
+AFTER DELETE ON `invoice`
+FOR EACH ROW
+BEGIN
+    CALL PostInvoiceToLedger(OLD.consultation_rec_id, OLD.created_at, OLD.due_date, OLD.sub_total, OLD.tax_amount, -1);
+END$$
+
+-- =============================================
+-- Triggers: payment
+-- Posted after the balance trigger, so a payment it rejects
+-- (SIGNAL) never reaches the ledger
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_ledger_payment_insert`$$
+
+CREATE TRIGGER `trg_ledger_payment_insert`
+AFTER INSERT ON `payment`
+FOR EACH ROW
+FOLLOWS `trg_payment_after_insert_balance_update`
+BEGIN
+    CALL PostPaymentToLedger(NEW.patient_id, NEW.payment_date, NEW.payment_method, NEW.status, NEW.amount_paid, 1);
+END$$
+
+DROP TRIGGER IF EXISTS `trg_ledger_payment_update`$$
+
+CREATE TRIGGER `trg_ledger_payment_update`
+AFTER UPDATE ON `payment`
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.status <=> NEW.status)
+        OR NOT (OLD.amount_paid <=> NEW.amount_paid)
+        OR NOT (OLD.payment_method <=> NEW.payment_method)
+        OR NOT (OLD.payment_date <=> NEW.payment_date)
+        OR NOT (OLD.patient_id <=> NEW.patient_id) THEN
+        CALL PostPaymentToLedger(OLD.patient_id, OLD.payment_date, OLD.payment_method, OLD.status, OLD.amount_paid, -1);
+        CALL PostPaymentToLedger(NEW.patient_id, NEW.payment_date, NEW.payment_method, NEW.status, NEW.amount_paid, 1);
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_ledger_payment_delete`$$
+
+CREATE TRIGGER `trg_ledger_payment_delete`
+AFTER DELETE ON `payment`
+FOR EACH ROW
+BEGIN
+    CALL PostPaymentToLedger(OLD.patient_id, OLD.payment_date, OLD.payment_method, OLD.status, OLD.amount_paid, -1);
+END$$
+
+DELIMITER ;
+
+-- 3. INITIAL BACKFILL
+CALL RebuildRevenueLedger();
@@ -0,0 +1,251 @@
+-- ============================================================
+-- REPORT DATA VERSIONS
+-- One change counter per table the reports read, bumped by
+-- triggers on every insert, delete and report-relevant update.
+-- services/report_cache.py folds the counters of a report's
+-- source tables into its cache key, so a cached report stays
+-- valid exactly until one of those tables changes (deletes
+-- included, which an updated_at maximum would miss).
+-- ============================================================
+
+USE `medsync_db`;
+
+CREATE TABLE IF NOT EXISTS report_data_version (
+    table_name VARCHAR(64) PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    changed_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)
+);
+
+INSERT IGNORE INTO report_data_version (table_name) VALUES
+    ('appointment'), ('branch'), ('payment'), ('consultation_record'), ('user'),
+    ('patient_balance'), ('treatment'), ('treatment_catalogue'), ('claim');
+
+DELIMITER $$
+
+-- =============================================
+-- Procedure: BumpReportDataVersion
+-- =============================================
+DROP PROCEDURE IF EXISTS `BumpReportDataVersion`$$
+
+CREATE PROCEDURE `BumpReportDataVersion`(IN p_table_name VARCHAR(64))
+BEGIN
+    INSERT INTO report_data_version (table_name, version)
+    VALUES (p_table_name, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+END$$
+
+-- =============================================
+-- appointment: any change (status, date, branch)
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_report_version_appointment_insert`$$
+CREATE TRIGGER `trg_report_version_appointment_insert`
+AFTER INSERT ON `appointment`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDataVersion('appointment');
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_version_appointment_update`$$
+CREATE TRIGGER `trg_report_version_appointment_update`
+AFTER UPDATE ON `appointment`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDataVersion('appointment');
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_version_appointment_delete`$$
+CREATE TRIGGER `trg_report_version_appointment_delete`
+AFTER DELETE ON `appointment`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDataVersion('appointment');
+END$$
+
+-- =============================================
+-- branch: only the name appears in reports
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_report_version_branch_update`$$
+CREATE TRIGGER `trg_report_version_branch_update`
+AFTER UPDATE ON `branch`
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.branch_name <=> NEW.branch_name) THEN
+        CALL BumpReportDataVersion('branch');
+    END IF;
+END$$
+
+-- =============================================
+-- payment
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_report_version_payment_insert`$$
+CREATE TRIGGER `trg_report_version_payment_insert`
+AFTER INSERT ON `payment`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDataVersion('payment');
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_version_payment_update`$$
+CREATE TRIGGER `trg_report_version_payment_update`
+AFTER UPDATE ON `payment`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDataVersion('payment');
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_version_payment_delete`$$
+CREATE TRIGGER `trg_report_version_payment_delete`
+AFTER DELETE ON `payment`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDataVersion('payment');
+END$$
+
+-- =============================================
+-- consultation_record: appointment link and date only
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_report_version_consultation_insert`$$
+CREATE TRIGGER `trg_report_version_consultation_insert`
+AFTER INSERT ON `consultation_record`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDataVersion('consultation_record');
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_version_consultation_update`$$
+CREATE TRIGGER `trg_report_version_consultation_update`
+AFTER UPDATE ON `consultation_record`
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.appointment_id <=> NEW.appointment_id)
+        OR NOT (OLD.created_at <=> NEW.created_at) THEN
+        CALL BumpReportDataVersion('consultation_record');
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_version_consultation_delete`$$
+CREATE TRIGGER `trg_report_version_consultation_delete`
+AFTER DELETE ON `consultation_record`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDataVersion('consultation_record');
+END$$
+
+-- =============================================
+-- user: only the display name appears in reports
+-- (last_login updates must not invalidate them)
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_report_version_user_update`$$
+CREATE TRIGGER `trg_report_version_user_update`
+AFTER UPDATE ON `user`
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.full_name <=> NEW.full_name) THEN
+        CALL BumpReportDataVersion('user');
+    END IF;
+END$$
+
+-- =============================================
+-- patient_balance
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_report_version_balance_insert`$$
+CREATE TRIGGER `trg_report_version_balance_insert`
+AFTER INSERT ON `patient_balance`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDataVersion('patient_balance');
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_version_balance_update`$$
+CREATE TRIGGER `trg_report_version_balance_update`
+AFTER UPDATE ON `patient_balance`
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.total_balance <=> NEW.total_balance) THEN
+        CALL BumpReportDataVersion('patient_balance');
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_version_balance_delete`$$
+CREATE TRIGGER `trg_report_version_balance_delete`
+AFTER DELETE ON `patient_balance`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDataVersion('patient_balance');
+END$$
+
+-- =============================================
+-- treatment
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_report_version_treatment_insert`$$
+CREATE TRIGGER `trg_report_version_treatment_insert`
+AFTER INSERT ON `treatment`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDataVersion('treatment');
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_version_treatment_update`$$
+CREATE TRIGGER `trg_report_version_treatment_update`
+AFTER UPDATE ON `treatment`
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.treatment_service_code <=> NEW.treatment_service_code)
+        OR NOT (OLD.consultation_rec_id <=> NEW.consultation_rec_id) THEN
+        CALL BumpReportDataVersion('treatment');
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_version_treatment_delete`$$
+CREATE TRIGGER `trg_report_version_treatment_delete`
+AFTER DELETE ON `treatment`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDataVersion('treatment');
+END$$
+
+-- =============================================
+-- treatment_catalogue: name and price
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_report_version_catalogue_update`$$
+CREATE TRIGGER `trg_report_version_catalogue_update`
+AFTER UPDATE ON `treatment_catalogue`
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.treatment_name <=> NEW.treatment_name)
+        OR NOT (OLD.base_price <=> NEW.base_price) THEN
+        CALL BumpReportDataVersion('treatment_catalogue');
+    END IF;
+END$$
+
+-- =============================================
+-- claim
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_report_version_claim_insert`$$
+CREATE TRIGGER `trg_report_version_claim_insert`
+AFTER INSERT ON `claim`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDataVersion('claim');
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_version_claim_update`$$
+CREATE TRIGGER `trg_report_version_claim_update`
+AFTER UPDATE ON `claim`
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.claim_amount <=> NEW.claim_amount)
+        OR NOT (OLD.claim_date <=> NEW.claim_date) THEN
+        CALL BumpReportDataVersion('claim');
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_version_claim_delete`$$
+CREATE TRIGGER `trg_report_version_claim_delete`
+AFTER DELETE ON `claim`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDataVersion('claim');
+END$$
+
+DELIMITER ;
@@ -0,0 +1,314 @@
+-- ============================================================
+-- MATERIALIZED REPORT SUMMARIES
+-- Stored replacements for the branch_appointment_daily_summary and
+-- doctor_monthly_revenue views of 7_reporting_views.sql, which
+-- re-aggregated appointments and payments on every report call
+-- (and no longer match the schema: payment has no
+-- consultation_rec_id, appointment no branch_id).
+--
+-- Triggers only mark the (date, branch) or (month, doctor)
+-- partitions a write touched; services/report_summaries.py
+-- recomputes marked partitions every minute, records each run in
+-- report_refresh_log and rebuilds everything nightly (cascaded
+-- invoice deletes fire no triggers). Reports fall back to the live
+-- aggregate when the oldest unrefreshed mark exceeds
+-- REPORT_SUMMARY_MAX_STALENESS.
+-- ============================================================
+
+USE `medsync_db`;
+
+-- 1. BRANCH APPOINTMENTS PER DAY AND STATUS
+-- Attributed to the slot's branch and date; the report joins branch for
+-- the name so renames need no refresh
+CREATE TABLE IF NOT EXISTS report_branch_appointment_daily (
+    available_date DATE NOT NULL,
+    branch_id CHAR(36) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    appointment_count INT NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (available_date, branch_id, status),
+    INDEX idx_report_branch_daily_branch (branch_id, available_date)
+);
+
+-- 2. DOCTOR REVENUE PER MONTH
+-- Invoiced amount (sub_total + tax) by the doctor of the invoiced
+-- consultation and the month the invoice was created
+CREATE TABLE IF NOT EXISTS report_doctor_monthly_revenue (
+    revenue_month DATE NOT NULL,                -- First day of the month
+    doctor_id CHAR(36) NOT NULL,
+    invoice_count INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (revenue_month, doctor_id),
+    INDEX idx_report_doctor_revenue_doctor (doctor_id, revenue_month)
+);
+
+-- 3. PARTITIONS WAITING FOR A REFRESH
+-- first_marked_at drives the staleness bound; marked_at changes on every
+-- re-mark so the refresher only clears rows nobody touched meanwhile
+CREATE TABLE IF NOT EXISTS report_summary_dirty (
+    summary_name VARCHAR(40) NOT NULL,
+    partition_date DATE NOT NULL,
+    partition_key CHAR(36) NOT NULL,            -- branch_id or doctor_id
+    first_marked_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    marked_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    PRIMARY KEY (summary_name, partition_date, partition_key),
+    INDEX idx_report_summary_dirty_age (first_marked_at)
+);
+
+-- 4. REFRESH LOG
+CREATE TABLE IF NOT EXISTS report_refresh_log (
+    refresh_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    mode ENUM('incremental', 'full') NOT NULL,
+    partitions INT NOT NULL DEFAULT 0,
+    started_at TIMESTAMP(6) NOT NULL,
+    finished_at TIMESTAMP(6) NULL,
+    duration_ms DECIMAL(12,2) NULL,
+    error TEXT NULL,
+    INDEX idx_report_refresh_log_started (started_at)
+);
+
+-- Outstanding balances need no summary: patient_balance already is the
+-- maintained aggregate, it only lacked an index for the > 0 range read
+CREATE INDEX idx_patient_balance_total ON patient_balance (total_balance);
+
+-- Live fallback: invoices of one doctor-month by creation time
+CREATE INDEX idx_invoice_created_at ON invoice (created_at);
+
+-- The live doctor revenue query reads invoice, so it joins the report
+-- cache's data versions (15_report_data_version.sql)
+INSERT IGNORE INTO report_data_version (table_name) VALUES ('invoice'), ('report_summaries');
+
+DELIMITER $$
+
+-- =============================================
+-- Procedure: MarkReportPartition
+-- =============================================
+DROP PROCEDURE IF EXISTS `MarkReportPartition`$$
+
+CREATE PROCEDURE `MarkReportPartition`(
+    IN p_summary_name VARCHAR(40),
+    IN p_partition_date DATE,
+    IN p_partition_key CHAR(36)
+)
+BEGIN
+    IF p_partition_date IS NOT NULL AND p_partition_key IS NOT NULL THEN
+        INSERT INTO report_summary_dirty (summary_name, partition_date, partition_key)
+        VALUES (p_summary_name, p_partition_date, p_partition_key)
+        ON DUPLICATE KEY UPDATE marked_at = CURRENT_TIMESTAMP(6);
+    END IF;
+END$$
+
+-- =============================================
+-- Procedure: MarkSlotPartition
+-- Marks the (date, branch) of an appointment's time slot
+-- =============================================
+DROP PROCEDURE IF EXISTS `MarkSlotPartition`$$
+
+CREATE PROCEDURE `MarkSlotPartition`(IN p_time_slot_id CHAR(36))
+BEGIN
+    DECLARE v_date DATE;
+    DECLARE v_branch_id CHAR(36);
+
+    SELECT available_date, branch_id INTO v_date, v_branch_id
+    FROM time_slot WHERE time_slot_id = p_time_slot_id;
+
+    CALL MarkReportPartition('branch_appointment_daily', v_date, v_branch_id);
+END$$
+
+-- =============================================
+-- Procedure: MarkInvoicePartition
+-- Marks the (month, doctor) of an invoice
+-- =============================================
+DROP PROCEDURE IF EXISTS `MarkInvoicePartition`$$
+
+CREATE PROCEDURE `MarkInvoicePartition`(
+    IN p_consultation_rec_id CHAR(36),
+    IN p_created_at TIMESTAMP
+)
+BEGIN
+    DECLARE v_doctor_id CHAR(36);
+
+    SELECT ts.doctor_id INTO v_doctor_id
+    FROM consultation_record cr
+    JOIN appointment a ON cr.appointment_id = a.appointment_id
+    JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+    WHERE cr.consultation_rec_id = p_consultation_rec_id;
+
+    CALL MarkReportPartition('doctor_monthly_revenue', DATE_FORMAT(p_created_at, '%Y-%m-01'), v_doctor_id);
+END$$
+
+-- =============================================
+-- Procedure: RefreshBranchAppointmentPartition
+-- =============================================
+DROP PROCEDURE IF EXISTS `RefreshBranchAppointmentPartition`$$
+
+CREATE PROCEDURE `RefreshBranchAppointmentPartition`(
+    IN p_date DATE,
+    IN p_branch_id CHAR(36)
+)
+BEGIN
+    DELETE FROM report_branch_appointment_daily
+    WHERE available_date = p_date AND branch_id = p_branch_id;
+
+    INSERT INTO report_branch_appointment_daily (available_date, branch_id, status, appointment_count)
+    SELECT ts.available_date, ts.branch_id, a.status, COUNT(*)
+    FROM time_slot ts
+    JOIN appointment a ON a.time_slot_id = ts.time_slot_id
+    WHERE ts.branch_id = p_branch_id AND ts.available_date = p_date
+    GROUP BY ts.available_date, ts.branch_id, a.status;
+END$$
+
+-- =============================================
+-- Procedure: RefreshDoctorRevenuePartition
+-- =============================================
+DROP PROCEDURE IF EXISTS `RefreshDoctorRevenuePartition`$$
+
+CREATE PROCEDURE `RefreshDoctorRevenuePartition`(
+    IN p_month DATE,
+    IN p_doctor_id CHAR(36)
+)
+BEGIN
+    DELETE FROM report_doctor_monthly_revenue
+    WHERE revenue_month = p_month AND doctor_id = p_doctor_id;
+
+    INSERT INTO report_doctor_monthly_revenue (revenue_month, doctor_id, invoice_count, revenue)
+    SELECT p_month, ts.doctor_id, COUNT(*), SUM(i.sub_total + COALESCE(i.tax_amount, 0))
+    FROM time_slot ts
+    JOIN appointment a ON a.time_slot_id = ts.time_slot_id
+    JOIN consultation_record cr ON cr.appointment_id = a.appointment_id
+    JOIN invoice i ON i.consultation_rec_id = cr.consultation_rec_id
+    WHERE ts.doctor_id = p_doctor_id
+        AND i.created_at >= p_month
+        AND i.created_at < p_month + INTERVAL 1 MONTH
+    GROUP BY ts.doctor_id;
+END$$
+
+-- =============================================
+-- Procedure: RebuildReportSummaries
+-- =============================================
+DROP PROCEDURE IF EXISTS `RebuildReportSummaries`$$
+
+CREATE PROCEDURE `RebuildReportSummaries`()
+BEGIN
+    DECLARE v_started_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6);
+
+    DELETE FROM report_branch_appointment_daily;
+    DELETE FROM report_doctor_monthly_revenue;
+
+    INSERT INTO report_branch_appointment_daily (available_date, branch_id, status, appointment_count)
+    SELECT ts.available_date, ts.branch_id, a.status, COUNT(*)
+    FROM appointment a
+    JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+    GROUP BY ts.available_date, ts.branch_id, a.status;
+
+    INSERT INTO report_doctor_monthly_revenue (revenue_month, doctor_id, invoice_count, revenue)
+    SELECT
+        DATE_FORMAT(i.created_at, '%Y-%m-01') as revenue_month,
+        ts.doctor_id,
+        COUNT(*),
+        SUM(i.sub_total + COALESCE(i.tax_amount, 0))
+    FROM invoice i
+    JOIN consultation_record cr ON i.consultation_rec_id = cr.consultation_rec_id
+    JOIN appointment a ON cr.appointment_id = a.appointment_id
+    JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+    GROUP BY revenue_month, ts.doctor_id;
+
+    -- Marks made during the rebuild may not be covered by it; keep them
+    DELETE FROM report_summary_dirty WHERE marked_at < v_started_at;
+END$$
+
+-- =============================================
+-- Triggers: appointment
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_report_summary_appointment_insert`$$
+
+CREATE TRIGGER `trg_report_summary_appointment_insert`
+AFTER INSERT ON `appointment`
+FOR EACH ROW
+BEGIN
+    CALL MarkSlotPartition(NEW.time_slot_id);
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_summary_appointment_update`$$
+
+CREATE TRIGGER `trg_report_summary_appointment_update`
+AFTER UPDATE ON `appointment`
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.status <=> NEW.status) OR NOT (OLD.time_slot_id <=> NEW.time_slot_id) THEN
+        CALL MarkSlotPartition(OLD.time_slot_id);
+        IF NOT (OLD.time_slot_id <=> NEW.time_slot_id) THEN
+            CALL MarkSlotPartition(NEW.time_slot_id);
+        END IF;
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_summary_appointment_delete`$$
+
+CREATE TRIGGER `trg_report_summary_appointment_delete`
+AFTER DELETE ON `appointment`
+FOR EACH ROW
+BEGIN
+    CALL MarkSlotPartition(OLD.time_slot_id);
+END$$
+
+-- =============================================
+-- Trigger: time_slot (a booked slot moved to another day or branch)
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_report_summary_slot_update`$$
+
+CREATE TRIGGER `trg_report_summary_slot_update`
+AFTER UPDATE ON `time_slot`
+FOR EACH ROW
+BEGIN
+    IF (OLD.is_booked OR NEW.is_booked)
+        AND (NOT (OLD.available_date <=> NEW.available_date) OR NOT (OLD.branch_id <=> NEW.branch_id)) THEN
+        CALL MarkReportPartition('branch_appointment_daily', OLD.available_date, OLD.branch_id);
+        CALL MarkReportPartition('branch_appointment_daily', NEW.available_date, NEW.branch_id);
+    END IF;
+END$$
+
+-- =============================================
+-- Triggers: invoice (partition marks and report cache data version)
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_report_summary_invoice_insert`$$
+
+CREATE TRIGGER `trg_report_summary_invoice_insert`
+AFTER INSERT ON `invoice`
+FOR EACH ROW
+BEGIN
+    CALL MarkInvoicePartition(NEW.consultation_rec_id, NEW.created_at);
+    CALL BumpReportDataVersion('invoice');
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_summary_invoice_update`$$
+
+CREATE TRIGGER `trg_report_summary_invoice_update`
+AFTER UPDATE ON `invoice`
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.sub_total <=> NEW.sub_total)
+        OR NOT (OLD.tax_amount <=> NEW.tax_amount)
+        OR NOT (OLD.created_at <=> NEW.created_at)
+        OR NOT (OLD.consultation_rec_id <=> NEW.consultation_rec_id) THEN
+        CALL MarkInvoicePartition(OLD.consultation_rec_id, OLD.created_at);
+        CALL MarkInvoicePartition(NEW.consultation_rec_id, NEW.created_at);
+        CALL BumpReportDataVersion('invoice');
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_summary_invoice_delete`$$
+
+CREATE TRIGGER `trg_report_summary_invoice_delete`
+AFTER DELETE ON `invoice`
+FOR EACH ROW
+BEGIN
+    CALL MarkInvoicePartition(OLD.consultation_rec_id, OLD.created_at);
+    CALL BumpReportDataVersion('invoice');
+END$$
+
+DELIMITER ;
+
+-- 5. INITIAL BACKFILL
+CALL RebuildReportSummaries();
@@ -0,0 +1,174 @@
+-- ============================================================
+-- DAILY PAYMENT MIX
+-- Payment count and amount per day and payment method, plus
+-- insurance claims per day, posted by triggers on payment and
+-- claim. The insurance vs out-of-pocket report reads every total
+-- it needs from this table in one grouped range scan instead of
+-- three passes over payment and claim with DATE() filters.
+--
+-- Distinct patients per method cannot be summed across days, so
+-- the report still counts them on payment, through the covering
+-- index below. services/report_summaries.py rebuilds the table
+-- nightly (claims are deleted by cascade with their patient,
+-- which fires no triggers).
+--
+-- The index replaces idx_payment_date_amount (14_revenue_ledger.sql):
+-- both lead with payment_date, and the wider one also covers the
+-- ledger's partial-month payment reads, so keeping both only doubled
+-- the payment_date maintenance on every payment write.
+--
+-- UNVERIFIED: no MySQL server was available when this index set was
+-- chosen, so the plans below are what the index definitions should
+-- give, not EXPLAIN output. Check them (and the timings) with
+--   python -m services.report_data --seed-payments 5000000
+-- which seeds a scratch schema and prints the real plans.
+-- Expected plans at 5M payments:
+--   rollup read         type=range  key=PRIMARY
+--                       Extra: Using where; Using temporary
+--   patient counts      type=range  key=idx_payment_date_report
+--                       Extra: Using where; Using index; Using temporary
+--   ledger leftovers    type=range  key=idx_payment_date_report
+--                       Extra: Using where; Using index; Using temporary
+--   ledger daily stats  type=range  key=idx_payment_date_report
+--                       Extra: Using where; Backward index scan; Using index
+-- Without a date filter these become a full scan of the same key
+-- (type=index), still without touching payment rows.
+-- ============================================================
+
+USE `medsync_db`;
+
+-- 1. PAYMENT MIX PER DAY
+-- source 'payment' rows are per payment_method (every status, as the
+-- report has always counted them); source 'claim' rows use method ''
+CREATE TABLE IF NOT EXISTS report_payment_mix_daily (
+    mix_date DATE NOT NULL,
+    source ENUM('payment', 'claim') NOT NULL,
+    payment_method VARCHAR(20) NOT NULL DEFAULT '',
+    row_count INT NOT NULL DEFAULT 0,
+    amount DECIMAL(14,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (mix_date, source, payment_method)
+);
+
+-- Distinct patients per method, and the ledger's per-status and per-day
+-- totals, over a payment_date range from the index alone
+DROP INDEX idx_payment_date_amount ON payment;
+CREATE INDEX idx_payment_date_report ON payment (payment_date, payment_method, patient_id, status, amount_paid);
+
+DELIMITER $$
+
+-- =============================================
+-- Procedure: PostPaymentMix
+-- Posts (p_sign = 1) or reverses (p_sign = -1) one payment or claim
+-- =============================================
+DROP PROCEDURE IF EXISTS `PostPaymentMix`$$
+
+CREATE PROCEDURE `PostPaymentMix`(
+    IN p_source VARCHAR(10),
+    IN p_date DATE,
+    IN p_payment_method VARCHAR(20),
+    IN p_amount DECIMAL(12,2),
+    IN p_sign INT
+)
+BEGIN
+    INSERT INTO report_payment_mix_daily (mix_date, source, payment_method, row_count, amount)
+    VALUES (p_date, p_source, COALESCE(p_payment_method, ''), p_sign, p_sign * p_amount)
+    ON DUPLICATE KEY UPDATE
+        row_count = row_count + p_sign,
+        amount = amount + p_sign * p_amount;
+END$$
+
+-- =============================================
+-- Procedure: RebuildPaymentMixDaily
+-- =============================================
+DROP PROCEDURE IF EXISTS `RebuildPaymentMixDaily`$$
+
+CREATE PROCEDURE `RebuildPaymentMixDaily`()
+BEGIN
+    DELETE FROM report_payment_mix_daily;
+
+    INSERT INTO report_payment_mix_daily (mix_date, source, payment_method, row_count, amount)
+    SELECT payment_date, 'payment', payment_method, COUNT(*), SUM(amount_paid)
+    FROM payment
+    GROUP BY payment_date, payment_method;
+
+    INSERT INTO report_payment_mix_daily (mix_date, source, payment_method, row_count, amount)
+    SELECT claim_date, 'claim', '', COUNT(*), SUM(claim_amount)
+    FROM claim
+    GROUP BY claim_date;
+END$$
+
+-- =============================================
+-- Triggers: payment
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_payment_mix_payment_insert`$$
+
+CREATE TRIGGER `trg_payment_mix_payment_insert`
+AFTER INSERT ON `payment`
+FOR EACH ROW
+FOLLOWS `trg_ledger_payment_insert`
+BEGIN
+    CALL PostPaymentMix('payment', NEW.payment_date, NEW.payment_method, NEW.amount_paid, 1);
+END$$
+
+DROP TRIGGER IF EXISTS `trg_payment_mix_payment_update`$$
+
+CREATE TRIGGER `trg_payment_mix_payment_update`
+AFTER UPDATE ON `payment`
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.amount_paid <=> NEW.amount_paid)
+        OR NOT (OLD.payment_method <=> NEW.payment_method)
+        OR NOT (OLD.payment_date <=> NEW.payment_date) THEN
+        CALL PostPaymentMix('payment', OLD.payment_date, OLD.payment_method, OLD.amount_paid, -1);
+        CALL PostPaymentMix('payment', NEW.payment_date, NEW.payment_method, NEW.amount_paid, 1);
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_payment_mix_payment_delete`$$
+
+CREATE TRIGGER `trg_payment_mix_payment_delete`
+AFTER DELETE ON `payment`
+FOR EACH ROW
+BEGIN
+    CALL PostPaymentMix('payment', OLD.payment_date, OLD.payment_method, OLD.amount_paid, -1);
+END$$
+
+-- =============================================
+-- Triggers: claim
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_payment_mix_claim_insert`$$
+
+CREATE TRIGGER `trg_payment_mix_claim_insert`
+AFTER INSERT ON `claim`
+FOR EACH ROW
+BEGIN
+    CALL PostPaymentMix('claim', NEW.claim_date, '', NEW.claim_amount, 1);
+END$$
+
+DROP TRIGGER IF EXISTS `trg_payment_mix_claim_update`$$
+
+CREATE TRIGGER `trg_payment_mix_claim_update`
+AFTER UPDATE ON `claim`
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.claim_amount <=> NEW.claim_amount)
+        OR NOT (OLD.claim_date <=> NEW.claim_date) THEN
+        CALL PostPaymentMix('claim', OLD.claim_date, '', OLD.claim_amount, -1);
+        CALL PostPaymentMix('claim', NEW.claim_date, '', NEW.claim_amount, 1);
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_payment_mix_claim_delete`$$
+
+CREATE TRIGGER `trg_payment_mix_claim_delete`
+AFTER DELETE ON `claim`
+FOR EACH ROW
+BEGIN
+    CALL PostPaymentMix('claim', OLD.claim_date, '', OLD.claim_amount, -1);
+END$$
+
+DELIMITER ;
+
+-- 2. INITIAL BACKFILL
+CALL RebuildPaymentMixDaily();
@@ -0,0 +1,15 @@
+-- ============================================================
+-- ANALYTICS SNAPSHOT SOURCES
+-- services/analytics_snapshot.py copies the reporting fact tables
+-- into a local SQLite file, re-reading only rows whose updated_at
+-- (archive tables: archived_at) is past its last watermark. These
+-- indexes turn each sync into a short range scan; appointment,
+-- consultation_record and invoice already have theirs
+-- (12_doctor_daily_stats.sql).
+-- ============================================================
+
+USE `medsync_db`;
+
+CREATE INDEX idx_time_slot_updated_at ON time_slot (updated_at);
+CREATE INDEX idx_time_slot_archive_archived_at ON time_slot_archive (archived_at);
+CREATE INDEX idx_appointment_archive_archived_at ON appointment_archive (archived_at);
@@ -0,0 +1,56 @@
+-- ============================================================
+-- MEDICATION SEARCH INDEX SUPPORT
+-- The medication typeahead is answered from an in-memory prefix
+-- and n-gram index (services/medication_search.py) instead of a
+-- LIKE '%q%' scan of medication per keystroke. Each API process
+-- keeps its own index current:
+--   * the 'medication' counter in report_data_version, bumped by
+--     the triggers below, tells it that some process (or a script)
+--     changed medication; it checks the counter at most every few
+--     seconds with one primary key read
+--   * it then re-reads only rows with updated_at at or after its
+--     watermark (idx_medication_updated_at), and reconciles ids
+--     when the row count shows deletes
+-- ============================================================
+
+USE `medsync_db`;
+
+INSERT IGNORE INTO report_data_version (table_name) VALUES ('medication');
+
+-- Incremental reload of changed medications
+CREATE INDEX idx_medication_updated_at ON medication (updated_at);
+
+DELIMITER $$
+
+-- =============================================
+-- medication: inserts, deletes and edits of the searched columns
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_report_version_medication_insert`$$
+CREATE TRIGGER `trg_report_version_medication_insert`
+AFTER INSERT ON `medication`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDataVersion('medication');
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_version_medication_update`$$
+CREATE TRIGGER `trg_report_version_medication_update`
+AFTER UPDATE ON `medication`
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.generic_name <=> NEW.generic_name)
+        OR NOT (OLD.manufacturer <=> NEW.manufacturer)
+        OR NOT (OLD.form <=> NEW.form) THEN
+        CALL BumpReportDataVersion('medication');
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_version_medication_delete`$$
+CREATE TRIGGER `trg_report_version_medication_delete`
+AFTER DELETE ON `medication`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDataVersion('medication');
+END$$
+
+DELIMITER ;
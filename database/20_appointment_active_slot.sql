@@ -0,0 +1,177 @@
+-- ============================================================
+-- ONE LIVE APPOINTMENT PER SLOT
+-- Cancelling an appointment keeps its row (reports and counters
+-- still count it) and frees the slot, so time_slot_id alone can
+-- no longer be unique: rebooking the slot would hit a duplicate
+-- key. Uniqueness now covers only appointments that are not
+-- Cancelled, through a generated column that is NULL for them.
+-- The column is INVISIBLE, so SELECT a.* responses are unchanged.
+-- ============================================================
+
+USE `medsync_db`;
+
+-- 1. HOT TABLE
+-- The foreign key on time_slot_id needs its own index once the
+-- inline UNIQUE (named time_slot_id) is dropped
+ALTER TABLE appointment
+    ADD COLUMN active_time_slot_id CHAR(36)
+        AS (IF(status = 'Cancelled', NULL, time_slot_id)) STORED INVISIBLE,
+    ADD INDEX idx_appointment_time_slot (time_slot_id),
+    DROP INDEX time_slot_id,
+    ADD UNIQUE KEY uq_appointment_active_slot (active_time_slot_id);
+
+-- 2. ARCHIVE
+-- A slot archived with a cancelled and a later appointment brings both
+ALTER TABLE appointment_archive
+    DROP INDEX time_slot_id,
+    ADD INDEX idx_aa_time_slot (time_slot_id);
+
+-- 3. BRANCH STATISTICS
+-- Replace the versions in 13_branch_statistics.sql that assumed at most
+-- one appointment per slot (a scalar subquery in the slot trigger, and
+-- a slot-appointment join that counted a slot once per appointment)
+DELIMITER $$
+
+-- =============================================
+-- Procedure: RebuildBranchStatistics
+-- Recomputes both tables from the base tables
+-- =============================================
+DROP PROCEDURE IF EXISTS `RebuildBranchStatistics`$$
+
+CREATE PROCEDURE `RebuildBranchStatistics`()
+BEGIN
+    DELETE FROM branch_counters;
+    DELETE FROM branch_daily_occupancy;
+
+    INSERT INTO branch_counters (
+        branch_id, active_employees, active_doctors, patients,
+        appointments, scheduled, completed, cancelled, no_show
+    )
+    SELECT
+        b.branch_id,
+        COALESCE(emp.active_employees, 0),
+        COALESCE(emp.active_doctors, 0),
+        COALESCE(pat.patients, 0),
+        COALESCE(apt.appointments, 0),
+        COALESCE(apt.scheduled, 0),
+        COALESCE(apt.completed, 0),
+        COALESCE(apt.cancelled, 0),
+        COALESCE(apt.no_show, 0)
+    FROM branch b
+    LEFT JOIN (
+        SELECT e.branch_id, COUNT(*) as active_employees, COUNT(d.doctor_id) as active_doctors
+        FROM employee e
+        LEFT JOIN doctor d ON d.doctor_id = e.employee_id
+        WHERE e.is_active = TRUE
+        GROUP BY e.branch_id
+    ) emp ON emp.branch_id = b.branch_id
+    LEFT JOIN (
+        SELECT registered_branch_id, COUNT(*) as patients
+        FROM patient
+        GROUP BY registered_branch_id
+    ) pat ON pat.registered_branch_id = b.branch_id
+    LEFT JOIN (
+        SELECT
+            ts.branch_id,
+            COUNT(*) as appointments,
+            SUM(a.status = 'Scheduled') as scheduled,
+            SUM(a.status = 'Completed') as completed,
+            SUM(a.status = 'Cancelled') as cancelled,
+            SUM(a.status = 'No-Show') as no_show
+        FROM appointment a
+        JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+        GROUP BY ts.branch_id
+    ) apt ON apt.branch_id = b.branch_id;
+
+    -- Slots and appointments are counted separately: a slot can now carry
+    -- a cancelled appointment next to the one that rebooked it
+    INSERT INTO branch_daily_occupancy (
+        branch_id, stat_date, total_slots, booked_slots,
+        appointments, scheduled, completed, cancelled, no_show
+    )
+    SELECT
+        slots.branch_id,
+        slots.available_date,
+        slots.total_slots,
+        slots.booked_slots,
+        COALESCE(apt.appointments, 0),
+        COALESCE(apt.scheduled, 0),
+        COALESCE(apt.completed, 0),
+        COALESCE(apt.cancelled, 0),
+        COALESCE(apt.no_show, 0)
+    FROM (
+        SELECT branch_id, available_date, COUNT(*) as total_slots, COALESCE(SUM(is_booked), 0) as booked_slots
+        FROM time_slot
+        GROUP BY branch_id, available_date
+    ) slots
+    LEFT JOIN (
+        SELECT
+            ts.branch_id,
+            ts.available_date,
+            COUNT(*) as appointments,
+            SUM(a.status = 'Scheduled') as scheduled,
+            SUM(a.status = 'Completed') as completed,
+            SUM(a.status = 'Cancelled') as cancelled,
+            SUM(a.status = 'No-Show') as no_show
+        FROM appointment a
+        JOIN time_slot ts ON a.time_slot_id = ts.time_slot_id
+        GROUP BY ts.branch_id, ts.available_date
+    ) apt ON apt.branch_id = slots.branch_id AND apt.available_date = slots.available_date;
+END$$
+
+-- =============================================
+-- Procedure: MoveSlotAppointments
+-- Moves the per-status appointment counts of one slot between
+-- branch days (a slot may hold several appointments now)
+-- =============================================
+DROP PROCEDURE IF EXISTS `MoveSlotAppointments`$$
+
+CREATE PROCEDURE `MoveSlotAppointments`(
+    IN p_time_slot_id CHAR(36),
+    IN p_old_branch_id CHAR(36),
+    IN p_old_date DATE,
+    IN p_new_branch_id CHAR(36),
+    IN p_new_date DATE
+)
+BEGIN
+    DECLARE v_done INT DEFAULT 0;
+    DECLARE v_status VARCHAR(20);
+    DECLARE v_count INT;
+    DECLARE status_cursor CURSOR FOR
+        SELECT status, COUNT(*) FROM appointment
+        WHERE time_slot_id = p_time_slot_id
+        GROUP BY status;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_done = 1;
+
+    OPEN status_cursor;
+    move_loop: LOOP
+        FETCH status_cursor INTO v_status, v_count;
+        IF v_done THEN
+            LEAVE move_loop;
+        END IF;
+        CALL BumpBranchAppointment(p_old_branch_id, p_old_date, v_status, -v_count);
+        CALL BumpBranchAppointment(p_new_branch_id, p_new_date, v_status, v_count);
+    END LOOP;
+    CLOSE status_cursor;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_branch_stats_slot_update`$$
+
+CREATE TRIGGER `trg_branch_stats_slot_update`
+AFTER UPDATE ON `time_slot`
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.branch_id <=> NEW.branch_id)
+        OR NOT (OLD.available_date <=> NEW.available_date)
+        OR NOT (OLD.is_booked <=> NEW.is_booked) THEN
+        CALL BumpBranchSlot(OLD.branch_id, OLD.available_date, -1, -IF(OLD.is_booked, 1, 0));
+        CALL BumpBranchSlot(NEW.branch_id, NEW.available_date, 1, IF(NEW.is_booked, 1, 0));
+    END IF;
+
+    -- A moved slot carries its appointments with it
+    IF NOT (OLD.branch_id <=> NEW.branch_id) OR NOT (OLD.available_date <=> NEW.available_date) THEN
+        CALL MoveSlotAppointments(NEW.time_slot_id, OLD.branch_id, OLD.available_date, NEW.branch_id, NEW.available_date);
+    END IF;
+END$$
+
+DELIMITER ;
@@ -0,0 +1,272 @@
+-- ============================================================
+-- REPORT DATA VERSIONS PER DAY
+-- report_data_version (15_report_data_version.sql) counts every
+-- change to a table, so a report over a closed period (yesterday,
+-- last month) was re-keyed by the first write of the day or the
+-- next summary refresh even though none of its rows changed.
+-- These counters are kept per table and per date the change is
+-- reported under. services/report_cache.py keys closed periods by
+-- the sum of the counters over the period instead of the whole-
+-- table counter, so such a cache entry stays valid until a row in
+-- that period changes. Lookup tables (branch, user,
+-- treatment_catalogue, patient_balance) keep whole-table keys.
+--
+-- Dates follow the reports' filters: the slot date for
+-- appointments, DATE(created_at) for invoices and consultations
+-- (treatments by their consultation), payment_date, claim_date.
+-- 'report_summaries' rows are bumped by services/report_summaries.py
+-- for every partition it refreshes.
+-- ============================================================
+
+USE `medsync_db`;
+
+CREATE TABLE IF NOT EXISTS report_day_version (
+    table_name VARCHAR(64) NOT NULL,
+    stat_date DATE NOT NULL,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    PRIMARY KEY (table_name, stat_date)
+);
+
+DELIMITER $$
+
+-- =============================================
+-- Procedure: BumpReportDayVersion
+-- =============================================
+DROP PROCEDURE IF EXISTS `BumpReportDayVersion`$$
+
+CREATE PROCEDURE `BumpReportDayVersion`(
+    IN p_table_name VARCHAR(64),
+    IN p_date DATE
+)
+BEGIN
+    IF p_date IS NOT NULL THEN
+        INSERT INTO report_day_version (table_name, stat_date, version)
+        VALUES (p_table_name, p_date, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1;
+    END IF;
+END$$
+
+-- =============================================
+-- Procedure: BumpSlotDayVersion
+-- An appointment is reported under its slot's date
+-- =============================================
+DROP PROCEDURE IF EXISTS `BumpSlotDayVersion`$$
+
+CREATE PROCEDURE `BumpSlotDayVersion`(IN p_time_slot_id CHAR(36))
+BEGIN
+    DECLARE v_date DATE;
+
+    SELECT available_date INTO v_date
+    FROM time_slot WHERE time_slot_id = p_time_slot_id;
+
+    CALL BumpReportDayVersion('appointment', v_date);
+END$$
+
+-- =============================================
+-- Procedure: BumpConsultationDayVersion
+-- A treatment is reported under its consultation's date
+-- =============================================
+DROP PROCEDURE IF EXISTS `BumpConsultationDayVersion`$$
+
+CREATE PROCEDURE `BumpConsultationDayVersion`(IN p_consultation_rec_id CHAR(36))
+BEGIN
+    DECLARE v_date DATE;
+
+    SELECT DATE(created_at) INTO v_date
+    FROM consultation_record WHERE consultation_rec_id = p_consultation_rec_id;
+
+    CALL BumpReportDayVersion('treatment', v_date);
+END$$
+
+-- =============================================
+-- appointment (and slots moved to another date)
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_report_day_appointment_insert`$$
+CREATE TRIGGER `trg_report_day_appointment_insert`
+AFTER INSERT ON `appointment`
+FOR EACH ROW
+BEGIN
+    CALL BumpSlotDayVersion(NEW.time_slot_id);
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_day_appointment_update`$$
+CREATE TRIGGER `trg_report_day_appointment_update`
+AFTER UPDATE ON `appointment`
+FOR EACH ROW
+BEGIN
+    CALL BumpSlotDayVersion(NEW.time_slot_id);
+    IF NOT (OLD.time_slot_id <=> NEW.time_slot_id) THEN
+        CALL BumpSlotDayVersion(OLD.time_slot_id);
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_day_appointment_delete`$$
+CREATE TRIGGER `trg_report_day_appointment_delete`
+AFTER DELETE ON `appointment`
+FOR EACH ROW
+BEGIN
+    CALL BumpSlotDayVersion(OLD.time_slot_id);
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_day_slot_update`$$
+CREATE TRIGGER `trg_report_day_slot_update`
+AFTER UPDATE ON `time_slot`
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.available_date <=> NEW.available_date)
+        OR NOT (OLD.branch_id <=> NEW.branch_id) THEN
+        CALL BumpReportDayVersion('appointment', OLD.available_date);
+        CALL BumpReportDayVersion('appointment', NEW.available_date);
+    END IF;
+END$$
+
+-- =============================================
+-- invoice
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_report_day_invoice_insert`$$
+CREATE TRIGGER `trg_report_day_invoice_insert`
+AFTER INSERT ON `invoice`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDayVersion('invoice', DATE(NEW.created_at));
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_day_invoice_update`$$
+CREATE TRIGGER `trg_report_day_invoice_update`
+AFTER UPDATE ON `invoice`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDayVersion('invoice', DATE(NEW.created_at));
+    IF NOT (DATE(OLD.created_at) <=> DATE(NEW.created_at)) THEN
+        CALL BumpReportDayVersion('invoice', DATE(OLD.created_at));
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_day_invoice_delete`$$
+CREATE TRIGGER `trg_report_day_invoice_delete`
+AFTER DELETE ON `invoice`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDayVersion('invoice', DATE(OLD.created_at));
+END$$
+
+-- =============================================
+-- payment
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_report_day_payment_insert`$$
+CREATE TRIGGER `trg_report_day_payment_insert`
+AFTER INSERT ON `payment`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDayVersion('payment', NEW.payment_date);
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_day_payment_update`$$
+CREATE TRIGGER `trg_report_day_payment_update`
+AFTER UPDATE ON `payment`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDayVersion('payment', NEW.payment_date);
+    IF NOT (OLD.payment_date <=> NEW.payment_date) THEN
+        CALL BumpReportDayVersion('payment', OLD.payment_date);
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_day_payment_delete`$$
+CREATE TRIGGER `trg_report_day_payment_delete`
+AFTER DELETE ON `payment`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDayVersion('payment', OLD.payment_date);
+END$$
+
+-- =============================================
+-- claim
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_report_day_claim_insert`$$
+CREATE TRIGGER `trg_report_day_claim_insert`
+AFTER INSERT ON `claim`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDayVersion('claim', NEW.claim_date);
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_day_claim_update`$$
+CREATE TRIGGER `trg_report_day_claim_update`
+AFTER UPDATE ON `claim`
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.claim_amount <=> NEW.claim_amount)
+        OR NOT (OLD.claim_date <=> NEW.claim_date) THEN
+        CALL BumpReportDayVersion('claim', OLD.claim_date);
+        CALL BumpReportDayVersion('claim', NEW.claim_date);
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_day_claim_delete`$$
+CREATE TRIGGER `trg_report_day_claim_delete`
+AFTER DELETE ON `claim`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDayVersion('claim', OLD.claim_date);
+END$$
+
+-- =============================================
+-- consultation_record and treatment
+-- =============================================
+DROP TRIGGER IF EXISTS `trg_report_day_consultation_insert`$$
+CREATE TRIGGER `trg_report_day_consultation_insert`
+AFTER INSERT ON `consultation_record`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDayVersion('consultation_record', DATE(NEW.created_at));
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_day_consultation_update`$$
+CREATE TRIGGER `trg_report_day_consultation_update`
+AFTER UPDATE ON `consultation_record`
+FOR EACH ROW
+BEGIN
+    IF NOT (DATE(OLD.created_at) <=> DATE(NEW.created_at)) THEN
+        CALL BumpReportDayVersion('consultation_record', DATE(OLD.created_at));
+        CALL BumpReportDayVersion('consultation_record', DATE(NEW.created_at));
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_day_consultation_delete`$$
+CREATE TRIGGER `trg_report_day_consultation_delete`
+AFTER DELETE ON `consultation_record`
+FOR EACH ROW
+BEGIN
+    CALL BumpReportDayVersion('consultation_record', DATE(OLD.created_at));
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_day_treatment_insert`$$
+CREATE TRIGGER `trg_report_day_treatment_insert`
+AFTER INSERT ON `treatment`
+FOR EACH ROW
+BEGIN
+    CALL BumpConsultationDayVersion(NEW.consultation_rec_id);
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_day_treatment_update`$$
+CREATE TRIGGER `trg_report_day_treatment_update`
+AFTER UPDATE ON `treatment`
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.treatment_service_code <=> NEW.treatment_service_code)
+        OR NOT (OLD.consultation_rec_id <=> NEW.consultation_rec_id) THEN
+        CALL BumpConsultationDayVersion(OLD.consultation_rec_id);
+        CALL BumpConsultationDayVersion(NEW.consultation_rec_id);
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `trg_report_day_treatment_delete`$$
+CREATE TRIGGER `trg_report_day_treatment_delete`
+AFTER DELETE ON `treatment`
+FOR EACH ROW
+BEGIN
+    CALL BumpConsultationDayVersion(OLD.consultation_rec_id);
+END$$
+
+DELIMITER ;
@@ -0,0 +1,75 @@
+-- ============================================================
+-- SHARDED REPORT DATA VERSIONS
+-- The triggers of 15_report_data_version.sql and
+-- 21_report_day_version.sql bumped one counter row per table
+-- (and per table and day) inside the writer's transaction. That
+-- row stayed X-locked until commit, so every booking, payment and
+-- consultation queued behind every other one, and writers that
+-- touch several tables (batch bookings, no-show sweeps,
+-- cancellations) could deadlock on the counters.
+--
+-- Each counter is now split into 64 shards. A bump goes to the
+-- shard of the writer's connection (CONNECTION_ID() % 64), so
+-- concurrent transactions on different pooled connections update
+-- different rows and never wait for each other. Readers add the
+-- shards up: services/report_cache.py and
+-- services/medication_search.py read SUM(version) per table, which
+-- still only ever grows, so cache keys behave exactly as before.
+-- ============================================================
+
+USE `medsync_db`;
+
+-- 1. SHARD COLUMNS
+-- Existing counts stay in shard 0
+ALTER TABLE report_data_version
+    ADD COLUMN shard TINYINT UNSIGNED NOT NULL DEFAULT 0 AFTER table_name,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (table_name, shard);
+
+ALTER TABLE report_day_version
+    ADD COLUMN shard TINYINT UNSIGNED NOT NULL DEFAULT 0 AFTER stat_date,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (table_name, stat_date, shard);
+
+-- 2. PRE-CREATED WHOLE-TABLE SHARDS
+-- A bump then always updates an existing row instead of inserting one
+INSERT IGNORE INTO report_data_version (table_name, shard)
+WITH RECURSIVE shards (shard) AS (
+    SELECT 0 UNION ALL SELECT shard + 1 FROM shards WHERE shard < 63
+)
+SELECT v.table_name, shards.shard
+FROM (SELECT DISTINCT table_name FROM report_data_version) v
+CROSS JOIN shards;
+
+DELIMITER $$
+
+-- =============================================
+-- Procedure: BumpReportDataVersion
+-- =============================================
+DROP PROCEDURE IF EXISTS `BumpReportDataVersion`$$
+
+CREATE PROCEDURE `BumpReportDataVersion`(IN p_table_name VARCHAR(64))
+BEGIN
+    INSERT INTO report_data_version (table_name, shard, version)
+    VALUES (p_table_name, CONNECTION_ID() % 64, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+END$$
+
+-- =============================================
+-- Procedure: BumpReportDayVersion
+-- =============================================
+DROP PROCEDURE IF EXISTS `BumpReportDayVersion`$$
+
+CREATE PROCEDURE `BumpReportDayVersion`(
+    IN p_table_name VARCHAR(64),
+    IN p_date DATE
+)
+BEGIN
+    IF p_date IS NOT NULL THEN
+        INSERT INTO report_day_version (table_name, stat_date, shard, version)
+        VALUES (p_table_name, p_date, CONNECTION_ID() % 64, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1;
+    END IF;
+END$$
+
+DELIMITER ;
@@ -3,6 +3,9 @@
 -- ============================================
 -- These views provide pre-aggregated data for generating PDF reports
 -- Run this file after the main database setup
+--
+-- Superseded for the reports by the materialized summaries in
+-- 16_report_summaries.sql; the API no longer reads these views.
 
 USE medisync;
 
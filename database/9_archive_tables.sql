@@ -0,0 +1,55 @@
+-- ============================================================
+-- ARCHIVE TABLES FOR PAST TIME SLOTS AND APPOINTMENTS
+-- Cold storage for rows older than the archive horizon
+-- Rows are moved here in bounded batches by services/archive.py
+-- ============================================================
+
+USE `medsync_db`;
+
+-- 1. TIME SLOT ARCHIVE
+-- Same shape as time_slot, without foreign keys so rows can outlive
+-- the hot table. Only slots with no hot appointment are archived.
+CREATE TABLE IF NOT EXISTS time_slot_archive (
+    time_slot_id CHAR(36) PRIMARY KEY,
+    doctor_id CHAR(36) NOT NULL,
+    branch_id CHAR(36) NOT NULL,
+    available_date DATE NOT NULL,
+    is_booked BOOL DEFAULT FALSE,
+    start_time TIME NOT NULL,
+    end_time TIME NOT NULL,
+    created_at TIMESTAMP NULL,
+    updated_at TIMESTAMP NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_tsa_doctor_date (doctor_id, available_date),
+    INDEX idx_tsa_branch_date (branch_id, available_date)
+);
+
+-- 2. APPOINTMENT ARCHIVE
+-- Only appointments without a consultation record are archived, because
+-- consultation_record, invoice and claim rows still reference them.
+CREATE TABLE IF NOT EXISTS appointment_archive (
+    appointment_id CHAR(36) PRIMARY KEY,
+    time_slot_id CHAR(36) NOT NULL UNIQUE,
+    patient_id CHAR(36) NOT NULL,
+    status ENUM('Scheduled', 'Completed', 'Cancelled', 'No-Show') DEFAULT 'Scheduled',
+    notes TEXT,
+    created_at TIMESTAMP NULL,
+    updated_at TIMESTAMP NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_aa_patient (patient_id)
+);
+
+-- 3. ARCHIVE WATERMARK
+-- Everything dated before archived_before may live in the archive tables.
+-- Read paths compare their date range against this value to decide
+-- whether the archive has to be consulted at all.
+CREATE TABLE IF NOT EXISTS archive_watermark (
+    table_name VARCHAR(64) PRIMARY KEY,
+    archived_before DATE NOT NULL,
+    rows_archived BIGINT NOT NULL DEFAULT 0,
+    last_run_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- 4. SUPPORTING INDEX ON THE HOT TABLE
+-- Lets the archiver find the oldest slots without scanning the table
+CREATE INDEX idx_time_slot_available_date ON time_slot (available_date);
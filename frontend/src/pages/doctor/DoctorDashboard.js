@@ -84,38 +84,19 @@ export default function DoctorDashboard() {
 
       console.log('📊 Fetching dashboard data for doctor:', doctorId);
 
-      // Fetch doctor dashboard stats
-      const statsResponse = await fetch(`${API_BASE_URL}/doctors/${doctorId}/dashboard/stats`, {
+      // Fetch stats, today's and upcoming appointments in one request
+      const bundleResponse = await fetch(`${API_BASE_URL}/doctors/${doctorId}/dashboard/bundle?days=7`, {
         headers: { 
           'Authorization': `Bearer ${localStorage.getItem('token')}`,
           'Content-Type': 'application/json'
         }
       });
 
-      if (!statsResponse.ok) throw new Error('Failed to fetch stats');
-      const stats = await statsResponse.json();
-
-      // Fetch today's appointments
-      const todayResponse = await fetch(`${API_BASE_URL}/doctors/${doctorId}/dashboard/today-appointments`, {
-        headers: {
-          'Authorization': `Bearer ${localStorage.getItem('token')}`,
-          'Content-Type': 'application/json'
-        }
-      });
-
-      if (!todayResponse.ok) throw new Error('Failed to fetch today appointments');
-      const todayData = await todayResponse.json();
-
-      // Fetch upcoming appointments
-      const upcomingResponse = await fetch(`${API_BASE_URL}/doctors/${doctorId}/dashboard/upcoming?days=7`, {
-        headers: {
-          'Authorization': `Bearer ${localStorage.getItem('token')}`,
-          'Content-Type': 'application/json'
-        }
-      });
-
-      if (!upcomingResponse.ok) throw new Error('Failed to fetch upcoming appointments');
-      const upcomingData = await upcomingResponse.json();
+      if (!bundleResponse.ok) throw new Error('Failed to fetch dashboard');
+      const bundle = await bundleResponse.json();
+      const stats = bundle.stats;
+      const todayData = bundle.today_appointments;
+      const upcomingData = bundle.upcoming;
 
       // Fetch doctor details
       const doctorResponse = await fetch(`${API_BASE_URL}/doctors/${doctorId}`, {
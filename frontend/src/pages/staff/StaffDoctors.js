@@ -94,7 +94,7 @@ const StaffDoctors = () => {
   const fetchPerformanceReport = async () => {
     try {
       const token = localStorage.getItem('token');
-      const response = await fetch(`${API_BASE_URL}/doctors/performance-report`, {
+      const response = await fetch(`${API_BASE_URL}/doctors/performance-report?period=all`, {
         headers: { 'Authorization': `Bearer ${token}`, 'Content-Type': 'application/json' }
       });
       if (response.ok) {